@@ -0,0 +1,57 @@
+"""
+Monster Hunter Weapons API - Modo asíncrono (ASGI)
+
+Sirve la misma aplicación que app.py (páginas, /api/..., /api/auth/...,
+/api/jobs/..., /metrics, /health y los mismos hooks de petición): registra
+los mismos blueprints de controllers/ en Quart. Las vistas y los servicios
+son corrutinas compartidas (ver services/runtime.py); aquí se esperan en el
+bucle de eventos con los repositorios asíncronos sobre un AsyncEngine
+(asyncpg / aiosqlite), de modo que una petición en espera de PostgreSQL no
+ocupa un hilo y un proceso puede mantener miles de conexiones lentas o
+inactivas (p. ej. suscriptores de /api/events).
+
+El esquema se crea al arrancar el servidor (``before_serving``), no al
+importar el módulo: importar asgi.py no toca la base de datos.
+
+Dependencias opcionales:
+    pip install -r requirements-async.txt
+
+Ejecución:
+    uvicorn asgi:app --workers 4
+    hypercorn asgi:app --workers 4
+"""
+
+import asyncio
+from quart import Quart
+from controllers import register_blueprints
+from config.database import init_db
+from services import events_service
+
+__version__ = "2.0.0"
+
+
+def create_async_app():
+    """
+    Factory de la aplicación ASGI.
+
+    Returns:
+        Quart: Aplicación con los blueprints de controllers/ registrados
+    """
+    app = Quart(__name__)
+    app.json.sort_keys = False
+
+    register_blueprints(app)
+
+    @app.before_serving
+    async def prepare_database():
+        """Crea tablas / verifica índices con el motor síncrono antes de servir."""
+        await asyncio.to_thread(init_db)
+
+    @app.after_serving
+    async def stop_events_broker():
+        await asyncio.to_thread(events_service.get_broker().stop)
+
+    return app
+
+
+app = create_async_app()
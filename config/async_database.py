@@ -0,0 +1,120 @@
+"""
+Motor asíncrono de base de datos para el modo de despliegue ASGI (asgi.py).
+
+Reutiliza la misma configuración que config/database.py (DATABASE_URL o las
+variables DB*, las réplicas de DBREPLICA_HOSTS y el dimensionado del pool de
+config/pool.py), pero con un ``AsyncEngine``:
+- postgresql:// -> postgresql+asyncpg://
+- sqlite://     -> sqlite+aiosqlite://
+
+Las lecturas siguen las mismas reglas que ``get_read_db``: réplica
+round-robin salvo que el contexto esté fijado a la primaria (``use_primary``
+o read-your-writes).
+
+Dependencias opcionales: ver requirements-async.txt
+"""
+
+from contextlib import asynccontextmanager
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+from config.database import DATABASE_URL, REPLICA_URLS, ReplicaSet, enforce_foreign_keys, is_primary_pinned
+from config.query_stats import instrument_queries
+from services.tracing_service import trace_queries
+from config.pool import (
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_PGBOUNCER,
+    DB_QUERY_CACHE_SIZE
+)
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_database_url(url):
+    """
+    Convierte una URL síncrona en su equivalente con driver asíncrono.
+
+    Args:
+        url (str): URL de conexión (p. ej. postgresql://...)
+
+    Returns:
+        str: URL con driver asyncio (si ya tenía uno asíncrono se respeta)
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if parsed.get_driver_name() in ('asyncpg', 'aiosqlite', 'psycopg_async'):
+        return url
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No hay driver asíncrono configurado para '{backend}'")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def _async_engine_options(url):
+    parsed = make_url(url)
+    options = {'query_cache_size': DB_QUERY_CACHE_SIZE}
+    if parsed.get_backend_name() == 'sqlite':
+        return options
+    # asyncpg ya prepara y cachea las sentencias por conexión
+    options['pool_pre_ping'] = DB_POOL_PRE_PING
+    if DB_PGBOUNCER:
+        options['poolclass'] = NullPool
+        if parsed.get_driver_name() == 'asyncpg':
+            options['connect_args'] = {'statement_cache_size': 0, 'prepared_statement_cache_size': 0}
+    else:
+        options.update({
+            'pool_size': DB_POOL_SIZE,
+            'max_overflow': DB_MAX_OVERFLOW,
+            'pool_timeout': DB_POOL_TIMEOUT,
+            'pool_recycle': DB_POOL_RECYCLE,
+        })
+    return options
+
+
+def _create_async_engine(url):
+    new_engine = create_async_engine(url, echo=False, **_async_engine_options(url))
+    enforce_foreign_keys(new_engine.sync_engine)
+    instrument_queries(new_engine.sync_engine)
+    trace_queries(new_engine.sync_engine)
+    return new_engine
+
+
+ASYNC_DATABASE_URL = async_database_url(DATABASE_URL)
+
+async_engine = _create_async_engine(ASYNC_DATABASE_URL)
+async_replicas = ReplicaSet(_create_async_engine(async_database_url(url)) for url in REPLICA_URLS)
+
+# expire_on_commit=False: los objetos devueltos se usan tras cerrar la sesión
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+
+@asynccontextmanager
+async def get_async_db():
+    """
+    Context manager asíncrono de sesiones de base de datos.
+
+    Usage:
+        async with get_async_db() as db:
+            ...
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@asynccontextmanager
+async def get_async_read_db():
+    """
+    Context manager asíncrono de sesiones de sólo lectura (ver ``get_read_db``).
+
+    Usage:
+        async with get_async_read_db() as db:
+            ...
+    """
+    replica = None if is_primary_pinned() else async_replicas.choose()
+    async with (AsyncSessionLocal(bind=replica) if replica is not None else AsyncSessionLocal()) as db:
+        yield db
@@ -3,8 +3,9 @@ Configuración de base de datos para la API de Monster Hunter Weapons.
 
 Este módulo maneja:
 - Conexión a PostgreSQL en Railway usando variables de entorno
-- Creación del motor SQLAlchemy con configuraciones optimizadas
+- Creación del motor SQLAlchemy con pool configurable (ver config/pool.py)
 - Gestión de sesiones de base de datos con context manager
+- Enrutado de lecturas a réplicas (round-robin con expulsión por errores)
 - Inicialización automática de tablas
 
 Variables de entorno requeridas:
@@ -13,17 +14,37 @@ Variables de entorno requeridas:
 - DBHOST: Host del servidor PostgreSQL
 - DBPORT: Puerto (por defecto 5432)
 - DBNAME: Nombre de la base de datos
+
+Variables de entorno opcionales:
+- DATABASE_URL: URL completa de la primaria (sustituye a las anteriores).
+  ``postgres://`` y ``postgresql://`` sin driver usan psycopg 3
+- DBREPLICA_HOSTS: Réplicas de lectura, separadas por comas (host[:puerto] o URL)
+- DBREPLICA_EJECT_SECONDS: Tiempo fuera de rotación de una réplica con errores
 """
 
 import os
-from sqlalchemy import create_engine
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
 from models.weapons_model import Base
+import models.change_model  # noqa: F401  (registra catalog_changes y su listener de escritura)
+import models.stats_model  # noqa: F401  (registra catalog_counters y su listener de escritura)
+from config.pool import engine_options, instrument_engine, start_liveness_sweep
+from config.query_stats import instrument_queries
 from dotenv import load_dotenv
 
 # Cargar variables de entorno desde archivo .env
 load_dotenv()
 
+# Después de load_dotenv: lee TRACING_EXPORTER al importarse
+from services.tracing_service import trace_queries
+
 # Obtener credenciales de base de datos desde variables de entorno
 DBUSER = os.getenv('DBUSER')
 DBPASSWORD = os.getenv('DBPASSWORD') 
@@ -31,33 +52,248 @@ DBHOST = os.getenv('DBHOST')
 DBPORT = os.getenv('DBPORT', '5432')
 DBNAME = os.getenv('DBNAME')
 
-# Validar que todas las variables requeridas estén presentes
-required_vars = ['DBUSER', 'DBPASSWORD', 'DBHOST', 'DBNAME']
-missing_vars = [var for var in required_vars if not os.getenv(var)]
+# Réplicas de lectura opcionales: lista separada por comas de host[:puerto]
+# (mismas credenciales y base de datos que la primaria) o URLs completas
+DBREPLICA_HOSTS = os.getenv('DBREPLICA_HOSTS', '')
+# Segundos que una réplica queda fuera de rotación tras un error de conexión
+DBREPLICA_EJECT_SECONDS = float(os.getenv('DBREPLICA_EJECT_SECONDS', '30'))
+
+# Driver de PostgreSQL cuando la URL no indica ninguno: psycopg 3, que prepara
+# en el servidor las consultas repetidas (DB_PREPARE_THRESHOLD, config/pool.py)
+DEFAULT_POSTGRES_DRIVER = 'postgresql+psycopg'
+
+
+def with_default_driver(url):
+    """``postgres://`` o ``postgresql://`` -> DEFAULT_POSTGRES_DRIVER; un driver explícito se respeta."""
+    for prefix in ('postgres://', 'postgresql://'):
+        if url.startswith(prefix):
+            return f"{DEFAULT_POSTGRES_DRIVER}://{url[len(prefix):]}"
+    return url
+
 
-if missing_vars:
-    raise ValueError(f"Variables de entorno faltantes: {', '.join(missing_vars)}")
+if os.getenv('DATABASE_URL'):
+    # URL completa (p. ej. sqlite:///local.db para desarrollo y pruebas)
+    DATABASE_URL = with_default_driver(os.getenv('DATABASE_URL'))
+else:
+    # Validar que todas las variables requeridas estén presentes
+    required_vars = ['DBUSER', 'DBPASSWORD', 'DBHOST', 'DBNAME']
+    missing_vars = [var for var in required_vars if not os.getenv(var)]
+
+    if missing_vars:
+        raise ValueError(f"Variables de entorno faltantes: {', '.join(missing_vars)}")
+
+    # Construir URL de conexión para PostgreSQL
+    DATABASE_URL = f"{DEFAULT_POSTGRES_DRIVER}://{DBUSER}:{DBPASSWORD}@{DBHOST}:{DBPORT}/{DBNAME}"
+
+
+# Métricas del pool de cada motor (primaria y réplicas)
+_pool_stats = {}
+
+
+def enforce_foreign_keys(target_engine):
+    """
+    Activa la comprobación de claves foráneas en SQLite (PRAGMA por conexión).
+
+    PostgreSQL siempre las comprueba; las escrituras confían en la restricción
+    en lugar de consultar antes la fila referenciada.
+    """
+    if target_engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(target_engine, 'connect')
+    def _foreign_keys_on(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
+def _create_engine(url, name='primary'):
+    """Crea un motor con la configuración de pool de entorno (ver config/pool.py)."""
+    new_engine = create_engine(url, echo=False, **engine_options(url))
+    enforce_foreign_keys(new_engine)
+    _pool_stats[new_engine] = instrument_engine(new_engine, name)
+    instrument_queries(new_engine)
+    trace_queries(new_engine)
+    return new_engine
+
+
+def _replica_url(entry):
+    """Convierte una entrada de DBREPLICA_HOSTS en una URL de conexión."""
+    if '://' in entry:
+        return with_default_driver(entry)
+    host, _, port = entry.partition(':')
+    return make_url(DATABASE_URL).set(host=host, port=int(port) if port else None).render_as_string(
+        hide_password=False
+    )
 
-# Construir URL de conexión para PostgreSQL
-DATABASE_URL = f"postgresql://{DBUSER}:{DBPASSWORD}@{DBHOST}:{DBPORT}/{DBNAME}"
 
 # Crear motor SQLAlchemy con configuraciones para producción
-engine = create_engine(
-    DATABASE_URL, 
-    echo=False,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-    max_overflow=20,
-    pool_size=10
-)
+engine = _create_engine(DATABASE_URL)
 
 # Configurar factory de sesiones
+# expire_on_commit=False: los objetos devueltos por las escrituras conservan
+# sus valores tras el commit (sin SELECT de refresco) y se usan ya cerrada
+# la sesión, igual que en config/async_database.py
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
+    expire_on_commit=False,
     bind=engine
 )
 
+
+class ReplicaSet:
+    """
+    Conjunto de réplicas de lectura con reparto round-robin.
+
+    Una réplica que produce un error de conexión se expulsa de la rotación
+    durante ``eject_seconds``; si no queda ninguna disponible las lecturas
+    vuelven a la primaria.
+
+    Args:
+        engines (list): Motores SQLAlchemy de las réplicas
+        eject_seconds (float): Tiempo de expulsión tras un error
+    """
+
+    def __init__(self, engines, eject_seconds=DBREPLICA_EJECT_SECONDS):
+        self.engines = list(engines)
+        self.eject_seconds = eject_seconds
+        self._counter = itertools.count()
+        self._ejected_until = {}
+        self._lock = threading.Lock()
+        # Los eventos de un AsyncEngine se escuchan en su motor síncrono
+        self._by_sync_engine = {getattr(r, 'sync_engine', r): r for r in self.engines}
+        for sync_engine in self._by_sync_engine:
+            event.listen(sync_engine, 'handle_error', self._on_error)
+
+    def _on_error(self, context):
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+            self.eject(self._by_sync_engine.get(context.engine, context.engine))
+
+    def eject(self, replica):
+        """Saca ``replica`` de la rotación durante ``eject_seconds``."""
+        with self._lock:
+            self._ejected_until[replica] = time.monotonic() + self.eject_seconds
+
+    def healthy(self):
+        """Devuelve las réplicas que no están expulsadas."""
+        now = time.monotonic()
+        with self._lock:
+            return [r for r in self.engines if self._ejected_until.get(r, 0) <= now]
+
+    def choose(self):
+        """
+        Elige la siguiente réplica sana en orden round-robin.
+
+        Returns:
+            Engine|None: Motor de la réplica o None si no hay ninguna disponible
+        """
+        candidates = self.healthy()
+        if not candidates:
+            return None
+        return candidates[next(self._counter) % len(candidates)]
+
+
+REPLICA_URLS = [_replica_url(entry.strip()) for entry in DBREPLICA_HOSTS.split(',') if entry.strip()]
+
+replicas = ReplicaSet(_create_engine(url, f'replica_{i}') for i, url in enumerate(REPLICA_URLS))
+
+# Cuando está activo, todas las lecturas del contexto actual van a la primaria
+# (peticiones de escritura y lecturas inmediatamente posteriores a escribir)
+_primary_pinned = ContextVar('primary_pinned', default=False)
+
+
+def pin_primary(pinned=True):
+    """
+    Fija (o libera) la primaria para las lecturas del contexto actual.
+
+    Returns:
+        Token para restaurar el valor anterior con ``restore_primary_pin``
+    """
+    return _primary_pinned.set(pinned)
+
+
+def restore_primary_pin(token):
+    """Restaura el enrutado de lecturas anterior a ``pin_primary``."""
+    _primary_pinned.reset(token)
+
+
+def is_primary_pinned():
+    """Indica si las lecturas del contexto actual deben ir a la primaria."""
+    return _primary_pinned.get()
+
+
+@contextmanager
+def use_primary():
+    """Context manager que envía a la primaria las lecturas del bloque."""
+    token = _primary_pinned.set(True)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(token)
+
+
+def all_engines():
+    """Devuelve la primaria seguida de las réplicas configuradas."""
+    return [engine] + replicas.engines
+
+
+def pool_stats():
+    """
+    Métricas de los pools de conexiones.
+
+    Returns:
+        dict: {'primary': {...}, 'replicas': [{...}, ...]}
+    """
+    return {
+        'primary': _pool_stats[engine].snapshot(engine.pool),
+        'replicas': [_pool_stats[e].snapshot(e.pool) for e in replicas.engines]
+    }
+
+
+# (pid, evento de parada) del barrido activo: los hilos no sobreviven a un fork
+_sweeper = None
+
+
+def start_pool_sweeper():
+    """Inicia el barrido de vida de las conexiones en el proceso actual (una sola vez)."""
+    global _sweeper
+    if _sweeper is not None and _sweeper[0] == os.getpid():
+        return _sweeper[1]
+    stop = start_liveness_sweep(all_engines())
+    _sweeper = (os.getpid(), stop) if stop is not None else None
+    return stop
+
+
+def stop_pool_sweeper():
+    """Detiene el barrido de vida del proceso actual, si hay uno."""
+    global _sweeper
+    if _sweeper is not None and _sweeper[0] == os.getpid():
+        _sweeper[1].set()
+    _sweeper = None
+
+
+def release_pools():
+    """
+    Cierra todas las conexiones del proceso (p. ej. el proceso maestro antes
+    de crear workers, para no ocupar conexiones que no va a usar).
+    """
+    stop_pool_sweeper()
+    for current in all_engines():
+        current.dispose()
+
+
+def reset_pools_after_fork():
+    """
+    Descarta en un proceso hijo las conexiones heredadas del padre sin
+    cerrarlas (siguen perteneciendo al padre) y arranca su propio barrido.
+    """
+    for current in all_engines():
+        current.dispose(close=False)
+        _pool_stats[current].reset()
+    start_pool_sweeper()
+
+
 def get_db():
     """
     Generador de sesiones de base de datos con context manager.
@@ -68,10 +304,42 @@ def get_db():
     finally:
         db.close()
 
+
+def get_read_db():
+    """
+    Generador de sesiones para consultas de sólo lectura.
+
+    Usa una réplica (round-robin entre las sanas) salvo que no haya réplicas
+    configuradas o que el contexto esté fijado a la primaria.
+    """
+    replica = None if is_primary_pinned() else replicas.choose()
+    db = SessionLocal(bind=replica) if replica is not None else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 def init_db():
     """
     Inicializa la base de datos creando todas las tablas definidas.
+    
+    En bases de datos existentes create_all no añade índices nuevos: éstos se
+    aplican con ``python -m migrations upgrade``. Si falta algún índice de las
+    rutas calientes la aplicación no arranca (DB_SKIP_SCHEMA_CHECK=1 lo omite).
     """
+    import models.user_model  # noqa: F401  (registra la tabla users)
+    import models.rate_limit_model  # noqa: F401  (registra la tabla rate_limit_buckets)
+    import models.job_model  # noqa: F401  (registra la tabla jobs)
+    from migrations import check_schema
+    
     print(" Inicializando base de datos...")
     Base.metadata.create_all(bind=engine)
     print(" Tablas creadas/verificadas correctamente")
+    
+    from repositories.stats_repository import StatsRepository
+    if StatsRepository().seed():
+        print(" Contadores del catálogo inicializados")
+    
+    if os.getenv('DB_SKIP_SCHEMA_CHECK', '').lower() not in ('1', 'true', 'yes'):
+        check_schema(engine)
+        print(" Índices requeridos verificados")
@@ -0,0 +1,265 @@
+"""
+Configuración e instrumentación del pool de conexiones.
+
+Toda la configuración se lee de variables de entorno:
+- DB_POOL_SIZE: Conexiones permanentes por proceso (por defecto 10)
+- DB_MAX_OVERFLOW: Conexiones extra en picos (por defecto 20)
+- DB_POOL_TIMEOUT: Segundos de espera máxima por una conexión (por defecto 30)
+- DB_POOL_RECYCLE: Segundos antes de reciclar una conexión (por defecto 3600)
+- DB_POOL_PRE_PING: Si vale 1, hace un ping en cada checkout (por defecto 0)
+- DB_POOL_SWEEP_SECONDS: Intervalo del barrido de vida (por defecto 30, 0 lo desactiva)
+- DB_PGBOUNCER: Si vale 1, usa NullPool y desactiva las sentencias preparadas
+- DB_QUERY_CACHE_SIZE: Sentencias compiladas que guarda cada motor (por defecto 500)
+- DB_PREPARE_THRESHOLD: Ejecuciones tras las que psycopg 3 prepara una sentencia
+  en el servidor (por defecto 5; 0 = desde la primera; ``none`` o vacío = nunca).
+  psycopg 3 es el driver por defecto (ver config/database.py); con una URL
+  ``postgresql+psycopg2://`` no hay sentencias preparadas
+
+Sin pre-ping, las conexiones muertas se detectan por error: SQLAlchemy invalida
+todo el pool al recibir un error de desconexión y las siguientes peticiones
+abren conexiones nuevas. El barrido periódico provoca esa detección en segundo
+plano para que no la sufra una petición real tras reiniciar la base de datos.
+"""
+
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, NullPool
+from services import metrics_service
+
+
+def _env_flag(name, default='0'):
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+
+def _env_optional_int(name, default):
+    """Entero de entorno tal cual (0 incluido); ``none`` o vacío devuelven None."""
+    value = os.getenv(name, default).strip()
+    if value.lower() in ('', 'none'):
+        return None
+    return int(value)
+
+
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '3600'))
+DB_POOL_PRE_PING = _env_flag('DB_POOL_PRE_PING')
+DB_POOL_SWEEP_SECONDS = float(os.getenv('DB_POOL_SWEEP_SECONDS', '30'))
+DB_PGBOUNCER = _env_flag('DB_PGBOUNCER')
+DB_QUERY_CACHE_SIZE = int(os.getenv('DB_QUERY_CACHE_SIZE', '500'))
+DB_PREPARE_THRESHOLD = _env_optional_int('DB_PREPARE_THRESHOLD', '5')
+
+
+class PoolStats:
+    """
+    Métricas acumuladas de un pool: esperas por conexión, tiempo que cada
+    conexión permanece prestada y uso del overflow.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.checkouts = 0
+        self.overflow_checkouts = 0
+        self.overflow_peak = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.held_seconds_total = 0.0
+        self.held_seconds_max = 0.0
+        self.checkout_errors = 0
+
+    def reset(self):
+        """Pone a cero las métricas (p. ej. en un worker recién creado)."""
+        with self._lock:
+            self._clear()
+
+    def record_wait(self, seconds, failed=False):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if failed:
+                self.checkout_errors += 1
+
+    def record_checkout(self, overflow):
+        with self._lock:
+            self.checkouts += 1
+            if overflow > 0:
+                self.overflow_checkouts += 1
+                self.overflow_peak = max(self.overflow_peak, overflow)
+
+    def record_checkin(self, seconds):
+        with self._lock:
+            self.held_seconds_total += seconds
+            self.held_seconds_max = max(self.held_seconds_max, seconds)
+
+    def snapshot(self, pool=None):
+        """
+        Devuelve las métricas actuales.
+
+        Args:
+            pool: Pool del que leer los valores instantáneos (opcional)
+
+        Returns:
+            dict: Métricas acumuladas e instantáneas
+        """
+        with self._lock:
+            data = {
+                'checkouts': self.checkouts,
+                'checkout_errors': self.checkout_errors,
+                'overflow_checkouts': self.overflow_checkouts,
+                'overflow_peak': self.overflow_peak,
+                'wait_seconds_total': round(self.wait_seconds_total, 6),
+                'wait_seconds_max': round(self.wait_seconds_max, 6),
+                'held_seconds_total': round(self.held_seconds_total, 6),
+                'held_seconds_max': round(self.held_seconds_max, 6),
+            }
+        if isinstance(pool, QueuePool):
+            data.update({
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'idle': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0),
+            })
+        return data
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool que mide cuánto espera cada petición por una conexión.
+
+    Las esperas se suman también en los contadores de Prometheus en el momento
+    del checkout: con varios workers se acumulan entre procesos y no bajan
+    cuando un worker se recicla.
+    """
+
+    stats = None
+    metrics_name = 'primary'
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            waited = time.perf_counter() - start
+            self.stats.record_wait(waited, failed=True)
+            metrics_service.pool_wait(self.metrics_name, waited, failed=True)
+            raise
+        waited = time.perf_counter() - start
+        self.stats.record_wait(waited)
+        metrics_service.pool_wait(self.metrics_name, waited)
+        return connection
+
+    def recreate(self):
+        # dispose() recrea el pool: conservar las métricas acumuladas
+        new_pool = super().recreate()
+        new_pool.stats = self.stats
+        new_pool.metrics_name = self.metrics_name
+        return new_pool
+
+
+def engine_options(url):
+    """
+    Argumentos de ``create_engine`` según la configuración de entorno.
+
+    Args:
+        url (str): URL de conexión
+
+    Returns:
+        dict: Argumentos para ``create_engine``
+    """
+    parsed = make_url(url)
+    # Caché de compilación de SQLAlchemy: las sentencias de los repositorios
+    # (lambda_stmt) se compilan una vez por proceso y se reutilizan
+    options = {'query_cache_size': DB_QUERY_CACHE_SIZE}
+    if parsed.get_backend_name() == 'sqlite':
+        return options
+
+    options['pool_pre_ping'] = DB_POOL_PRE_PING
+    driver = parsed.get_driver_name()
+    if DB_PGBOUNCER:
+        # PgBouncer en modo transacción ya agrupa conexiones y no admite
+        # sentencias preparadas del lado servidor
+        options['poolclass'] = NullPool
+        if driver == 'psycopg':
+            options['connect_args'] = {'prepare_threshold': None}
+        elif driver == 'asyncpg':
+            options['connect_args'] = {'statement_cache_size': 0, 'prepared_statement_cache_size': 0}
+    else:
+        if driver == 'psycopg':
+            # Sentencias preparadas en el servidor para las consultas repetidas
+            options['connect_args'] = {'prepare_threshold': DB_PREPARE_THRESHOLD}
+        options.update({
+            'poolclass': InstrumentedQueuePool,
+            'pool_size': DB_POOL_SIZE,
+            'max_overflow': DB_MAX_OVERFLOW,
+            'pool_timeout': DB_POOL_TIMEOUT,
+            'pool_recycle': DB_POOL_RECYCLE,
+        })
+    return options
+
+
+def instrument_engine(engine, name='primary'):
+    """
+    Registra los eventos del pool que alimentan ``PoolStats``.
+
+    Args:
+        engine: Motor SQLAlchemy
+        name (str): Etiqueta ``pool`` de sus métricas ('primary', 'replica_0'...)
+
+    Returns:
+        PoolStats: Métricas del motor
+    """
+    stats = PoolStats()
+    engine.pool.stats = stats
+    engine.pool.metrics_name = name
+
+    @event.listens_for(engine, 'checkout')
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info['checked_out_at'] = time.perf_counter()
+        pool = engine.pool
+        stats.record_checkout(pool.overflow() if isinstance(pool, QueuePool) else 0)
+
+    @event.listens_for(engine, 'checkin')
+    def _on_checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop('checked_out_at', None)
+        if started is not None:
+            stats.record_checkin(time.perf_counter() - started)
+
+    return stats
+
+
+def _sweep(engines, interval, stop):
+    while not stop.wait(interval):
+        for engine in engines:
+            try:
+                with engine.connect() as conn:
+                    conn.exec_driver_sql('SELECT 1')
+            except Exception:
+                # La desconexión ya invalidó el pool; el siguiente barrido
+                # o la siguiente petición abrirán conexiones nuevas
+                pass
+
+
+def start_liveness_sweep(engines, interval=DB_POOL_SWEEP_SECONDS):
+    """
+    Lanza un hilo que comprueba periódicamente la conexión de cada motor.
+
+    Debe llamarse en cada proceso (después de un fork los hilos no se heredan).
+
+    Returns:
+        threading.Event|None: Evento para detener el barrido, o None si está desactivado
+    """
+    if interval <= 0 or DB_PGBOUNCER:
+        return None
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=_sweep, args=(list(engines), interval, stop),
+        name='db-liveness-sweep', daemon=True
+    )
+    thread.start()
+    return stop
@@ -0,0 +1,205 @@
+"""
+Conteo de consultas SQL por petición y registro de consultas lentas.
+
+Los eventos del motor (``before/after_cursor_execute``) suman cada sentencia
+y su duración al contador de la petición actual (un ``ContextVar``, válido
+tanto para hilos como para tareas asyncio). app.py lo expone en la cabecera
+``Server-Timing`` y en el log estructurado de cada petición.
+
+Las sentencias que tardan más de DB_SLOW_QUERY_MS (por defecto 200, 0 lo
+desactiva) se registran en el logger ``mhwiki.sql`` con sus parámetros y el
+plan de ejecución (EXPLAIN en PostgreSQL, EXPLAIN QUERY PLAN en SQLite).
+"""
+
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+
+DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '200'))
+
+sql_logger = logging.getLogger('mhwiki.sql')
+
+# Longitud máxima de cada parámetro en el log
+_MAX_PARAM_LENGTH = 200
+
+_current = ContextVar('query_stats', default=None)
+
+
+class QueryStats:
+    """Consultas ejecutadas y tiempo acumulado en base de datos."""
+
+    __slots__ = ('count', 'seconds', 'statements', 'parent')
+
+    def __init__(self, capture=False, parent=None):
+        self.count = 0
+        self.seconds = 0.0
+        # Sólo se guardan las sentencias si se piden (tests)
+        self.statements = [] if capture else None
+        # Contador que envuelve a este (p. ej. assert_max_queries alrededor
+        # de una petición de test): también recibe las consultas
+        self.parent = parent
+
+    def record(self, statement, seconds):
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.seconds += seconds
+            if stats.statements is not None:
+                stats.statements.append(statement)
+            stats = stats.parent
+
+    @property
+    def milliseconds(self):
+        return self.seconds * 1000
+
+    def server_timing(self):
+        """Valor de la métrica ``db`` para la cabecera Server-Timing."""
+        return f'db;dur={self.milliseconds:.2f};desc="queries={self.count}"'
+
+
+def start_tracking(capture=False):
+    """
+    Empieza a contar las consultas del contexto actual.
+
+    Returns:
+        tuple: (QueryStats, token para ``stop_tracking``)
+    """
+    stats = QueryStats(capture, parent=_current.get())
+    return stats, _current.set(stats)
+
+
+def stop_tracking(token):
+    """Deja de contar (restaura el contador anterior)."""
+    _current.reset(token)
+
+
+def current_stats():
+    """Contador de la petición actual, o None fuera de una petición."""
+    return _current.get()
+
+
+@contextmanager
+def track_queries(capture=False):
+    """
+    Cuenta las consultas ejecutadas dentro del bloque.
+
+    Usage:
+        with track_queries() as stats:
+            ...
+        print(stats.count, stats.milliseconds)
+    """
+    stats, token = start_tracking(capture)
+    try:
+        yield stats
+    finally:
+        stop_tracking(token)
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """
+    Falla si el bloque ejecuta más de ``limit`` sentencias SQL.
+
+    Usage:
+        with assert_max_queries(2):
+            client.get('/api/categories/1/weapons')
+
+    Raises:
+        AssertionError: Con la lista de sentencias ejecutadas
+    """
+    with track_queries(capture=True) as stats:
+        yield stats
+    if stats.count > limit:
+        listing = '\n'.join(f'  {i}. {sql}' for i, sql in enumerate(stats.statements, 1))
+        raise AssertionError(f"Se esperaban como mucho {limit} consultas y se ejecutaron {stats.count}:\n{listing}")
+
+
+def _loggable(parameters):
+    """Parámetros aptos para el log (binarios y textos largos abreviados)."""
+    def shorten(value):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return f'<{len(value)} bytes>'
+        if isinstance(value, str) and len(value) > _MAX_PARAM_LENGTH:
+            return value[:_MAX_PARAM_LENGTH] + '…'
+        if isinstance(value, (int, float, bool)) or value is None:
+            return value
+        return str(value)
+
+    if isinstance(parameters, dict):
+        return {key: shorten(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [shorten(value) for value in parameters]
+    return shorten(parameters)
+
+
+def _explain(conn, statement, parameters):
+    """
+    Plan de ejecución de una sentencia, con un cursor DBAPI aparte para no
+    disparar de nuevo los eventos ni alterar el resultado en curso.
+    """
+    dialect = conn.dialect.name
+    if dialect == 'postgresql':
+        prefix = 'EXPLAIN '
+    elif dialect == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        return None
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+    except Exception as e:
+        return [f'EXPLAIN no disponible: {e}']
+    finally:
+        cursor.close()
+
+
+def _log_slow_query(conn, statement, parameters, elapsed, executemany):
+    record = {
+        'event': 'slow_query',
+        'duration_ms': round(elapsed * 1000, 2),
+        'statement': statement,
+        'parameters': _loggable(parameters),
+    }
+    # EXPLAIN de INSERT/UPDATE/DELETE no las ejecuta, pero con executemany no
+    # hay un único juego de parámetros que explicar
+    if not executemany:
+        record['plan'] = _explain(conn, statement, parameters)
+    sql_logger.warning(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def instrument_queries(engine, slow_query_ms=DB_SLOW_QUERY_MS):
+    """
+    Registra los eventos de conteo y de consultas lentas en un motor.
+
+    Args:
+        engine: Motor síncrono (para un AsyncEngine, su ``sync_engine``)
+        slow_query_ms (float): Umbral de consulta lenta (0 lo desactiva)
+    """
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+        if slow_query_ms and elapsed * 1000 >= slow_query_ms:
+            _log_slow_query(conn, statement, parameters, elapsed, executemany)
+
+    @event.listens_for(engine, 'handle_error')
+    def _on_error(exception_context):
+        # Una sentencia fallida no llega a after_cursor_execute
+        conn = exception_context.connection
+        started = conn.info.get('query_started') if conn is not None else None
+        if started:
+            elapsed = time.perf_counter() - started.pop()
+            stats = _current.get()
+            if stats is not None:
+                stats.record(exception_context.statement, elapsed)
@@ -0,0 +1,26 @@
+"""
+Blueprints de la aplicación, compartidos por app.py (Flask) y asgi.py (Quart).
+"""
+
+from controllers.auth_controller import auth_bp
+from controllers.core_controller import core_bp
+from controllers.jobs_controller import jobs_bp
+from controllers.pages_controller import pages_bp
+from controllers.weapons_controller import weapons_bp
+from services import tracing_service
+
+
+def register_blueprints(app):
+    """
+    Registra todas las rutas y hooks en ``app`` (Flask o Quart).
+
+    ``core`` va primero: sus hooks de petición abren el span y el recuento de
+    consultas antes que cualquier otro.
+    """
+    app.register_blueprint(core_bp)
+    app.register_blueprint(pages_bp)
+    app.register_blueprint(weapons_bp, url_prefix='/api')
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+    # Un span por vista de los blueprints (capa de controlador)
+    tracing_service.trace_views(app, ('weapons', 'auth', 'jobs'))
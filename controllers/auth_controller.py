@@ -8,19 +8,30 @@ Endpoints:
 - GET  /auth/users - Listar usuarios (solo admin)
 - PUT  /auth/users/{id}/role - Cambiar rol de usuario (solo admin)
 - GET  /auth/source - Ver código fuente (requiere admin)
+- POST /auth/profiler/sample - Muestrear el proceso durante N segundos (solo admin)
+- POST /auth/profiler/requests - Perfilar las próximas N peticiones de una ruta (solo admin)
+- GET  /auth/profiler/{id} - Estado o resultado de una sesión de perfilado (solo admin)
+
+Las vistas son corrutinas que sirven tanto app.py como asgi.py (ver
+services/runtime.py y services/web.py).
 """
 
-from flask import Blueprint, request, jsonify, send_file
-from services import auth_service
+from flask import Blueprint
+from services import auth_service, profiler_service, source_service
+from services.load_shed_service import shed_load
+from services.rate_limit_service import rate_limit
+from services.runtime import offload
+from services.web import get_json, jsonify, request, response as make_response, send_file
 # from services import captcha_service  # Ya no se usa, ahora usamos Google reCAPTCHA
 from models.user_model import UserRole
-import os
 
 auth_bp = Blueprint('auth', __name__)
 
 
 @auth_bp.route('/register', methods=['POST'])
-def register():
+@rate_limit('register')
+@shed_load('bcrypt')
+async def register():
     """
     Registra un nuevo usuario en el sistema.
     
@@ -35,7 +46,7 @@ def register():
         201: Usuario creado exitosamente
         400: Datos inválidos
     """
-    data = request.get_json()
+    data = await get_json()
     
     if not data:
         return jsonify({'error': 'No se proporcionaron datos'}), 400
@@ -45,7 +56,7 @@ def register():
     password = data.get('password')
     
     # Registrar usuario (siempre como USER, los admins se crean manualmente)
-    user, error = auth_service.register_user(username, email, password, UserRole.USER)
+    user, error = await auth_service.register_user(username, email, password, UserRole.USER)
     
     if error:
         return jsonify({'error': error}), 400
@@ -57,7 +68,9 @@ def register():
 
 
 @auth_bp.route('/login', methods=['POST'])
-def login():
+@rate_limit('login')
+@shed_load('bcrypt')
+async def login():
     """
     Autentica a un usuario y devuelve un token JWT.
     
@@ -71,7 +84,7 @@ def login():
         200: Login exitoso con token
         401: Credenciales inválidas
     """
-    data = request.get_json()
+    data = await get_json()
     
     if not data:
         return jsonify({'error': 'No se proporcionaron datos'}), 400
@@ -82,7 +95,7 @@ def login():
     if not username or not password:
         return jsonify({'error': 'Username y password son requeridos'}), 400
     
-    token, user, error = auth_service.login_user(username, password)
+    token, user, error = await auth_service.login_user(username, password)
     
     if error:
         return jsonify({'error': error}), 401
@@ -96,7 +109,7 @@ def login():
 
 @auth_bp.route('/me', methods=['GET'])
 @auth_service.token_required
-def get_profile(payload):
+async def get_profile(payload):
     """
     Obtiene el perfil del usuario actual.
     
@@ -107,7 +120,7 @@ def get_profile(payload):
         200: Perfil del usuario
         401: Token inválido
     """
-    user = auth_service.get_user_by_id(payload['user_id'])
+    user = await auth_service.get_user_by_id(payload['user_id'])
     
     if not user:
         return jsonify({'error': 'Usuario no encontrado'}), 404
@@ -120,7 +133,7 @@ def get_profile(payload):
 @auth_bp.route('/users', methods=['GET'])
 @auth_service.token_required
 @auth_service.admin_required
-def list_users(payload):
+async def list_users(payload):
     """
     Lista todos los usuarios del sistema (solo admin).
     
@@ -131,7 +144,7 @@ def list_users(payload):
         200: Lista de usuarios
         403: No es administrador
     """
-    users = auth_service.get_all_users()
+    users = await auth_service.get_all_users()
     
     return jsonify({
         'users': [user.to_json(include_sensitive=True) for user in users],
@@ -142,7 +155,7 @@ def list_users(payload):
 @auth_bp.route('/users/<int:user_id>/role', methods=['PUT'])
 @auth_service.token_required
 @auth_service.admin_required
-def change_role(payload, user_id):
+async def change_role(payload, user_id):
     """
     Cambia el rol de un usuario (solo admin).
     
@@ -159,7 +172,7 @@ def change_role(payload, user_id):
         400: Datos inválidos
         403: No es administrador
     """
-    data = request.get_json()
+    data = await get_json()
     
     if not data or 'role' not in data:
         return jsonify({'error': 'El campo role es requerido'}), 400
@@ -174,7 +187,7 @@ def change_role(payload, user_id):
         else:
             return jsonify({'error': 'Rol inválido. Use "admin" o "user"'}), 400
         
-        user, error = auth_service.change_user_role(user_id, new_role)
+        user, error = await auth_service.change_user_role(user_id, new_role)
         
         if error:
             return jsonify({'error': error}), 400
@@ -229,7 +242,7 @@ def change_role(payload, user_id):
 #         200: CAPTCHA válido
 #         400: CAPTCHA inválido
 #     """
-#     data = request.get_json()
+#     data = await get_json()
 #     
 #     if not data:
 #         return jsonify({'error': 'No se proporcionaron datos'}), 400
@@ -251,7 +264,7 @@ def change_role(payload, user_id):
 @auth_bp.route('/source', methods=['POST'])
 @auth_service.token_required
 @auth_service.admin_required
-def view_source(payload):
+async def view_source(payload):
     """
     Permite ver el código fuente (solo admin).
     Nota: El CAPTCHA ahora se verifica con Google reCAPTCHA en el frontend.
@@ -269,7 +282,7 @@ def view_source(payload):
         403: No es administrador
         404: Archivo no encontrado
     """
-    data = request.get_json()
+    data = await get_json()
     
     if not data:
         return jsonify({'error': 'No se proporcionaron datos'}), 400
@@ -280,36 +293,14 @@ def view_source(payload):
     # Obtener archivo solicitado
     file_path = data.get('file_path', 'app.py')
     
-    # Validar que el archivo esté en el proyecto
-    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    full_path = os.path.join(project_root, file_path)
-    
-    # Seguridad: evitar acceso fuera del proyecto
-    if not os.path.abspath(full_path).startswith(project_root):
-        return jsonify({'error': 'Acceso denegado'}), 403
-    
-    if not os.path.exists(full_path):
-        return jsonify({'error': 'Archivo no encontrado'}), 404
-    
-    try:
-        with open(full_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        return jsonify({
-            'file_path': file_path,
-            'content': content,
-            'lines': len(content.split('\n')),
-            'size_bytes': len(content.encode('utf-8'))
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'error': f'Error leyendo archivo: {str(e)}'}), 500
+    body, status = await offload(source_service.read_source_file, file_path)
+    return jsonify(body), status
 
 
 @auth_bp.route('/source/files', methods=['GET'])
 @auth_service.token_required
 @auth_service.admin_required
-def list_source_files(payload):
+async def list_source_files(payload):
     """
     Lista los archivos Python disponibles en el proyecto (solo admin).
     
@@ -320,20 +311,115 @@ def list_source_files(payload):
         200: Lista de archivos
         403: No es administrador
     """
-    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    
-    python_files = []
-    
-    for root, dirs, files in os.walk(project_root):
-        # Ignorar carpetas específicas
-        dirs[:] = [d for d in dirs if d not in ['.venv', '__pycache__', '.git', 'images']]
-        
-        for file in files:
-            if file.endswith('.py'):
-                rel_path = os.path.relpath(os.path.join(root, file), project_root)
-                python_files.append(rel_path)
+    python_files = await offload(source_service.list_python_files)
     
     return jsonify({
-        'files': sorted(python_files),
+        'files': python_files,
         'total': len(python_files)
     }), 200
+
+
+@auth_bp.route('/profiler/sample', methods=['POST'])
+@auth_service.token_required
+@auth_service.admin_required
+async def profiler_sample(payload):
+    """
+    Muestrea las pilas de todos los hilos del worker durante N segundos (solo admin).
+    
+    Headers:
+        Authorization: Bearer <token>
+        
+    Body JSON:
+        {
+            "seconds": "number (opcional, por defecto 10, máximo PROFILER_MAX_SECONDS)",
+            "interval_ms": "int (opcional, por defecto 5)"
+        }
+        
+    Returns:
+        200: Pilas colapsadas (text/plain), listas para flamegraph.pl / speedscope
+        400: Parámetros inválidos
+        403: No es administrador
+    """
+    data = await get_json(silent=True) or {}
+    try:
+        seconds = float(data.get('seconds', 10))
+        interval_ms = int(data.get('interval_ms', profiler_service.DEFAULT_INTERVAL_MS))
+    except (TypeError, ValueError):
+        return jsonify({'error': "'seconds' e 'interval_ms' deben ser numéricos"}), 400
+    if seconds <= 0 or interval_ms <= 0:
+        return jsonify({'error': "'seconds' e 'interval_ms' deben ser positivos"}), 400
+
+    stacks, samples = await offload(profiler_service.sample_for, seconds, interval_ms)
+    response = make_response(stacks, content_type='text/plain; charset=utf-8')
+    response.headers['X-Profiler-Samples'] = str(samples)
+    return response
+
+
+@auth_bp.route('/profiler/requests', methods=['POST'])
+@auth_service.token_required
+@auth_service.admin_required
+async def profiler_requests(payload):
+    """
+    Arma una sesión que perfila las próximas N peticiones de una ruta (solo admin).
+    
+    La sesión vive en el worker que atiende esta petición.
+    
+    Headers:
+        Authorization: Bearer <token>
+        
+    Body JSON:
+        {
+            "route": "string (prefijo de ruta, p. ej. /api/weapons, o nombre de endpoint)",
+            "requests": "int (opcional, por defecto 20)",
+            "format": "collapsed | pstats (opcional, por defecto collapsed)",
+            "interval_ms": "int (opcional, por defecto 5)"
+        }
+        
+    Returns:
+        202: Sesión armada (id y URL del resultado)
+        400: Parámetros inválidos o ya hay una sesión activa
+        403: No es administrador
+    """
+    data = await get_json(silent=True) or {}
+    try:
+        session = profiler_service.start_request_session(
+            data.get('route'),
+            data.get('requests', 20),
+            data.get('format', 'collapsed'),
+            int(data.get('interval_ms', profiler_service.DEFAULT_INTERVAL_MS)),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    body = session.to_json()
+    body['result_url'] = f"/api/auth/profiler/{session.id}"
+    return jsonify(body), 202
+
+
+@auth_bp.route('/profiler/<session_id>', methods=['GET'])
+@auth_service.token_required
+@auth_service.admin_required
+async def profiler_result(payload, session_id):
+    """
+    Devuelve el resultado de una sesión de perfilado (solo admin).
+    
+    Headers:
+        Authorization: Bearer <token>
+        
+    Returns:
+        200: Pilas colapsadas (text/plain) o fichero .pstats
+        202: La sesión sigue capturando peticiones
+        403: No es administrador
+        404: Sesión no encontrada
+    """
+    path, fmt = profiler_service.find_result(session_id)
+    if path is not None:
+        if fmt == 'pstats':
+            return await send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                                   download_name=f'profile-{session_id}.pstats')
+        return await send_file(path, mimetype='text/plain; charset=utf-8')
+
+    session = profiler_service.get_session(session_id)
+    if session is None:
+        return jsonify({'error': 'Sesión no encontrada (puede estar activa en otro worker)'}), 404
+    return jsonify(session.to_json()), 202
@@ -0,0 +1,274 @@
+"""
+Hooks de petición y endpoints de la aplicación (comunes a app.py y asgi.py).
+
+Blueprint sin prefijo con lo que antes vivía en app.py:
+- Trazas: span de la petición y cabecera X-Trace-Id
+- Enrutado de lecturas (réplicas / read-your-writes)
+- Server-Timing y log JSON por petición (logger ``mhwiki.request``)
+- Métricas de Prometheus y perfilado por peticiones
+- GET /metrics, GET /api/stats, GET /health
+- Manejadores de 404, 405 y 500
+
+Los hooks se registran en el mismo orden que tenían en app.py: Flask y Quart
+ejecutan los ``after_request`` y ``teardown_request`` en orden inverso.
+"""
+
+import os
+import json
+import logging
+import time
+from flask import Blueprint
+from config.database import pin_primary, restore_primary_pin, pool_stats
+from config.query_stats import start_tracking, stop_tracking
+from services.stats_service import get_stats
+from services import metrics_service, profiler_service, tracing_service
+from services.runtime import in_event_loop, offload
+from services.web import g, jsonify, request, response as make_response
+
+core_bp = Blueprint('core', __name__)
+
+# =============================================================================
+# TRAZAS (OPENTELEMETRY, VER services/tracing_service.py)
+# =============================================================================
+
+@core_bp.before_app_request
+async def start_request_span():
+    """Abre el span de la petición continuando el ``traceparent`` entrante."""
+    rule = request.url_rule.rule if request.url_rule is not None else None
+    handle = tracing_service.start_request(request.method, rule, request.endpoint, request.path, request.headers)
+    if handle is not None:
+        g.trace_handle = handle
+
+
+@core_bp.after_app_request
+async def add_trace_id(response):
+    if g.get('trace_handle') is not None:
+        g.response_status = response.status_code
+        trace_id = tracing_service.current_trace_id()
+        if trace_id:
+            response.headers['X-Trace-Id'] = trace_id
+    return response
+
+
+@core_bp.teardown_app_request
+async def end_request_span(exception=None):
+    tracing_service.finish_request(g.pop('trace_handle', None), g.get('response_status'), exception)
+
+# =============================================================================
+# ENRUTADO DE LECTURAS (RÉPLICAS / READ-YOUR-WRITES)
+# =============================================================================
+
+# Segundos que un cliente sigue leyendo de la primaria tras una escritura,
+# para que vea sus propios cambios aunque las réplicas vayan con retraso
+READ_YOUR_WRITES_SECONDS = int(os.getenv('DB_READ_YOUR_WRITES_SECONDS', '5'))
+READ_YOUR_WRITES_COOKIE = 'mh_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+@core_bp.before_app_request
+async def route_reads():
+    """Fija la primaria para escrituras y para clientes que acaban de escribir."""
+    try:
+        pinned_until = float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0))
+    except ValueError:
+        pinned_until = 0
+    g.primary_pin_token = pin_primary(request.method not in SAFE_METHODS or pinned_until > time.time())
+
+
+@core_bp.after_app_request
+async def remember_write(response):
+    """Tras una escritura correcta, mantiene al cliente en la primaria unos segundos."""
+    if request.method not in SAFE_METHODS and response.status_code < 400 and READ_YOUR_WRITES_SECONDS > 0:
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            str(time.time() + READ_YOUR_WRITES_SECONDS),
+            max_age=READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+            samesite='Lax'
+        )
+    return response
+
+# =============================================================================
+# MÉTRICAS DE BASE DE DATOS POR PETICIÓN
+# =============================================================================
+
+request_logger = logging.getLogger('mhwiki.request')
+
+
+@core_bp.before_app_request
+async def start_query_tracking():
+    """Empieza a contar las consultas SQL de la petición."""
+    g.request_started = time.perf_counter()
+    g.query_stats, g.query_stats_token = start_tracking()
+
+
+@core_bp.after_app_request
+async def report_query_stats(response):
+    """
+    Añade ``Server-Timing: db;dur=..;desc="queries=N", app;dur=..`` y registra
+    una línea JSON por petición en el logger ``mhwiki.request``.
+    """
+    stats = g.get('query_stats')
+    if stats is None:
+        return response
+    total_ms = (time.perf_counter() - g.request_started) * 1000
+    timing = f"{stats.server_timing()}, app;dur={total_ms:.2f}"
+    existing = response.headers.get('Server-Timing')
+    response.headers['Server-Timing'] = f"{existing}, {timing}" if existing else timing
+    request_logger.info(json.dumps({
+        'event': 'request',
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'duration_ms': round(total_ms, 2),
+        'db_queries': stats.count,
+        'db_ms': round(stats.milliseconds, 2),
+        'trace_id': tracing_service.current_trace_id(),
+    }))
+    return response
+
+
+@core_bp.teardown_app_request
+async def stop_query_tracking(exception=None):
+    token = g.pop('query_stats_token', None)
+    if token is not None:
+        stop_tracking(token)
+    # El enrutado de lecturas de la petición no debe sobrevivirla
+    token = g.pop('primary_pin_token', None)
+    if token is not None:
+        restore_primary_pin(token)
+
+# =============================================================================
+# MÉTRICAS (PROMETHEUS)
+# =============================================================================
+
+@core_bp.after_app_request
+async def record_request_metrics(response):
+    """Cuenta la petición, su latencia y sus consultas, y refresca los gauges del pool."""
+    started = g.get('request_started')
+    if started is not None:
+        stats = g.get('query_stats')
+        metrics_service.observe_request(
+            request.method, request.endpoint, response.status_code,
+            time.perf_counter() - started, stats.count if stats is not None else None
+        )
+        metrics_service.update_pool_gauges(pool_stats())
+    return response
+
+
+@core_bp.route('/metrics')
+async def metrics():
+    """
+    Métricas en formato de texto de Prometheus (agregadas entre workers).
+
+    Si METRICS_TOKEN está configurado, requiere ``Authorization: Bearer <token>``.
+    """
+    if not metrics_service.is_authorized(request.headers):
+        return jsonify({'error': 'No autorizado'}), 401
+    body, content_type = await offload(metrics_service.render_metrics)
+    return make_response(body, content_type=content_type)
+
+# =============================================================================
+# PERFILADOR (SESIONES POR PETICIÓN, VER /api/auth/profiler)
+# =============================================================================
+
+@core_bp.before_app_request
+async def start_request_profiling():
+    """Perfila la petición si hay una sesión armada que coincide con su ruta."""
+    handle = profiler_service.request_started(request.path, request.endpoint)
+    if handle is not None:
+        g.profiler_handle = handle
+
+
+@core_bp.teardown_app_request
+async def stop_request_profiling(exception=None):
+    profiler_service.request_finished(g.pop('profiler_handle', None))
+
+# =============================================================================
+# ENDPOINTS ADICIONALES
+# =============================================================================
+
+@core_bp.route('/api/stats')
+async def api_stats():
+    """
+    Endpoint para obtener estadísticas de la wiki
+
+    Los conteos provienen de la tabla catalog_counters (mantenida en cada
+    alta/baja) y se sirven desde una caché en memoria con TTL corto, por lo
+    que esta ruta no ejecuta COUNT(*) sobre las tablas.
+
+    Returns:
+        JSON: Estadísticas de artículos
+    """
+    try:
+        stats = await offload(get_stats)
+        total_articles = stats['categories'] + stats['weapons'] + 850  # + contenido base
+
+        return jsonify({
+            'total_articles': total_articles,
+            'categories': stats['categories'],
+            'weapons': stats['weapons'],
+            'users': stats['users'],
+            'weapons_by_category': stats['weapons_by_category'],
+            'status': 'online'
+        })
+    except Exception as e:
+        return jsonify({
+            'total_articles': 1000,
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
+@core_bp.route('/health')
+async def health_check():
+    """
+    Endpoint de health check para monitoreo.
+
+    Returns:
+        JSON: Estado de salud de la aplicación y base de datos
+    """
+    return jsonify({
+        'status': 'healthy',
+        'database': 'connected',
+        'api_version': '1.0.0',
+        'mode': 'asgi' if in_event_loop() else 'wsgi',
+        'pool': pool_stats()
+    })
+
+# =============================================================================
+# MANEJO GLOBAL DE ERRORES
+# =============================================================================
+
+@core_bp.app_errorhandler(404)
+async def not_found(error):
+    """Manejador para errores 404 - Recurso no encontrado."""
+    return jsonify({
+        'error': 'Endpoint no encontrado',
+        'message': 'Verifica la URL y el método HTTP',
+        'available_endpoints': [
+            'GET /categories',
+            'POST /categories',
+            'GET /weapons',
+            'POST /weapons'
+        ]
+    }), 404
+
+
+@core_bp.app_errorhandler(405)
+async def method_not_allowed(error):
+    """Manejador para errores 405 - Método no permitido."""
+    return jsonify({
+        'error': 'Método HTTP no permitido',
+        'message': 'Verifica que estés usando el método correcto (GET, POST, PUT, DELETE)'
+    }), 405
+
+
+@core_bp.app_errorhandler(500)
+async def internal_server_error(error):
+    """Manejador para errores 500 - Error interno del servidor."""
+    return jsonify({
+        'error': 'Error interno del servidor',
+        'message': 'Ha ocurrido un error inesperado. Inténtalo más tarde.'
+    }), 500
@@ -0,0 +1,99 @@
+"""
+Controlador REST de la cola de trabajos en segundo plano (solo admin).
+
+Endpoints:
+- GET  /jobs       - Trabajos por estado y tipos disponibles
+- POST /jobs       - Encolar un trabajo de cualquier tipo registrado
+- GET  /jobs/{id}  - Estado y resultado de un trabajo
+
+Los endpoints que encolan trabajo pesado (p. ej. ``POST /weapons/import``)
+responden 202 con ``status_url`` apuntando a ``GET /jobs/{id}``; el trabajo
+lo ejecuta ``python worker.py`` (ver services/jobs_service.py). La cola usa
+el motor síncrono: en asgi.py se consulta desde un hilo (``offload``).
+"""
+
+from flask import Blueprint
+from services import auth_service, jobs_service
+from services.runtime import offload
+from services.web import get_json, jsonify
+from models.job_model import STATUS_FAILED, STATUS_SUCCEEDED
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def accepted_response(job):
+    """202 Accepted con la URL de estado del trabajo encolado (también en Location)."""
+    response = jsonify(job)
+    response.status_code = 202
+    response.headers['Location'] = job['status_url']
+    return response
+
+
+@jobs_bp.route('', methods=['GET'])
+@auth_service.token_required
+@auth_service.admin_required
+async def queue_summary(payload):
+    """
+    Resumen de la cola (solo admin).
+
+    Returns:
+        200: {'counts': {estado: número}, 'kinds': [tipos de trabajo]}
+    """
+    return jsonify({
+        'counts': await offload(jobs_service.queue_counts),
+        'kinds': jobs_service.job_kinds()
+    }), 200
+
+
+@jobs_bp.route('', methods=['POST'])
+@auth_service.token_required
+@auth_service.admin_required
+async def enqueue_job(payload):
+    """
+    Encola un trabajo (solo admin).
+
+    Body JSON:
+        {
+            "kind": "string (p. ej. catalog.export, stats.rebuild)",
+            "payload": "object (opcional)",
+            "priority": "int (opcional, mayor primero)",
+            "max_attempts": "int (opcional)"
+        }
+
+    Returns:
+        202: Trabajo encolado (Location y status_url con su estado)
+        400: Tipo desconocido o parámetros inválidos
+        403: No es administrador
+    """
+    data = await get_json(silent=True) or {}
+    try:
+        job = await offload(
+            jobs_service.enqueue, data.get('kind'), data.get('payload'),
+            priority=data.get('priority'), max_attempts=data.get('max_attempts')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return accepted_response(job)
+
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+@auth_service.token_required
+@auth_service.admin_required
+async def get_job(payload, job_id):
+    """
+    Estado de un trabajo (solo admin).
+
+    Returns:
+        200: Trabajo terminado (succeeded o failed), con su resultado o error
+        202: Trabajo pendiente o en curso (Retry-After orientativo)
+        404: Trabajo no encontrado
+    """
+    job = await offload(jobs_service.get_job, job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    if job['status'] in (STATUS_SUCCEEDED, STATUS_FAILED):
+        return jsonify(job), 200
+    response = jsonify(job)
+    response.status_code = 202
+    response.headers['Retry-After'] = str(max(1, round(jobs_service.JOB_POLL_SECONDS)))
+    return response
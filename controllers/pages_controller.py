@@ -0,0 +1,67 @@
+"""
+Páginas HTML de la wiki (plantillas de templates/).
+
+Rutas:
+- /                           -> Página de inicio
+- /weapons                    -> Categorías de armas
+- /weapons/category/{id}      -> Armas de una categoría
+- /weapons/{id}               -> Detalle de un arma
+- /monsters, /items, /armor, /quests -> Secciones próximamente
+- /test-auth                  -> Prueba del sistema de autenticación
+"""
+
+from flask import Blueprint
+from services.web import render_template
+
+pages_bp = Blueprint('pages', __name__)
+
+
+@pages_bp.route('/')
+async def home():
+    """
+    Página de inicio de MonsterHunterWiki
+    
+    Returns:
+        HTML: Página de inicio renderizada
+    """
+    return await render_template('index.html')
+
+@pages_bp.route('/weapons')
+async def weapons_page():
+    """Página principal de armas - muestra categorías"""
+    return await render_template('weapons_categories.html')
+
+@pages_bp.route('/weapons/category/<int:category_id>')
+async def weapons_by_category_page(category_id):
+    """Página de armas por categoría"""
+    return await render_template('weapons_list.html', category_id=category_id)
+
+@pages_bp.route('/weapons/<int:weapon_id>')
+async def weapon_detail_page(weapon_id):
+    """Página de detalle de un arma específica"""
+    return await render_template('weapon_detail.html', weapon_id=weapon_id)
+
+@pages_bp.route('/monsters')
+async def monsters_page():
+    """Página de monstruos (próximamente)"""
+    return await render_template('coming_soon.html', section='Monstruos')
+
+@pages_bp.route('/items')
+async def items_page():
+    """Página de objetos (próximamente)"""
+    return await render_template('coming_soon.html', section='Objetos')
+
+@pages_bp.route('/armor')
+async def armor_page():
+    """Página de armaduras (próximamente)"""
+    return await render_template('coming_soon.html', section='Armaduras')
+
+@pages_bp.route('/quests')
+async def quests_page():
+    """Página de misiones (próximamente)"""
+    return await render_template('coming_soon.html', section='Misiones')
+
+@pages_bp.route('/test-auth')
+async def test_auth_page():
+    """Página de prueba del sistema de autenticación."""
+    return await render_template('test_auth.html')
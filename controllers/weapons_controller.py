@@ -10,59 +10,126 @@ Incluye validaciones, manejo de errores y respuestas HTTP apropiadas
 siguiendo las mejores prácticas de APIs RESTful.
 
 Endpoints disponibles:
-- GET    /categories              -> Listar todas las categorías
+- GET    /categories              -> Listar todas las categorías (?with_counts=1 añade weapon_count)
 - GET    /categories/{id}         -> Obtener categoría por ID
 - GET    /categories/{id}/weapons -> Listar armas de una categoría
 - POST   /categories              -> Crear nueva categoría
 - PUT    /categories/{id}         -> Actualizar categoría
+- PATCH  /categories/{id}         -> Modificar sólo algunos campos de una categoría
 - DELETE /categories/{id}         -> Eliminar categoría
 - GET    /weapons                 -> Listar todas las armas
 - GET    /weapons/{id}            -> Obtener arma por ID
 - POST   /weapons                 -> Crear nueva arma
 - PUT    /weapons/{id}            -> Actualizar arma
+- PATCH  /weapons/{id}            -> Modificar sólo algunos campos de un arma
 - DELETE /weapons/{id}            -> Eliminar arma
+- GET    /changes                 -> Cambios del catálogo desde un seq (sincronización incremental)
+- GET    /events                  -> Flujo SSE de cambios del catálogo
+- POST   /weapons/import          -> Importación masiva de armas en segundo plano (admin, 202)
+- PUT    /weapons/{id}/image      -> Subir la imagen de un arma; se procesa en segundo plano (admin, 202)
+
+Las lecturas JSON llevan ETag débil (y Last-Modified los recursos
+individuales) y responden 304 a If-None-Match / If-Modified-Since; los PUT
+aceptan If-Match y responden 412 si la fila cambió (ver
+services/conditional_service.py).
+
+Las vistas son corrutinas que sirven tanto app.py como asgi.py (ver
+services/runtime.py y services/web.py).
 """
 
-from flask import Blueprint, request, jsonify, send_file
-from io import BytesIO
+from flask import Blueprint
+from controllers.jobs_controller import accepted_response
+from services import (
+    auth_service, changes_service, conditional_service, events_service, jobs_service, metrics_service, tracing_service
+)
+from services.conditional_service import (
+    collection_etag, counts_extra, expected_versions, item_response, items_etag, json_response,
+    not_modified, not_modified_response
+)
+from services.load_shed_service import shed_load
+from services.rate_limit_service import rate_limit
+from services.runtime import in_event_loop, offload
+from services.web import event_stream, get_json, jsonify, read_body, request, send_file
 from services.weapons_service import (
     get_all_categories, get_category_by_id, get_category_object, create_category, update_category, delete_category,
-    get_all_weapons, get_weapons_by_category, get_weapon_by_id, get_weapon_object, create_weapon, update_weapon, delete_weapon
+    get_all_weapons, get_weapons_by_category, get_weapon_by_id, get_weapon_object, create_weapon, update_weapon, delete_weapon,
+    get_categories_version, get_category_version, get_weapons_version, get_weapon_version, VersionConflictError,
+    patch_category, patch_weapon, CategoryInUseError, CategoryNotFoundError, parse_ids, get_categories_by_ids, get_weapons_by_ids
 )
 
 # Blueprint para agrupar todas las rutas relacionadas con armas
 weapons_bp = Blueprint('weapons', __name__)
 
 
+def version_conflict_response():
+    return jsonify({'error': 'El recurso ha cambiado desde la versión indicada en If-Match'}), 412
+
+
+async def batch_response(raw_ids, lookup):
+    """
+    Respuesta de una búsqueda por lotes (``?ids=3,1,7``): una sola consulta,
+    resultados en el orden pedido y los ids que no existen en ``missing``.
+    """
+    try:
+        ids = parse_ids(raw_ids)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    batch = await lookup(ids)
+    # El orden y el conjunto de ids encontrados forman parte del cuerpo
+    etag = items_etag(batch['items'], ','.join(str(item['id']) for item in batch['items']))
+    if not_modified(etag):
+        return not_modified_response(etag)
+    return json_response(batch, etag)
+
+
 # =============================================================================
 # ENDPOINTS PARA CATEGORÍAS DE ARMAS
 # =============================================================================
 
 @weapons_bp.route('/categories', methods=['GET'])
-def list_categories():
+async def list_categories():
     """
     Obtiene la lista completa de categorías de armas disponibles.
     
+    Query Params:
+        with_counts (opcional): Si vale 1/true, incluye "weapon_count" en cada
+            categoría, calculado con un único GROUP BY en la base de datos.
+        ids (opcional): Lista de IDs separados por comas (máximo BATCH_MAX_IDS).
+            Devuelve {"items": [...], "missing": [...]} en el orden pedido,
+            resuelto con una sola consulta.
+    
     Returns:
         JSON: Lista de categorías con estructura:
         [
             {
                 "id": 1,
                 "name": "Great Sword",
-                "description": "Armas pesadas de dos manos..."
+                "description": "Armas pesadas de dos manos...",
+                "weapon_count": 3  (solo con with_counts=1)
             }
         ]
         
     Status Codes:
         200: Éxito - Lista retornada correctamente
+        304: La lista no ha cambiado (If-None-Match)
+        400: Parámetro ids inválido
         500: Error interno del servidor
     """
-    categories = get_all_categories()
-    return jsonify(categories)
+    if 'ids' in request.args:
+        return await batch_response(request.args['ids'], get_categories_by_ids)
+    with_counts = request.args.get('with_counts', '').lower() in ('1', 'true', 'yes')
+    if conditional_service.has_conditions():
+        count, newest, counts = await get_categories_version(with_counts=with_counts)
+        etag = collection_etag(count, newest, counts_extra(counts) if with_counts else None)
+        if not_modified(etag):
+            return not_modified_response(etag)
+    categories = await get_all_categories(with_counts=with_counts)
+    extra = counts_extra({cat['id']: cat['weapon_count'] for cat in categories}) if with_counts else None
+    return json_response(categories, items_etag(categories, extra))
 
 
 @weapons_bp.route('/categories/<int:category_id>', methods=['GET'])
-def get_category(category_id):
+async def get_category(category_id):
     """
     Obtiene los detalles de una categoría específica por su ID.
     
@@ -74,16 +141,21 @@ def get_category(category_id):
         
     Status Codes:
         200: Categoría encontrada
+        304: La categoría no ha cambiado (If-None-Match / If-Modified-Since)
         404: Categoría no existe
     """
-    category = get_category_by_id(category_id)
+    if conditional_service.has_conditions():
+        current = await get_category_version(category_id)
+        if current and not_modified(str(current.version), current.updated_at):
+            return not_modified_response(str(current.version), current.updated_at)
+    category = await get_category_by_id(category_id)
     if category:
-        return jsonify(category)
+        return item_response(category)
     return jsonify({'error': 'Categoría no encontrada'}), 404
 
 
 @weapons_bp.route('/categories/<int:category_id>/weapons', methods=['GET'])
-def get_category_weapons(category_id):
+async def get_category_weapons(category_id):
     """
     Obtiene todas las armas pertenecientes a una categoría específica.
     
@@ -105,26 +177,35 @@ def get_category_weapons(category_id):
         
     Status Codes:
         200: Éxito - Lista de armas retornada
+        304: Ni la categoría ni sus armas han cambiado (If-None-Match)
         404: Categoría no existe
         500: Error interno del servidor
     """
     try:
+        if conditional_service.has_conditions():
+            current = await get_category_version(category_id)
+            if current:
+                count, newest = await get_weapons_version(category_id)
+                etag = collection_etag(count, newest, f"category={current.version}")
+                if not_modified(etag):
+                    return not_modified_response(etag)
+        
         # Validar existencia de la categoría antes de buscar armas
-        category = get_category_by_id(category_id)
+        category = await get_category_by_id(category_id)
         if not category:
             return jsonify({'error': 'Categoría no encontrada'}), 404
         
-        weapons = get_weapons_by_category(category_id)
-        return jsonify({
+        weapons = await get_weapons_by_category(category_id)
+        return json_response({
             'category': category,
             'weapons': weapons
-        })
+        }, items_etag(weapons, f"category={category['version']}"))
     except Exception as e:
         return jsonify({'error': f'Error al obtener las armas: {str(e)}'}), 500
 
 
 @weapons_bp.route('/categories', methods=['POST'])
-def create_new_category():
+async def create_new_category():
     """
     Crea una nueva categoría de armas.
     
@@ -150,21 +231,21 @@ def create_new_category():
         }
     """
     try:
-        data = request.json
+        data = await get_json()
         
         # Validar estructura del JSON
         if not data or 'name' not in data:
             return jsonify({'error': 'El campo name es obligatorio'}), 400
         
-        category = create_category(data)
-        return jsonify(category), 201
+        category = await create_category(data)
+        return item_response(category, 201)
         
     except Exception as e:
         return jsonify({'error': f'Error al crear la categoría: {str(e)}'}), 500
 
 
 @weapons_bp.route('/categories/<int:category_id>', methods=['PUT'])
-def update_category_endpoint(category_id):
+async def update_category_endpoint(category_id):
     """
     Actualiza los datos de una categoría existente.
     
@@ -180,20 +261,67 @@ def update_category_endpoint(category_id):
     Returns:
         JSON: Categoría actualizada
         
+    Headers:
+        If-Match (opcional): ETag de la versión leída; si la categoría ha
+            cambiado desde entonces no se actualiza
+        
     Status Codes:
         200: Actualización exitosa
+        400: Datos inválidos o nombre duplicado
         404: Categoría no existe
-        500: Error interno del servidor
+        412: La categoría cambió desde la versión de If-Match
     """
-    data = request.json
-    category = update_category(category_id, data)
+    data = await get_json()
+    try:
+        category = await update_category(category_id, data, expected_versions())
+    except VersionConflictError:
+        return version_conflict_response()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     if category:
-        return jsonify(category)
+        return item_response(category)
+    return jsonify({'error': 'Categoría no encontrada'}), 404
+
+
+@weapons_bp.route('/categories/<int:category_id>', methods=['PATCH'])
+async def patch_category_endpoint(category_id):
+    """
+    Modifica sólo los campos enviados de una categoría.
+    
+    Se resuelve con un único ``UPDATE ... RETURNING``: no se lee la fila
+    antes ni después, y la unicidad del nombre la comprueba la base de datos.
+    
+    Args:
+        category_id (int): ID de la categoría a modificar
+        
+    Body JSON (al menos uno):
+        {
+            "name": "Nuevo nombre",
+            "description": "Nueva descripción"
+        }
+        
+    Headers:
+        If-Match (opcional): ETag de la versión leída
+        
+    Status Codes:
+        200: Modificación exitosa
+        400: Campos inválidos o nombre duplicado
+        404: Categoría no existe
+        412: La categoría cambió desde la versión de If-Match
+    """
+    try:
+        category = await patch_category(category_id, await get_json(silent=True), expected_versions())
+    except VersionConflictError:
+        return version_conflict_response()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if category:
+        return item_response(category)
     return jsonify({'error': 'Categoría no encontrada'}), 404
 
 
 @weapons_bp.route('/categories/<int:category_id>', methods=['DELETE'])
-def delete_category_endpoint(category_id):
+async def delete_category_endpoint(category_id):
     """
     Elimina una categoría del sistema.
     
@@ -209,9 +337,12 @@ def delete_category_endpoint(category_id):
     Status Codes:
         200: Eliminación exitosa
         404: Categoría no existe
-        500: Error de integridad (armas asociadas)
+        409: La categoría tiene armas asociadas
     """
-    category = delete_category(category_id)
+    try:
+        category = await delete_category(category_id)
+    except CategoryInUseError as e:
+        return jsonify({'error': str(e)}), 409
     if category:
         return jsonify({'message': 'Categoría eliminada'})
     return jsonify({'error': 'Categoría no encontrada'}), 404
@@ -222,10 +353,16 @@ def delete_category_endpoint(category_id):
 # =============================================================================
 
 @weapons_bp.route('/weapons', methods=['GET'])
-def list_weapons():
+async def list_weapons():
     """
     Obtiene la lista completa de todas las armas registradas.
     
+    Query Params:
+        ids (opcional): Lista de IDs separados por comas (máximo BATCH_MAX_IDS),
+            p. ej. para favoritos o comparativas. Devuelve
+            {"items": [...], "missing": [...]} en el orden pedido, resuelto
+            con una sola consulta.
+    
     Returns:
         JSON: Lista de armas con información básica:
         [
@@ -239,13 +376,22 @@ def list_weapons():
         
     Status Codes:
         200: Lista retornada correctamente
+        304: La lista no ha cambiado (If-None-Match)
+        400: Parámetro ids inválido
     """
-    weapons = get_all_weapons()
-    return jsonify(weapons)
+    if 'ids' in request.args:
+        return await batch_response(request.args['ids'], get_weapons_by_ids)
+    if conditional_service.has_conditions():
+        count, newest = await get_weapons_version()
+        etag = collection_etag(count, newest)
+        if not_modified(etag):
+            return not_modified_response(etag)
+    weapons = await get_all_weapons()
+    return json_response(weapons, items_etag(weapons))
 
 
 @weapons_bp.route('/weapons/<int:weapon_id>', methods=['GET'])
-def get_weapon(weapon_id):
+async def get_weapon(weapon_id):
     """
     Obtiene los detalles de un arma específica por su ID.
     
@@ -257,16 +403,21 @@ def get_weapon(weapon_id):
         
     Status Codes:
         200: Arma encontrada
+        304: El arma no ha cambiado (If-None-Match / If-Modified-Since)
         404: Arma no existe
     """
-    weapon = get_weapon_by_id(weapon_id)
+    if conditional_service.has_conditions():
+        current = await get_weapon_version(weapon_id)
+        if current and not_modified(str(current.version), current.updated_at):
+            return not_modified_response(str(current.version), current.updated_at)
+    weapon = await get_weapon_by_id(weapon_id)
     if weapon:
-        return jsonify(weapon)
+        return item_response(weapon)
     return jsonify({'error': 'Arma no encontrada'}), 404
 
 
 @weapons_bp.route('/weapons', methods=['POST'])
-def create_new_weapon():
+async def create_new_weapon():
     """
     Crea una nueva arma en el sistema.
     
@@ -300,7 +451,7 @@ def create_new_weapon():
         }
     """
     try:
-        data = request.json
+        data = await get_json()
         
         # Validar campos requeridos
         if not data or 'name' not in data or 'category_id' not in data:
@@ -308,22 +459,86 @@ def create_new_weapon():
                 'error': 'Los campos name y category_id son obligatorios'
             }), 400
         
-        # Validar que la categoría existe (integridad referencial)
-        category = get_category_by_id(data['category_id'])
-        if not category:
-            return jsonify({
-                'error': 'La categoría especificada no existe'
-            }), 404
-        
-        weapon = create_weapon(data)
-        return jsonify(weapon), 201
+        # La integridad referencial la comprueba la clave foránea al insertar
+        weapon = await create_weapon(data)
+        return item_response(weapon, 201)
         
+    except CategoryNotFoundError:
+        return jsonify({
+            'error': 'La categoría especificada no existe'
+        }), 404
     except Exception as e:
         return jsonify({'error': f'Error al crear el arma: {str(e)}'}), 500
 
 
+@weapons_bp.route('/weapons/import', methods=['POST'])
+@auth_service.token_required
+@auth_service.admin_required
+async def import_weapons_endpoint(payload):
+    """
+    Importa muchas armas de una vez en segundo plano (solo admin).
+    
+    La importación la ejecuta el worker (``python worker.py``) en una sola
+    transacción; las armas inválidas se omiten y se listan en el resultado.
+    
+    Body JSON requerido:
+        {
+            "weapons": [{"name": "...", "category_id": 1, "description": "..."}, ...]
+        }
+        
+    Returns:
+        JSON: Trabajo encolado (Location y status_url con su estado)
+        
+    Status Codes:
+        202: Importación encolada
+        400: Cuerpo inválido o más de IMPORT_MAX_WEAPONS armas
+        403: No es administrador
+    """
+    data = await get_json(silent=True) or {}
+    try:
+        job = await offload(jobs_service.enqueue_weapon_import, data.get('weapons'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return accepted_response(job)
+
+
+@weapons_bp.route('/weapons/<int:weapon_id>/image', methods=['PUT'])
+@auth_service.token_required
+@auth_service.admin_required
+async def upload_weapon_image(payload, weapon_id):
+    """
+    Sube la imagen de un arma (solo admin).
+    
+    El cuerpo es la imagen en bruto (PNG, JPEG, WebP...). El worker la
+    decodifica, la reduce a IMAGE_MAX_SIZE píxeles de lado y la guarda en PNG.
+    
+    Returns:
+        JSON: Trabajo encolado (Location y status_url con su estado)
+        
+    Status Codes:
+        202: Imagen encolada para procesar
+        400: Cuerpo vacío
+        403: No es administrador
+        404: Arma no encontrada
+        413: Imagen mayor que IMAGE_UPLOAD_MAX_BYTES
+    """
+    too_large = jsonify({'error': f'La imagen supera el máximo de {jobs_service.IMAGE_UPLOAD_MAX_BYTES} bytes'}), 413
+    if request.content_length is not None and request.content_length > jobs_service.IMAGE_UPLOAD_MAX_BYTES:
+        return too_large
+    if await get_weapon_version(weapon_id) is None:
+        return jsonify({'error': 'Arma no encontrada'}), 404
+    image_data = await read_body(jobs_service.IMAGE_UPLOAD_MAX_BYTES)
+    if image_data is None:
+        return too_large
+    try:
+        job = await offload(jobs_service.enqueue_weapon_image, weapon_id, image_data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return accepted_response(job)
+
+
 @weapons_bp.route('/weapons/<int:weapon_id>', methods=['PUT'])
-def update_weapon_endpoint(weapon_id):
+async def update_weapon_endpoint(weapon_id):
     """
     Actualiza los datos de un arma existente.
     
@@ -340,20 +555,73 @@ def update_weapon_endpoint(weapon_id):
     Returns:
         JSON: Arma actualizada
         
+    Headers:
+        If-Match (opcional): ETag de la versión leída; si el arma ha
+            cambiado desde entonces no se actualiza
+        
     Status Codes:
         200: Actualización exitosa
-        404: Arma no existe
-        500: Error interno del servidor
+        400: Datos inválidos
+        404: El arma o la categoría indicada no existen
+        412: El arma cambió desde la versión de If-Match
+    """
+    data = await get_json()
+    try:
+        weapon = await update_weapon(weapon_id, data, expected_versions())
+    except VersionConflictError:
+        return version_conflict_response()
+    except CategoryNotFoundError:
+        return jsonify({'error': 'La categoría especificada no existe'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if weapon:
+        return item_response(weapon)
+    return jsonify({'error': 'Arma no encontrada'}), 404
+
+
+@weapons_bp.route('/weapons/<int:weapon_id>', methods=['PATCH'])
+async def patch_weapon_endpoint(weapon_id):
+    """
+    Modifica sólo los campos enviados de un arma.
+    
+    Se resuelve con un único ``UPDATE ... RETURNING``: no se lee la fila
+    antes ni después, y la existencia de la categoría la comprueba la clave
+    foránea en lugar de una consulta previa.
+    
+    Args:
+        weapon_id (int): ID del arma a modificar
+        
+    Body JSON (al menos uno):
+        {
+            "name": "Nuevo nombre",
+            "category_id": 2,
+            "description": "Nueva descripción"
+        }
+        
+    Headers:
+        If-Match (opcional): ETag de la versión leída
+        
+    Status Codes:
+        200: Modificación exitosa
+        400: Campos inválidos
+        404: El arma o la categoría indicada no existen
+        412: El arma cambió desde la versión de If-Match
     """
-    data = request.json
-    weapon = update_weapon(weapon_id, data)
+    try:
+        weapon = await patch_weapon(weapon_id, await get_json(silent=True), expected_versions())
+    except VersionConflictError:
+        return version_conflict_response()
+    except CategoryNotFoundError:
+        return jsonify({'error': 'La categoría especificada no existe'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     if weapon:
-        return jsonify(weapon)
+        return item_response(weapon)
     return jsonify({'error': 'Arma no encontrada'}), 404
 
 
 @weapons_bp.route('/weapons/<int:weapon_id>', methods=['DELETE'])
-def delete_weapon_endpoint(weapon_id):
+async def delete_weapon_endpoint(weapon_id):
     """
     Elimina un arma del sistema.
     
@@ -367,18 +635,85 @@ def delete_weapon_endpoint(weapon_id):
         200: Eliminación exitosa
         404: Arma no existe
     """
-    weapon = delete_weapon(weapon_id)
+    weapon = await delete_weapon(weapon_id)
     if weapon:
         return jsonify({'message': 'Arma eliminada'})
     return jsonify({'error': 'Arma no encontrada'}), 404
 
 
+# =============================================================================
+# SINCRONIZACIÓN INCREMENTAL
+# =============================================================================
+
+@weapons_bp.route('/changes', methods=['GET'])
+async def list_changes():
+    """
+    Obtiene los cambios del catálogo (armas, categorías e imágenes) en orden.
+    
+    Query Params:
+        since (opcional): Último seq que ya tiene el cliente (por defecto 0)
+        limit (opcional): Máximo de cambios (por defecto 100, máximo 1000)
+        
+    Returns:
+        JSON: Página de cambios:
+        {
+            "changes": [
+                {"seq": 41, "entity": "weapon", "id": 7, "op": "update",
+                 "version": 3, "changed_at": "...", "data": {...}},
+                {"seq": 42, "entity": "weapon", "id": 9, "op": "delete",
+                 "version": 1, "changed_at": "...", "data": null}
+            ],
+            "next_since": 42,
+            "has_more": false
+        }
+        
+    Status Codes:
+        200: Éxito
+        400: Parámetros inválidos
+    """
+    try:
+        since, limit = changes_service.parse_page(request.args.get('since'), request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(await changes_service.get_changes(since, limit))
+
+
+@weapons_bp.route('/events', methods=['GET'])
+async def catalog_events():
+    """
+    Flujo Server-Sent Events con los cambios del catálogo.
+    
+    Cada cambio llega como ``event: change`` con ``id: <seq>`` y los datos
+    {"seq", "entity", "id", "op", "version"}. Al reconectar, el navegador
+    envía ``Last-Event-ID`` y recibe los cambios que se perdió (o
+    ``event: reset`` si son demasiados y debe recargar).
+    
+    En app.py cada suscriptor ocupa un hilo del worker, así que hay un límite
+    por worker (SSE_MAX_SYNC_SUBSCRIBERS); en asgi.py los suscriptores sólo
+    esperan en el bucle de eventos y no hay límite.
+    
+    Status Codes:
+        200: Flujo text/event-stream
+        503: Demasiados suscriptores en este worker (app.py)
+    """
+    last_event_id = request.headers.get('Last-Event-ID')
+    if in_event_loop():
+        return event_stream(events_service.stream_async(last_event_id), events_service.STREAM_HEADERS)
+    if events_service.get_broker().thread_subscribers() >= events_service.SSE_MAX_SYNC_SUBSCRIBERS:
+        response = jsonify({'error': 'Demasiados suscriptores. Inténtalo de nuevo más tarde'})
+        response.headers['Retry-After'] = str(events_service.SSE_RETRY_MS // 1000)
+        return response, 503
+    return event_stream(events_service.stream(last_event_id), events_service.STREAM_HEADERS)
+
+
 # =============================================================================
 # ENDPOINTS PARA IMÁGENES DESDE BASE DE DATOS (BYTEA)
 # =============================================================================
 
 @weapons_bp.route('/categories/<int:category_id>/icon', methods=['GET'])
-def get_category_icon(category_id):
+@rate_limit('images')
+@shed_load('images')
+async def get_category_icon(category_id):
     """
     Obtiene la imagen del icono de una categoría desde la base de datos.
     
@@ -392,7 +727,7 @@ def get_category_icon(category_id):
         200: Imagen encontrada y retornada
         404: Categoría no existe o no tiene imagen
     """
-    category = get_category_object(category_id)
+    category = await get_category_object(category_id)
     
     if not category:
         return jsonify({'error': 'Categoría no encontrada'}), 404
@@ -400,22 +735,26 @@ def get_category_icon(category_id):
     if not category.icon_data:
         return jsonify({'error': 'Esta categoría no tiene imagen almacenada'}), 404
     
-    # Crear un objeto de archivo en memoria desde los bytes
-    image_binary = BytesIO(category.icon_data)
-    
     # Determinar el tipo MIME (por defecto PNG)
     mime_type = category.icon_mime_type or 'image/png'
     
-    return send_file(
-        image_binary,
-        mimetype=mime_type,
-        as_attachment=False,
-        download_name=f'{category.name}.png'
-    )
+    metrics_service.image_served('category_icon', len(category.icon_data))
+    
+    with tracing_service.span('image.send', layer='controller', **{
+        'mhwiki.image.kind': 'category_icon', 'mhwiki.image.bytes': len(category.icon_data), 'mhwiki.image.mime': mime_type
+    }):
+        return await send_file(
+            category.icon_data,
+            mimetype=mime_type,
+            as_attachment=False,
+            download_name=f'{category.name}.png'
+        )
 
 
 @weapons_bp.route('/weapons/<int:weapon_id>/image', methods=['GET'])
-def get_weapon_image(weapon_id):
+@rate_limit('images')
+@shed_load('images')
+async def get_weapon_image(weapon_id):
     """
     Obtiene la imagen de un arma desde la base de datos.
     
@@ -429,7 +768,7 @@ def get_weapon_image(weapon_id):
         200: Imagen encontrada y retornada
         404: Arma no existe o no tiene imagen
     """
-    weapon = get_weapon_object(weapon_id)
+    weapon = await get_weapon_object(weapon_id)
     
     if not weapon:
         return jsonify({'error': 'Arma no encontrada'}), 404
@@ -437,15 +776,17 @@ def get_weapon_image(weapon_id):
     if not weapon.image_data:
         return jsonify({'error': 'Esta arma no tiene imagen almacenada'}), 404
     
-    # Crear un objeto de archivo en memoria desde los bytes
-    image_binary = BytesIO(weapon.image_data)
-    
     # Determinar el tipo MIME (por defecto PNG)
     mime_type = weapon.image_mime_type or 'image/png'
     
-    return send_file(
-        image_binary,
-        mimetype=mime_type,
-        as_attachment=False,
-        download_name=f'{weapon.name}.png'
-    )
+    metrics_service.image_served('weapon', len(weapon.image_data))
+    
+    with tracing_service.span('image.send', layer='controller', **{
+        'mhwiki.image.kind': 'weapon', 'mhwiki.image.bytes': len(weapon.image_data), 'mhwiki.image.mime': mime_type
+    }):
+        return await send_file(
+            weapon.image_data,
+            mimetype=mime_type,
+            as_attachment=False,
+            download_name=f'{weapon.name}.png'
+        )
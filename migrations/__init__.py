@@ -0,0 +1,32 @@
+"""
+Sistema de migraciones de esquema (estilo Alembic) para PostgreSQL.
+
+Cada revisión vive en ``migrations/versions/NNNN_descripcion.py`` y define:
+- ``revision`` / ``down_revision``: encadenan las revisiones en orden
+- ``upgrade(op)`` / ``downgrade(op)``: aplican o revierten el cambio
+- ``transactional`` (opcional, True por defecto): si es False la revisión se
+  ejecuta en modo AUTOCOMMIT, necesario para ``CREATE INDEX CONCURRENTLY``
+
+La revisión aplicada se guarda en la tabla ``schema_version``.
+
+Uso desde la línea de comandos:
+    python -m migrations upgrade          # Aplicar hasta la última revisión
+    python -m migrations downgrade 0001   # Volver a una revisión concreta
+    python -m migrations current          # Revisión aplicada
+    python -m migrations history          # Listado de revisiones
+    python -m migrations check            # Verificar índices esperados
+"""
+
+from .runner import (
+    load_revisions, current_revision, head_revision, upgrade, downgrade, stamp
+)
+from .operations import Operations
+from .schema_check import (
+    EXPECTED_INDEXES, EXPECTED_COLUMNS, find_missing_indexes, find_missing_columns, check_schema
+)
+
+__all__ = [
+    'load_revisions', 'current_revision', 'head_revision', 'upgrade', 'downgrade', 'stamp',
+    'Operations', 'EXPECTED_INDEXES', 'EXPECTED_COLUMNS', 'find_missing_indexes', 'find_missing_columns',
+    'check_schema'
+]
@@ -0,0 +1,73 @@
+"""
+Línea de comandos de migraciones.
+
+    python -m migrations upgrade [revision]
+    python -m migrations downgrade <revision|base>
+    python -m migrations current
+    python -m migrations history
+    python -m migrations stamp <revision>
+    python -m migrations check
+"""
+
+import argparse
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import engine
+from migrations import (
+    load_revisions, current_revision, upgrade, downgrade, stamp, find_missing_indexes, find_missing_columns
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m migrations', description='Migraciones de esquema')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    up = sub.add_parser('upgrade', help='Aplicar revisiones pendientes')
+    up.add_argument('revision', nargs='?', default='head')
+
+    down = sub.add_parser('downgrade', help='Revertir revisiones')
+    down.add_argument('revision')
+
+    st = sub.add_parser('stamp', help='Marcar una revisión como aplicada sin ejecutarla')
+    st.add_argument('revision')
+
+    sub.add_parser('current', help='Mostrar la revisión aplicada')
+    sub.add_parser('history', help='Listar las revisiones disponibles')
+    sub.add_parser('check', help='Verificar los índices esperados')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'upgrade':
+        applied = upgrade(engine, args.revision)
+        print(f"✅ {len(applied)} revisión(es) aplicada(s). Actual: {current_revision(engine)}")
+    elif args.command == 'downgrade':
+        reverted = downgrade(engine, args.revision)
+        print(f"✅ {len(reverted)} revisión(es) revertida(s). Actual: {current_revision(engine)}")
+    elif args.command == 'stamp':
+        stamp(engine, None if args.revision == 'base' else args.revision)
+        print(f"✅ Revisión marcada: {args.revision}")
+    elif args.command == 'current':
+        print(current_revision(engine) or 'base')
+    elif args.command == 'history':
+        applied = current_revision(engine)
+        for module in load_revisions():
+            marker = ' (actual)' if module.revision == applied else ''
+            print(f"{module.revision} <- {module.down_revision or 'base'}: {module.description}{marker}")
+    elif args.command == 'check':
+        columns = find_missing_columns(engine)
+        missing = find_missing_indexes(engine)
+        if not missing and not columns:
+            print("✅ Todas las columnas e índices esperados existen")
+            return 0
+        for table, column, revision in columns:
+            print(f"❌ {table}.{column} - revisión {revision}")
+        for m in missing:
+            print(f"❌ {m.table}({', '.join(m.columns)}) - {m.reason}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
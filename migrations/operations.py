@@ -0,0 +1,183 @@
+"""
+Operaciones disponibles dentro de una revisión de migración.
+
+Las revisiones reciben una instancia de ``Operations`` (``op``) y la usan para
+ejecutar DDL de forma idempotente y compatible con PostgreSQL y SQLite.
+"""
+
+from sqlalchemy import inspect, text
+
+
+class Operations:
+    """
+    Envoltorio sobre una conexión para ejecutar DDL desde una revisión.
+
+    Args:
+        connection: Conexión SQLAlchemy sobre la que se ejecuta la revisión
+        transactional (bool): False si la revisión corre en modo AUTOCOMMIT
+    """
+
+    def __init__(self, connection, transactional=True):
+        self.connection = connection
+        self.transactional = transactional
+
+    @property
+    def dialect(self):
+        """Nombre del dialecto de la base de datos ('postgresql', 'sqlite'...)."""
+        return self.connection.dialect.name
+
+    @property
+    def is_postgresql(self):
+        return self.dialect == 'postgresql'
+
+    def execute(self, sql, **params):
+        """Ejecuta una sentencia SQL arbitraria."""
+        return self.connection.execute(text(sql), params)
+
+    def index_exists(self, name):
+        """Indica si existe un índice con el nombre dado."""
+        if self.is_postgresql:
+            query = "SELECT 1 FROM pg_class WHERE relname = :name AND relkind = 'i'"
+        else:
+            query = "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"
+        return self.execute(query, name=name).first() is not None
+
+    def _drop_invalid_index(self, name):
+        # Un CREATE INDEX CONCURRENTLY interrumpido deja un índice INVALID que
+        # IF NOT EXISTS daría por bueno: se elimina antes de reintentar.
+        row = self.execute(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name",
+            name=name
+        ).first()
+        if row is not None and not row[0]:
+            self.drop_index(name, concurrently=True)
+
+    def create_index(self, name, table, columns, unique=False, where=None, concurrently=False):
+        """
+        Crea un índice B-tree si no existe.
+
+        Args:
+            name (str): Nombre del índice
+            table (str): Tabla indexada
+            columns (list[str]): Columnas del índice, en orden
+            unique (bool): Crear un índice único
+            where (str): Predicado para un índice parcial (opcional)
+            concurrently (bool): Usar CREATE INDEX CONCURRENTLY en PostgreSQL
+                (requiere una revisión con ``transactional = False``)
+        """
+        concurrent = concurrently and self.is_postgresql
+        if concurrent:
+            if self.transactional:
+                raise RuntimeError(
+                    f"CREATE INDEX CONCURRENTLY ({name}) requiere una revisión con transactional = False"
+                )
+            self._drop_invalid_index(name)
+
+        sql = "CREATE {unique}INDEX {concurrently}IF NOT EXISTS {name} ON {table} ({columns})".format(
+            unique='UNIQUE ' if unique else '',
+            concurrently='CONCURRENTLY ' if concurrent else '',
+            name=name,
+            table=table,
+            columns=', '.join(columns)
+        )
+        if where:
+            sql += f" WHERE {where}"
+        self.execute(sql)
+
+    def drop_index(self, name, concurrently=False):
+        """
+        Elimina un índice si existe.
+
+        Args:
+            name (str): Nombre del índice
+            concurrently (bool): Usar DROP INDEX CONCURRENTLY en PostgreSQL
+        """
+        concurrent = concurrently and self.is_postgresql
+        if concurrent and self.transactional:
+            raise RuntimeError(
+                f"DROP INDEX CONCURRENTLY ({name}) requiere una revisión con transactional = False"
+            )
+        self.execute(
+            "DROP INDEX {concurrently}IF EXISTS {name}".format(
+                concurrently='CONCURRENTLY ' if concurrent else '',
+                name=name
+            )
+        )
+
+    def column_exists(self, table, column):
+        """Indica si ``table`` tiene la columna ``column``."""
+        return any(c['name'] == column for c in inspect(self.connection).get_columns(table))
+
+    def add_column(self, table, column, definition):
+        """
+        Añade una columna si no existe.
+
+        Args:
+            table (str): Tabla
+            column (str): Nombre de la columna
+            definition (str): Tipo y restricciones SQL (p. ej. "INTEGER NOT NULL DEFAULT 1")
+        """
+        if not self.column_exists(table, column):
+            self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def drop_column(self, table, column):
+        """Elimina una columna si existe (SQLite >= 3.35)."""
+        if self.column_exists(table, column):
+            self.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+
+    def foreign_key(self, table, column):
+        """Clave foránea de ``table`` sobre ``column`` (dict del inspector) o None."""
+        for foreign_key in inspect(self.connection).get_foreign_keys(table):
+            if foreign_key['constrained_columns'] == [column]:
+                return foreign_key
+        return None
+
+    def set_foreign_key_ondelete(self, table, column, ondelete):
+        """
+        Cambia la acción ON DELETE de la clave foránea de ``column``.
+
+        Sólo en PostgreSQL: SQLite no permite alterar claves foráneas (su NO
+        ACTION por defecto, sin diferir, ya rechaza el DELETE igual que
+        RESTRICT). Se hace en dos pasos para no recorrer la tabla con el
+        bloqueo ACCESS EXCLUSIVE tomado:
+
+        1. ``DROP CONSTRAINT`` + ``ADD CONSTRAINT ... NOT VALID`` en un único
+           ALTER TABLE: bloqueo exclusivo breve, sin comprobar las filas
+           existentes (las nuevas ya se comprueban).
+        2. ``VALIDATE CONSTRAINT``: recorre la tabla con SHARE UPDATE
+           EXCLUSIVE, que no bloquea lecturas ni escrituras.
+
+        En una revisión con ``transactional = False`` cada paso es su propia
+        transacción; dentro de una transacción el bloqueo del paso 1 se
+        mantendría hasta el final. Si la validación se interrumpe, volver a
+        ejecutar la revisión sólo repite el paso 2.
+
+        Args:
+            table (str): Tabla con la clave foránea
+            column (str): Columna de la clave foránea
+            ondelete (str|None): 'RESTRICT', 'CASCADE'... o None para NO ACTION
+        """
+        foreign_key = self.foreign_key(table, column)
+        if not self.is_postgresql or foreign_key is None:
+            return
+        name = foreign_key['name']
+        if (foreign_key.get('options', {}).get('ondelete') or '').upper() != (ondelete or '').upper():
+            referred = f"{foreign_key['referred_table']} ({', '.join(foreign_key['referred_columns'])})"
+            action = f" ON DELETE {ondelete}" if ondelete else ''
+            self.execute(
+                f"ALTER TABLE {table} DROP CONSTRAINT {name}, "
+                f"ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {referred}{action} NOT VALID"
+            )
+        self.validate_constraint(table, name)
+
+    def validate_constraint(self, table, name):
+        """Valida una restricción creada con NOT VALID (no hace nada si ya es válida o no es PostgreSQL)."""
+        if not self.is_postgresql:
+            return
+        row = self.execute(
+            "SELECT convalidated FROM pg_constraint WHERE conname = :name AND conrelid = CAST(:table AS regclass)",
+            name=name, table=table
+        ).first()
+        if row is not None and not row[0]:
+            self.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
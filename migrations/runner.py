@@ -0,0 +1,164 @@
+"""
+Motor de migraciones: descubre las revisiones, calcula el camino entre la
+revisión aplicada y la solicitada y las ejecuta registrando el progreso en
+la tabla ``schema_version``.
+"""
+
+import importlib
+import os
+from sqlalchemy import MetaData, Table, Column, String, select, delete, insert
+from .operations import Operations
+
+VERSIONS_PACKAGE = 'migrations.versions'
+VERSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'versions')
+
+_version_metadata = MetaData()
+schema_version = Table(
+    'schema_version', _version_metadata,
+    Column('revision', String(64), primary_key=True)
+)
+
+
+def load_revisions():
+    """
+    Carga las revisiones de ``migrations/versions`` ordenadas por su cadena.
+
+    Returns:
+        list[module]: Módulos de revisión, del más antiguo al más reciente
+    """
+    modules = {}
+    for filename in sorted(os.listdir(VERSIONS_DIR)):
+        if filename.endswith('.py') and filename[0].isdigit():
+            module = importlib.import_module(f"{VERSIONS_PACKAGE}.{filename[:-3]}")
+            modules[module.revision] = module
+
+    by_parent = {}
+    for module in modules.values():
+        if module.down_revision in by_parent:
+            raise RuntimeError(
+                f"Las revisiones {by_parent[module.down_revision].revision} y {module.revision} "
+                f"tienen la misma revisión padre ({module.down_revision})"
+            )
+        by_parent[module.down_revision] = module
+
+    ordered = []
+    current = by_parent.get(None)
+    while current is not None:
+        ordered.append(current)
+        current = by_parent.get(current.revision)
+
+    if len(ordered) != len(modules):
+        raise RuntimeError("La cadena de revisiones está rota (down_revision desconocido)")
+    return ordered
+
+
+def head_revision():
+    """Devuelve el identificador de la última revisión disponible."""
+    revisions = load_revisions()
+    return revisions[-1].revision if revisions else None
+
+
+def current_revision(engine):
+    """
+    Devuelve la revisión aplicada en la base de datos.
+
+    Returns:
+        str|None: Identificador de la revisión o None si no hay ninguna
+    """
+    with engine.connect() as conn:
+        _version_metadata.create_all(conn)
+        conn.commit()
+        return conn.execute(select(schema_version.c.revision)).scalar()
+
+
+def _stamp(conn, revision):
+    _version_metadata.create_all(conn)
+    conn.execute(delete(schema_version))
+    if revision is not None:
+        conn.execute(insert(schema_version).values(revision=revision))
+
+
+def stamp(engine, revision):
+    """Marca ``revision`` como aplicada sin ejecutar ninguna revisión."""
+    with engine.begin() as conn:
+        _stamp(conn, revision)
+
+
+def _run(engine, module, direction, revision):
+    """
+    Ejecuta ``module.<direction>`` y deja ``revision`` como aplicada.
+
+    En las revisiones transaccionales la marca va en la misma transacción que
+    el DDL: si la revisión falla no queda aplicada a medias ni marcada. Las
+    que corren en AUTOCOMMIT (índices CONCURRENTLY) se marcan al terminar;
+    sus operaciones son idempotentes, así que repetirlas tras un fallo es
+    seguro.
+    """
+    transactional = getattr(module, 'transactional', True)
+    if transactional:
+        with engine.begin() as conn:
+            getattr(module, direction)(Operations(conn, transactional=True))
+            _stamp(conn, revision)
+    else:
+        with engine.connect() as conn:
+            conn = conn.execution_options(isolation_level='AUTOCOMMIT')
+            getattr(module, direction)(Operations(conn, transactional=False))
+        stamp(engine, revision)
+
+
+def _index_of(revisions, revision):
+    if revision is None:
+        return -1
+    for i, module in enumerate(revisions):
+        if module.revision == revision:
+            return i
+    raise ValueError(f"Revisión desconocida: {revision}")
+
+
+def upgrade(engine, target='head', echo=print):
+    """
+    Aplica las revisiones pendientes hasta ``target``.
+
+    Args:
+        engine: Motor SQLAlchemy de la base de datos primaria
+        target (str): Revisión destino o 'head' para la última
+        echo (callable): Función para informar del progreso
+
+    Returns:
+        list[str]: Revisiones aplicadas
+    """
+    revisions = load_revisions()
+    start = _index_of(revisions, current_revision(engine))
+    end = len(revisions) - 1 if target == 'head' else _index_of(revisions, target)
+
+    applied = []
+    for module in revisions[start + 1:end + 1]:
+        echo(f" ⬆️  {module.revision}: {module.description}")
+        _run(engine, module, 'upgrade', module.revision)
+        applied.append(module.revision)
+    return applied
+
+
+def downgrade(engine, target, echo=print):
+    """
+    Revierte revisiones hasta dejar ``target`` como revisión aplicada.
+
+    Args:
+        engine: Motor SQLAlchemy de la base de datos primaria
+        target (str|None): Revisión destino ('base' o None para revertir todas)
+        echo (callable): Función para informar del progreso
+
+    Returns:
+        list[str]: Revisiones revertidas
+    """
+    revisions = load_revisions()
+    start = _index_of(revisions, current_revision(engine))
+    end = _index_of(revisions, None if target == 'base' else target)
+
+    reverted = []
+    for i in range(start, end, -1):
+        module = revisions[i]
+        echo(f" ⬇️  {module.revision}: {module.description}")
+        _run(engine, module, 'downgrade', module.down_revision)
+        reverted.append(module.revision)
+    return reverted
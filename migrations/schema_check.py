@@ -0,0 +1,130 @@
+"""
+Verificación de los índices que necesitan las consultas más frecuentes y de
+las columnas añadidas por migraciones.
+
+La aplicación se niega a arrancar si falta alguno (ver ``config.database.init_db``):
+sin los índices las rutas calientes degeneran en escaneos secuenciales, y
+``create_all`` no añade columnas nuevas a tablas existentes.
+"""
+
+from collections import namedtuple
+from sqlalchemy import inspect, text
+
+# table/columns: columnas que deben encabezar algún índice o restricción única.
+# name: si se indica, se exige un índice con ese nombre exacto (índices parciales).
+ExpectedIndex = namedtuple('ExpectedIndex', ['table', 'columns', 'name', 'reason'])
+
+EXPECTED_INDEXES = [
+    ExpectedIndex('weapons', ('category_id',), None,
+                  'WeaponRepository.get_by_category / count_by_category'),
+    ExpectedIndex('weapon_categories', ('name',), None,
+                  'WeaponCategoryRepository.exists_by_name (restricción única)'),
+    ExpectedIndex('users', ('username',), None, 'UserRepository.get_by_username'),
+    ExpectedIndex('users', ('email',), None, 'UserRepository.get_by_email'),
+    ExpectedIndex('users', ('role',), 'ix_users_role_admin',
+                  'UserRepository.count_admins / get_all_admins (índice parcial)'),
+    ExpectedIndex('jobs', ('priority', 'run_at', 'id'), 'ix_jobs_ready',
+                  'JobRepository.claim (índice parcial)'),
+]
+
+# Columnas que el modelo necesita y que añade una migración: (tabla, columna, revisión)
+EXPECTED_COLUMNS = [
+    ('weapon_categories', 'version', '0004'),
+    ('weapon_categories', 'updated_at', '0004'),
+    ('weapons', 'version', '0004'),
+    ('weapons', 'updated_at', '0004'),
+]
+
+
+def _invalid_indexes(engine):
+    if engine.dialect.name != 'postgresql':
+        return set()
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE NOT i.indisvalid"
+        ))
+        return {row[0] for row in rows}
+
+
+def find_missing_indexes(engine):
+    """
+    Compara los índices existentes con ``EXPECTED_INDEXES``.
+
+    Returns:
+        list[ExpectedIndex]: Índices esperados que no existen (o son INVALID)
+    """
+    inspector = inspect(engine)
+    invalid = _invalid_indexes(engine)
+    missing = []
+
+    for expected in EXPECTED_INDEXES:
+        if not inspector.has_table(expected.table):
+            missing.append(expected)
+            continue
+
+        # En SQLite las restricciones UNIQUE en línea sólo aparecen como autoíndices
+        options = {'include_auto_indexes': True} if engine.dialect.name == 'sqlite' else {}
+        covering = [
+            (index['name'], tuple(index['column_names']))
+            for index in inspector.get_indexes(expected.table, **options)
+            if index['name'] not in invalid
+        ]
+        covering += [
+            (constraint['name'], tuple(constraint['column_names']))
+            for constraint in inspector.get_unique_constraints(expected.table)
+        ]
+        pk = inspector.get_pk_constraint(expected.table)
+        covering.append((pk.get('name'), tuple(pk.get('constrained_columns') or ())))
+
+        if expected.name:
+            found = any(name == expected.name for name, _ in covering)
+        else:
+            width = len(expected.columns)
+            found = any(columns[:width] == expected.columns for _, columns in covering)
+
+        if not found:
+            missing.append(expected)
+
+    return missing
+
+
+def find_missing_columns(engine):
+    """
+    Returns:
+        list[tuple]: Entradas de ``EXPECTED_COLUMNS`` que no existen
+    """
+    inspector = inspect(engine)
+    missing = []
+    for table, column, revision in EXPECTED_COLUMNS:
+        if not inspector.has_table(table):
+            continue
+        if column not in {c['name'] for c in inspector.get_columns(table)}:
+            missing.append((table, column, revision))
+    return missing
+
+
+def check_schema(engine):
+    """
+    Lanza RuntimeError si falta alguna columna o índice esperado.
+
+    Raises:
+        RuntimeError: Con la lista de columnas o índices ausentes y cómo crearlos
+    """
+    columns = find_missing_columns(engine)
+    if columns:
+        details = ', '.join(f"{table}.{column} (revisión {revision})" for table, column, revision in columns)
+        raise RuntimeError(
+            f"Faltan columnas requeridas: {details}. "
+            "Ejecuta 'python -m migrations upgrade' para crearlas."
+        )
+
+    missing = find_missing_indexes(engine)
+    if missing:
+        details = '; '.join(
+            f"{m.table}({', '.join(m.columns)}) para {m.reason}" for m in missing
+        )
+        raise RuntimeError(
+            f"Faltan índices requeridos: {details}. "
+            "Ejecuta 'python -m migrations upgrade' para crearlos."
+        )
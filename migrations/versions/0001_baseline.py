@@ -0,0 +1,69 @@
+"""
+Revisión base: esquema creado por ``init_db`` (create_all) y por los scripts
+de ``scripts/setup`` antes de existir el sistema de migraciones.
+
+El DDL está congelado aquí, sin importar los modelos: los modelos actuales ya
+incluyen lo que añaden las revisiones posteriores (versión de fila, registro
+de cambios, cola de trabajos...), y crearlos desde la base haría que esas
+revisiones chocaran con tablas y columnas ya existentes.
+
+Es idempotente: en una base de datos existente no modifica nada.
+"""
+
+from sqlalchemy import (
+    BigInteger, Boolean, Column, DateTime, Enum, ForeignKey, Integer, LargeBinary, MetaData, String, Table, func
+)
+
+revision = '0001'
+down_revision = None
+description = 'Esquema base (weapon_categories, weapons, users, catalog_counters)'
+
+metadata = MetaData()
+
+Table(
+    'weapon_categories', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('name', String(100), nullable=False, unique=True),
+    Column('description', String(255), nullable=True),
+    Column('icon_path', String(255), nullable=True),
+    Column('icon_data', LargeBinary, nullable=True),
+    Column('icon_mime_type', String(50), nullable=True),
+)
+
+Table(
+    'weapons', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('name', String(100), nullable=False),
+    Column('category_id', Integer, ForeignKey('weapon_categories.id')),
+    Column('description', String(255), nullable=True),
+    Column('image_path', String(255), nullable=True),
+    Column('image_data', LargeBinary, nullable=True),
+    Column('image_mime_type', String(50), nullable=True),
+)
+
+Table(
+    'users', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('username', String(50), unique=True, nullable=False, index=True),
+    Column('email', String(120), unique=True, nullable=False, index=True),
+    Column('password_hash', String(255), nullable=False),
+    Column('role', Enum('user', 'admin', name='userrole'), nullable=False),
+    Column('is_active', Boolean, nullable=False),
+    Column('created_at', DateTime(timezone=True), server_default=func.now()),
+    Column('last_login', DateTime(timezone=True), nullable=True),
+)
+
+Table(
+    'catalog_counters', metadata,
+    Column('name', String(100), primary_key=True),
+    Column('value', BigInteger, nullable=False),
+)
+
+
+def upgrade(op):
+    metadata.create_all(op.connection, checkfirst=True)
+
+
+def downgrade(op):
+    # La revisión base nunca elimina tablas con datos
+    pass
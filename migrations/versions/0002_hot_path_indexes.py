@@ -0,0 +1,39 @@
+"""
+Índices para las rutas de consulta calientes.
+
+Auditoría de índices y restricciones:
+- weapons.category_id: filtro de get_by_category/count_by_category y clave
+  foránea sin índice -> B-tree ix_weapons_category_id.
+- weapon_categories.name: la restricción UNIQUE ya crea un índice B-tree que
+  cubre exists_by_name; no se añade otro.
+- users.role: count_admins/get_all_admins filtran role = 'admin', que es una
+  fracción mínima de la tabla -> índice parcial ix_users_role_admin.
+- users.username/email: migrate_users_table.py creó idx_users_username e
+  idx_users_email además de las restricciones UNIQUE; son duplicados que sólo
+  encarecen las escrituras y se eliminan.
+
+Se ejecuta fuera de transacción para usar CREATE/DROP INDEX CONCURRENTLY y
+no bloquear escrituras en producción.
+"""
+
+revision = '0002'
+down_revision = '0001'
+description = 'Índices de rutas calientes (category_id, admins parcial) y limpieza de duplicados'
+transactional = False
+
+
+def upgrade(op):
+    op.create_index('ix_weapons_category_id', 'weapons', ['category_id'], concurrently=True)
+    op.create_index(
+        'ix_users_role_admin', 'users', ['role'],
+        where="role = 'admin'", concurrently=True
+    )
+    op.drop_index('idx_users_username', concurrently=True)
+    op.drop_index('idx_users_email', concurrently=True)
+
+
+def downgrade(op):
+    op.create_index('idx_users_email', 'users', ['email'], concurrently=True)
+    op.create_index('idx_users_username', 'users', ['username'], concurrently=True)
+    op.drop_index('ix_users_role_admin', concurrently=True)
+    op.drop_index('ix_weapons_category_id', concurrently=True)
@@ -0,0 +1,31 @@
+"""
+Tabla de buckets de limitación de peticiones (rate_limit_buckets).
+
+La usa el backend ``database`` de services/rate_limit_service.py para que
+todos los workers compartan los mismos contadores.
+"""
+
+from sqlalchemy import Column, Float, MetaData, String, Table
+
+metadata = MetaData()
+
+# DDL congelado (ver 0001_baseline.py): los cambios posteriores del modelo
+# van en sus propias revisiones
+rate_limit_buckets = Table(
+    'rate_limit_buckets', metadata,
+    Column('key', String(255), primary_key=True),
+    Column('tokens', Float, nullable=False),
+    Column('updated_at', Float, nullable=False, index=True),
+)
+
+revision = '0003'
+down_revision = '0002'
+description = 'Buckets compartidos de limitación de peticiones'
+
+
+def upgrade(op):
+    rate_limit_buckets.create(op.connection, checkfirst=True)
+
+
+def downgrade(op):
+    rate_limit_buckets.drop(op.connection, checkfirst=True)
@@ -0,0 +1,41 @@
+"""
+Versión de fila y fecha de modificación en weapon_categories y weapons.
+
+``version`` la incrementa el ORM en cada UPDATE (``version_id_col``) y sirve
+de ETag y de control de concurrencia optimista (If-Match); ``updated_at``
+alimenta Last-Modified y los ETag de las colecciones.
+
+En PostgreSQL ``ADD COLUMN ... DEFAULT now()`` no reescribe la tabla (el
+valor por defecto se evalúa una vez). SQLite no admite un DEFAULT no
+constante en ALTER TABLE, así que se rellena después.
+"""
+
+from datetime import datetime, timezone
+
+revision = '0004'
+down_revision = '0003'
+description = 'Columnas version y updated_at en weapon_categories y weapons'
+
+TABLES = ('weapon_categories', 'weapons')
+
+
+def upgrade(op):
+    if op.is_postgresql:
+        timestamp = "TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()"
+    else:
+        timestamp = "DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00.000000'"
+
+    for table in TABLES:
+        op.add_column(table, 'version', "INTEGER NOT NULL DEFAULT 1")
+        op.add_column(table, 'updated_at', timestamp)
+        if not op.is_postgresql:
+            op.execute(
+                f"UPDATE {table} SET updated_at = :now WHERE updated_at = '1970-01-01 00:00:00.000000'",
+                now=datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')
+            )
+
+
+def downgrade(op):
+    for table in TABLES:
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'version')
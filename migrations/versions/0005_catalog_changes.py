@@ -0,0 +1,35 @@
+"""
+Registro de cambios del catálogo (catalog_changes).
+
+Lo escribe el listener de models/change_model.py en cada flush que toca armas
+o categorías, y lo lee ``GET /api/changes`` para la sincronización
+incremental.
+"""
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+# DDL congelado (ver 0001_baseline.py): los cambios posteriores del modelo
+# van en sus propias revisiones
+catalog_changes = Table(
+    'catalog_changes', metadata,
+    Column('seq', BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True),
+    Column('entity', String(20), nullable=False),
+    Column('entity_id', Integer, nullable=False),
+    Column('op', String(10), nullable=False),
+    Column('version', Integer, nullable=True),
+    Column('changed_at', DateTime(timezone=True), nullable=False),
+)
+
+revision = '0005'
+down_revision = '0004'
+description = 'Registro de cambios del catálogo'
+
+
+def upgrade(op):
+    catalog_changes.create(op.connection, checkfirst=True)
+
+
+def downgrade(op):
+    catalog_changes.drop(op.connection, checkfirst=True)
@@ -0,0 +1,26 @@
+"""
+``ON DELETE RESTRICT`` en la clave foránea weapons.category_id.
+
+El servicio ya no cuenta las armas antes de borrar una categoría: es la
+restricción la que rechaza el DELETE y el error se traduce al mismo mensaje.
+En SQLite la clave foránea existente (NO ACTION, sin diferir) ya se comporta
+igual, así que la revisión sólo cambia PostgreSQL.
+
+La restricción nueva se añade NOT VALID y se valida después (ver
+``Operations.set_foreign_key_ondelete``). Se ejecuta fuera de transacción
+para que la validación, que recorre weapons, no ocurra con el bloqueo ACCESS
+EXCLUSIVE del ALTER TABLE todavía tomado.
+"""
+
+revision = '0006'
+down_revision = '0005'
+description = 'ON DELETE RESTRICT en weapons.category_id'
+transactional = False
+
+
+def upgrade(op):
+    op.set_foreign_key_ondelete('weapons', 'category_id', 'RESTRICT')
+
+
+def downgrade(op):
+    op.set_foreign_key_ondelete('weapons', 'category_id', None)
@@ -0,0 +1,45 @@
+"""
+Cola de trabajos en segundo plano (jobs).
+
+La escriben los endpoints que encolan trabajo pesado y la consume el proceso
+``python worker.py`` (ver services/jobs_service.py).
+"""
+
+from sqlalchemy import JSON, BigInteger, Column, DateTime, Index, Integer, MetaData, String, Table, Text, text
+
+metadata = MetaData()
+
+# DDL congelado (ver 0001_baseline.py): los cambios posteriores del modelo
+# van en sus propias revisiones
+jobs = Table(
+    'jobs', metadata,
+    Column('id', BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True),
+    Column('kind', String(50), nullable=False),
+    Column('payload', JSON, nullable=False),
+    Column('status', String(10), nullable=False),
+    Column('priority', Integer, nullable=False),
+    Column('attempts', Integer, nullable=False),
+    Column('max_attempts', Integer, nullable=False),
+    Column('run_at', DateTime(timezone=True), nullable=False),
+    Column('locked_by', String(100), nullable=True),
+    Column('locked_at', DateTime(timezone=True), nullable=True),
+    Column('last_error', Text, nullable=True),
+    Column('result', JSON, nullable=True),
+    Column('created_at', DateTime(timezone=True), nullable=False),
+    Column('finished_at', DateTime(timezone=True), nullable=True),
+    Index('ix_jobs_ready', text('priority DESC'), 'run_at', 'id',
+          postgresql_where=text("status = 'queued'"),
+          sqlite_where=text("status = 'queued'")),
+)
+
+revision = '0007'
+down_revision = '0006'
+description = 'Cola de trabajos en segundo plano'
+
+
+def upgrade(op):
+    jobs.create(op.connection, checkfirst=True)
+
+
+def downgrade(op):
+    jobs.drop(op.connection, checkfirst=True)
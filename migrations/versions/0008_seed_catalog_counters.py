@@ -0,0 +1,40 @@
+"""
+Inicializa catalog_counters desde las tablas.
+
+Las escrituras suman sus incrementos con un upsert (models/stats_model.py),
+así que los contadores deben partir del valor real: esta revisión los
+calcula una vez, igual que ``StatsRepository.rebuild``. En PostgreSQL se
+bloquea catalog_counters mientras se cuenta, para que una escritura
+concurrente sume después sobre el valor inicial en lugar de perderse.
+
+También elimina el contador ``admins``, que ya no se mantiene.
+"""
+
+revision = '0008'
+down_revision = '0007'
+description = 'Valores iniciales de catalog_counters'
+
+_SEED = [
+    "SELECT 'categories', COUNT(*) FROM weapon_categories",
+    "SELECT 'weapons', COUNT(*) FROM weapons",
+    "SELECT 'users', COUNT(*) FROM users",
+    "SELECT 'weapons.category.' || c.id, COUNT(w.id) FROM weapon_categories c "
+    "LEFT JOIN weapons w ON w.category_id = c.id GROUP BY c.id",
+]
+
+
+def upgrade(op):
+    if op.is_postgresql:
+        op.execute('LOCK TABLE catalog_counters IN EXCLUSIVE MODE')
+    for query in _SEED:
+        # WHERE true: SQLite necesita una cláusula antes de ON CONFLICT en INSERT ... SELECT
+        op.execute(
+            f"INSERT INTO catalog_counters (name, value) SELECT * FROM ({query}) AS seed WHERE true "
+            "ON CONFLICT (name) DO UPDATE SET value = excluded.value"
+        )
+    op.execute("DELETE FROM catalog_counters WHERE name = 'admins'")
+
+
+def downgrade(op):
+    # Los contadores siguen siendo válidos con el esquema anterior
+    pass
@@ -0,0 +1,35 @@
+"""
+Ficheros subidos de los trabajos en segundo plano (job_files).
+
+Las imágenes de ``PUT /api/weapons/<id>/image`` se guardan aquí en bruto en
+lugar de en base64 dentro del payload JSON de jobs; la fila se borra al
+terminar el trabajo (ver repositories/job_repository.py).
+"""
+
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, LargeBinary, MetaData, Table
+
+metadata = MetaData()
+
+# Sólo la columna referenciada: la tabla jobs la crea la revisión 0007
+Table('jobs', metadata, Column('id', BigInteger().with_variant(Integer, 'sqlite'), primary_key=True))
+
+# DDL congelado (ver 0001_baseline.py): los cambios posteriores del modelo
+# van en sus propias revisiones
+job_files = Table(
+    'job_files', metadata,
+    Column('job_id', BigInteger().with_variant(Integer, 'sqlite'), ForeignKey('jobs.id', ondelete='CASCADE'),
+           primary_key=True),
+    Column('data', LargeBinary, nullable=False),
+)
+
+revision = '0009'
+down_revision = '0008'
+description = 'Ficheros subidos de los trabajos'
+
+
+def upgrade(op):
+    job_files.create(op.connection, checkfirst=True)
+
+
+def downgrade(op):
+    job_files.drop(op.connection, checkfirst=True)
@@ -0,0 +1,3 @@
+"""
+Revisiones de esquema, aplicadas en el orden definido por ``down_revision``.
+"""
@@ -0,0 +1,194 @@
+"""
+Modelo del registro de cambios del catálogo (catalog_changes).
+
+Cada alta, modificación o baja de un arma, de una categoría o de sus imágenes
+añade una fila con un número de secuencia creciente, en la misma transacción
+que el cambio: ninguna escritura del ORM puede quedar fuera del registro, ni
+el registro puede anotar una escritura revertida. Un listener ``after_flush``
+de la sesión reúne los cambios de cada flush y otro ``before_commit`` los
+escribe justo antes de confirmar; las escrituras que no pasan por el ORM
+(p. ej. ``UPDATE ... RETURNING`` de los PATCH) los añaden con ``defer``.
+
+En PostgreSQL el ``INSERT`` toma en la propia sentencia un advisory lock de
+transacción antes de numerar las filas, de modo que los números de secuencia
+se hacen visibles en orden: un cliente que ya leyó hasta ``seq`` nunca verá
+después aparecer un cambio con un número menor. Como el ``INSERT`` es lo
+último antes del ``COMMIT``, el lock sólo serializa ese instante, no la
+transacción entera. La misma sentencia envía ``NOTIFY catalog_changes``, que
+PostgreSQL entrega al confirmar y que despierta el flujo SSE
+(services/events_service.py).
+"""
+
+from sqlalchemy import (BigInteger, Column, DateTime, Integer, String, cast, column, event, func,
+                        inspect, insert, select, true, values)
+from sqlalchemy.orm import Session
+from models.weapons_model import Base, Weapon, WeaponCategory, utcnow
+
+# Clave del advisory lock que ordena las escrituras en el registro
+CHANGE_LOG_LOCK_KEY = 0x6D68_6368  # 'mhch'
+
+# Canal de LISTEN/NOTIFY por el que se avisa de cambios confirmados
+CHANGE_CHANNEL = 'catalog_changes'
+
+# Entidad de cada modelo: (nombre, nombre de su imagen, columnas de la imagen)
+TRACKED_MODELS = {
+    Weapon: ('weapon', 'weapon_image', ('image_data', 'image_mime_type', 'image_path')),
+    WeaponCategory: ('category', 'category_icon', ('icon_data', 'icon_mime_type', 'icon_path')),
+}
+
+OP_INSERT = 'insert'
+OP_UPDATE = 'update'
+OP_DELETE = 'delete'
+
+# Cambios pendientes de escribir en la transacción de la sesión
+PENDING_KEY = 'catalog_changes'
+
+RECORD_COLUMNS = ('entity', 'entity_id', 'op', 'version', 'changed_at')
+
+
+class CatalogChange(Base):
+    """
+    Cambio del catálogo.
+
+    Atributos:
+        seq: Número de secuencia (orden de los cambios)
+        entity: 'weapon', 'category', 'weapon_image' o 'category_icon'
+        entity_id: ID del arma o de la categoría
+        op: 'insert', 'update' o 'delete' (tombstone)
+        version: Versión de la fila tras el cambio
+        changed_at: Momento del cambio (UTC)
+    """
+    __tablename__ = 'catalog_changes'
+
+    # SQLite sólo autoincrementa INTEGER PRIMARY KEY
+    seq = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String(10), nullable=False)
+    version = Column(Integer, nullable=True)
+    changed_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+    def __repr__(self):
+        return f"<CatalogChange #{self.seq} {self.op} {self.entity}:{self.entity_id}>"
+
+
+def _changed_columns(obj):
+    return {attr.key for attr in inspect(obj).attrs if attr.history.has_changes()}
+
+
+def _image_op(obj, image_columns, created):
+    has_image = any(getattr(obj, column) is not None for column in image_columns)
+    if created:
+        return OP_INSERT if has_image else None
+    return OP_UPDATE if has_image else OP_DELETE
+
+
+def change_row(entity, entity_id, op, version, changed_at=None):
+    """Fila de catalog_changes (sin ``seq``)."""
+    return {'entity': entity, 'entity_id': entity_id, 'op': op, 'version': version,
+            'changed_at': changed_at or utcnow()}
+
+
+def collect_changes(session):
+    """
+    Cambios pendientes del flush en curso.
+
+    Returns:
+        list[dict]: Filas de catalog_changes (sin ``seq``)
+    """
+    now = utcnow()
+    rows = []
+
+    def add(entity, obj, op):
+        rows.append(change_row(entity, obj.id, op, obj.version, now))
+
+    for obj in session.new:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if tracked:
+            entity, image_entity, image_columns = tracked
+            add(entity, obj, OP_INSERT)
+            image_op = _image_op(obj, image_columns, created=True)
+            if image_op:
+                add(image_entity, obj, image_op)
+
+    for obj in session.dirty:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if not tracked or not session.is_modified(obj):
+            continue
+        entity, image_entity, image_columns = tracked
+        changed = _changed_columns(obj)
+        if changed - set(image_columns):
+            add(entity, obj, OP_UPDATE)
+        if changed & set(image_columns):
+            add(image_entity, obj, _image_op(obj, image_columns, created=False))
+
+    for obj in session.deleted:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if tracked:
+            add(tracked[0], obj, OP_DELETE)
+
+    return rows
+
+
+def _locked_insert(rows):
+    """
+    ``INSERT ... SELECT`` que toma el advisory lock y envía el NOTIFY antes de
+    numerar las filas (el ``seq`` se calcula al insertar cada fila del join).
+    """
+    table = CatalogChange.__table__
+    data = values(*(column(name, table.c[name].type) for name in RECORD_COLUMNS), name='data').data(
+        [tuple(row[name] for name in RECORD_COLUMNS) for row in rows]
+    )
+    change_lock = select(
+        func.pg_advisory_xact_lock(CHANGE_LOG_LOCK_KEY).label('locked'),
+        func.pg_notify(CHANGE_CHANNEL, '').label('notified'),
+    ).subquery('change_lock')
+    return insert(table).from_select(
+        RECORD_COLUMNS,
+        select(*(cast(data.c[name], table.c[name].type) for name in RECORD_COLUMNS))
+        .select_from(data.join(change_lock, true())),
+    )
+
+
+def record(connection, rows):
+    """
+    Escribe ``rows`` en catalog_changes dentro de la transacción de ``connection``.
+
+    Debe ser la última sentencia antes del ``COMMIT``: en PostgreSQL toma el
+    advisory lock del registro, que se mantiene hasta confirmar.
+    """
+    if not rows:
+        return
+    if connection.dialect.name == 'postgresql':
+        connection.execute(_locked_insert(rows))
+    else:
+        connection.execute(insert(CatalogChange.__table__), rows)
+
+
+def defer(session, rows):
+    """Añade ``rows`` a los cambios que la sesión escribirá al confirmar."""
+    session.info.setdefault(PENDING_KEY, []).extend(rows)
+
+
+@event.listens_for(Session, 'after_flush')
+def collect_flushed_changes(session, flush_context):
+    """Reúne los cambios del flush; se escriben al confirmar la transacción."""
+    defer(session, collect_changes(session))
+
+
+@event.listens_for(Session, 'before_commit')
+def record_changes(session):
+    """Escribe los cambios pendientes en catalog_changes justo antes del ``COMMIT``."""
+    # before_commit llega antes del flush final del commit
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    rows = session.info.pop(PENDING_KEY, None)
+    if rows:
+        record(session.connection(), rows)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_changes(session, previous_transaction):
+    """Descarta los cambios pendientes de una transacción revertida."""
+    if not session.in_transaction():
+        session.info.pop(PENDING_KEY, None)
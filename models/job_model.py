@@ -0,0 +1,110 @@
+"""
+Modelo de la cola de trabajos en segundo plano (tabla jobs).
+
+Las peticiones encolan el trabajo pesado (importaciones masivas, imágenes,
+exportaciones, recálculo de contadores) y responden 202 al momento; el
+proceso ``python worker.py`` lo ejecuta después (ver services/jobs_service.py).
+
+Los workers toman los trabajos con ``SELECT ... FOR UPDATE SKIP LOCKED``, de
+modo que varios procesos pueden consumir la cola sin bloquearse entre sí ni
+ejecutar dos veces el mismo trabajo.
+
+Los ficheros subidos (p. ej. imágenes) no van en el payload JSON: se guardan
+en bruto en job_files hasta que el trabajo termina.
+"""
+
+from sqlalchemy import (JSON, BigInteger, Column, DateTime, ForeignKey, Index, Integer, LargeBinary, String,
+                        Text, text)
+from models.weapons_model import Base, format_timestamp, utcnow
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+
+JOB_STATUSES = (STATUS_QUEUED, STATUS_RUNNING, STATUS_SUCCEEDED, STATUS_FAILED)
+
+
+class Job(Base):
+    """
+    Trabajo en segundo plano.
+
+    Atributos:
+        id: Identificador del trabajo
+        kind: Tipo de trabajo (nombre del manejador, p. ej. 'weapons.import')
+        payload: Parámetros del trabajo (JSON)
+        status: 'queued', 'running', 'succeeded' o 'failed'
+        priority: Prioridad (mayor primero)
+        attempts: Intentos realizados
+        max_attempts: Intentos máximos antes de marcarlo como fallido
+        run_at: No se ejecuta antes de este momento (reintentos con espera)
+        locked_by: Worker que lo está ejecutando
+        locked_at: Momento en que lo tomó el worker
+        last_error: Error del último intento fallido
+        result: Resultado del trabajo (JSON)
+        created_at: Momento en que se encoló
+        finished_at: Momento en que terminó (con éxito o fallido)
+    """
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Índice parcial para JobRepository.claim: sólo los trabajos pendientes,
+        # en el orden en que se toman
+        Index('ix_jobs_ready', text('priority DESC'), 'run_at', 'id',
+              postgresql_where=text("status = 'queued'"),
+              sqlite_where=text("status = 'queued'")),
+    )
+
+    # SQLite sólo autoincrementa INTEGER PRIMARY KEY
+    id = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String(10), nullable=False, default=STATUS_QUEUED)
+    priority = Column(Integer, nullable=False, default=0)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+    locked_by = Column(String(100), nullable=True)
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def to_json(self):
+        """Estado del trabajo (sin el payload)."""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'priority': self.priority,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': format_timestamp(self.run_at),
+            'last_error': self.last_error,
+            'result': self.result,
+            'created_at': format_timestamp(self.created_at),
+            'finished_at': format_timestamp(self.finished_at),
+        }
+
+    def __repr__(self):
+        return f"<Job #{self.id} {self.kind} {self.status}>"
+
+
+class JobFile(Base):
+    """
+    Fichero subido de un trabajo, en bruto.
+
+    Se borra al terminar el trabajo (y con él, por la clave foránea).
+
+    Atributos:
+        job_id: Trabajo al que pertenece
+        data: Contenido del fichero
+    """
+    __tablename__ = 'job_files'
+
+    job_id = Column(BigInteger().with_variant(Integer, 'sqlite'), ForeignKey('jobs.id', ondelete='CASCADE'),
+                    primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+
+    def __repr__(self):
+        return f"<JobFile job #{self.job_id} ({len(self.data or b'')} bytes)>"
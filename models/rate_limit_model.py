@@ -0,0 +1,28 @@
+"""
+Modelo de los buckets de limitación de peticiones compartidos entre workers.
+
+Cada fila es un token bucket (ver services/rate_limit_service.py): los tokens
+se recargan de forma perezosa según el tiempo transcurrido desde updated_at.
+"""
+
+from sqlalchemy import Column, String, Float
+from models.weapons_model import Base
+
+
+class RateLimitBucket(Base):
+    """
+    Token bucket de una regla y un cliente.
+
+    Atributos:
+        key: '<regla>:<ámbito>:<sha256 del cliente>' (p. ej. 'login:ip:5c1f...')
+        tokens: Tokens disponibles tras la última petición admitida
+        updated_at: Instante (epoch en segundos) de la última petición admitida
+    """
+    __tablename__ = 'rate_limit_buckets'
+
+    key = Column(String(255), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<RateLimitBucket {self.key}={self.tokens:.2f}>"
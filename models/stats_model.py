@@ -0,0 +1,168 @@
+"""
+Modelo de contadores del catálogo.
+
+Cada fila guarda un contador mantenido de forma incremental (armas,
+categorías, usuarios y armas por categoría), de modo que las estadísticas de
+la wiki no necesiten recorrer las tablas completas.
+
+Los contadores se actualizan en la misma transacción que la escritura que los
+cambia, igual que el registro de cambios (models/change_model.py): un listener
+``after_flush`` de la sesión cubre las escrituras del ORM y las sentencias
+``UPDATE``/``DELETE ... RETURNING`` de los repositories llaman a ``apply``. Si
+la transacción se revierte, el contador también.
+
+Los incrementos se suman con un upsert: un contador que aún no existe se crea
+con el incremento. Los valores iniciales los calcula la migración 0008 (o
+``init_db`` en una base nueva), de modo que los contadores no se desvían.
+"""
+
+from sqlalchemy import Column, String, BigInteger, delete, event, inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from models.weapons_model import Base, Weapon, WeaponCategory
+from models.user_model import User
+
+# Prefijo de los contadores de armas por categoría
+CATEGORY_COUNTER_PREFIX = 'weapons.category.'
+
+
+class CatalogCounter(Base):
+    """
+    Contador con nombre del catálogo.
+
+    Atributos:
+        name: Clave del contador ('weapons', 'categories', 'users' o
+              'weapons.category.<id>')
+        value: Valor actual del contador
+    """
+    __tablename__ = 'catalog_counters'
+
+    name = Column(String(100), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CatalogCounter {self.name}={self.value}>"
+
+
+def category_counter_name(category_id):
+    """Nombre del contador de armas de una categoría."""
+    return f"{CATEGORY_COUNTER_PREFIX}{category_id}"
+
+
+def upsert(connection):
+    """``insert`` con ON CONFLICT del dialecto de ``connection``."""
+    return pg_insert if connection.dialect.name == 'postgresql' else sqlite_insert
+
+
+def weapon_deltas(category_id, sign=1):
+    """Incrementos por el alta (1) o la baja (-1) de un arma."""
+    deltas = {'weapons': sign}
+    if category_id is not None:
+        deltas[category_counter_name(category_id)] = sign
+    return deltas
+
+
+def weapon_moved_deltas(old_category_id, new_category_id):
+    """Incrementos por el cambio de categoría de un arma."""
+    if old_category_id == new_category_id:
+        return {}
+    deltas = {}
+    if old_category_id is not None:
+        deltas[category_counter_name(old_category_id)] = -1
+    if new_category_id is not None:
+        deltas[category_counter_name(new_category_id)] = 1
+    return deltas
+
+
+def user_deltas(sign=1):
+    """Incrementos por el alta (1) o la baja (-1) de un usuario."""
+    return {'users': sign}
+
+
+def _merge(total, deltas):
+    for name, delta in deltas.items():
+        total[name] = total.get(name, 0) + delta
+
+
+def apply(connection, deltas, created=(), deleted=()):
+    """
+    Aplica incrementos dentro de la transacción de ``connection``.
+
+    Cada incremento es un ``INSERT ... ON CONFLICT DO UPDATE SET value =
+    value + n``: un contador que todavía no existe se crea con el incremento.
+
+    Args:
+        connection: Conexión de la transacción de la escritura
+        deltas (dict): {nombre: incremento}
+        created (Iterable[str]): Contadores de categoría a crear (a 0)
+        deleted (Iterable[str]): Contadores de categoría a eliminar
+    """
+    table = CatalogCounter.__table__
+    created, deleted = list(created), list(deleted)
+    insert = upsert(connection)
+    if created:
+        connection.execute(
+            insert(table).values([{'name': name, 'value': 0} for name in created])
+            .on_conflict_do_nothing(index_elements=[table.c.name])
+        )
+    if deleted:
+        connection.execute(delete(table).where(table.c.name.in_(deleted)))
+    for name, delta in sorted(deltas.items()):
+        if delta and name not in deleted:
+            connection.execute(
+                insert(table).values(name=name, value=delta)
+                .on_conflict_do_update(index_elements=[table.c.name], set_={'value': table.c.value + delta})
+            )
+
+
+def _change(obj, attribute):
+    """(anterior, nuevo) si ``attribute`` cambió y se conocía su valor anterior; None si no."""
+    history = inspect(obj).attrs[attribute].history
+    if history.added and history.deleted:
+        return history.deleted[0], history.added[0]
+    return None
+
+
+def collect_counter_changes(session):
+    """
+    Incrementos pendientes del flush en curso.
+
+    Returns:
+        tuple: (deltas, contadores a crear, contadores a eliminar)
+    """
+    deltas, created, deleted = {}, [], []
+
+    for obj in session.new:
+        if isinstance(obj, Weapon):
+            _merge(deltas, weapon_deltas(obj.category_id))
+        elif isinstance(obj, WeaponCategory):
+            _merge(deltas, {'categories': 1})
+            created.append(category_counter_name(obj.id))
+        elif isinstance(obj, User):
+            _merge(deltas, user_deltas())
+
+    for obj in session.dirty:
+        if isinstance(obj, Weapon):
+            change = _change(obj, 'category_id')
+            if change:
+                _merge(deltas, weapon_moved_deltas(*change))
+
+    for obj in session.deleted:
+        if isinstance(obj, Weapon):
+            _merge(deltas, weapon_deltas(obj.category_id, -1))
+        elif isinstance(obj, WeaponCategory):
+            _merge(deltas, {'categories': -1})
+            deleted.append(category_counter_name(obj.id))
+        elif isinstance(obj, User):
+            _merge(deltas, user_deltas(-1))
+
+    return {name: delta for name, delta in deltas.items() if delta}, created, deleted
+
+
+@event.listens_for(Session, 'after_flush')
+def maintain_counters(session, flush_context):
+    """Actualiza catalog_counters con los cambios del flush, en la misma transacción."""
+    deltas, created, deleted = collect_counter_changes(session)
+    if deltas or created or deleted:
+        apply(session.connection(), deltas, created, deleted)
@@ -3,10 +3,12 @@ Modelo de Usuario para autenticación y autorización.
 Incluye roles (admin/user) y gestión de contraseñas hasheadas.
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, Index, text
 from sqlalchemy.sql import func
 from models.weapons_model import Base
 import enum
+from datetime import datetime
+from typing import NamedTuple, Optional
 
 
 class UserRole(enum.Enum):
@@ -30,6 +32,12 @@ class User(Base):
         last_login: Última fecha de inicio de sesión
     """
     __tablename__ = 'users'
+    __table_args__ = (
+        # Índice parcial para count_admins/get_all_admins (muy pocos admins)
+        Index('ix_users_role_admin', 'role',
+              postgresql_where=text("role = 'admin'"),
+              sqlite_where=text("role = 'admin'")),
+    )
     
     id = Column(Integer, primary_key=True)
     username = Column(String(50), unique=True, nullable=False, index=True)
@@ -41,6 +49,9 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     last_login = Column(DateTime(timezone=True), nullable=True)
     
+    # created_at lo asigna el servidor: el INSERT lo devuelve con RETURNING
+    __mapper_args__ = {'eager_defaults': True}
+    
     def to_json(self, include_sensitive=False):
         """
         Convierte el usuario a formato JSON.
@@ -67,3 +78,28 @@ class User(Base):
     
     def __repr__(self):
         return f"<User {self.username} ({self.role.value})>"
+
+
+class UserView(NamedTuple):
+    """
+    Usuario de sólo lectura para los listados.
+    
+    Tupla inmutable construida desde una fila Core (sin identity map ni
+    instrumentación, y sin password_hash). ``to_json`` coincide con el de User.
+    """
+    id: int
+    username: str
+    email: str
+    role: UserRole
+    is_active: bool
+    created_at: Optional[datetime]
+    last_login: Optional[datetime]
+    
+    to_json = User.to_json
+
+
+# Columnas, en el orden de los campos de UserView
+USER_VIEW_COLUMNS = (
+    User.__table__.c.id, User.__table__.c.username, User.__table__.c.email, User.__table__.c.role,
+    User.__table__.c.is_active, User.__table__.c.created_at, User.__table__.c.last_login,
+)
@@ -1,8 +1,47 @@
-﻿from sqlalchemy import Column, Integer, String, ForeignKey, LargeBinary
+﻿from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+from sqlalchemy import ARRAY, Column, DateTime, Integer, String, ForeignKey, LargeBinary, any_, bindparam, func
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+def format_timestamp(value):
+    """ISO 8601 en UTC con microsegundos; SQLite devuelve fechas sin zona (son UTC)."""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec='microseconds') + 'Z'
+
+
+def has_blob(column):
+    """
+    Expresión SQL ``column IS NOT NULL`` para una imagen, sin leer el BLOB.
+
+    Se expresa sobre length(): SQLite < 3.41 evalúa mal ``IS [NOT] NULL`` de
+    una columna no modificada dentro de un ``UPDATE ... RETURNING``.
+    """
+    return func.length(column).isnot(None)
+
+
+def id_in(column, ids, dialect_name):
+    """
+    Filtro ``column`` entre ``ids`` para las búsquedas por lotes.
+
+    En PostgreSQL es ``column = ANY(:ids)`` con un único parámetro array: la
+    sentencia es la misma para cualquier número de ids. En el resto de bases
+    de datos, ``column IN (...)``.
+    """
+    if dialect_name == 'postgresql':
+        return column == any_(bindparam('ids', list(ids), type_=ARRAY(Integer)))
+    return column.in_(ids)
+
+
 class WeaponCategory(Base):
     __tablename__ = 'weapon_categories'
     
@@ -12,6 +51,14 @@ class WeaponCategory(Base):
     icon_path = Column(String(255), nullable=True)  # Ruta a la imagen del icono (fallback)
     icon_data = Column(LargeBinary, nullable=True)  # Imagen almacenada como BYTEA
     icon_mime_type = Column(String(50), nullable=True)  # Tipo MIME (image/png, image/jpeg)
+    # Versión de la fila (la incrementa el ORM en cada UPDATE; base de los ETag)
+    version = Column(Integer, nullable=False, server_default='1')
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=utcnow, onupdate=utcnow,
+                        server_default=func.now())
+    
+    # eager_defaults: el INSERT/UPDATE devuelve con RETURNING lo que genera el
+    # servidor, sin SELECT posterior
+    __mapper_args__ = {'version_id_col': version, 'eager_defaults': True}
     
     def to_json(self):
         return {
@@ -19,7 +66,9 @@ class WeaponCategory(Base):
             'name': self.name,
             'description': self.description,
             'icon_path': self.icon_path,
-            'has_icon_data': self.icon_data is not None
+            'has_icon_data': self.icon_data is not None,
+            'version': self.version,
+            'updated_at': format_timestamp(self.updated_at)
         }
 
 class Weapon(Base):
@@ -27,11 +76,20 @@ class Weapon(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(100), nullable=False)
-    category_id = Column(Integer, ForeignKey('weapon_categories.id'))
+    # RESTRICT: una categoría con armas no se puede borrar (lo comprueba la BD)
+    category_id = Column(Integer, ForeignKey('weapon_categories.id', ondelete='RESTRICT'), index=True)
     description = Column(String(255), nullable=True)
     image_path = Column(String(255), nullable=True)  # Ruta a la imagen del arma (fallback)
     image_data = Column(LargeBinary, nullable=True)  # Imagen almacenada como BYTEA
     image_mime_type = Column(String(50), nullable=True)  # Tipo MIME (image/png, image/jpeg)
+    # Versión de la fila (la incrementa el ORM en cada UPDATE; base de los ETag)
+    version = Column(Integer, nullable=False, server_default='1')
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=utcnow, onupdate=utcnow,
+                        server_default=func.now())
+    
+    # eager_defaults: el INSERT/UPDATE devuelve con RETURNING lo que genera el
+    # servidor, sin SELECT posterior
+    __mapper_args__ = {'version_id_col': version, 'eager_defaults': True}
     
     def to_json(self):
         return {
@@ -40,5 +98,59 @@ class Weapon(Base):
             'category_id': self.category_id,
             'description': self.description,
             'image_path': self.image_path,
-            'has_image_data': self.image_data is not None
+            'has_image_data': self.image_data is not None,
+            'version': self.version,
+            'updated_at': format_timestamp(self.updated_at)
         }
+
+
+# -----------------------------------------------------------------------------
+# Modelos de lectura
+#
+# Los GET no necesitan instancias ORM: se construyen tuplas inmutables
+# directamente desde las filas Core, sin identity map, sin instrumentación y
+# sin traer los BLOB (``has_*_data`` se calcula en SQL con ``has_blob``).
+# ``to_json`` devuelve exactamente lo mismo que el del modelo ORM.
+# -----------------------------------------------------------------------------
+
+class WeaponCategoryView(NamedTuple):
+    """Categoría de sólo lectura (ver ``CATEGORY_VIEW_COLUMNS``)."""
+    id: int
+    name: str
+    description: Optional[str]
+    icon_path: Optional[str]
+    has_icon_data: bool
+    version: int
+    updated_at: datetime
+
+    def to_json(self):
+        return dict(self._asdict(), updated_at=format_timestamp(self.updated_at))
+
+
+class WeaponView(NamedTuple):
+    """Arma de sólo lectura (ver ``WEAPON_VIEW_COLUMNS``)."""
+    id: int
+    name: str
+    category_id: Optional[int]
+    description: Optional[str]
+    image_path: Optional[str]
+    has_image_data: bool
+    version: int
+    updated_at: datetime
+
+    def to_json(self):
+        return dict(self._asdict(), updated_at=format_timestamp(self.updated_at))
+
+
+_categories = WeaponCategory.__table__.c
+_weapons = Weapon.__table__.c
+
+# Columnas, en el orden de los campos, para SELECT o RETURNING
+CATEGORY_VIEW_COLUMNS = (
+    _categories.id, _categories.name, _categories.description, _categories.icon_path,
+    has_blob(_categories.icon_data).label('has_icon_data'), _categories.version, _categories.updated_at,
+)
+WEAPON_VIEW_COLUMNS = (
+    _weapons.id, _weapons.name, _weapons.category_id, _weapons.description, _weapons.image_path,
+    has_blob(_weapons.image_data).label('has_image_data'), _weapons.version, _weapons.updated_at,
+)
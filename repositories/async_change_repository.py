@@ -0,0 +1,53 @@
+"""
+Repository asíncrono del registro de cambios del catálogo (modo ASGI).
+
+Versión con AsyncSession de ChangeRepository, con las mismas sentencias.
+"""
+
+from config.async_database import get_async_db, get_async_read_db
+from models.weapons_model import WeaponCategoryView, WeaponView
+from repositories.change_repository import changes_since_stmt, latest_seq_stmt, live_ids
+from repositories.weapon_category_repository import category_views_by_ids_stmt
+from repositories.weapon_repository import weapon_views_by_ids_stmt
+from services.tracing_service import traced_methods
+
+
+@traced_methods('repository')
+class AsyncChangeRepository:
+    """Versión con AsyncSession de ChangeRepository."""
+
+    async def get_page(self, since, limit, weapon_entities, category_entities, primary=False):
+        """
+        Obtener los cambios con ``seq > since`` y el estado actual de sus filas,
+        todo en la misma sesión (ver ``ChangeRepository.get_page``)
+
+        Returns:
+            tuple: (list[CatalogChange], {id: WeaponView}, {id: WeaponCategoryView})
+        """
+        async with (get_async_db() if primary else get_async_read_db()) as db:
+            changes = (await db.execute(changes_since_stmt(since, limit))).scalars().all()
+            dialect = db.bind.dialect.name
+
+            weapon_ids = live_ids(changes, weapon_entities)
+            weapons = {}
+            if weapon_ids:
+                result = await db.execute(weapon_views_by_ids_stmt(weapon_ids, dialect))
+                weapons = {view.id: view for view in (WeaponView(*row) for row in result)}
+
+            category_ids = live_ids(changes, category_entities)
+            categories = {}
+            if category_ids:
+                result = await db.execute(category_views_by_ids_stmt(category_ids, dialect))
+                categories = {view.id: view for view in (WeaponCategoryView(*row) for row in result)}
+
+            return changes, weapons, categories
+
+    async def latest_seq(self, primary=False):
+        """
+        Obtener el último número de secuencia registrado
+
+        Returns:
+            int: Último seq (0 si el registro está vacío)
+        """
+        async with (get_async_db() if primary else get_async_read_db()) as db:
+            return (await db.execute(latest_seq_stmt())).scalar() or 0
@@ -0,0 +1,29 @@
+"""
+Repository asíncrono de bloqueos consultivos de PostgreSQL (modo ASGI).
+
+Versión con AsyncSession de LockRepository.
+"""
+
+from contextlib import asynccontextmanager
+from sqlalchemy import text
+from config.async_database import get_async_db
+from repositories.lock_repository import lock_key
+
+
+class AsyncLockRepository:
+    """Versión con AsyncSession de LockRepository."""
+
+    @asynccontextmanager
+    async def advisory_lock(self, name):
+        """
+        Mantener el bloqueo consultivo ``name`` durante el bloque ``async with``
+        (ver ``LockRepository.advisory_lock``)
+
+        Args:
+            name (str): Nombre del bloqueo
+        """
+        async with get_async_db() as db:
+            if db.bind.dialect.name == 'postgresql':
+                await db.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': lock_key(name)})
+            # Al salir, el cierre de la sesión revierte la transacción y libera el bloqueo
+            yield
@@ -0,0 +1,73 @@
+"""
+Repositorio asíncrono de usuarios (modo ASGI).
+
+Usa las mismas sentencias que repositories/user_repository.py.
+"""
+
+from sqlalchemy import select
+from config.async_database import get_async_db, get_async_read_db
+from models.user_model import USER_VIEW_COLUMNS, User, UserView
+from repositories.user_repository import (
+    count_admins_stmt, exists_stmt, last_login_stmt, update_stmt, user_by_email_stmt, user_by_id_stmt,
+    user_by_username_stmt
+)
+from services.tracing_service import traced_methods
+
+
+@traced_methods('repository')
+class AsyncUserRepository:
+    """Versión con AsyncSession de UserRepository."""
+
+    async def get_all(self):
+        """Obtiene todos los usuarios como UserView (sólo lectura, sin password_hash)."""
+        async with get_async_read_db() as db:
+            result = await db.execute(select(*USER_VIEW_COLUMNS))
+            return [UserView(*row) for row in result]
+
+    async def get_by_id(self, user_id):
+        """Busca un usuario por su ID."""
+        async with get_async_read_db() as db:
+            return (await db.execute(user_by_id_stmt(user_id))).scalars().first()
+
+    async def get_by_username(self, username):
+        """Busca un usuario por su nombre de usuario."""
+        async with get_async_db() as db:
+            return (await db.execute(user_by_username_stmt(username))).scalars().first()
+
+    async def get_by_email(self, email):
+        """Busca un usuario por su email."""
+        async with get_async_db() as db:
+            return (await db.execute(user_by_email_stmt(email))).scalars().first()
+
+    async def exists_by_username_or_email(self, username, email):
+        """Verifica si existe un usuario con el username o email dado."""
+        async with get_async_db() as db:
+            return (await db.execute(exists_stmt(username, email))).first() is not None
+
+    async def create(self, data):
+        """Crea un nuevo usuario."""
+        async with get_async_db() as db:
+            user = User(**data)
+            db.add(user)
+            # created_at llega en el RETURNING del INSERT (eager_defaults)
+            await db.commit()
+            return user
+
+    async def update(self, user_id, data):
+        """Actualiza un usuario existente con un único ``UPDATE ... RETURNING``."""
+        async with get_async_db() as db:
+            user = (await db.execute(update_stmt(user_id, data))).scalars().first()
+            await db.commit()
+            return user
+
+    async def update_last_login(self, user_id):
+        """Actualiza la fecha de último login del usuario."""
+        async with get_async_db() as db:
+            result = await db.execute(last_login_stmt(user_id))
+            await db.commit()
+            return result.rowcount > 0
+
+    async def count_admins(self):
+        """Cuenta cuántos administradores hay en el sistema."""
+        async with get_async_read_db() as db:
+            return (await db.execute(count_admins_stmt())).scalar_one()
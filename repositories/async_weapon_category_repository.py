@@ -0,0 +1,189 @@
+"""
+Repository asíncrono de categorías de armas (modo ASGI)
+
+Versión con AsyncSession de WeaponCategoryRepository, con las sentencias de
+repositories/weapon_category_repository.py.
+"""
+
+from sqlalchemy import select
+from sqlalchemy.orm.exc import StaleDataError
+from config.async_database import get_async_db, get_async_read_db
+from models import change_model, stats_model
+from models.weapons_model import CATEGORY_VIEW_COLUMNS, WeaponCategory, WeaponCategoryView
+from repositories.weapon_category_repository import (
+    category_by_id_stmt, category_view_by_id_stmt, category_views_by_ids_stmt, collection_version_stmt,
+    delete_stmt, patch_stmt, version_stmt
+)
+from services.tracing_service import traced_methods
+
+
+@traced_methods('repository')
+class AsyncWeaponCategoryRepository:
+    """
+    Repository asíncrono para operaciones CRUD de categorías de armas
+    """
+
+    async def get_all(self):
+        """
+        Obtener todas las categorías de armas
+
+        Returns:
+            list[WeaponCategoryView]: Categorías de sólo lectura (sin BLOB ni instancias ORM)
+        """
+        return await self._views(select(*CATEGORY_VIEW_COLUMNS))
+
+    async def get_by_id(self, category_id):
+        """
+        Obtener una categoría específica por su ID (instancia ORM completa, con el icono)
+
+        Returns:
+            WeaponCategory|None: Objeto si existe, None si no se encuentra
+        """
+        async with get_async_read_db() as db:
+            result = await db.execute(category_by_id_stmt(category_id))
+            return result.scalars().first()
+
+    async def get_view(self, category_id):
+        """
+        Obtener una categoría de sólo lectura por su ID
+
+        Returns:
+            WeaponCategoryView|None: Categoría sin el icono, None si no se encuentra
+        """
+        views = await self._views(category_view_by_id_stmt(category_id))
+        return views[0] if views else None
+
+    async def get_by_ids(self, category_ids):
+        """
+        Obtener varias categorías por sus IDs en una sola consulta
+
+        Returns:
+            list[WeaponCategoryView]: Las que existen (sin orden garantizado)
+        """
+        category_ids = list(category_ids)
+        if not category_ids:
+            return []
+        async with get_async_read_db() as db:
+            result = await db.execute(category_views_by_ids_stmt(category_ids, db.bind.dialect.name))
+            return [WeaponCategoryView(*row) for row in result]
+
+    async def _views(self, stmt):
+        """Ejecuta ``stmt`` (columnas de CATEGORY_VIEW_COLUMNS) en la réplica y construye las vistas."""
+        async with get_async_read_db() as db:
+            result = await db.execute(stmt)
+            return [WeaponCategoryView(*row) for row in result]
+
+    async def create(self, data):
+        """
+        Crear una nueva categoría de arma
+
+        Returns:
+            WeaponCategory: Objeto de la categoría creada con su ID asignado
+        """
+        async with get_async_db() as db:
+            category = WeaponCategory(
+                name=data['name'],
+                description=data.get('description', '')
+            )
+            db.add(category)
+            await db.commit()
+            return category
+
+    async def update(self, category_id, data, expected_versions=None):
+        """
+        Actualizar una categoría existente (todas sus columnas editables)
+
+        Returns:
+            WeaponCategoryView|None: Categoría actualizada, None si no se encuentra
+
+        Raises:
+            StaleDataError: Si la versión actual no es una de las esperadas
+            IntegrityError: Si el nuevo nombre ya existe
+        """
+        return await self.patch(category_id, {
+            'name': data['name'],
+            'description': data.get('description', '')
+        }, expected_versions)
+
+    async def patch(self, category_id, changes, expected_versions=None):
+        """
+        Actualizar sólo las columnas indicadas con un único ``UPDATE ... RETURNING``
+
+        Returns:
+            WeaponCategoryView|None: Categoría actualizada, o None si no existe
+
+        Raises:
+            StaleDataError: Si la versión actual no es una de las esperadas
+            IntegrityError: Si el nuevo nombre ya existe
+        """
+        async with get_async_db() as db:
+            row = (await db.execute(patch_stmt(category_id, changes, expected_versions))).first()
+            if row is None:
+                await db.rollback()
+                if expected_versions is not None and await self.get_version(category_id) is not None:
+                    raise StaleDataError(f"La categoría {category_id} no está en la versión indicada")
+                return None
+            change_model.defer(db.sync_session, [
+                change_model.change_row('category', row.id, change_model.OP_UPDATE, row.version)
+            ])
+            await db.commit()
+            return WeaponCategoryView(*row)
+
+    async def delete(self, category_id):
+        """
+        Eliminar una categoría con un único ``DELETE ... RETURNING``
+
+        Returns:
+            bool: True si se eliminó correctamente, False si no existe
+
+        Raises:
+            IntegrityError: Si alguna arma pertenece a la categoría
+        """
+        async with get_async_db() as db:
+            row = (await db.execute(delete_stmt(category_id))).first()
+            if row is None:
+                await db.rollback()
+                return False
+            change_model.defer(db.sync_session, [
+                change_model.change_row('category', row.id, change_model.OP_DELETE, row.version)
+            ])
+            deleted = [stats_model.category_counter_name(row.id)]
+            await db.run_sync(
+                lambda session: stats_model.apply(session.connection(), {'categories': -1}, deleted=deleted)
+            )
+            await db.commit()
+            return True
+
+    async def exists_by_name(self, name):
+        """
+        Verificar si existe una categoría con el nombre especificado
+
+        Returns:
+            bool: True si existe una categoría con ese nombre, False si no
+        """
+        async with get_async_db() as db:
+            result = await db.execute(
+                select(WeaponCategory.id).where(WeaponCategory.name == name).limit(1)
+            )
+            return result.first() is not None
+
+    async def get_version(self, category_id):
+        """
+        Obtener sólo la versión y la fecha de modificación de una categoría
+
+        Returns:
+            Row|None: Fila (version, updated_at) o None si no existe
+        """
+        async with get_async_read_db() as db:
+            return (await db.execute(version_stmt(category_id))).first()
+
+    async def collection_version(self):
+        """
+        Número de categorías y última modificación
+
+        Returns:
+            tuple: (cantidad, updated_at más reciente o None)
+        """
+        async with get_async_read_db() as db:
+            count, newest = (await db.execute(collection_version_stmt())).one()
+            return count, newest
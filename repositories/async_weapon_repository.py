@@ -0,0 +1,217 @@
+"""
+Repository asíncrono de armas (modo ASGI)
+
+Versión con AsyncSession de WeaponRepository: mismas sentencias (las de
+repositories/weapon_repository.py), mismos métodos y mismos valores de
+retorno, pero como corrutinas. Las lecturas van a la réplica como en
+``get_read_db`` y las escrituras son el mismo ``UPDATE``/``DELETE ...
+RETURNING`` de una sola sentencia.
+"""
+
+from sqlalchemy import select
+from sqlalchemy.orm.exc import StaleDataError
+from config.async_database import get_async_db, get_async_read_db
+from models import change_model, stats_model
+from models.weapons_model import WEAPON_VIEW_COLUMNS, Weapon, WeaponView
+from repositories.weapon_repository import (
+    collection_version_stmt, count_by_category_stmt, count_grouped_stmt, delete_stmt, patch_stmt,
+    previous_category_stmt, version_stmt, weapon_by_id_stmt, weapon_view_by_id_stmt,
+    weapon_views_by_category_stmt, weapon_views_by_ids_stmt
+)
+from services.tracing_service import traced_methods
+
+
+@traced_methods('repository')
+class AsyncWeaponRepository:
+    """
+    Repository asíncrono para operaciones CRUD de armas
+    """
+
+    async def get_all(self):
+        """
+        Obtener todas las armas
+
+        Returns:
+            list[WeaponView]: Armas de sólo lectura (sin BLOB ni instancias ORM)
+        """
+        return await self._views(select(*WEAPON_VIEW_COLUMNS))
+
+    async def get_by_id(self, weapon_id):
+        """
+        Obtener un arma específica por su ID (instancia ORM completa, con la imagen)
+
+        Returns:
+            Weapon|None: Objeto Weapon si existe, None si no se encuentra
+        """
+        async with get_async_read_db() as db:
+            result = await db.execute(weapon_by_id_stmt(weapon_id))
+            return result.scalars().first()
+
+    async def get_view(self, weapon_id):
+        """
+        Obtener un arma de sólo lectura por su ID
+
+        Returns:
+            WeaponView|None: Arma sin la imagen, None si no se encuentra
+        """
+        views = await self._views(weapon_view_by_id_stmt(weapon_id))
+        return views[0] if views else None
+
+    async def get_by_category(self, category_id):
+        """
+        Obtener todas las armas de una categoría específica
+
+        Returns:
+            list[WeaponView]: Armas de sólo lectura que pertenecen a la categoría
+        """
+        return await self._views(weapon_views_by_category_stmt(category_id))
+
+    async def get_by_ids(self, weapon_ids):
+        """
+        Obtener varias armas por sus IDs en una sola consulta
+
+        Returns:
+            list[WeaponView]: Las que existen (sin orden garantizado)
+        """
+        weapon_ids = list(weapon_ids)
+        if not weapon_ids:
+            return []
+        async with get_async_read_db() as db:
+            result = await db.execute(weapon_views_by_ids_stmt(weapon_ids, db.bind.dialect.name))
+            return [WeaponView(*row) for row in result]
+
+    async def _views(self, stmt):
+        """Ejecuta ``stmt`` (columnas de WEAPON_VIEW_COLUMNS) en la réplica y construye las vistas."""
+        async with get_async_read_db() as db:
+            result = await db.execute(stmt)
+            return [WeaponView(*row) for row in result]
+
+    async def create(self, data):
+        """
+        Crear una nueva arma
+
+        Returns:
+            Weapon: Objeto del arma creada con su ID asignado
+        """
+        async with get_async_db() as db:
+            weapon = Weapon(
+                name=data['name'],
+                category_id=data['category_id'],
+                description=data.get('description', '')
+            )
+            db.add(weapon)
+            # INSERT ... RETURNING id (eager_defaults); sin refresh tras el commit
+            await db.commit()
+            return weapon
+
+    async def update(self, weapon_id, data, expected_versions=None):
+        """
+        Actualizar un arma existente (todas sus columnas editables)
+
+        Es un ``patch`` con name, category_id y description.
+
+        Returns:
+            tuple|None: (WeaponView actualizada, categoría anterior), None si no se encuentra
+
+        Raises:
+            StaleDataError: Si la versión actual no es una de las esperadas
+            IntegrityError: Si ``category_id`` no existe
+        """
+        return await self.patch(weapon_id, {
+            'name': data['name'],
+            'category_id': data['category_id'],
+            'description': data.get('description', '')
+        }, expected_versions)
+
+    async def patch(self, weapon_id, changes, expected_versions=None):
+        """
+        Actualizar sólo las columnas indicadas con un único ``UPDATE ... RETURNING``
+
+        Returns:
+            tuple|None: (WeaponView actualizada, categoría anterior), o None si
+                        el arma no existe
+
+        Raises:
+            StaleDataError: Si la versión actual no es una de las esperadas
+            IntegrityError: Si ``category_id`` no existe
+        """
+        async with get_async_db() as db:
+            previous_category_id = None
+            if 'category_id' in changes:
+                previous_category_id = (await db.execute(previous_category_stmt(weapon_id))).scalar()
+            row = (await db.execute(patch_stmt(weapon_id, changes, expected_versions))).first()
+            if row is None:
+                await db.rollback()
+                if expected_versions is not None and await self.get_version(weapon_id) is not None:
+                    raise StaleDataError(f"El arma {weapon_id} no está en la versión indicada")
+                return None
+            change_model.defer(db.sync_session, [
+                change_model.change_row('weapon', row.id, change_model.OP_UPDATE, row.version)
+            ])
+            if 'category_id' in changes:
+                deltas = stats_model.weapon_moved_deltas(previous_category_id, row.category_id)
+                await db.run_sync(lambda session: stats_model.apply(session.connection(), deltas))
+            await db.commit()
+            return WeaponView(*row), previous_category_id
+
+    async def delete(self, weapon_id):
+        """
+        Eliminar un arma con un único ``DELETE ... RETURNING``
+
+        Returns:
+            Row|None: Fila (id, category_id, version) del arma eliminada, None si no existe
+        """
+        async with get_async_db() as db:
+            row = (await db.execute(delete_stmt(weapon_id))).first()
+            if row is None:
+                await db.rollback()
+                return None
+            change_model.defer(db.sync_session, [
+                change_model.change_row('weapon', row.id, change_model.OP_DELETE, row.version)
+            ])
+            deltas = stats_model.weapon_deltas(row.category_id, -1)
+            await db.run_sync(lambda session: stats_model.apply(session.connection(), deltas))
+            await db.commit()
+            return row
+
+    async def count_by_category(self, category_id):
+        """
+        Contar cuántas armas pertenecen a una categoría específica
+
+        Returns:
+            int: Cantidad de armas en la categoría
+        """
+        async with get_async_read_db() as db:
+            return (await db.execute(count_by_category_stmt(category_id))).scalar_one()
+
+    async def count_grouped_by_category(self):
+        """
+        Contar las armas de todas las categorías con un único GROUP BY
+
+        Returns:
+            dict: Diccionario {category_id: cantidad de armas}
+        """
+        async with get_async_read_db() as db:
+            result = await db.execute(count_grouped_stmt())
+            return {category_id: count for category_id, count in result}
+
+    async def get_version(self, weapon_id):
+        """
+        Obtener sólo la versión y la fecha de modificación de un arma
+
+        Returns:
+            Row|None: Fila (version, updated_at) o None si no existe
+        """
+        async with get_async_read_db() as db:
+            return (await db.execute(version_stmt(weapon_id))).first()
+
+    async def collection_version(self, category_id=None):
+        """
+        Número de armas y última modificación (de todas o de una categoría)
+
+        Returns:
+            tuple: (cantidad, updated_at más reciente o None)
+        """
+        async with get_async_read_db() as db:
+            count, newest = (await db.execute(collection_version_stmt(category_id))).one()
+            return count, newest
@@ -0,0 +1,115 @@
+"""
+Repository del registro de cambios del catálogo (tabla catalog_changes).
+
+Las filas las escribe el listener de models/change_model.py; aquí sólo se
+leen para la sincronización incremental.
+"""
+
+from sqlalchemy import func, select
+from config.database import get_db, get_read_db
+from models.change_model import CatalogChange
+from models.weapons_model import WeaponCategoryView, WeaponView
+from repositories.weapon_category_repository import category_views_by_ids_stmt
+from repositories.weapon_repository import weapon_views_by_ids_stmt
+from services.tracing_service import traced_methods
+
+
+# Compartido con repositories/async_change_repository.py
+def changes_since_stmt(since, limit):
+    return select(CatalogChange).where(CatalogChange.seq > since).order_by(CatalogChange.seq).limit(limit)
+
+
+def latest_seq_stmt():
+    return select(func.max(CatalogChange.seq))
+
+
+def live_ids(changes, entities):
+    """IDs de las filas de ``entities`` que ``changes`` no da por borradas."""
+    return list({c.entity_id for c in changes if c.op != 'delete' and c.entity in entities})
+
+
+@traced_methods('repository')
+class ChangeRepository:
+    """
+    Repository de lectura del registro de cambios
+
+    Proporciona métodos para:
+    - Listar los cambios posteriores a un número de secuencia
+    - Listarlos junto con el estado actual de sus filas
+    - Obtener el último número de secuencia
+    """
+
+    def get_since(self, since, limit, primary=False):
+        """
+        Obtener los cambios con ``seq > since`` en orden
+
+        Args:
+            since (int): Último número de secuencia que ya tiene el cliente
+            limit (int): Máximo de cambios a devolver
+            primary (bool): Leer de la primaria (sin retraso de réplica)
+
+        Returns:
+            list[CatalogChange]: Cambios ordenados por seq
+        """
+        db = next(get_db() if primary else get_read_db())
+        try:
+            return db.execute(changes_since_stmt(since, limit)).scalars().all()
+        finally:
+            db.close()
+
+    def get_page(self, since, limit, weapon_entities, category_entities, primary=False):
+        """
+        Obtener los cambios con ``seq > since`` y el estado actual de sus filas
+
+        Todo se lee en la misma sesión, es decir, del mismo servidor: las filas
+        reflejan al menos los cambios leídos, así que una fila que falta es
+        porque se borró después y su tombstone está más adelante en el
+        registro. Con dos sesiones, cada lectura podía ir a una réplica
+        distinta y una réplica más retrasada devolver la fila como inexistente.
+
+        Args:
+            since (int): Último número de secuencia que ya tiene el cliente
+            limit (int): Máximo de cambios a devolver
+            weapon_entities (tuple[str]): Entidades cuyos datos están en weapons
+            category_entities (tuple[str]): Entidades cuyos datos están en weapon_categories
+            primary (bool): Leer de la primaria (sin retraso de réplica)
+
+        Returns:
+            tuple: (list[CatalogChange], {id: WeaponView}, {id: WeaponCategoryView})
+        """
+        db = next(get_db() if primary else get_read_db())
+        try:
+            changes = db.execute(changes_since_stmt(since, limit)).scalars().all()
+            dialect = db.bind.dialect.name
+
+            weapon_ids = live_ids(changes, weapon_entities)
+            weapons = {}
+            if weapon_ids:
+                stmt = weapon_views_by_ids_stmt(weapon_ids, dialect)
+                weapons = {view.id: view for view in (WeaponView(*row) for row in db.execute(stmt))}
+
+            category_ids = live_ids(changes, category_entities)
+            categories = {}
+            if category_ids:
+                stmt = category_views_by_ids_stmt(category_ids, dialect)
+                categories = {view.id: view for view in (WeaponCategoryView(*row) for row in db.execute(stmt))}
+
+            return changes, weapons, categories
+        finally:
+            db.close()
+
+    def latest_seq(self, primary=False):
+        """
+        Obtener el último número de secuencia registrado
+
+        Args:
+            primary (bool): Leer de la primaria (sin retraso de réplica)
+
+        Returns:
+            int: Último seq (0 si el registro está vacío)
+        """
+        db = next(get_db() if primary else get_read_db())
+        try:
+            return db.execute(latest_seq_stmt()).scalar() or 0
+        finally:
+            db.close()
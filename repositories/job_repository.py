@@ -0,0 +1,307 @@
+"""
+Repository de la cola de trabajos (tabla jobs).
+
+Tomar un trabajo es una sola sentencia::
+
+    UPDATE jobs SET status = 'running', attempts = attempts + 1, ...
+    WHERE id = (SELECT id FROM jobs WHERE status = 'queued' AND run_at <= now
+                ORDER BY priority DESC, run_at, id LIMIT 1
+                FOR UPDATE SKIP LOCKED)
+    RETURNING *
+
+En PostgreSQL ``SKIP LOCKED`` hace que cada worker se salte las filas que otro
+está tomando en ese momento, en lugar de esperarlas. SQLite no tiene
+``FOR UPDATE`` (se omite al compilar), pero serializa las escrituras, así que
+la sentencia sigue siendo atómica.
+
+El fichero subido de un trabajo (job_files) se borra en la misma transacción
+que lo da por terminado, con éxito o fallido (``complete``, ``fail`` y
+``requeue_stale``; ``completion`` es para manejadores sin fichero).
+"""
+
+from datetime import timedelta
+from sqlalchemy import delete, func, select, update
+from config.database import get_db
+from models.job_model import Job, JobFile, STATUS_FAILED, STATUS_QUEUED, STATUS_RUNNING, STATUS_SUCCEEDED
+from models.weapons_model import utcnow
+from services.tracing_service import traced_methods
+
+
+@traced_methods('repository')
+class JobRepository:
+    """
+    Repository de la cola de trabajos
+
+    Proporciona métodos para:
+    - Encolar y consultar trabajos (y su fichero subido)
+    - Tomar el siguiente trabajo pendiente (SKIP LOCKED)
+    - Marcar un trabajo como terminado, reintentarlo o darlo por fallido
+    - Devolver a la cola los trabajos de workers caídos
+    - Purgar trabajos terminados antiguos
+    """
+
+    def enqueue(self, kind, payload, priority=0, max_attempts=3, data=None):
+        """
+        Encolar un trabajo
+
+        Args:
+            kind (str): Tipo de trabajo
+            payload (dict): Parámetros del trabajo
+            priority (int): Prioridad (mayor primero)
+            max_attempts (int): Intentos máximos
+            data (bytes|None): Fichero subido, que se guarda en job_files
+
+        Returns:
+            Job: Trabajo encolado con su ID asignado
+        """
+        db = next(get_db())
+        try:
+            job = Job(kind=kind, payload=payload, priority=priority, max_attempts=max_attempts,
+                      status=STATUS_QUEUED, attempts=0, run_at=utcnow())
+            db.add(job)
+            if data is not None:
+                db.flush()
+                db.add(JobFile(job_id=job.id, data=data))
+            db.commit()
+            return job
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            db.close()
+
+    def get(self, job_id):
+        """
+        Obtener un trabajo por ID (siempre de la primaria: el estado cambia a menudo)
+
+        Args:
+            job_id (int): ID del trabajo
+
+        Returns:
+            Job|None: Trabajo encontrado o None
+        """
+        db = next(get_db())
+        try:
+            return db.get(Job, job_id)
+        finally:
+            db.close()
+
+    def get_file(self, job_id):
+        """
+        Obtener el fichero subido de un trabajo
+
+        Args:
+            job_id (int): ID del trabajo
+
+        Returns:
+            bytes|None: Contenido del fichero, None si no tiene (o ya terminó)
+        """
+        db = next(get_db())
+        try:
+            return db.execute(select(JobFile.data).where(JobFile.job_id == job_id)).scalar()
+        finally:
+            db.close()
+
+    def claim(self, worker_id, kinds=None):
+        """
+        Tomar el siguiente trabajo pendiente
+
+        Args:
+            worker_id (str): Identificador del worker que lo ejecutará
+            kinds (list[str]|None): Limitar a estos tipos de trabajo
+
+        Returns:
+            Job|None: Trabajo tomado (ya en 'running'), o None si no hay ninguno listo
+        """
+        now = utcnow()
+        ready = select(Job.id).where(Job.status == STATUS_QUEUED, Job.run_at <= now)
+        if kinds:
+            ready = ready.where(Job.kind.in_(kinds))
+        ready = (
+            ready.order_by(Job.priority.desc(), Job.run_at, Job.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(Job)
+            .where(Job.id == ready, Job.status == STATUS_QUEUED)
+            .values(status=STATUS_RUNNING, attempts=Job.attempts + 1, locked_by=worker_id, locked_at=now)
+            .returning(Job)
+        )
+        db = next(get_db())
+        try:
+            job = db.scalars(stmt).first()
+            db.commit()
+            return job
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            db.close()
+
+    def complete(self, job_id, attempt, result=None):
+        """
+        Marcar un trabajo como terminado con éxito
+
+        Args:
+            job_id (int): ID del trabajo
+            attempt (int): Intento que termina (``attempts`` devuelto por claim)
+            result (dict|None): Resultado del trabajo
+        """
+        self._execute(self.completion(job_id, attempt, result), finished=True)
+
+    def completion(self, job_id, attempt, result=None):
+        """
+        Sentencia que marca un trabajo como terminado con éxito
+
+        Para los manejadores que la ejecutan en la transacción de su propia
+        escritura: si el trabajo ya no pertenece a este intento no afecta a
+        ninguna fila y el manejador debe revertir.
+
+        Args:
+            job_id (int): ID del trabajo
+            attempt (int): Intento que termina (``attempts`` devuelto por claim)
+            result (dict|None): Resultado del trabajo
+
+        Returns:
+            Update: ``UPDATE jobs`` condicionado al intento
+        """
+        return self._if_owned(job_id, attempt, status=STATUS_SUCCEEDED, result=result, last_error=None,
+                              locked_by=None, locked_at=None, finished_at=utcnow())
+
+    def heartbeat(self, job_id, attempt):
+        """
+        Renovar ``locked_at`` de un trabajo en curso para que requeue_stale no lo dé por abandonado
+
+        Args:
+            job_id (int): ID del trabajo
+            attempt (int): Intento en curso (``attempts`` devuelto por claim)
+
+        Returns:
+            bool: False si el trabajo ya no pertenece a este intento
+        """
+        return self._execute(self._if_owned(job_id, attempt, locked_at=utcnow())) > 0
+
+    def fail(self, job_id, attempt, error, retry_in=None):
+        """
+        Registrar un intento fallido
+
+        Args:
+            job_id (int): ID del trabajo
+            attempt (int): Intento que termina (``attempts`` devuelto por claim)
+            error (str): Descripción del error
+            retry_in (float|None): Segundos hasta el reintento; None para darlo
+                por fallido definitivamente
+        """
+        if retry_in is None:
+            self._execute(self._if_owned(job_id, attempt, status=STATUS_FAILED, last_error=error,
+                                         locked_by=None, locked_at=None, finished_at=utcnow()),
+                          finished=True)
+        else:
+            self._execute(self._if_owned(job_id, attempt, status=STATUS_QUEUED, last_error=error,
+                                         locked_by=None, locked_at=None,
+                                         run_at=utcnow() + timedelta(seconds=retry_in)))
+
+    def _if_owned(self, job_id, attempt, **values):
+        # Sólo si sigue en 'running' en el mismo intento: un trabajo devuelto a
+        # la cola por requeue_stale (y quizá tomado por otro worker) ya no
+        # pertenece a éste
+        return (
+            update(Job)
+            .where(Job.id == job_id, Job.status == STATUS_RUNNING, Job.attempts == attempt)
+            .values(**values)
+        )
+
+    def _execute(self, stmt, finished=False):
+        # finished: ``stmt`` termina el trabajo, cuyo fichero ya no hace falta
+        db = next(get_db())
+        try:
+            result = db.execute(stmt.returning(Job.id) if finished else stmt)
+            if finished:
+                job_ids = result.scalars().all()
+                rowcount = len(job_ids)
+                if job_ids:
+                    db.execute(delete(JobFile).where(JobFile.job_id.in_(job_ids)))
+            else:
+                rowcount = result.rowcount
+            db.commit()
+            return rowcount
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            db.close()
+
+    def requeue_stale(self, timeout_seconds):
+        """
+        Devolver a la cola los trabajos 'running' de workers que dejaron de responder
+
+        Los que ya agotaron sus intentos se marcan como fallidos.
+
+        Args:
+            timeout_seconds (float): Segundos tras los que un trabajo en curso se da por abandonado
+
+        Returns:
+            int: Trabajos devueltos a la cola o marcados como fallidos
+        """
+        now = utcnow()
+        stale = (Job.status == STATUS_RUNNING, Job.locked_at < now - timedelta(seconds=timeout_seconds))
+        error = 'Abandonado por el worker (timeout)'
+        db = next(get_db())
+        try:
+            exhausted = db.execute(
+                update(Job).where(*stale, Job.attempts >= Job.max_attempts)
+                .values(status=STATUS_FAILED, last_error=error, locked_by=None, locked_at=None, finished_at=now)
+                .returning(Job.id)
+            ).scalars().all()
+            if exhausted:
+                db.execute(delete(JobFile).where(JobFile.job_id.in_(exhausted)))
+            requeued = db.execute(
+                update(Job).where(*stale)
+                .values(status=STATUS_QUEUED, last_error=error, locked_by=None, locked_at=None, run_at=now)
+            ).rowcount
+            db.commit()
+            return len(exhausted) + requeued
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            db.close()
+
+    def purge_finished(self, older_than_seconds):
+        """
+        Eliminar trabajos terminados (con éxito o fallidos) antiguos
+
+        Args:
+            older_than_seconds (float): Antigüedad mínima de finished_at
+
+        Returns:
+            int: Trabajos eliminados
+        """
+        cutoff = utcnow() - timedelta(seconds=older_than_seconds)
+        db = next(get_db())
+        try:
+            deleted = db.execute(
+                delete(Job).where(Job.status.in_((STATUS_SUCCEEDED, STATUS_FAILED)), Job.finished_at < cutoff)
+            ).rowcount
+            db.commit()
+            return deleted
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            db.close()
+
+    def count_by_status(self):
+        """
+        Contar los trabajos de cada estado
+
+        Returns:
+            dict: {estado: número de trabajos}
+        """
+        db = next(get_db())
+        try:
+            return dict(db.execute(select(Job.status, func.count()).group_by(Job.status)).all())
+        finally:
+            db.close()
@@ -0,0 +1,46 @@
+"""
+Repository de bloqueos consultivos (advisory locks) de PostgreSQL.
+
+Sirven para coordinar trabajo entre workers sin tablas auxiliares: p. ej. que
+sólo un proceso a la vez recalcule una entrada de caché (services/cache.py).
+"""
+
+import hashlib
+from contextlib import contextmanager
+from sqlalchemy import text
+from config.database import get_db
+
+
+def lock_key(name):
+    """Clave bigint estable para ``name`` (las funciones pg_advisory_* usan enteros)."""
+    return int.from_bytes(hashlib.blake2b(name.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+class LockRepository:
+    """
+    Repository de bloqueos consultivos
+
+    Proporciona métodos para:
+    - Mantener un bloqueo con nombre mientras dura un bloque ``with``
+    """
+
+    @contextmanager
+    def advisory_lock(self, name):
+        """
+        Mantener el bloqueo consultivo ``name`` durante el bloque
+
+        Es un bloqueo de transacción (``pg_advisory_xact_lock``): espera si
+        otro proceso lo tiene y se libera al cerrar la sesión, aunque el
+        bloque falle. En otras bases de datos no bloquea nada (un solo proceso).
+
+        Args:
+            name (str): Nombre del bloqueo
+        """
+        db = next(get_db())
+        try:
+            if db.bind.dialect.name == 'postgresql':
+                db.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': lock_key(name)})
+            yield
+        finally:
+            # El rollback del cierre termina la transacción y libera el bloqueo
+            db.close()
@@ -0,0 +1,99 @@
+"""
+Repository de los token buckets compartidos (tabla rate_limit_buckets).
+
+Consumir un token es una sola sentencia ``INSERT ... ON CONFLICT DO UPDATE
+... WHERE`` que recarga el bucket según el tiempo transcurrido y sólo lo
+actualiza si queda al menos un token: si no devuelve fila, la petición se
+rechaza. Funciona igual en PostgreSQL y en SQLite.
+"""
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from config.database import get_db
+from models.rate_limit_model import RateLimitBucket
+
+
+class RateLimitRepository:
+    """
+    Repository para consumir tokens de los buckets compartidos
+
+    Proporciona métodos para:
+    - Consumir un token de forma atómica
+    - Consultar los tokens disponibles de un bucket
+    - Eliminar buckets inactivos
+    """
+
+    def consume(self, key, capacity, refill_rate, now):
+        """
+        Consumir un token del bucket ``key``
+
+        Args:
+            key (str): Clave del bucket
+            capacity (float): Tokens máximos (ráfaga)
+            refill_rate (float): Tokens recargados por segundo
+            now (float): Instante actual (epoch en segundos)
+
+        Returns:
+            float|None: Tokens restantes, o None si no había ninguno disponible
+        """
+        table = RateLimitBucket.__table__
+        db = next(get_db())
+        try:
+            postgresql = db.bind.dialect.name == 'postgresql'
+            insert = pg_insert if postgresql else sqlite_insert
+            least = func.least if postgresql else func.min
+            refilled = least(capacity, table.c.tokens + (now - table.c.updated_at) * refill_rate)
+
+            stmt = insert(table).values(key=key, tokens=capacity - 1, updated_at=now)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.key],
+                set_={'tokens': refilled - 1, 'updated_at': now},
+                where=refilled >= 1,
+            ).returning(table.c.tokens)
+            remaining = db.execute(stmt).scalar()
+            db.commit()
+            return remaining
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def available(self, key, capacity, refill_rate, now):
+        """
+        Tokens disponibles en ``key`` sin consumir ninguno
+
+        Returns:
+            float: Tokens disponibles (``capacity`` si el bucket no existe)
+        """
+        table = RateLimitBucket.__table__
+        db = next(get_db())
+        try:
+            row = db.execute(
+                select(table.c.tokens, table.c.updated_at).where(table.c.key == key)
+            ).first()
+            if row is None:
+                return capacity
+            tokens = row.tokens + (now - row.updated_at) * refill_rate
+            return min(capacity, tokens)
+        finally:
+            db.close()
+
+    def purge_idle(self, older_than):
+        """
+        Eliminar los buckets sin actividad desde ``older_than`` (ya estarían llenos)
+
+        Returns:
+            int: Buckets eliminados
+        """
+        db = next(get_db())
+        try:
+            result = db.execute(delete(RateLimitBucket).where(RateLimitBucket.updated_at < older_than))
+            db.commit()
+            return result.rowcount
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
@@ -0,0 +1,114 @@
+"""
+Repository para los contadores incrementales del catálogo.
+
+Los contadores se actualizan con upserts ``... SET value = value + n``
+en la transacción de cada escritura (ver models/stats_model.py), para que las
+estadísticas se lean con una sola consulta por clave primaria en lugar de
+ejecutar ``COUNT(*)`` sobre las tablas completas.
+"""
+
+from sqlalchemy import delete, func, text, update
+from config.database import get_db, get_read_db
+from models.stats_model import CATEGORY_COUNTER_PREFIX, CatalogCounter, category_counter_name, upsert
+from models.weapons_model import Weapon, WeaponCategory
+from models.user_model import User
+from services.tracing_service import traced_methods
+
+
+@traced_methods('repository')
+class StatsRepository:
+    """
+    Repository para leer y mantener los contadores del catálogo
+
+    Proporciona métodos para:
+    - Leer todos los contadores
+    - Reconstruir los contadores desde las tablas (operación costosa)
+    """
+
+    def get_all(self):
+        """
+        Obtener todos los contadores
+
+        Returns:
+            dict: Diccionario {nombre: valor}
+        """
+        db = next(get_read_db())
+        try:
+            rows = db.query(CatalogCounter.name, CatalogCounter.value).all()
+            return {name: value for name, value in rows}
+        finally:
+            db.close()
+
+    def seed(self):
+        """
+        Inicializar los contadores si la base todavía no los tiene
+
+        Las bases migradas los reciben de la revisión 0008; ``init_db`` lo
+        llama para las creadas con ``create_all``.
+
+        Returns:
+            bool: True si se han calculado ahora
+        """
+        db = next(get_db())
+        try:
+            seeded = db.query(CatalogCounter.name).filter(CatalogCounter.name == 'weapons').first() is not None
+        finally:
+            db.close()
+        if seeded:
+            return False
+        self.rebuild()
+        return True
+
+    def rebuild(self):
+        """
+        Recalcular todos los contadores desde las tablas
+
+        Ejecuta los ``COUNT(*)`` completos, por lo que sólo debe usarse al
+        inicializar los contadores o para corregir una desviación.
+
+        Los valores se escriben con un upsert (dos reconstrucciones simultáneas
+        no chocan en la clave primaria) y los ``COUNT(*)`` se hacen con
+        catalog_counters bloqueada para escritura: una escritura que ya tocó un
+        contador termina antes de contar, y una que llega después suma sobre el
+        valor reconstruido, así que ningún incremento se pierde.
+
+        Returns:
+            dict: Contadores recalculados {nombre: valor}
+        """
+        table = CatalogCounter.__table__
+        db = next(get_db())
+        try:
+            if db.bind.dialect.name == 'postgresql':
+                db.execute(text('LOCK TABLE catalog_counters IN EXCLUSIVE MODE'))
+            else:
+                # SQLite: una escritura vacía abre ya la transacción de escritura
+                db.execute(update(table).where(table.c.name.is_(None)).values(value=table.c.value))
+
+            counters = {
+                'categories': db.query(func.count(WeaponCategory.id)).scalar(),
+                'weapons': db.query(func.count(Weapon.id)).scalar(),
+                'users': db.query(func.count(User.id)).scalar(),
+            }
+            for (category_id,) in db.query(WeaponCategory.id).all():
+                counters[category_counter_name(category_id)] = 0
+            per_category = (
+                db.query(Weapon.category_id, func.count(Weapon.id))
+                .filter(Weapon.category_id.isnot(None))
+                .group_by(Weapon.category_id)
+                .all()
+            )
+            for category_id, count in per_category:
+                counters[category_counter_name(category_id)] = count
+
+            insert = upsert(db.connection())
+            stmt = insert(table).values([{'name': name, 'value': value} for name, value in counters.items()])
+            db.execute(stmt.on_conflict_do_update(index_elements=[table.c.name], set_={'value': stmt.excluded.value}))
+            # Contadores de categorías que ya no existen
+            db.execute(delete(table).where(table.c.name.not_in(list(counters))))
+            db.commit()
+            return counters
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            db.close()
@@ -2,20 +2,54 @@
 Repositorio para operaciones de base de datos de usuarios.
 """
 
-from config.database import get_db
-from models.user_model import User, UserRole
-from sqlalchemy import or_
+from config.database import get_db, get_read_db
+from models.user_model import USER_VIEW_COLUMNS, User, UserRole, UserView
+from sqlalchemy import func, lambda_stmt, or_, select, update
 from datetime import datetime
+from services.tracing_service import traced_methods
 
 
+# Sentencias compartidas con repositories/async_user_repository.py. Las
+# búsquedas calientes (cada petición autenticada y cada login) como
+# lambda_stmt: construidas y compiladas una vez por proceso
+def user_by_id_stmt(user_id):
+    return lambda_stmt(lambda: select(User).where(User.id == user_id))
+
+
+def user_by_username_stmt(username):
+    return lambda_stmt(lambda: select(User).where(User.username == username))
+
+
+def user_by_email_stmt(email):
+    return lambda_stmt(lambda: select(User).where(User.email == email))
+
+
+def exists_stmt(username, email):
+    return select(User.id).where(or_(User.username == username, User.email == email)).limit(1)
+
+
+def update_stmt(user_id, data):
+    """Un único ``UPDATE ... RETURNING`` con la fila ya actualizada."""
+    return update(User).where(User.id == user_id).values(**data).returning(User)
+
+
+def last_login_stmt(user_id):
+    return update(User).where(User.id == user_id).values(last_login=datetime.utcnow())
+
+
+def count_admins_stmt():
+    return select(func.count(User.id)).where(User.role == UserRole.ADMIN)
+
+
+@traced_methods('repository')
 class UserRepository:
     """Repositorio para gestionar usuarios en la base de datos."""
     
     def get_all(self):
-        """Obtiene todos los usuarios."""
-        db = next(get_db())
+        """Obtiene todos los usuarios como UserView (sólo lectura, sin password_hash)."""
+        db = next(get_read_db())
         try:
-            return db.query(User).all()
+            return [UserView(*row) for row in db.execute(select(*USER_VIEW_COLUMNS))]
         finally:
             db.close()
     
@@ -29,9 +63,9 @@ class UserRepository:
         Returns:
             User o None si no existe
         """
-        db = next(get_db())
+        db = next(get_read_db())
         try:
-            return db.query(User).filter_by(id=user_id).first()
+            return db.execute(user_by_id_stmt(user_id)).scalars().first()
         finally:
             db.close()
     
@@ -49,8 +83,8 @@ class UserRepository:
         try:
             user = User(**data)
             db.add(user)
+            # INSERT ... RETURNING id, created_at (eager_defaults); sin refresh
             db.commit()
-            db.refresh(user)
             return user
         finally:
             db.close()
@@ -68,13 +102,12 @@ class UserRepository:
         """
         db = next(get_db())
         try:
-            user = db.query(User).filter_by(id=user_id).first()
-            if user:
-                for key, value in data.items():
-                    setattr(user, key, value)
-                db.commit()
-                db.refresh(user)
+            user = db.execute(update_stmt(user_id, data)).scalars().first()
+            db.commit()
             return user
+        except Exception:
+            db.rollback()
+            raise
         finally:
             db.close()
     
@@ -111,7 +144,7 @@ class UserRepository:
         """
         db = next(get_db())
         try:
-            return db.query(User).filter_by(username=username).first()
+            return db.execute(user_by_username_stmt(username)).scalars().first()
         finally:
             db.close()
     
@@ -127,7 +160,7 @@ class UserRepository:
         """
         db = next(get_db())
         try:
-            return db.query(User).filter_by(email=email).first()
+            return db.execute(user_by_email_stmt(email)).scalars().first()
         finally:
             db.close()
     
@@ -144,9 +177,7 @@ class UserRepository:
         """
         db = next(get_db())
         try:
-            return db.query(User).filter(
-                or_(User.username == username, User.email == email)
-            ).first() is not None
+            return db.execute(exists_stmt(username, email)).first() is not None
         finally:
             db.close()
     
@@ -162,12 +193,9 @@ class UserRepository:
         """
         db = next(get_db())
         try:
-            user = db.query(User).filter_by(id=user_id).first()
-            if user:
-                user.last_login = datetime.utcnow()
-                db.commit()
-                return True
-            return False
+            result = db.execute(last_login_stmt(user_id))
+            db.commit()
+            return result.rowcount > 0
         finally:
             db.close()
     
@@ -178,7 +206,7 @@ class UserRepository:
         Returns:
             list: Lista de usuarios admin
         """
-        db = next(get_db())
+        db = next(get_read_db())
         try:
             return db.query(User).filter(User.role == UserRole.ADMIN).all()
         finally:
@@ -191,9 +219,9 @@ class UserRepository:
         Returns:
             int: Número de administradores
         """
-        db = next(get_db())
+        db = next(get_read_db())
         try:
-            return db.query(User).filter(User.role == UserRole.ADMIN).count()
+            return db.execute(count_admins_stmt()).scalar_one()
         finally:
             db.close()
     
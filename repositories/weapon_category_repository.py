@@ -5,9 +5,55 @@ Este módulo proporciona una capa de abstracción entre la lógica de negocio
 y la base de datos PostgreSQL para operaciones CRUD de categorías de armas.
 """
 
-from config.database import get_db
-from models.weapons_model import WeaponCategory
+from sqlalchemy import delete, func, lambda_stmt, select, update
+from sqlalchemy.orm.exc import StaleDataError
+from config.database import get_db, get_read_db
+from models import change_model, stats_model
+from models.weapons_model import CATEGORY_VIEW_COLUMNS, WeaponCategory, WeaponCategoryView, id_in, utcnow
+from services.tracing_service import traced_methods
 
+# Sentencias compartidas con repositories/async_weapon_category_repository.py;
+# las búsquedas calientes como lambda_stmt (ver repositories/weapon_repository.py)
+def category_by_id_stmt(category_id):
+    return lambda_stmt(lambda: select(WeaponCategory).where(WeaponCategory.id == category_id))
+
+
+def category_view_by_id_stmt(category_id):
+    return lambda_stmt(lambda: select(*CATEGORY_VIEW_COLUMNS).where(WeaponCategory.id == category_id))
+
+
+def category_views_by_ids_stmt(category_ids, dialect):
+    return select(*CATEGORY_VIEW_COLUMNS).where(id_in(WeaponCategory.id, category_ids, dialect))
+
+
+def version_stmt(category_id):
+    return select(WeaponCategory.version, WeaponCategory.updated_at).where(WeaponCategory.id == category_id)
+
+
+def collection_version_stmt():
+    return select(func.count(WeaponCategory.id), func.max(WeaponCategory.updated_at))
+
+
+def patch_stmt(category_id, changes, expected_versions=None):
+    """``UPDATE ... RETURNING`` de las columnas de ``changes`` con la versión y ``updated_at``."""
+    table = WeaponCategory.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == category_id)
+        .values(**changes, version=table.c.version + 1, updated_at=utcnow())
+        .returning(*CATEGORY_VIEW_COLUMNS)
+    )
+    if expected_versions is not None:
+        stmt = stmt.where(table.c.version.in_(expected_versions))
+    return stmt
+
+
+def delete_stmt(category_id):
+    table = WeaponCategory.__table__
+    return delete(table).where(table.c.id == category_id).returning(table.c.id, table.c.version)
+
+
+@traced_methods('repository')
 class WeaponCategoryRepository:
     """
     Repository para operaciones CRUD de categorías de armas en PostgreSQL
@@ -25,29 +71,69 @@ class WeaponCategoryRepository:
         Obtener todas las categorías de armas
         
         Returns:
-            list[WeaponCategory]: Lista de objetos WeaponCategory
+            list[WeaponCategoryView]: Categorías de sólo lectura (sin BLOB ni instancias ORM)
         """
-        db = next(get_db())
-        try:
-            categories = db.query(WeaponCategory).all()
-            return categories
-        finally:
-            db.close()
+        return self._views(select(*CATEGORY_VIEW_COLUMNS))
     
     def get_by_id(self, category_id):
         """
         Obtener una categoría específica por su ID
         
+        Carga la instancia ORM completa, con el icono; para servir JSON usar
+        ``get_view``.
+        
         Args:
             category_id (int): ID de la categoría
             
         Returns:
             WeaponCategory|None: Objeto WeaponCategory si existe, None si no se encuentra
         """
-        db = next(get_db())
+        db = next(get_read_db())
         try:
-            category = db.query(WeaponCategory).filter(WeaponCategory.id == category_id).first()
-            return category
+            return db.execute(category_by_id_stmt(category_id)).scalars().first()
+        finally:
+            db.close()
+    
+    def get_view(self, category_id):
+        """
+        Obtener una categoría de sólo lectura por su ID
+        
+        Args:
+            category_id (int): ID de la categoría
+            
+        Returns:
+            WeaponCategoryView|None: Categoría sin el icono, None si no se encuentra
+        """
+        views = self._views(category_view_by_id_stmt(category_id))
+        return views[0] if views else None
+    
+    def get_by_ids(self, category_ids):
+        """
+        Obtener varias categorías por sus IDs en una sola consulta
+        
+        ``id = ANY(:ids)`` en PostgreSQL (ver ``id_in``).
+        
+        Args:
+            category_ids (Iterable[int]): IDs buscados
+            
+        Returns:
+            list[WeaponCategoryView]: Las que existen (sin orden garantizado)
+        """
+        category_ids = list(category_ids)
+        if not category_ids:
+            return []
+        db = next(get_read_db())
+        try:
+            stmt = category_views_by_ids_stmt(category_ids, db.bind.dialect.name)
+            return [WeaponCategoryView(*row) for row in db.execute(stmt)]
+        finally:
+            db.close()
+    
+    def _views(self, stmt):
+        """Ejecuta ``stmt`` (columnas de CATEGORY_VIEW_COLUMNS) en la réplica y construye las vistas."""
+        db = next(get_read_db())
+        try:
+            return [WeaponCategoryView(*row) for row in db.execute(stmt)]
         finally:
             db.close()
     
@@ -70,8 +156,8 @@ class WeaponCategoryRepository:
                 description=data.get('description', '')
             )
             db.add(category)
+            # INSERT ... RETURNING id (eager_defaults); sin refresh tras el commit
             db.commit()
-            db.refresh(category)
             return category
         except Exception as e:
             db.rollback()
@@ -79,28 +165,60 @@ class WeaponCategoryRepository:
         finally:
             db.close()
     
-    def update(self, category_id, data):
+    def update(self, category_id, data, expected_versions=None):
         """
-        Actualizar una categoría existente
+        Actualizar una categoría existente (todas sus columnas editables)
+        
+        Es un ``patch`` con name y description: un único ``UPDATE ... RETURNING``.
         
         Args:
             category_id (int): ID de la categoría a actualizar
             data (dict): Diccionario con los nuevos datos
                 - name (str): Nuevo nombre de la categoría
                 - description (str): Nueva descripción
+            expected_versions (set[int]|None): Versiones aceptadas (If-Match)
             
         Returns:
-            WeaponCategory|None: Objeto actualizado si existe, None si no se encuentra
+            WeaponCategoryView|None: Categoría actualizada, None si no se encuentra
+            
+        Raises:
+            StaleDataError: Si la versión actual no es una de las esperadas
+            IntegrityError: Si el nuevo nombre ya existe
+        """
+        return self.patch(category_id, {
+            'name': data['name'],
+            'description': data.get('description', '')
+        }, expected_versions)
+    
+    def patch(self, category_id, changes, expected_versions=None):
+        """
+        Actualizar sólo las columnas indicadas con un único ``UPDATE ... RETURNING``
+        
+        Args:
+            category_id (int): ID de la categoría
+            changes (dict): Columnas a cambiar (name, description)
+            expected_versions (set[int]|None): Versiones aceptadas (If-Match)
+            
+        Returns:
+            WeaponCategoryView|None: Categoría actualizada, o None si no existe
+            
+        Raises:
+            StaleDataError: Si la versión actual no es una de las esperadas
+            IntegrityError: Si el nuevo nombre ya existe
         """
         db = next(get_db())
         try:
-            category = db.query(WeaponCategory).filter(WeaponCategory.id == category_id).first()
-            if category:
-                category.name = data['name']
-                category.description = data.get('description', '')
-                db.commit()
-                db.refresh(category)
-            return category
+            row = db.execute(patch_stmt(category_id, changes, expected_versions)).first()
+            if row is None:
+                db.rollback()
+                if expected_versions is not None and self.get_version(category_id) is not None:
+                    raise StaleDataError(f"La categoría {category_id} no está en la versión indicada")
+                return None
+            change_model.defer(db, [
+                change_model.change_row('category', row.id, change_model.OP_UPDATE, row.version)
+            ])
+            db.commit()
+            return WeaponCategoryView(*row)
         except Exception as e:
             db.rollback()
             raise e
@@ -111,20 +229,31 @@ class WeaponCategoryRepository:
         """
         Eliminar una categoría
         
+        Un único ``DELETE ... RETURNING``: si la categoría aún tiene armas, la
+        clave foránea (ON DELETE RESTRICT) rechaza el borrado con IntegrityError.
+        
         Args:
             category_id (int): ID de la categoría a eliminar
             
         Returns:
             bool: True si se eliminó correctamente, False si no existe
+            
+        Raises:
+            IntegrityError: Si alguna arma pertenece a la categoría
         """
         db = next(get_db())
         try:
-            category = db.query(WeaponCategory).filter(WeaponCategory.id == category_id).first()
-            if category:
-                db.delete(category)
-                db.commit()
-                return True
-            return False
+            row = db.execute(delete_stmt(category_id)).first()
+            if row is None:
+                db.rollback()
+                return False
+            change_model.defer(db, [
+                change_model.change_row('category', row.id, change_model.OP_DELETE, row.version)
+            ])
+            stats_model.apply(db.connection(), {'categories': -1},
+                              deleted=[stats_model.category_counter_name(row.id)])
+            db.commit()
+            return True
         except Exception as e:
             db.rollback()
             raise e
@@ -149,3 +278,30 @@ class WeaponCategoryRepository:
             return exists
         finally:
             db.close()
+    
+    def get_version(self, category_id):
+        """
+        Obtener sólo la versión y la fecha de modificación de una categoría
+        
+        Returns:
+            Row|None: Fila (version, updated_at) o None si no existe
+        """
+        db = next(get_read_db())
+        try:
+            return db.execute(version_stmt(category_id)).first()
+        finally:
+            db.close()
+    
+    def collection_version(self):
+        """
+        Número de categorías y última modificación
+        
+        Returns:
+            tuple: (cantidad, updated_at más reciente o None)
+        """
+        db = next(get_read_db())
+        try:
+            count, newest = db.execute(collection_version_stmt()).one()
+            return count, newest
+        finally:
+            db.close()
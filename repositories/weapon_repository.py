@@ -5,9 +5,78 @@ Este módulo proporciona una capa de abstracción entre la lógica de negocio
 y la base de datos PostgreSQL para operaciones CRUD de armas.
 """
 
-from config.database import get_db
-from models.weapons_model import Weapon
+from sqlalchemy import delete, func, lambda_stmt, select, update
+from sqlalchemy.orm.exc import StaleDataError
+from config.database import get_db, get_read_db
+from models import change_model, stats_model
+from models.weapons_model import WEAPON_VIEW_COLUMNS, Weapon, WeaponView, id_in, utcnow
+from services.tracing_service import traced_methods
 
+# Sentencias compartidas con repositories/async_weapon_repository.py.
+# Búsquedas calientes como lambda_stmt: la sentencia se construye y compila
+# una vez por proceso (la clave de caché es la propia lambda) y en cada
+# llamada sólo cambia el parámetro capturado
+def weapon_by_id_stmt(weapon_id):
+    return lambda_stmt(lambda: select(Weapon).where(Weapon.id == weapon_id))
+
+
+def weapon_view_by_id_stmt(weapon_id):
+    return lambda_stmt(lambda: select(*WEAPON_VIEW_COLUMNS).where(Weapon.id == weapon_id))
+
+
+def weapon_views_by_category_stmt(category_id):
+    return lambda_stmt(lambda: select(*WEAPON_VIEW_COLUMNS).where(Weapon.category_id == category_id))
+
+
+def weapon_views_by_ids_stmt(weapon_ids, dialect):
+    return select(*WEAPON_VIEW_COLUMNS).where(id_in(Weapon.id, weapon_ids, dialect))
+
+
+def count_by_category_stmt(category_id):
+    return lambda_stmt(lambda: select(func.count(Weapon.id)).where(Weapon.category_id == category_id))
+
+
+def count_grouped_stmt():
+    return select(Weapon.category_id, func.count(Weapon.id)).group_by(Weapon.category_id)
+
+
+def version_stmt(weapon_id):
+    return select(Weapon.version, Weapon.updated_at).where(Weapon.id == weapon_id)
+
+
+def collection_version_stmt(category_id=None):
+    stmt = select(func.count(Weapon.id), func.max(Weapon.updated_at))
+    if category_id is not None:
+        stmt = stmt.where(Weapon.category_id == category_id)
+    return stmt
+
+
+def patch_stmt(weapon_id, changes, expected_versions=None):
+    """``UPDATE ... RETURNING`` de las columnas de ``changes`` con la versión y ``updated_at``."""
+    table = Weapon.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == weapon_id)
+        .values(**changes, version=table.c.version + 1, updated_at=utcnow())
+        .returning(*WEAPON_VIEW_COLUMNS)
+    )
+    if expected_versions is not None:
+        stmt = stmt.where(table.c.version.in_(expected_versions))
+    return stmt
+
+
+def previous_category_stmt(weapon_id):
+    """Categoría actual del arma, bloqueada hasta el final de la transacción."""
+    table = Weapon.__table__
+    return select(table.c.category_id).where(table.c.id == weapon_id).with_for_update()
+
+
+def delete_stmt(weapon_id):
+    table = Weapon.__table__
+    return delete(table).where(table.c.id == weapon_id).returning(table.c.id, table.c.category_id, table.c.version)
+
+
+@traced_methods('repository')
 class WeaponRepository:
     """
     Repository para operaciones CRUD de armas en PostgreSQL
@@ -25,32 +94,42 @@ class WeaponRepository:
         Obtener todas las armas
         
         Returns:
-            list[Weapon]: Lista de objetos Weapon
+            list[WeaponView]: Armas de sólo lectura (sin BLOB ni instancias ORM)
         """
-        db = next(get_db())
-        try:
-            weapons = db.query(Weapon).all()
-            return weapons
-        finally:
-            db.close()
+        return self._views(select(*WEAPON_VIEW_COLUMNS))
     
     def get_by_id(self, weapon_id):
         """
         Obtener un arma específica por su ID
         
+        Carga la instancia ORM completa, con la imagen; para servir JSON usar
+        ``get_view``.
+        
         Args:
             weapon_id (int): ID del arma
             
         Returns:
             Weapon|None: Objeto Weapon si existe, None si no se encuentra
         """
-        db = next(get_db())
+        db = next(get_read_db())
         try:
-            weapon = db.query(Weapon).filter(Weapon.id == weapon_id).first()
-            return weapon
+            return db.execute(weapon_by_id_stmt(weapon_id)).scalars().first()
         finally:
             db.close()
     
+    def get_view(self, weapon_id):
+        """
+        Obtener un arma de sólo lectura por su ID
+        
+        Args:
+            weapon_id (int): ID del arma
+            
+        Returns:
+            WeaponView|None: Arma sin la imagen, None si no se encuentra
+        """
+        views = self._views(weapon_view_by_id_stmt(weapon_id))
+        return views[0] if views else None
+    
     def get_by_category(self, category_id):
         """
         Obtener todas las armas de una categoría específica
@@ -59,12 +138,37 @@ class WeaponRepository:
             category_id (int): ID de la categoría
             
         Returns:
-            list[Weapon]: Lista de armas que pertenecen a la categoría
+            list[WeaponView]: Armas de sólo lectura que pertenecen a la categoría
         """
-        db = next(get_db())
+        return self._views(weapon_views_by_category_stmt(category_id))
+    
+    def get_by_ids(self, weapon_ids):
+        """
+        Obtener varias armas por sus IDs en una sola consulta
+        
+        ``id = ANY(:ids)`` en PostgreSQL (ver ``id_in``).
+        
+        Args:
+            weapon_ids (Iterable[int]): IDs buscados
+            
+        Returns:
+            list[WeaponView]: Las que existen (sin orden garantizado)
+        """
+        weapon_ids = list(weapon_ids)
+        if not weapon_ids:
+            return []
+        db = next(get_read_db())
         try:
-            weapons = db.query(Weapon).filter(Weapon.category_id == category_id).all()
-            return weapons
+            stmt = weapon_views_by_ids_stmt(weapon_ids, db.bind.dialect.name)
+            return [WeaponView(*row) for row in db.execute(stmt)]
+        finally:
+            db.close()
+    
+    def _views(self, stmt):
+        """Ejecuta ``stmt`` (columnas de WEAPON_VIEW_COLUMNS) en la réplica y construye las vistas."""
+        db = next(get_read_db())
+        try:
+            return [WeaponView(*row) for row in db.execute(stmt)]
         finally:
             db.close()
     
@@ -89,8 +193,8 @@ class WeaponRepository:
                 description=data.get('description', '')
             )
             db.add(weapon)
+            # INSERT ... RETURNING id (eager_defaults); sin refresh tras el commit
             db.commit()
-            db.refresh(weapon)
             return weapon
         except Exception as e:
             db.rollback()
@@ -98,9 +202,54 @@ class WeaponRepository:
         finally:
             db.close()
     
-    def update(self, weapon_id, data):
+    def create_many(self, items, finish=None):
+        """
+        Crear varias armas en una sola transacción (importaciones masivas)
+
+        Los INSERT se agrupan en lotes con RETURNING; si alguno falla no se
+        crea ninguna, de modo que la importación se puede reintentar entera.
+
+        Args:
+            items (list[dict]): Datos de cada arma (name, category_id, description)
+            finish (callable|None): Recibe las armas creadas y devuelve una
+                sentencia que se ejecuta en la misma transacción (p. ej. marcar
+                el trabajo de importación como terminado); si no afecta a
+                ninguna fila se revierte todo
+
+        Returns:
+            list[Weapon]|None: Armas creadas, en el mismo orden; None si
+            ``finish`` no afectó a ninguna fila
+
+        Raises:
+            IntegrityError: Si alguna ``category_id`` no existe
         """
-        Actualizar un arma existente
+        db = next(get_db())
+        try:
+            weapons = [
+                Weapon(name=data['name'], category_id=data['category_id'],
+                       description=data.get('description', ''))
+                for data in items
+            ]
+            db.add_all(weapons)
+            if finish is not None:
+                db.flush()
+                if db.execute(finish(weapons)).rowcount == 0:
+                    db.rollback()
+                    return None
+            db.commit()
+            return weapons
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            db.close()
+
+    def update(self, weapon_id, data, expected_versions=None):
+        """
+        Actualizar un arma existente (todas sus columnas editables)
+        
+        Es un ``patch`` con name, category_id y description: un único
+        ``UPDATE ... RETURNING`` sin cargar ni refrescar la fila.
         
         Args:
             weapon_id (int): ID del arma a actualizar
@@ -108,44 +257,126 @@ class WeaponRepository:
                 - name (str): Nuevo nombre del arma
                 - category_id (int): Nueva categoría
                 - description (str): Nueva descripción
+            expected_versions (set[int]|None): Versiones aceptadas (If-Match)
+            
+        Returns:
+            tuple|None: (WeaponView actualizada, categoría anterior), None si no se encuentra
+            
+        Raises:
+            StaleDataError: Si la versión actual no es una de las esperadas
+            IntegrityError: Si ``category_id`` no existe
+        """
+        return self.patch(weapon_id, {
+            'name': data['name'],
+            'category_id': data['category_id'],
+            'description': data.get('description', '')
+        }, expected_versions)
+    
+    def patch(self, weapon_id, changes, expected_versions=None):
+        """
+        Actualizar sólo las columnas indicadas con un único ``UPDATE ... RETURNING``
+        
+        No carga la fila antes ni la refresca después: la versión y
+        ``updated_at`` se actualizan en la misma sentencia y la categoría la
+        valida la clave foránea. Si cambia ``category_id`` se lee (y bloquea)
+        antes la categoría anterior, que necesitan los contadores.
+        
+        Args:
+            weapon_id (int): ID del arma
+            changes (dict): Columnas a cambiar (name, category_id, description)
+            expected_versions (set[int]|None): Versiones aceptadas (If-Match)
             
         Returns:
-            Weapon|None: Objeto actualizado si existe, None si no se encuentra
+            tuple|None: (WeaponView actualizada, categoría anterior), o None si
+                        el arma no existe
+            
+        Raises:
+            StaleDataError: Si la versión actual no es una de las esperadas
+            IntegrityError: Si ``category_id`` no existe
         """
         db = next(get_db())
         try:
-            weapon = db.query(Weapon).filter(Weapon.id == weapon_id).first()
-            if weapon:
-                weapon.name = data['name']
-                weapon.category_id = data['category_id']
-                weapon.description = data.get('description', '')
-                db.commit()
-                db.refresh(weapon)
-            return weapon
+            previous_category_id = None
+            if 'category_id' in changes:
+                previous_category_id = db.execute(previous_category_stmt(weapon_id)).scalar()
+            row = db.execute(patch_stmt(weapon_id, changes, expected_versions)).first()
+            if row is None:
+                db.rollback()
+                if expected_versions is not None and self.get_version(weapon_id) is not None:
+                    raise StaleDataError(f"El arma {weapon_id} no está en la versión indicada")
+                return None
+            change_model.defer(db, [
+                change_model.change_row('weapon', row.id, change_model.OP_UPDATE, row.version)
+            ])
+            if 'category_id' in changes:
+                stats_model.apply(db.connection(), stats_model.weapon_moved_deltas(previous_category_id, row.category_id))
+            db.commit()
+            return WeaponView(*row), previous_category_id
         except Exception as e:
             db.rollback()
             raise e
         finally:
             db.close()
     
+    def set_image(self, weapon_id, image_data, mime_type):
+        """
+        Guardar la imagen de un arma con un único ``UPDATE ... RETURNING``
+
+        Args:
+            weapon_id (int): ID del arma
+            image_data (bytes): Imagen ya procesada
+            mime_type (str): Tipo MIME de la imagen
+
+        Returns:
+            WeaponView|None: Arma actualizada, None si no se encuentra
+        """
+        table = Weapon.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == weapon_id)
+            .values(image_data=image_data, image_mime_type=mime_type,
+                    version=table.c.version + 1, updated_at=utcnow())
+            .returning(*WEAPON_VIEW_COLUMNS)
+        )
+        db = next(get_db())
+        try:
+            row = db.execute(stmt).first()
+            if row is None:
+                db.rollback()
+                return None
+            change_model.defer(db, [
+                change_model.change_row('weapon_image', row.id, change_model.OP_UPDATE, row.version)
+            ])
+            db.commit()
+            return WeaponView(*row)
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            db.close()
+
     def delete(self, weapon_id):
         """
-        Eliminar un arma
+        Eliminar un arma con un único ``DELETE ... RETURNING``
         
         Args:
             weapon_id (int): ID del arma a eliminar
             
         Returns:
-            bool: True si se eliminó correctamente, False si no existe
+            Row|None: Fila (id, category_id, version) del arma eliminada, None si no existe
         """
         db = next(get_db())
         try:
-            weapon = db.query(Weapon).filter(Weapon.id == weapon_id).first()
-            if weapon:
-                db.delete(weapon)
-                db.commit()
-                return True
-            return False
+            row = db.execute(delete_stmt(weapon_id)).first()
+            if row is None:
+                db.rollback()
+                return None
+            change_model.defer(db, [
+                change_model.change_row('weapon', row.id, change_model.OP_DELETE, row.version)
+            ])
+            stats_model.apply(db.connection(), stats_model.weapon_deltas(row.category_id, -1))
+            db.commit()
+            return row
         except Exception as e:
             db.rollback()
             raise e
@@ -156,7 +387,8 @@ class WeaponRepository:
         """
         Contar cuántas armas pertenecen a una categoría específica
         
-        Útil para validar si una categoría tiene armas antes de eliminarla
+        Sólo se usa para el mensaje de error cuando la clave foránea impide
+        borrar una categoría
         
         Args:
             category_id (int): ID de la categoría
@@ -164,9 +396,56 @@ class WeaponRepository:
         Returns:
             int: Cantidad de armas en la categoría
         """
-        db = next(get_db())
+        db = next(get_read_db())
+        try:
+            return db.execute(count_by_category_stmt(category_id)).scalar_one()
+        finally:
+            db.close()
+    
+    def count_grouped_by_category(self):
+        """
+        Contar las armas de todas las categorías con un único GROUP BY
+        
+        Evita una consulta por categoría (N+1) al listar categorías con su
+        número de armas; se apoya en el índice sobre weapons.category_id.
+        
+        Returns:
+            dict: Diccionario {category_id: cantidad de armas}
+        """
+        db = next(get_read_db())
+        try:
+            return {category_id: count for category_id, count in db.execute(count_grouped_stmt())}
+        finally:
+            db.close()
+    
+    def get_version(self, weapon_id):
+        """
+        Obtener sólo la versión y la fecha de modificación de un arma
+        
+        Consulta barata para responder peticiones condicionales sin cargar
+        ni serializar la fila completa.
+        
+        Returns:
+            Row|None: Fila (version, updated_at) o None si no existe
+        """
+        db = next(get_read_db())
+        try:
+            return db.execute(version_stmt(weapon_id)).first()
+        finally:
+            db.close()
+    
+    def collection_version(self, category_id=None):
+        """
+        Número de armas y última modificación (de todas o de una categoría)
+        
+        El número detecta los borrados, que no cambian la última modificación.
+        
+        Returns:
+            tuple: (cantidad, updated_at más reciente o None)
+        """
+        db = next(get_read_db())
         try:
-            count = db.query(Weapon).filter(Weapon.category_id == category_id).count()
-            return count
+            count, newest = db.execute(collection_version_stmt(category_id)).one()
+            return count, newest
         finally:
             db.close()
@@ -0,0 +1,107 @@
+"""
+Compara dos resultados de load_test.py (p. ej. antes y después de un commit)
+
+Muestra, por operación, la variación de req/s, latencias, consultas SQL y
+bytes por petición, y marca las regresiones que superan el umbral.
+
+Uso:
+    python -m scripts.benchmark.compare_results bench/base.json bench/nuevo.json --threshold 10
+    python -m scripts.benchmark.compare_results base.json nuevo.json --fail-on-regression
+"""
+
+import argparse
+import json
+import sys
+
+# (clave, etiqueta, True si un valor mayor es mejor)
+METRICS = [
+    (('rps',), 'req/s', True),
+    (('latency_ms', 'p50'), 'p50 ms', False),
+    (('latency_ms', 'p95'), 'p95 ms', False),
+    (('latency_ms', 'p99'), 'p99 ms', False),
+    (('queries_per_request',), 'sql/req', False),
+    (('bytes_per_request',), 'bytes/req', False),
+]
+
+
+def metric(data, path):
+    for key in path:
+        if data is None:
+            return None
+        data = data.get(key)
+    return data
+
+
+def change(base, new):
+    """Variación porcentual de base a new (None si no se puede calcular)."""
+    if base is None or new is None:
+        return None
+    if base == 0:
+        return 0.0 if new == 0 else float('inf')
+    return (new - base) / base * 100
+
+
+def compare(base, new, threshold):
+    """
+    Compara dos resultados.
+
+    Returns:
+        tuple: (filas, regresiones) donde cada fila es
+               (operación, métrica, base, nuevo, variación %, es_regresión)
+    """
+    rows = []
+    regressions = []
+    operations = ['TOTAL'] + sorted(set(base['operations']) | set(new['operations']))
+    for op in operations:
+        old_data = base['overall'] if op == 'TOTAL' else base['operations'].get(op)
+        new_data = new['overall'] if op == 'TOTAL' else new['operations'].get(op)
+        for path, label, higher_is_better in METRICS:
+            old_value, new_value = metric(old_data, path), metric(new_data, path)
+            pct = change(old_value, new_value)
+            worse = pct is not None and (-pct if higher_is_better else pct) > threshold
+            row = (op, label, old_value, new_value, pct, worse)
+            rows.append(row)
+            if worse:
+                regressions.append(row)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara dos resultados de load_test.py')
+    parser.add_argument('base', help='Resultado de referencia (JSON)')
+    parser.add_argument('new', help='Resultado nuevo (JSON)')
+    parser.add_argument('--threshold', type=float, default=10, help='Porcentaje a partir del cual se marca una regresión')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Salir con código 1 si hay regresiones')
+    args = parser.parse_args()
+
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.new, encoding='utf-8') as f:
+        new = json.load(f)
+
+    rows, regressions = compare(base, new, args.threshold)
+
+    print(f"📊 {base.get('label')} → {new.get('label')} (umbral {args.threshold:g}%)")
+    print("=" * 78)
+    print(f"{'operación':<24}{'métrica':<12}{'base':>12}{'nuevo':>12}{'cambio':>12}")
+    print("-" * 78)
+    last_op = None
+    for op, label, old_value, new_value, pct, worse in rows:
+        if old_value is None and new_value is None:
+            continue
+        pct_text = '-' if pct is None else f"{pct:+.1f}%"
+        print(f"{op if op != last_op else '':<24}{label:<12}{str(old_value):>12}{str(new_value):>12}"
+              f"{pct_text:>12}{'  ⚠️' if worse else ''}")
+        last_op = op
+    print("=" * 78)
+
+    if regressions:
+        print(f"⚠️  {len(regressions)} regresión(es) por encima del {args.threshold:g}%")
+        if args.fail_on_regression:
+            sys.exit(1)
+    else:
+        print("✅ Sin regresiones")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+"""
+Prueba de carga de la API HTTP
+
+Lanza N clientes concurrentes (hilos con conexiones keep-alive) contra un
+servidor en marcha durante un tiempo fijo, con una mezcla configurable de
+operaciones sobre el catálogo generado por seed_catalog.py:
+
+- read:  detalle de arma (70%), armas de una categoría, categorías y /api/stats
+- image: GET /api/weapons/<id>/image
+- login: POST /api/auth/login con un usuario de prueba (coste de bcrypt)
+- write: crear, actualizar y eliminar un arma (ciclo por cliente)
+
+Informa de peticiones por segundo, latencias p50/p95/p99, bytes por petición
+y, si el servidor envía la cabecera ``Server-Timing: db;dur=..;desc="queries=N"``,
+consultas SQL y tiempo de base de datos por petición. Los resultados se guardan
+en JSON para compararlos entre commits con compare_results.py.
+
+Uso (desde la raíz del proyecto):
+    python -m scripts.benchmark.load_test --url http://127.0.0.1:8000 \\
+        --concurrency 32 --duration 30 --mix read=60,image=20,login=10,write=10 \\
+        --json bench/$(git rev-parse --short HEAD).json
+"""
+
+import argparse
+import http.client
+import json
+import platform
+import random
+import re
+import statistics
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+DEFAULT_MIX = 'read=60,image=20,login=10,write=10'
+SERVER_TIMING_DB = re.compile(r'(?:^|,)\s*db\s*(;[^,]*)')
+
+
+def parse_mix(value):
+    """Convierte 'read=60,image=20' en [('read', 60), ('image', 20)]."""
+    mix = []
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in ('read', 'image', 'login', 'write'):
+            raise argparse.ArgumentTypeError(f"Operación desconocida: {name}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def parse_server_timing(header):
+    """
+    Extrae la métrica ``db`` de la cabecera Server-Timing.
+
+    Returns:
+        tuple: (consultas, milisegundos) o (None, None) si no viene
+    """
+    if not header:
+        return None, None
+    match = SERVER_TIMING_DB.search(header)
+    if not match:
+        return None, None
+    queries = duration = None
+    for param in match.group(1).split(';'):
+        key, _, value = param.strip().partition('=')
+        value = value.strip('"')
+        if key == 'dur':
+            duration = float(value)
+        elif key == 'desc':
+            found = re.search(r'queries=(\d+)', value)
+            if found:
+                queries = int(found.group(1))
+    return queries, duration
+
+
+def percentile(values, pct):
+    """Percentil por el método del rango más cercano."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    """Acumula las mediciones de todos los clientes, agrupadas por operación."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+
+    def add(self, op, status, seconds, size, queries, db_ms):
+        with self._lock:
+            self.samples[op].append((status, seconds, size, queries, db_ms))
+
+    def summary(self, elapsed):
+        def summarize(samples):
+            latencies = [s[1] for s in samples]
+            queries = [s[3] for s in samples if s[3] is not None]
+            db_ms = [s[4] for s in samples if s[4] is not None]
+            statuses = defaultdict(int)
+            for s in samples:
+                statuses[str(s[0])] += 1
+            ms = lambda value: round(value * 1000, 2) if value is not None else None
+            return {
+                'requests': len(samples),
+                'errors': sum(1 for s in samples if s[0] == 0 or s[0] >= 400),
+                'rps': round(len(samples) / elapsed, 1) if elapsed else 0,
+                'latency_ms': {
+                    'mean': ms(statistics.fmean(latencies)) if latencies else None,
+                    'p50': ms(percentile(latencies, 50)),
+                    'p95': ms(percentile(latencies, 95)),
+                    'p99': ms(percentile(latencies, 99)),
+                    'max': ms(max(latencies)) if latencies else None,
+                },
+                'bytes_per_request': round(statistics.fmean(s[2] for s in samples)) if samples else 0,
+                'queries_per_request': round(statistics.fmean(queries), 2) if queries else None,
+                'db_ms_per_request': round(statistics.fmean(db_ms), 2) if db_ms else None,
+                'status_codes': dict(statuses),
+            }
+
+        with self._lock:
+            everything = [s for samples in self.samples.values() for s in samples]
+            return {
+                'overall': summarize(everything),
+                'operations': {op: summarize(samples) for op, samples in sorted(self.samples.items())},
+            }
+
+
+class Client:
+    """Cliente HTTP keep-alive de un hilo."""
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.timeout = timeout
+        self.conn = None
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'Connection': 'keep-alive'}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        for attempt in (1, 2):
+            if self.conn is None:
+                cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+                self.conn = cls(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                return response.status, data, response.getheader('Server-Timing')
+            except (http.client.HTTPException, OSError):
+                self.conn.close()
+                self.conn = None
+                if attempt == 2:
+                    raise
+
+
+class Workload:
+    """Genera y ejecuta las operaciones de un cliente."""
+
+    def __init__(self, client, manifest, recorder, admin_token, rng):
+        self.client = client
+        self.manifest = manifest
+        self.recorder = recorder
+        self.admin_token = admin_token
+        self.rng = rng
+        self.created_id = None
+        self.write_step = 0
+
+    def _timed(self, op, method, path, body=None, token=None, record=True):
+        start = time.perf_counter()
+        try:
+            status, data, timing = self.client.request(method, path, body, token)
+        except (http.client.HTTPException, OSError):
+            status, data, timing = 0, b'', None
+        elapsed = time.perf_counter() - start
+        if record:
+            queries, db_ms = parse_server_timing(timing)
+            self.recorder.add(op, status, elapsed, len(data), queries, db_ms)
+        return status, data
+
+    def random_weapon_id(self):
+        return self.rng.randint(self.manifest['weapon_id_min'], self.manifest['weapon_id_max'])
+
+    def read(self, record):
+        choice = self.rng.random()
+        if choice < 0.7:
+            self._timed('read.weapon', 'GET', f'/api/weapons/{self.random_weapon_id()}', record=record)
+        elif choice < 0.8:
+            category_id = self.rng.choice(self.manifest['category_ids'])
+            self._timed('read.category_weapons', 'GET', f'/api/categories/{category_id}/weapons', record=record)
+        elif choice < 0.9:
+            self._timed('read.categories', 'GET', '/api/categories', record=record)
+        else:
+            self._timed('read.stats', 'GET', '/api/stats', record=record)
+
+    def image(self, record):
+        every = self.manifest.get('image_every') or 0
+        if every:
+            count = (self.manifest['weapon_id_max'] - self.manifest['weapon_id_min']) // every
+            weapon_id = self.manifest['weapon_id_min'] + self.rng.randint(0, count) * every
+        else:
+            weapon_id = self.random_weapon_id()
+        self._timed('image', 'GET', f'/api/weapons/{weapon_id}/image', record=record)
+
+    def login(self, record):
+        username = self.rng.choice(self.manifest['usernames'])
+        self._timed('login', 'POST', '/api/auth/login',
+                    {'username': username, 'password': self.manifest['password']}, record=record)
+
+    def write(self, record):
+        category_id = self.rng.choice(self.manifest['category_ids'])
+        if self.created_id is None:
+            status, data = self._timed('write.create', 'POST', '/api/weapons', {
+                'name': f'bench_load_{self.rng.getrandbits(32):08x}',
+                'category_id': category_id,
+                'description': 'Creada por load_test.py',
+            }, self.admin_token, record)
+            if status == 201:
+                self.created_id = json.loads(data)['id']
+        elif self.write_step % 2 == 0:
+            self._timed('write.update', 'PUT', f'/api/weapons/{self.created_id}', {
+                'name': f'bench_load_{self.created_id}_v{self.write_step}',
+                'category_id': category_id,
+            }, self.admin_token, record)
+            self.write_step += 1
+        else:
+            self._timed('write.delete', 'DELETE', f'/api/weapons/{self.created_id}',
+                        token=self.admin_token, record=record)
+            self.created_id = None
+            self.write_step += 1
+
+    def cleanup(self):
+        if self.created_id is not None:
+            self._timed('cleanup', 'DELETE', f'/api/weapons/{self.created_id}',
+                        token=self.admin_token, record=False)
+
+
+def run_client(url, manifest, recorder, mix, admin_token, warmup_until, deadline, seed, timeout):
+    rng = random.Random(seed)
+    workload = Workload(Client(url, timeout), manifest, recorder, admin_token, rng)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        getattr(workload, rng.choices(names, weights)[0])(record=now >= warmup_until)
+    workload.cleanup()
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def admin_login(url, manifest, timeout):
+    status, data, _ = Client(url, timeout).request('POST', '/api/auth/login', {
+        'username': manifest['admin_username'], 'password': manifest['password']
+    })
+    return json.loads(data).get('token') if status == 200 else None
+
+
+def print_report(result):
+    print("=" * 96)
+    print(f"{'operación':<24}{'req':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'errores':>9}{'bytes/req':>11}{'sql/req':>9}")
+    print("-" * 96)
+    rows = list(result['operations'].items()) + [('TOTAL', result['overall'])]
+    for op, data in rows:
+        lat = data['latency_ms']
+        queries = data['queries_per_request']
+        print(f"{op:<24}{data['requests']:>8}{data['rps']:>9}{str(lat['p50']):>9}{str(lat['p95']):>9}"
+              f"{str(lat['p99']):>9}{data['errors']:>9}{data['bytes_per_request']:>11}"
+              f"{'-' if queries is None else queries:>9}")
+    print("=" * 96)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga de la API')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='URL base del servidor')
+    parser.add_argument('--manifest', default='benchmark_manifest.json', help='Manifiesto de seed_catalog.py')
+    parser.add_argument('--concurrency', type=int, default=16, help='Clientes concurrentes')
+    parser.add_argument('--duration', type=float, default=30, help='Segundos de medición')
+    parser.add_argument('--warmup', type=float, default=3, help='Segundos iniciales sin medir')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f'Pesos de cada operación (por defecto {DEFAULT_MIX})')
+    parser.add_argument('--timeout', type=float, default=30, help='Timeout por petición')
+    parser.add_argument('--seed', type=int, default=1, help='Semilla para reproducir la secuencia')
+    parser.add_argument('--label', help='Etiqueta del resultado (por defecto, el commit actual)')
+    parser.add_argument('--json', help='Fichero donde guardar los resultados')
+    args = parser.parse_args()
+
+    with open(args.manifest, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    admin_token = admin_login(args.url, manifest, args.timeout)
+    mix_text = ', '.join(f'{name}={weight:g}' for name, weight in args.mix)
+    print(f"▶ {args.url}: {args.concurrency} clientes, {args.duration}s (+{args.warmup}s de calentamiento), "
+          f"mezcla {mix_text}, catálogo de {manifest['weapons']:,} armas")
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    warmup_until = started + args.warmup
+    deadline = warmup_until + args.duration
+    threads = [
+        threading.Thread(target=run_client, daemon=True, args=(
+            args.url, manifest, recorder, args.mix, admin_token,
+            warmup_until, deadline, args.seed + i, args.timeout
+        ))
+        for i in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    measured = max(min(time.perf_counter(), deadline) - warmup_until, 1e-9)
+
+    commit = git_commit()
+    result = {
+        'label': args.label or commit,
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'url': args.url,
+        'concurrency': args.concurrency,
+        'duration_seconds': round(measured, 2),
+        'mix': dict(args.mix),
+        'catalog': {key: manifest.get(key) for key in ('backend', 'weapons', 'image_bytes', 'image_every')},
+        **recorder.summary(measured),
+    }
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"Resultados guardados en {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Genera un catálogo sintético para las pruebas de carga
+
+Inserta N armas repartidas en K categorías (con imágenes BYTEA de tamaño
+configurable) y un conjunto de usuarios de prueba en la base de datos
+configurada (DATABASE_URL o variables DB*; también SQLite local). Al terminar
+recalcula los contadores de /api/stats y escribe un manifiesto JSON con los
+rangos de IDs y credenciales que usa scripts/benchmark/load_test.py.
+
+Uso (desde la raíz del proyecto):
+    DATABASE_URL=sqlite:///bench.db python -m scripts.benchmark.seed_catalog --weapons 100000
+    python -m scripts.benchmark.seed_catalog --weapons 1000000 --image-bytes 8192 --reset
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from sqlalchemy import insert, delete, func, select
+from config.database import engine, init_db
+from models.weapons_model import Weapon, WeaponCategory
+from models.user_model import User, UserRole
+from models.stats_model import CatalogCounter
+from repositories.stats_repository import StatsRepository
+from services.auth_service import hash_password
+
+BENCH_PREFIX = 'bench_'
+BENCH_PASSWORD = 'benchmark123'
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def make_blobs(size, distinct=32):
+    """Imágenes sintéticas (cabecera PNG + bytes aleatorios, no comprimibles)."""
+    if size <= 0:
+        return []
+    return [PNG_SIGNATURE + os.urandom(max(size - len(PNG_SIGNATURE), 0)) for _ in range(distinct)]
+
+
+def reset_catalog(conn):
+    """Elimina armas, categorías, contadores y usuarios de prueba."""
+    conn.execute(delete(Weapon))
+    conn.execute(delete(WeaponCategory))
+    conn.execute(delete(CatalogCounter))
+    conn.execute(delete(User).where(User.username.like(f'{BENCH_PREFIX}%')))
+
+
+def seed_categories(conn, count):
+    conn.execute(insert(WeaponCategory), [
+        {'name': f'{BENCH_PREFIX}category_{i}', 'description': f'Categoría sintética {i}'}
+        for i in range(count)
+    ])
+    return [row[0] for row in conn.execute(
+        select(WeaponCategory.id).where(WeaponCategory.name.like(f'{BENCH_PREFIX}%')).order_by(WeaponCategory.id)
+    )]
+
+
+def seed_weapons(conn, total, category_ids, blobs, image_every, batch_size):
+    started = time.perf_counter()
+    for offset in range(0, total, batch_size):
+        rows = []
+        for i in range(offset, min(offset + batch_size, total)):
+            has_image = image_every and i % image_every == 0
+            rows.append({
+                'name': f'{BENCH_PREFIX}weapon_{i}',
+                'category_id': category_ids[i % len(category_ids)],
+                'description': f'Arma sintética número {i} para pruebas de carga',
+                'image_data': blobs[i % len(blobs)] if has_image else None,
+                'image_mime_type': 'image/png' if has_image else None,
+            })
+        conn.execute(insert(Weapon), rows)
+        done = offset + len(rows)
+        rate = done / max(time.perf_counter() - started, 1e-9)
+        print(f"\r   • {done:,}/{total:,} armas ({rate:,.0f}/s)", end='', flush=True)
+    print()
+
+
+def seed_users(conn, count):
+    password_hash = hash_password(BENCH_PASSWORD)
+    users = [{'username': f'{BENCH_PREFIX}admin', 'email': f'{BENCH_PREFIX}admin@bench.local',
+              'password_hash': password_hash, 'role': UserRole.ADMIN, 'is_active': True}]
+    users += [{'username': f'{BENCH_PREFIX}user_{i}', 'email': f'{BENCH_PREFIX}user_{i}@bench.local',
+               'password_hash': password_hash, 'role': UserRole.USER, 'is_active': True}
+              for i in range(count)]
+    conn.execute(insert(User), users)
+    return [u['username'] for u in users[1:]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pobla la base de datos con un catálogo sintético')
+    parser.add_argument('--weapons', type=int, default=10000, help='Número de armas (10k–1M)')
+    parser.add_argument('--categories', type=int, default=14, help='Número de categorías')
+    parser.add_argument('--users', type=int, default=50, help='Usuarios de prueba (además de bench_admin)')
+    parser.add_argument('--image-bytes', type=int, default=4096, help='Tamaño de cada imagen (0 = sin imágenes)')
+    parser.add_argument('--image-ratio', type=float, default=1.0, help='Fracción de armas con imagen')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Filas por INSERT')
+    parser.add_argument('--reset', action='store_true', help='Vaciar el catálogo antes de poblar')
+    parser.add_argument('--manifest', default='benchmark_manifest.json', help='Fichero de manifiesto')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"🧪 CATÁLOGO SINTÉTICO: {args.weapons:,} armas, {args.categories} categorías, "
+          f"{args.users} usuarios ({engine.url.get_backend_name()})")
+    print("=" * 70)
+
+    init_db()
+    with engine.begin() as conn:
+        if args.reset:
+            print("🗑️  Vaciando catálogo anterior...")
+            reset_catalog(conn)
+        elif conn.execute(select(func.count()).select_from(Weapon)).scalar():
+            print("❌ La tabla weapons no está vacía. Usa --reset para reemplazar el catálogo.")
+            sys.exit(1)
+
+        print("📁 Categorías...")
+        category_ids = seed_categories(conn, args.categories)
+        print("👤 Usuarios...")
+        usernames = seed_users(conn, args.users)
+
+    print("⚔️  Armas...")
+    blobs = make_blobs(args.image_bytes)
+    # Una de cada `image_every` armas lleva imagen (0 = ninguna)
+    image_every = int(round(1 / args.image_ratio)) if args.image_ratio > 0 and blobs else 0
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        seed_weapons(conn, args.weapons, category_ids, blobs, image_every, args.batch_size)
+        id_min, id_max = conn.execute(select(func.min(Weapon.id), func.max(Weapon.id))).one()
+    elapsed = time.perf_counter() - started
+
+    print("📊 Recalculando contadores...")
+    StatsRepository().rebuild()
+
+    manifest = {
+        'backend': engine.url.get_backend_name(),
+        'weapons': args.weapons,
+        'weapon_id_min': id_min,
+        'weapon_id_max': id_max,
+        'category_ids': category_ids,
+        'image_bytes': args.image_bytes,
+        'image_every': image_every,
+        'admin_username': f'{BENCH_PREFIX}admin',
+        'usernames': usernames,
+        'password': BENCH_PASSWORD,
+        'seed_seconds': round(elapsed, 2),
+    }
+    with open(args.manifest, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"✅ {args.weapons:,} armas en {elapsed:.1f}s. Manifiesto: {args.manifest}")
+
+
+if __name__ == '__main__':
+    main()
@@ -44,6 +44,9 @@ def clear_database():
         categories_deleted = cursor.rowcount
         print(f"🗑️  Eliminadas {categories_deleted} categorías")
         
+        # Limpiar contadores (se recalculan en la siguiente consulta de estadísticas)
+        cursor.execute("DELETE FROM catalog_counters;")
+        
         # Reiniciar las secuencias de auto-incremento
         cursor.execute("ALTER SEQUENCE weapon_categories_id_seq RESTART WITH 1;")
         cursor.execute("ALTER SEQUENCE weapons_id_seq RESTART WITH 1;")
@@ -10,6 +10,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from services.auth_service import register_user, hash_password
 from models.user_model import UserRole
 from repositories.user_repository import UserRepository
+from services.runtime import run_sync
 
 def create_admin():
     """Crea el primer usuario administrador."""
@@ -55,7 +56,7 @@ def create_admin():
     print()
     
     # Crear usuario admin
-    user, error = register_user(username, email, password, UserRole.ADMIN)
+    user, error = run_sync(register_user(username, email, password, UserRole.ADMIN))
     
     if error:
         print(f"❌ Error: {error}")
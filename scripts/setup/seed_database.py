@@ -5,6 +5,7 @@ Este script inserta directamente en la base de datos usando SQLAlchemy
 
 from config.database import get_db
 from models.weapons_model import WeaponCategory, Weapon
+from repositories.stats_repository import StatsRepository
 
 print("=" * 70)
 print("🎮 POBLANDO BASE DE DATOS CON DATOS DE MONSTER HUNTER")
@@ -134,6 +135,10 @@ try:
     print(f"✅ Total de armas: {weapons_count}")
     print(f"✅ Nuevas armas creadas: {weapons_created}")
     
+    # Sincronizar los contadores de estadísticas con los datos insertados
+    StatsRepository().rebuild()
+    print("✅ Contadores de estadísticas recalculados")
+    
     print("\n🎮 Base de datos poblada exitosamente!")
     print("🌐 Accede a la wiki en: http://127.0.0.1:5000")
     
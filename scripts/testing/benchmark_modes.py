@@ -0,0 +1,191 @@
+"""
+Benchmark comparativo del modo síncrono (app.py) y el modo asíncrono (asgi.py)
+
+Abre primero un número de conexiones "lentas" (clientes que envían la
+cabecera HTTP a medias y se quedan esperando) y, mientras siguen abiertas,
+lanza clientes keep-alive que piden rutas de la API durante un tiempo fijo.
+Al final informa de peticiones por segundo, latencias p50/p95/p99, errores
+y cuántas conexiones lentas siguen aceptadas por el servidor.
+
+Solo usa la biblioteca estándar (asyncio), así que no necesita dependencias.
+
+Uso:
+    # Terminal 1: python app.py                      (Flask, puerto 5000)
+    # Terminal 2: uvicorn asgi:app --port 8000      (Quart/ASGI)
+    python scripts/testing/benchmark_modes.py \\
+        --target sync=http://127.0.0.1:5000 \\
+        --target async=http://127.0.0.1:8000 \\
+        --concurrency 50 --slow-clients 2000 --duration 20 --json resultados.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = ['/api/categories', '/api/weapons', '/api/stats', '/api/categories?with_counts=1']
+
+
+def percentile(values, pct):
+    """Percentil por el método del rango más cercano."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def read_response(reader):
+    """Lee una respuesta HTTP/1.1 completa y devuelve (status, bytes del cuerpo)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Conexión cerrada por el servidor')
+    status = int(status_line.split()[1])
+    length = 0
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value.strip())
+        elif name == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+
+    if not chunked:
+        await reader.readexactly(length)
+        return status, length
+
+    total = 0
+    while True:
+        size = int((await reader.readline()).strip().split(b';')[0], 16)
+        await reader.readexactly(size + 2)
+        total += size
+        if size == 0:
+            return status, total
+
+
+async def worker(host, port, paths, deadline, results):
+    """Cliente keep-alive que recorre las rutas hasta agotar el tiempo."""
+    reader = writer = None
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n"
+            start = time.perf_counter()
+            writer.write(request.encode())
+            await writer.drain()
+            status, size = await read_response(reader)
+            results['latencies'].append(time.perf_counter() - start)
+            results['bytes'] += size
+            if status >= 400:
+                results['errors'] += 1
+        except (OSError, ConnectionError, ValueError, asyncio.IncompleteReadError):
+            results['errors'] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def open_slow_client(host, port):
+    """Abre una conexión que envía solo parte de la petición y se queda esperando."""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=5)
+        writer.write(f"GET /health HTTP/1.1\r\nHost: {host}\r\n".encode())
+        await writer.drain()
+        return reader, writer
+    except (OSError, asyncio.TimeoutError):
+        return None
+
+
+async def run_target(label, url, args):
+    """Ejecuta el benchmark contra un servidor."""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+
+    slow = await asyncio.gather(*(open_slow_client(host, port) for _ in range(args.slow_clients)))
+    slow = [conn for conn in slow if conn is not None]
+
+    results = {'latencies': [], 'errors': 0, 'bytes': 0}
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(
+        worker(host, port, args.paths, deadline, results) for _ in range(args.concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    # Las conexiones lentas que el servidor no ha cerrado siguen "vivas"
+    alive = sum(1 for reader, _ in slow if not reader.at_eof())
+    for _, writer in slow:
+        writer.close()
+
+    latencies = results['latencies']
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        'label': label,
+        'url': url,
+        'duration_seconds': round(elapsed, 2),
+        'concurrency': args.concurrency,
+        'requests': len(latencies),
+        'errors': results['errors'],
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0,
+        'latency_ms': {
+            'mean': ms(statistics.fmean(latencies)) if latencies else None,
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+        },
+        'bytes_per_request': round(results['bytes'] / len(latencies)) if latencies else 0,
+        'slow_clients_requested': args.slow_clients,
+        'slow_clients_opened': len(slow),
+        'slow_clients_alive': alive,
+    }
+
+
+def print_table(reports):
+    print("=" * 78)
+    print(f"{'modo':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errores':>10}{'lentas vivas':>16}")
+    print("-" * 78)
+    for r in reports:
+        lat = r['latency_ms']
+        print(f"{r['label']:<10}{r['rps']:>10}{str(lat['p50']):>10}{str(lat['p95']):>10}"
+              f"{str(lat['p99']):>10}{r['errors']:>10}"
+              f"{str(r['slow_clients_alive']) + '/' + str(r['slow_clients_requested']):>16}")
+    print("=" * 78)
+
+
+async def main(args):
+    reports = []
+    for target in args.target:
+        label, _, url = target.partition('=')
+        print(f"▶ {label}: {url} ({args.slow_clients} conexiones lentas, "
+              f"{args.concurrency} clientes, {args.duration}s)")
+        reports.append(await run_target(label, url, args))
+    print_table(reports)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2)
+        print(f"Resultados guardados en {args.json}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara el modo WSGI y el modo ASGI de la API')
+    parser.add_argument('--target', action='append', required=True,
+                        help='etiqueta=url, p. ej. async=http://127.0.0.1:8000 (repetible)')
+    parser.add_argument('--concurrency', type=int, default=50, help='Clientes keep-alive activos')
+    parser.add_argument('--slow-clients', type=int, default=1000, help='Conexiones lentas mantenidas abiertas')
+    parser.add_argument('--duration', type=float, default=20, help='Segundos de carga por servidor')
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS, help='Rutas a solicitar')
+    parser.add_argument('--json', help='Fichero donde guardar los resultados')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,262 @@
+"""
+Monster Hunter Weapons API - Servidor de producción
+
+Lanza app.py con Gunicorn (workers de procesos + hilos) en lugar del servidor
+de desarrollo de Flask.
+
+Uso:
+    python serve.py                       # valores por defecto / variables de entorno
+    python serve.py --workers 4 --threads 8 --bind 0.0.0.0:8000
+
+Variables de entorno (los argumentos de línea de comandos tienen prioridad):
+- PORT: Puerto de escucha si no se indica --bind (por defecto 8000)
+- WEB_CONCURRENCY: Número de workers (por defecto 2 × CPUs + 1, máximo 8)
+- SERVE_THREADS: Hilos por worker (por defecto 4)
+- SERVE_PRELOAD: 1 para importar la aplicación una sola vez antes del fork (por defecto 1)
+- SERVE_MAX_REQUESTS / SERVE_MAX_REQUESTS_JITTER: Reciclado de workers (1000 / 100)
+- SERVE_KEEPALIVE: Segundos que se mantiene una conexión keep-alive (por defecto 5)
+- SERVE_TIMEOUT / SERVE_GRACEFUL_TIMEOUT: Segundos (por defecto 30 / 30)
+- DB_MAX_CONNECTIONS: Límite de conexiones del servidor PostgreSQL (por defecto 100)
+- DB_RESERVED_CONNECTIONS: Conexiones que no usa la API (migraciones, psql...) (por defecto 5)
+- PROMETHEUS_MULTIPROC_DIR: Directorio donde los workers comparten las métricas
+  de /metrics (por defecto uno temporal; se vacía al arrancar)
+- RATE_LIMIT_BACKEND: Con más de un worker, database por defecto para que los
+  límites de peticiones se compartan; las imágenes siguen contando en memoria
+  (RATE_LIMIT_LOCAL_RULES, ver services/rate_limit_service.py)
+
+El tamaño del pool por worker (DB_POOL_SIZE / DB_MAX_OVERFLOW) se calcula para
+que workers × (pool + overflow + la conexión LISTEN del broker SSE) nunca
+supere DB_MAX_CONNECTIONS menos las reservadas. Si se fijan a mano, se valida que respeten ese límite.
+
+Recarga elegante (sin cortar peticiones en curso):
+    kill -HUP <pid del maestro>    # nuevos workers con la configuración releída
+Con preload el código se importa en el maestro, así que para desplegar código
+nuevo sin cortes se usa la actualización en caliente de Gunicorn:
+    kill -USR2 <pid>  y después  kill -TERM <pid antiguo>
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from dotenv import load_dotenv
+from gunicorn.app.base import BaseApplication
+from gunicorn.workers.gthread import ThreadWorker
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+# Conexiones de cada worker además de una por hilo de peticiones:
+# - del pool (como overflow): el barrido de vida, el hilo del broker SSE que lee
+#   catalog_changes y el recálculo en segundo plano de la caché del catálogo
+POOLED_BACKGROUND_CONNECTIONS = 3
+# - fuera del pool: la conexión LISTEN del broker SSE (services/events_service.py),
+#   que se separa del pool y no cuenta en DB_POOL_SIZE / DB_MAX_OVERFLOW
+DEDICATED_CONNECTIONS = 1
+
+
+def plan_pool(workers, threads, max_connections, reserved=0, pool_size=None, max_overflow=None):
+    """
+    Calcula el pool de conexiones de cada worker.
+
+    Cada hilo usa como mucho una conexión a la vez; los hilos en segundo plano
+    del worker (POOLED_BACKGROUND_CONNECTIONS) se cubren con el overflow, y la
+    conexión LISTEN (DEDICATED_CONNECTIONS) se descuenta del presupuesto de
+    cada worker. Nunca se reparte más de lo que cabe en el límite del servidor.
+
+    Args:
+        workers (int): Número de procesos
+        threads (int): Hilos por proceso
+        max_connections (int): Límite de conexiones del servidor
+        reserved (int): Conexiones reservadas para otros clientes
+        pool_size (int|None): Tamaño fijado a mano (opcional)
+        max_overflow (int|None): Overflow fijado a mano (opcional)
+
+    Returns:
+        tuple: (pool_size, max_overflow)
+
+    Raises:
+        ValueError: Si no hay conexiones suficientes para todos los workers
+    """
+    budget = max_connections - reserved
+    per_worker = (budget // workers if workers > 0 else 0) - DEDICATED_CONNECTIONS
+    if per_worker < 1:
+        raise ValueError(
+            f"{workers} workers no caben en {budget} conexiones disponibles "
+            f"(DB_MAX_CONNECTIONS={max_connections}, reservadas={reserved}, "
+            f"{DEDICATED_CONNECTIONS} fuera del pool por worker)"
+        )
+
+    if pool_size is None and max_overflow is None:
+        usable = min(threads + POOLED_BACKGROUND_CONNECTIONS, per_worker)
+        pool_size = min(threads, usable)
+        return pool_size, usable - pool_size
+
+    pool_size = pool_size if pool_size is not None else min(threads, per_worker)
+    max_overflow = max_overflow if max_overflow is not None else 0
+    if workers * (pool_size + max_overflow + DEDICATED_CONNECTIONS) > budget:
+        raise ValueError(
+            f"{workers} workers × (DB_POOL_SIZE={pool_size} + DB_MAX_OVERFLOW={max_overflow} "
+            f"+ {DEDICATED_CONNECTIONS} fuera del pool) superan las {budget} conexiones disponibles"
+        )
+    return pool_size, max_overflow
+
+
+def when_ready(server):
+    # Con preload el maestro abrió conexiones al importar la aplicación
+    # (init_db, barrido de vida): se liberan antes de crear los workers
+    if server.cfg.preload_app:
+        from config.database import release_pools
+        release_pools()
+
+
+def post_fork(server, worker):
+    from config.database import reset_pools_after_fork
+    reset_pools_after_fork()
+
+
+def child_exit(server, worker):
+    from services.metrics_service import mark_process_dead
+    mark_process_dead(worker.pid)
+
+
+class QueueTimedThreadWorker(ThreadWorker):
+    """
+    Worker gthread que mide cuánto espera cada petición a que un hilo la atienda.
+
+    Sin proxy que envíe ``X-Request-Start``, esa cola es donde se acumulan las
+    peticiones cuando el worker está saturado; el control de admisión
+    (services/load_shed_service.py) la usa para rechazar a tiempo.
+    """
+
+    def enqueue_req(self, conn):
+        # También al volver una conexión keep-alive con una nueva petición
+        conn.enqueued_at = time.monotonic()
+        super().enqueue_req(conn)
+
+    def handle(self, conn):
+        from services.load_shed_service import set_worker_queue_wait
+        enqueued_at = getattr(conn, 'enqueued_at', None)
+        set_worker_queue_wait((time.monotonic() - enqueued_at) * 1000 if enqueued_at else None)
+        try:
+            return super().handle(conn)
+        finally:
+            set_worker_queue_wait(None)
+
+
+class APIServer(BaseApplication):
+    """Aplicación Gunicorn que carga ``app:app`` con la configuración indicada."""
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app import app
+        return app
+
+
+def parse_args(argv=None):
+    default_workers = min(multiprocessing.cpu_count() * 2 + 1, 8)
+    parser = argparse.ArgumentParser(description='Servidor de producción de la API')
+    parser.add_argument('--bind', default=f"0.0.0.0:{os.getenv('PORT', '8000')}")
+    parser.add_argument('--workers', type=int, default=_env_int('WEB_CONCURRENCY', default_workers))
+    parser.add_argument('--threads', type=int, default=_env_int('SERVE_THREADS', 4))
+    parser.add_argument('--preload', action=argparse.BooleanOptionalAction,
+                        default=os.getenv('SERVE_PRELOAD', '1').lower() in ('1', 'true', 'yes'))
+    parser.add_argument('--max-requests', type=int, default=_env_int('SERVE_MAX_REQUESTS', 1000))
+    parser.add_argument('--max-requests-jitter', type=int, default=_env_int('SERVE_MAX_REQUESTS_JITTER', 100))
+    parser.add_argument('--keep-alive', type=int, default=_env_int('SERVE_KEEPALIVE', 5))
+    parser.add_argument('--timeout', type=int, default=_env_int('SERVE_TIMEOUT', 30))
+    parser.add_argument('--graceful-timeout', type=int, default=_env_int('SERVE_GRACEFUL_TIMEOUT', 30))
+    parser.add_argument('--pidfile', default=os.getenv('SERVE_PIDFILE'))
+    return parser.parse_args(argv)
+
+
+def configure_pool(args):
+    """
+    Fija DB_POOL_SIZE / DB_MAX_OVERFLOW en el entorno antes de importar la
+    aplicación (config/pool.py los lee al importarse).
+    """
+    if os.getenv('DB_PGBOUNCER', '0').lower() in ('1', 'true', 'yes'):
+        print("🔌 DB_PGBOUNCER activo: sin pool en la API, PgBouncer limita las conexiones")
+        return
+
+    explicit_size = os.getenv('DB_POOL_SIZE')
+    explicit_overflow = os.getenv('DB_MAX_OVERFLOW')
+    pool_size, max_overflow = plan_pool(
+        args.workers, args.threads,
+        _env_int('DB_MAX_CONNECTIONS', 100), _env_int('DB_RESERVED_CONNECTIONS', 5),
+        int(explicit_size) if explicit_size else None,
+        int(explicit_overflow) if explicit_overflow else None,
+    )
+    os.environ['DB_POOL_SIZE'] = str(pool_size)
+    os.environ['DB_MAX_OVERFLOW'] = str(max_overflow)
+    total = args.workers * (pool_size + max_overflow + DEDICATED_CONNECTIONS)
+    print(f"🔌 Pool por worker: {pool_size} + {max_overflow} overflow + {DEDICATED_CONNECTIONS} LISTEN "
+          f"({args.workers} workers → máx. {total} conexiones)")
+
+
+def configure_metrics_dir():
+    """
+    Prepara el directorio multiproceso de prometheus_client antes de importar
+    la aplicación; los ficheros de una ejecución anterior se descartan.
+    """
+    directory = os.getenv('PROMETHEUS_MULTIPROC_DIR') or os.path.join(tempfile.gettempdir(), 'mhwiki-metrics')
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = directory
+
+
+def configure_rate_limit(args):
+    """
+    Con varios workers los token buckets deben compartirse: backend database
+    por defecto (salvo las reglas de RATE_LIMIT_LOCAL_RULES, como images).
+    """
+    if args.workers > 1:
+        os.environ.setdefault('RATE_LIMIT_BACKEND', 'database')
+
+
+def main(argv=None):
+    load_dotenv()
+    args = parse_args(argv)
+    try:
+        configure_pool(args)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    configure_metrics_dir()
+    configure_rate_limit(args)
+
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': QueueTimedThreadWorker if args.threads > 1 else 'sync',
+        'preload_app': args.preload,
+        'max_requests': args.max_requests,
+        'max_requests_jitter': args.max_requests_jitter,
+        'keepalive': args.keep_alive,
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        'when_ready': when_ready,
+        'post_fork': post_fork,
+        'child_exit': child_exit,
+        'accesslog': '-',
+    }
+    if args.pidfile:
+        options['pidfile'] = args.pidfile
+    APIServer(options).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,10 @@
 """
 Servicio de autenticación con JWT y bcrypt.
 Maneja registro, login, verificación de tokens y roles.
+
+Los servicios y decoradores son corrutinas compartidas por app.py y asgi.py
+(ver services/runtime.py); bcrypt es CPU intensivo, así que en el bucle de
+eventos se ejecuta en un hilo (``offload``).
 """
 
 import jwt
@@ -8,9 +12,12 @@ import os
 from datetime import datetime, timedelta
 from flask_bcrypt import Bcrypt
 from functools import wraps
-from flask import request, jsonify
 from repositories.user_repository import UserRepository
 from models.user_model import UserRole
+from services import stats_service, metrics_service, tracing_service
+from services.runtime import RepositoryPair, offload
+from services.tracing_service import traced
+from services.web import request, jsonify
 
 # Inicializar bcrypt
 bcrypt = Bcrypt()
@@ -21,6 +28,7 @@ JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 
 user_repo = UserRepository()
+user_repos = RepositoryPair(user_repo, 'repositories.async_user_repository:AsyncUserRepository')
 
 
 def hash_password(password):
@@ -33,7 +41,8 @@ def hash_password(password):
     Returns:
         str: Contraseña hasheada
     """
-    return bcrypt.generate_password_hash(password).decode('utf-8')
+    with metrics_service.track_bcrypt('hash'), tracing_service.span('bcrypt.hash', layer='crypto'):
+        return bcrypt.generate_password_hash(password).decode('utf-8')
 
 
 def verify_password(password_hash, password):
@@ -47,7 +56,8 @@ def verify_password(password_hash, password):
     Returns:
         bool: True si coincide, False si no
     """
-    return bcrypt.check_password_hash(password_hash, password)
+    with metrics_service.track_bcrypt('verify'), tracing_service.span('bcrypt.verify', layer='crypto'):
+        return bcrypt.check_password_hash(password_hash, password)
 
 
 def generate_token(user_id, username, role):
@@ -87,51 +97,75 @@ def decode_token(token):
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         return payload
     except jwt.ExpiredSignatureError:
+        metrics_service.jwt_failure('expired')
         return None
     except jwt.InvalidTokenError:
+        metrics_service.jwt_failure('invalid')
         return None
 
 
-def register_user(username, email, password, role=UserRole.USER):
+def validate_registration(username, email, password):
     """
-    Registra un nuevo usuario en el sistema.
+    Valida los datos de registro de un usuario.
     
     Args:
         username: Nombre de usuario
         email: Email del usuario
         password: Contraseña en texto plano
-        role: Rol del usuario (por defecto USER)
         
     Returns:
-        tuple: (usuario_creado, mensaje_error)
+        str: Mensaje de error, o None si los datos son válidos
     """
-    # Validaciones
     if not username or len(username) < 3:
-        return None, "El nombre de usuario debe tener al menos 3 caracteres"
+        return "El nombre de usuario debe tener al menos 3 caracteres"
     
     if not email or '@' not in email:
-        return None, "Email inválido"
+        return "Email inválido"
     
     if not password or len(password) < 6:
-        return None, "La contraseña debe tener al menos 6 caracteres"
+        return "La contraseña debe tener al menos 6 caracteres"
+    
+    return None
+
+
+@traced('service')
+async def register_user(username, email, password, role=UserRole.USER):
+    """
+    Registra un nuevo usuario en el sistema.
+    
+    Args:
+        username: Nombre de usuario
+        email: Email del usuario
+        password: Contraseña en texto plano
+        role: Rol del usuario (por defecto USER)
+        
+    Returns:
+        tuple: (usuario_creado, mensaje_error)
+    """
+    # Validaciones
+    error = validate_registration(username, email, password)
+    if error:
+        return None, error
     
     # Verificar si ya existe
-    if user_repo.exists_by_username_or_email(username, email):
+    if await user_repos().exists_by_username_or_email(username, email):
         return None, "El usuario o email ya están registrados"
     
     # Crear usuario
     user_data = {
         'username': username,
         'email': email,
-        'password_hash': hash_password(password),
+        'password_hash': await offload(hash_password, password),
         'role': role
     }
     
-    user = user_repo.create(user_data)
+    user = await user_repos().create(user_data)
+    stats_service.invalidate_cache()
     return user, None
 
 
-def login_user(username, password):
+@traced('service')
+async def login_user(username, password):
     """
     Autentica a un usuario y genera un token.
     
@@ -143,9 +177,9 @@ def login_user(username, password):
         tuple: (token, usuario, mensaje_error)
     """
     # Buscar usuario por username o email
-    user = user_repo.get_by_username(username)
+    user = await user_repos().get_by_username(username)
     if not user:
-        user = user_repo.get_by_email(username)
+        user = await user_repos().get_by_email(username)
     
     if not user:
         return None, None, "Usuario no encontrado"
@@ -154,11 +188,11 @@ def login_user(username, password):
         return None, None, "Usuario desactivado"
     
     # Verificar contraseña
-    if not verify_password(user.password_hash, password):
+    if not await offload(verify_password, user.password_hash, password):
         return None, None, "Contraseña incorrecta"
     
     # Actualizar último login
-    user_repo.update_last_login(user.id)
+    await user_repos().update_last_login(user.id)
     
     # Generar token
     token = generate_token(user.id, user.username, user.role.value)
@@ -166,6 +200,29 @@ def login_user(username, password):
     return token, user, None
 
 
+def extract_token(headers):
+    """
+    Extrae el token JWT de la cabecera Authorization ("Bearer <token>").
+    
+    Args:
+        headers: Cabeceras de la petición
+        
+    Returns:
+        tuple: (token, mensaje_error)
+    """
+    token = None
+    if 'Authorization' in headers:
+        try:
+            token = headers['Authorization'].split(' ')[1]
+        except IndexError:
+            return None, 'Formato de token inválido'
+    
+    if not token:
+        return None, 'Token no proporcionado'
+    
+    return token, None
+
+
 # Decoradores para proteger rutas
 def token_required(f):
     """
@@ -173,19 +230,11 @@ def token_required(f):
     Añade el payload del token a los argumentos de la función.
     """
     @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        
+    async def decorated(*args, **kwargs):
         # Buscar token en headers
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(' ')[1]  # "Bearer <token>"
-            except IndexError:
-                return jsonify({'error': 'Formato de token inválido'}), 401
-        
-        if not token:
-            return jsonify({'error': 'Token no proporcionado'}), 401
+        token, error = extract_token(request.headers)
+        if error:
+            return jsonify({'error': error}), 401
         
         # Decodificar token
         payload = decode_token(token)
@@ -193,11 +242,11 @@ def token_required(f):
             return jsonify({'error': 'Token inválido o expirado'}), 401
         
         # Verificar que el usuario existe y está activo
-        user = user_repo.get_by_id(payload['user_id'])
+        user = await user_repos().get_by_id(payload['user_id'])
         if not user or not user.is_active:
             return jsonify({'error': 'Usuario no válido'}), 401
         
-        return f(payload, *args, **kwargs)
+        return await f(payload, *args, **kwargs)
     
     return decorated
 
@@ -208,26 +257,29 @@ def admin_required(f):
     Debe usarse junto con @token_required.
     """
     @wraps(f)
-    def decorated(payload, *args, **kwargs):
+    async def decorated(payload, *args, **kwargs):
         if payload.get('role') != UserRole.ADMIN.value:
             return jsonify({'error': 'Acceso denegado. Se requiere rol de administrador'}), 403
         
-        return f(payload, *args, **kwargs)
+        return await f(payload, *args, **kwargs)
     
     return decorated
 
 
-def get_user_by_id(user_id):
+@traced('service')
+async def get_user_by_id(user_id):
     """Obtiene un usuario por ID."""
-    return user_repo.get_by_id(user_id)
+    return await user_repos().get_by_id(user_id)
 
 
-def get_all_users():
+@traced('service')
+async def get_all_users():
     """Obtiene todos los usuarios."""
-    return user_repo.get_all()
+    return await user_repos().get_all()
 
 
-def change_user_role(user_id, new_role):
+@traced('service')
+async def change_user_role(user_id, new_role):
     """
     Cambia el rol de un usuario.
     
@@ -238,12 +290,16 @@ def change_user_role(user_id, new_role):
     Returns:
         tuple: (usuario_actualizado, mensaje_error)
     """
+    user = await user_repos().get_by_id(user_id)
+    if not user:
+        return None, None
+    
     # Verificar que haya al menos un admin
-    if new_role == UserRole.USER:
-        user = user_repo.get_by_id(user_id)
-        if user and user.role == UserRole.ADMIN:
-            if user_repo.count_admins() <= 1:
-                return None, "No se puede remover el último administrador del sistema"
+    if new_role == UserRole.USER and user.role == UserRole.ADMIN:
+        if await user_repos().count_admins() <= 1:
+            return None, "No se puede remover el último administrador del sistema"
     
-    updated_user = user_repo.update(user_id, {'role': new_role})
+    updated_user = await user_repos().update(user_id, {'role': new_role})
+    if updated_user:
+        stats_service.invalidate_cache()
     return updated_user, None
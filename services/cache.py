@@ -0,0 +1,333 @@
+"""
+Caché en memoria con expiración (TTL) para respuestas baratas de servir.
+
+Cada proceso mantiene su propia copia; las escrituras locales invalidan la
+entrada inmediatamente. Con ``version`` (p. ej. el último ``seq`` de
+catalog_changes) cada consulta comprueba además si otro proceso escribió
+desde que se calculó la entrada y, en ese caso, la descarta; sin ``version``
+el resto de workers la refrescan al expirar el TTL. ``PolledVersion`` guarda
+esa versión en memoria y sólo la consulta cada pocos segundos.
+
+``get_or_set`` evita además la estampida cuando una entrada expira con carga:
+
+- Single-flight: si varios hilos piden a la vez una clave ausente, sólo uno
+  ejecuta el ``loader`` y el resto espera su resultado.
+- Stale-while-revalidate (``stale_ttl``): durante ``stale_ttl`` segundos tras
+  expirar se sigue sirviendo el valor anterior mientras un único hilo en
+  segundo plano lo recalcula.
+- ``lock``: bloqueo opcional entre procesos (p. ej. consultivo de PostgreSQL)
+  para que sólo un worker a la vez ejecute el ``loader`` de una clave.
+
+``AsyncTTLCache`` y ``AsyncPolledVersion`` son las mismas piezas para el
+bucle de eventos (asgi.py): el ``loader``, la versión y el bloqueo son
+corrutinas y los recálculos, tareas en lugar de hilos.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from services import metrics_service
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """Cálculo en curso de una clave; los demás hilos esperan a ``done``."""
+
+    __slots__ = ('generation', 'version', 'done', 'value', 'error')
+
+    def __init__(self, generation, version):
+        self.generation = generation
+        self.version = version
+        self.done = self._new_event()
+        self.value = None
+        self.error = None
+
+    @staticmethod
+    def _new_event():
+        return threading.Event()
+
+
+class _AsyncFlight(_Flight):
+    """Cálculo en curso de una clave en ``AsyncTTLCache``; las corrutinas esperan a ``done``."""
+
+    __slots__ = ()
+
+    @staticmethod
+    def _new_event():
+        return asyncio.Event()
+
+
+class PolledVersion:
+    """
+    Versión para ``TTLCache`` leída como mucho una vez cada ``interval`` segundos.
+
+    Entre lecturas se devuelve el último valor conocido; ``expire`` obliga a
+    leerlo de nuevo en la siguiente llamada (p. ej. al llegar un NOTIFY).
+
+    Args:
+        fetch (callable): Lee la versión actual
+        interval (float): Segundos durante los que vale la última lectura
+        bypass (callable|None): Si devuelve True, se lee siempre con ``fetch``
+            (p. ej. peticiones fijadas a la primaria tras escribir)
+    """
+
+    def __init__(self, fetch, interval, bypass=None):
+        self.fetch = fetch
+        self.interval = interval
+        self.bypass = bypass
+        self._value = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        now = time.monotonic()
+        if self._is_fresh(now):
+            return self._value
+        return self._remember(self.fetch(), now)
+
+    def _is_fresh(self, now):
+        if self.bypass is not None and self.bypass():
+            return False
+        with self._lock:
+            return self._checked_at is not None and now < self._checked_at + self.interval
+
+    def _remember(self, value, now):
+        with self._lock:
+            self._value, self._checked_at = value, now
+        return value
+
+    def expire(self):
+        """La siguiente llamada vuelve a leer la versión."""
+        with self._lock:
+            self._checked_at = None
+
+
+class AsyncPolledVersion(PolledVersion):
+    """``PolledVersion`` con ``fetch`` asíncrono, para ``AsyncTTLCache``."""
+
+    async def __call__(self):
+        now = time.monotonic()
+        if self._is_fresh(now):
+            return self._value
+        return self._remember(await self.fetch(), now)
+
+
+class TTLCache:
+    """
+    Caché clave/valor thread-safe con tiempo de vida por entrada.
+
+    Args:
+        ttl (float): Segundos que una entrada se considera válida
+        name (str): Nombre de la caché en las métricas
+        stale_ttl (float): Segundos tras expirar en los que ``get_or_set`` aún
+            sirve el valor anterior mientras lo recalcula (0 = nunca)
+        lock (callable|None): ``lock(nombre)`` devuelve un context manager que
+            se mantiene mientras se ejecuta el ``loader``
+        version (callable|None): Devuelve la versión actual de los datos
+            (creciente); una entrada calculada con una versión anterior no se
+            sirve, ni siquiera como caducada
+    """
+
+    def __init__(self, ttl, name='default', stale_ttl=0, lock=None, version=None):
+        self.ttl = ttl
+        self.name = name
+        self.stale_ttl = stale_ttl
+        self.lock = lock
+        self.version = version
+        self._entries = {}
+        self._flights = {}
+        # Cambia en cada invalidate(): un cálculo empezado antes no se guarda
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _is_current(stored, current):
+        """Si lo calculado con la versión ``stored`` sigue valiendo para ``current``."""
+        return current is None or (stored is not None and stored >= current)
+
+    def get(self, key, default=None):
+        """Obtiene el valor de ``key`` si existe, no ha expirado y sigue en la versión actual."""
+        version = self.version() if self.version else None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._is_current(entry[2], version):
+                del self._entries[key]
+                entry = None
+            if entry is not None and entry[1] <= now:
+                if entry[1] + self.stale_ttl <= now:
+                    del self._entries[key]
+                entry = None
+        metrics_service.cache_lookup(self.name, hit=entry is not None)
+        return entry[0] if entry is not None else default
+
+    def set(self, key, value):
+        """Guarda ``value`` en ``key`` durante ``ttl`` segundos."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl, None)
+
+    def get_or_set(self, key, loader):
+        """
+        Devuelve el valor en caché o lo calcula con ``loader()`` y lo guarda.
+
+        Los hilos que piden la misma clave mientras se calcula esperan a ese
+        cálculo en lugar de repetirlo. Dentro de la ventana ``stale_ttl`` se
+        devuelve el valor caducado y se recalcula en segundo plano, salvo que
+        ``version`` indique que los datos cambiaron: entonces se recalcula
+        antes de responder.
+
+        Args:
+            key: Clave de la entrada
+            loader (callable): Función sin argumentos que calcula el valor
+
+        Returns:
+            Valor en caché o recién calculado
+
+        Raises:
+            Exception: La que lance ``loader`` (también a los hilos que esperaban)
+        """
+        # Se lee antes que los datos: lo calculado después es al menos de esta versión
+        version = self.version() if self.version else None
+        result, entry, flight, started = self._claim(key, version, _Flight)
+        if result == 'stale' and started:
+            threading.Thread(
+                target=self._load, args=(key, loader, flight),
+                name=f'cache-refresh-{self.name}', daemon=True
+            ).start()
+        if result in ('hit', 'stale'):
+            return entry[0]
+        if started:
+            self._load(key, loader, flight)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _claim(self, key, version, flight_class):
+        """
+        Decide cómo responder a ``key`` y, si hace falta, registra su cálculo.
+
+        Returns:
+            tuple: (resultado, entrada, cálculo, True si el cálculo es nuevo y
+            lo debe ejecutar quien llama); resultado es 'hit', 'stale',
+            'coalesced' o 'miss'
+        """
+        now = time.monotonic()
+        started = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._is_current(entry[2], version):
+                del self._entries[key]
+                entry = None
+            flight = self._flights.get(key)
+            if flight is not None and not self._is_current(flight.version, version):
+                flight = None
+            if entry is not None and now < entry[1]:
+                result = 'hit'
+            elif entry is not None and now < entry[1] + self.stale_ttl:
+                result = 'stale'
+                if flight is None:
+                    flight = self._flights[key] = flight_class(self._generation, version)
+                    started = True
+            elif flight is not None:
+                result = 'coalesced'
+            else:
+                result = 'miss'
+                flight = self._flights[key] = flight_class(self._generation, version)
+                started = True
+        metrics_service.cache_lookup(self.name, hit=result == 'hit', result=result)
+        return result, entry, flight, started
+
+    def _load(self, key, loader, flight):
+        """Ejecuta ``loader`` para ``flight`` y guarda el resultado si sigue vigente."""
+        try:
+            with self.lock(f'{self.name}:{key!r}') if self.lock else nullcontext():
+                flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            logger.warning("Error recalculando la caché %s[%r]: %s", self.name, key, e)
+        finally:
+            self._finish(key, flight)
+
+    def _finish(self, key, flight):
+        """Guarda el resultado de ``flight`` si sigue vigente y despierta a quien espera."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            entry = self._entries.get(key)
+            newer = entry is not None and not self._is_current(flight.version, entry[2])
+            if flight.error is None and flight.generation == self._generation and not newer:
+                self._entries[key] = (flight.value, time.monotonic() + self.ttl, flight.version)
+        flight.done.set()
+
+    def invalidate(self, key=None):
+        """Elimina ``key`` de la caché, o todas las entradas si no se indica."""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+                self._flights.clear()
+            else:
+                self._entries.pop(key, None)
+                self._flights.pop(key, None)
+
+
+class AsyncTTLCache(TTLCache):
+    """
+    ``TTLCache`` para el bucle de eventos: ``get_or_set`` es una corrutina.
+
+    ``loader`` y ``version`` son corrutinas y ``lock(nombre)`` devuelve un
+    context manager asíncrono. Cada cálculo se ejecuta en su propia tarea:
+    las peticiones que lo esperan (incluida la que lo empezó) sólo esperan a
+    que termine, de modo que si una se cancela el cálculo sigue para el resto.
+    Desde otros hilos sólo se debe llamar a ``invalidate``.
+    """
+
+    def __init__(self, ttl, name='default', stale_ttl=0, lock=None, version=None):
+        super().__init__(ttl, name, stale_ttl, lock, version)
+        # Referencias a las tareas en curso (el bucle sólo guarda referencias débiles)
+        self._tasks = set()
+
+    async def get(self, key, default=None):
+        """``TTLCache.get`` con la versión leída de forma asíncrona."""
+        version = await self.version() if self.version else None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (not self._is_current(entry[2], version) or entry[1] <= now):
+                entry = None
+        metrics_service.cache_lookup(self.name, hit=entry is not None)
+        return entry[0] if entry is not None else default
+
+    async def get_or_set(self, key, loader):
+        """
+        Devuelve el valor en caché o lo calcula con ``await loader()`` y lo guarda.
+
+        Mismas reglas que ``TTLCache.get_or_set``.
+        """
+        version = await self.version() if self.version else None
+        result, entry, flight, started = self._claim(key, version, _AsyncFlight)
+        if started:
+            task = asyncio.get_running_loop().create_task(self._load(key, loader, flight))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if result in ('hit', 'stale'):
+            return entry[0]
+        await flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    async def _load(self, key, loader, flight):
+        try:
+            async with self.lock(f'{self.name}:{key!r}') if self.lock else nullcontext():
+                flight.value = await loader()
+        except Exception as e:
+            flight.error = e
+            logger.warning("Error recalculando la caché %s[%r]: %s", self.name, key, e)
+        finally:
+            self._finish(key, flight)
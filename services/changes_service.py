@@ -0,0 +1,89 @@
+"""
+Servicio de sincronización incremental del catálogo.
+
+Los clientes (mirrors, app móvil) guardan el último ``seq`` recibido y piden
+sólo los cambios posteriores en lugar de volver a descargar el catálogo
+entero. Cada cambio trae el estado actual de la fila (``data``), salvo los
+borrados, que son tombstones con ``data: null``.
+"""
+
+import os
+from models.weapons_model import format_timestamp
+from repositories.change_repository import ChangeRepository
+from services.runtime import RepositoryPair
+from services.tracing_service import traced
+
+CHANGES_DEFAULT_LIMIT = int(os.getenv('CHANGES_DEFAULT_LIMIT', '100'))
+CHANGES_MAX_LIMIT = int(os.getenv('CHANGES_MAX_LIMIT', '1000'))
+
+change_repo = ChangeRepository()
+change_repos = RepositoryPair(change_repo, 'repositories.async_change_repository:AsyncChangeRepository')
+
+# Entidades del registro según la tabla de la que sale ``data``
+WEAPON_ENTITIES = ('weapon', 'weapon_image')
+CATEGORY_ENTITIES = ('category', 'category_icon')
+
+
+def parse_page(since, limit):
+    """
+    Valida los parámetros ``since`` y ``limit``.
+
+    Returns:
+        tuple: (since, limit) como enteros
+
+    Raises:
+        ValueError: Si no son enteros no negativos
+    """
+    try:
+        since = int(since) if since not in (None, '') else 0
+        limit = int(limit) if limit not in (None, '') else CHANGES_DEFAULT_LIMIT
+    except ValueError:
+        raise ValueError("Los parámetros 'since' y 'limit' deben ser enteros")
+    if since < 0 or limit < 1:
+        raise ValueError("'since' debe ser >= 0 y 'limit' >= 1")
+    return since, min(limit, CHANGES_MAX_LIMIT)
+
+
+@traced('service')
+async def get_changes(since=0, limit=CHANGES_DEFAULT_LIMIT):
+    """
+    Cambios del catálogo posteriores a ``since``.
+
+    Returns:
+        dict: {
+            'changes': [{'seq', 'entity', 'id', 'op', 'version', 'changed_at', 'data'}],
+            'next_since': seq para la siguiente petición,
+            'has_more': True si quedan cambios por leer
+        }
+    """
+    changes, weapons, categories = await change_repos().get_page(
+        since, limit + 1, WEAPON_ENTITIES, CATEGORY_ENTITIES
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    def current(change):
+        if change.op == 'delete':
+            return None
+        rows = weapons if change.entity in WEAPON_ENTITIES else categories
+        # Filas leídas en la misma sesión que el registro: si falta, se borró
+        # después y su tombstone llegará más adelante
+        row = rows.get(change.entity_id)
+        return row.to_json() if row else None
+
+    return {
+        'changes': [
+            {
+                'seq': change.seq,
+                'entity': change.entity,
+                'id': change.entity_id,
+                'op': change.op,
+                'version': change.version,
+                'changed_at': format_timestamp(change.changed_at),
+                'data': current(change),
+            }
+            for change in changes
+        ],
+        'next_since': changes[-1].seq if changes else since,
+        'has_more': has_more,
+    }
@@ -0,0 +1,123 @@
+"""
+Peticiones condicionales (ETag / Last-Modified) para los recursos JSON.
+
+- Recursos individuales: ETag débil ``W/"<version>"`` (columna ``version`` de
+  la fila) y Last-Modified a partir de ``updated_at``.
+- Colecciones: ETag débil con un resumen de (número de filas, ``updated_at``
+  más reciente). El número detecta los borrados, que no cambian el máximo,
+  por eso las colecciones no llevan Last-Modified.
+
+Los controladores sólo consultan las versiones cuando la petición trae
+``If-None-Match`` o ``If-Modified-Since``: si coinciden responden 304 sin
+cargar ni serializar el cuerpo; en otro caso el ETag se calcula del propio
+JSON, y ambos caminos producen el mismo valor.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from models.weapons_model import format_timestamp
+from services.web import jsonify, request, response as make_response
+
+CACHE_CONTROL = 'no-cache'
+
+
+def collection_etag(count, newest, extra=None):
+    """
+    ETag de una colección.
+
+    Args:
+        count (int): Número de filas
+        newest (datetime|str|None): ``updated_at`` más reciente (o ya formateado)
+        extra (str|None): Otros datos de los que depende la respuesta
+    """
+    if not isinstance(newest, str):
+        newest = format_timestamp(newest) or ''
+    digest = hashlib.blake2b(f"{count}|{newest}|{extra or ''}".encode(), digest_size=8)
+    return digest.hexdigest()
+
+
+def items_etag(items, extra=None):
+    """ETag de una colección ya serializada (lista de ``to_json()``)."""
+    newest = max((item['updated_at'] for item in items), default='')
+    return collection_etag(len(items), newest, extra)
+
+
+def counts_extra(counts):
+    """Dependencia de ``weapon_count``: pares (categoría, armas) no nulos, ordenados."""
+    return ','.join(f"{key}={value}" for key, value in sorted(counts.items()) if value)
+
+
+def parse_timestamp(value):
+    """Convierte el ``updated_at`` serializado de nuevo en datetime UTC."""
+    if value is None:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _as_utc(value):
+    # SQLite devuelve fechas sin zona horaria (guardadas en UTC)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def has_conditions():
+    """True si la petición trae validadores para una respuesta 304."""
+    return 'If-None-Match' in request.headers or 'If-Modified-Since' in request.headers
+
+
+def not_modified(etag, last_modified=None):
+    """
+    Evalúa If-None-Match (tiene prioridad) e If-Modified-Since.
+
+    Returns:
+        bool: True si el cliente ya tiene la representación actual
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    if last_modified is not None and since is not None:
+        # HTTP-date sólo tiene precisión de segundos
+        return _as_utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def _add_validators(response, etag, last_modified=None):
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = _as_utc(last_modified)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def not_modified_response(etag, last_modified=None):
+    """Respuesta 304 sin cuerpo con los validadores actuales."""
+    return _add_validators(make_response(status=304), etag, last_modified)
+
+
+def json_response(payload, etag, last_modified=None, status=200):
+    """``jsonify(payload)`` con ETag, Last-Modified y Cache-Control."""
+    response = jsonify(payload)
+    response.status_code = status
+    return _add_validators(response, etag, last_modified)
+
+
+def item_response(item, status=200):
+    """Respuesta de un recurso individual serializado con ``to_json()``."""
+    return json_response(item, str(item['version']), parse_timestamp(item['updated_at']), status)
+
+
+def expected_versions():
+    """
+    Versiones aceptadas por la cabecera If-Match.
+
+    Returns:
+        set[int]|None: None si no hay If-Match (o es ``*``): no se comprueba la versión
+    """
+    if 'If-Match' not in request.headers or request.if_match.star_tag:
+        return None
+    versions = set()
+    for tag in request.if_match.as_set(include_weak=True):
+        if tag.isdigit():
+            versions.add(int(tag))
+    return versions
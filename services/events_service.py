@@ -0,0 +1,516 @@
+"""
+Flujo de cambios del catálogo por Server-Sent Events (GET /api/events).
+
+Cada proceso tiene un único ``ChangeBroker``: un hilo que espera avisos de
+la base de datos, lee los cambios nuevos de catalog_changes (una consulta
+por aviso, no una por suscriptor) y los reparte en memoria a todos los
+suscriptores conectados. El mensaje SSE se serializa una sola vez por cambio.
+
+- PostgreSQL: una conexión dedicada (fuera del pool) con ``LISTEN
+  catalog_changes``. El INSERT de models/change_model.py envía el NOTIFY en
+  la misma transacción que la escritura, así que sólo llegan cambios
+  confirmados. Además se consulta el registro cada SSE_SAFETY_POLL_SECONDS
+  por si se perdiera algún aviso (p. ej. al reconectar).
+- Otras bases (SQLite): sondeo de catalog_changes cada SSE_POLL_SECONDS.
+
+El hilo (y su conexión LISTEN) sólo existe mientras hay suscriptores: arranca
+con el primero y se detiene cuando se va el último.
+
+Contrapresión: cada suscriptor tiene una cola acotada (SSE_QUEUE_SIZE). Si
+se llena, el suscriptor se desconecta en lugar de acumular memoria; el
+navegador reconecta con ``Last-Event-ID`` y recupera lo que le falte del
+registro de cambios (o recibe ``event: reset`` si le faltan demasiados).
+
+Heartbeat: el propio broker envía un comentario ``: ping`` a todos cada
+SSE_HEARTBEAT_SECONDS, de modo que un suscriptor inactivo no tiene temporizador
+propio: en ASGI es sólo una corrutina esperando en su cola.
+
+Configuración (variables de entorno):
+- SSE_HEARTBEAT_SECONDS: Intervalo del heartbeat (por defecto 15)
+- SSE_QUEUE_SIZE: Mensajes pendientes por suscriptor antes de expulsarlo (por defecto 64)
+- SSE_POLL_SECONDS: Intervalo de sondeo sin LISTEN (por defecto 1)
+- SSE_SAFETY_POLL_SECONDS: Sondeo de seguridad con LISTEN (por defecto 30)
+- SSE_REPLAY_LIMIT: Cambios máximos a reenviar al reconectar (por defecto 500)
+- SSE_MAX_SYNC_SUBSCRIBERS: Suscriptores por worker en app.py, donde cada uno
+  ocupa un hilo del worker mientras dura (por defecto SERVE_THREADS / 4, al
+  menos 1, para que el resto de la API siga teniendo hilos); asgi.py no tiene
+  límite
+"""
+
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+import time
+from collections import deque
+from repositories.change_repository import ChangeRepository
+from services import metrics_service, weapons_service
+
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', '64'))
+SSE_POLL_SECONDS = float(os.getenv('SSE_POLL_SECONDS', '1'))
+SSE_SAFETY_POLL_SECONDS = float(os.getenv('SSE_SAFETY_POLL_SECONDS', '30'))
+SSE_REPLAY_LIMIT = int(os.getenv('SSE_REPLAY_LIMIT', '500'))
+SSE_MAX_SYNC_SUBSCRIBERS = int(os.getenv(
+    'SSE_MAX_SYNC_SUBSCRIBERS', max(1, int(os.getenv('SERVE_THREADS', '4')) // 4)
+))
+
+# Reintento sugerido al navegador tras una desconexión (ms)
+SSE_RETRY_MS = 3000
+# Cambios leídos por consulta del broker
+POLL_BATCH = 500
+# Cada cuánto comprueba el hilo, mientras espera un NOTIFY, si debe detenerse (s)
+LISTEN_STOP_CHECK_SECONDS = 1.0
+
+STREAM_HEADERS = {
+    'Cache-Control': 'no-cache',
+    # nginx no debe acumular el flujo en su buffer
+    'X-Accel-Buffering': 'no',
+}
+
+HEARTBEAT = (None, ': ping\n\n')
+RESET = (None, 'event: reset\ndata: {}\n\n')
+
+logger = logging.getLogger('mhwiki.events')
+change_repo = ChangeRepository()
+
+
+class SubscriptionClosed(Exception):
+    """La suscripción se cerró (cola llena o broker detenido)."""
+
+
+def format_event(change):
+    """
+    Mensaje SSE de un cambio de catalog_changes.
+
+    Returns:
+        tuple: (seq, texto del mensaje)
+    """
+    data = json.dumps({
+        'seq': change.seq, 'entity': change.entity, 'id': change.entity_id,
+        'op': change.op, 'version': change.version,
+    }, separators=(',', ':'))
+    return change.seq, f"id: {change.seq}\nevent: change\ndata: {data}\n\n"
+
+
+def parse_last_event_id(value):
+    """``Last-Event-ID`` como seq, o None si falta o no es válido."""
+    if value is None or not value.strip().isdigit():
+        return None
+    return int(value)
+
+
+class Subscription:
+    """Cola acotada de un suscriptor atendido por un hilo (app.py)."""
+
+    transport = 'thread'
+
+    def __init__(self, maxsize=SSE_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self.closed = False
+        self._messages = deque()
+        self._ready = threading.Condition()
+
+    def push(self, message):
+        with self._ready:
+            if self.closed:
+                return
+            if len(self._messages) >= self.maxsize:
+                self.closed = True
+                metrics_service.sse_dropped()
+            else:
+                self._messages.append(message)
+            self._ready.notify()
+
+    def close(self):
+        with self._ready:
+            self.closed = True
+            self._ready.notify()
+
+    def get(self, timeout=None):
+        """
+        Siguiente mensaje (bloquea; el heartbeat del broker lo despierta).
+
+        Raises:
+            SubscriptionClosed: Si la suscripción se cerró
+        """
+        with self._ready:
+            while not self._messages and not self.closed:
+                if not self._ready.wait(timeout):
+                    return HEARTBEAT
+            if self.closed:
+                raise SubscriptionClosed()
+            return self._messages.popleft()
+
+
+_CLOSED = object()
+
+
+class AsyncSubscription:
+    """Cola acotada de un suscriptor atendido por una corrutina (asgi.py)."""
+
+    transport = 'asyncio'
+
+    def __init__(self, maxsize=SSE_QUEUE_SIZE, loop=None):
+        self.loop = loop or asyncio.get_running_loop()
+        self.closed = False
+        # Una plaza más para poder encolar el aviso de cierre
+        self._queue = asyncio.Queue(maxsize + 1)
+        self.maxsize = maxsize
+
+    def push(self, message):
+        """Sólo desde el hilo del bucle (el broker usa call_soon_threadsafe)."""
+        if self.closed:
+            return
+        if self._queue.qsize() >= self.maxsize:
+            metrics_service.sse_dropped()
+            self.close()
+        else:
+            self._queue.put_nowait(message)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._queue.put_nowait(_CLOSED)
+
+    async def get(self):
+        message = await self._queue.get()
+        if message is _CLOSED:
+            raise SubscriptionClosed()
+        return message
+
+
+def _deliver(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.push(message)
+
+
+class _Run:
+    """Una ejecución del hilo del broker: desde su primer suscriptor hasta que no queda ninguno."""
+
+    def __init__(self):
+        self.stop = threading.Event()
+        # Se activa cuando last_seq ya está fijado y el hilo arrancado
+        self.ready = threading.Event()
+        self.thread = None
+        self.listener = None
+        self.last_seq = None
+
+
+def _drain_notifies(listener):
+    """Consume los NOTIFY recibidos (psycopg2 o psycopg 3)."""
+    if hasattr(listener, 'poll'):
+        listener.poll()
+        listener.notifies.clear()
+    else:
+        for _ in listener.notifies(timeout=0):
+            pass
+
+
+class ChangeBroker:
+    """
+    Reparte los cambios del catálogo a los suscriptores del proceso.
+
+    El hilo del broker arranca con el primer suscriptor y se detiene al irse
+    el último. Cada arranque es un ``_Run`` nuevo: su punto de partida
+    (``last_seq``) se fija antes de que ``subscribe`` vuelva, de modo que lo
+    que el suscriptor recupere después del registro enlaza sin huecos con lo
+    que publique el hilo. Un hilo ya detenido no publica nada, aunque tarde
+    en terminar su consulta en curso.
+    """
+
+    def __init__(self, repo=change_repo, engine=None):
+        self.repo = repo
+        self._engine = engine
+        self._lock = threading.Lock()
+        self._threaded = set()
+        self._by_loop = {}
+        self._run = None
+        self._stopped = None
+
+    # -- suscriptores ---------------------------------------------------------
+
+    def subscribe(self, subscription):
+        """Añade un suscriptor; arranca el hilo si es el primero (puede consultar la BD)."""
+        with self._lock:
+            if isinstance(subscription, AsyncSubscription):
+                self._by_loop.setdefault(subscription.loop, set()).add(subscription)
+            else:
+                self._threaded.add(subscription)
+            run, starting = self._run, self._run is None
+            if starting:
+                run = self._run = _Run()
+                previous, self._stopped = self._stopped, None
+        metrics_service.SSE_SUBSCRIBERS.labels(subscription.transport).inc()
+        if starting:
+            self._start(run, previous)
+        run.ready.wait()
+
+    def unsubscribe(self, subscription):
+        """Quita un suscriptor; detiene el hilo si era el último."""
+        with self._lock:
+            if isinstance(subscription, AsyncSubscription):
+                subscriptions = self._by_loop.get(subscription.loop)
+                if subscriptions is not None:
+                    subscriptions.discard(subscription)
+                    if not subscriptions:
+                        del self._by_loop[subscription.loop]
+            else:
+                self._threaded.discard(subscription)
+            if self._run is not None and not self._threaded and not self._by_loop:
+                self._run.stop.set()
+                self._stopped, self._run = self._run, None
+        metrics_service.SSE_SUBSCRIBERS.labels(subscription.transport).dec()
+
+    def thread_subscribers(self):
+        with self._lock:
+            return len(self._threaded)
+
+    def is_running(self):
+        """True si el hilo del broker está en marcha."""
+        with self._lock:
+            run = self._run
+        return run is not None and run.thread is not None and run.thread.is_alive()
+
+    def publish(self, message, run=None):
+        """
+        Entrega ``message`` a todos: una sola llamada por bucle de asyncio.
+
+        Con ``run``, sólo si esa ejecución del hilo sigue siendo la actual.
+        """
+        with self._lock:
+            if run is not None and run is not self._run:
+                return
+            threaded = list(self._threaded)
+            by_loop = [(loop, tuple(subscriptions)) for loop, subscriptions in self._by_loop.items()]
+        _deliver(threaded, message)
+        for loop, subscriptions in by_loop:
+            try:
+                loop.call_soon_threadsafe(_deliver, subscriptions, message)
+            except RuntimeError:
+                # Bucle cerrado: sus suscriptores ya no existen
+                with self._lock:
+                    self._by_loop.pop(loop, None)
+
+    # -- lectura del registro -------------------------------------------------
+
+    def _poll(self, run):
+        """Publica los cambios posteriores a ``run.last_seq`` (sólo desde el hilo de ``run``)."""
+        if run.last_seq is None:
+            run.last_seq = self.repo.latest_seq(primary=True)
+        while not run.stop.is_set():
+            changes = self.repo.get_since(run.last_seq, POLL_BATCH, primary=True)
+            for change in changes:
+                self.publish(format_event(change), run)
+                run.last_seq = change.seq
+            if changes:
+                weapons_service.catalog_changed()
+            if len(changes) < POLL_BATCH:
+                return
+
+    def _get_engine(self):
+        if self._engine is None:
+            from config.database import engine
+            self._engine = engine
+        return self._engine
+
+    def _listen(self):
+        """Conexión dedicada con LISTEN (sólo PostgreSQL), o None."""
+        engine = self._get_engine()
+        if engine.dialect.name != 'postgresql':
+            return None
+        from models.change_model import CHANGE_CHANNEL
+
+        connection = engine.raw_connection()
+        # Fuera del pool: la conexión vive lo que el hilo del broker
+        connection.detach()
+        listener = connection.dbapi_connection
+        listener.autocommit = True
+        with listener.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANGE_CHANNEL}")
+        logger.info("Escuchando NOTIFY %s", CHANGE_CHANNEL)
+        return listener
+
+    @staticmethod
+    def _close_listener(run):
+        if run.listener is not None:
+            try:
+                run.listener.close()
+            except Exception:
+                pass
+            run.listener = None
+
+    def _wait(self, run, timeout):
+        """
+        Espera un NOTIFY (o el sondeo) como mucho ``timeout`` segundos.
+
+        Con LISTEN, el select se trocea en LISTEN_STOP_CHECK_SECONDS para que
+        un hilo detenido suelte su conexión enseguida.
+        """
+        if run.listener is None:
+            run.stop.wait(timeout)
+            return
+        deadline = time.monotonic() + timeout
+        while not run.stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if select.select([run.listener], [], [], min(remaining, LISTEN_STOP_CHECK_SECONDS))[0]:
+                _drain_notifies(run.listener)
+                return
+
+    def _loop(self, run):
+        next_heartbeat = time.monotonic() + SSE_HEARTBEAT_SECONDS
+        while not run.stop.is_set():
+            try:
+                if run.listener is None:
+                    run.listener = self._listen()
+                self._poll(run)
+            except Exception as e:
+                logger.warning("Error leyendo el registro de cambios: %s", e)
+                self._close_listener(run)
+
+            interval = SSE_SAFETY_POLL_SECONDS if run.listener is not None else SSE_POLL_SECONDS
+            timeout = max(0.0, min(interval, next_heartbeat - time.monotonic()))
+            try:
+                self._wait(run, timeout)
+            except Exception as e:
+                logger.warning("Conexión LISTEN perdida: %s", e)
+                self._close_listener(run)
+                run.stop.wait(SSE_POLL_SECONDS)
+
+            if time.monotonic() >= next_heartbeat:
+                self.publish(HEARTBEAT, run)
+                next_heartbeat = time.monotonic() + SSE_HEARTBEAT_SECONDS
+        self._close_listener(run)
+
+    def _start(self, run, previous):
+        """Fija el punto de partida de ``run`` y arranca su hilo."""
+        try:
+            if previous is not None:
+                # Como mucho una conexión LISTEN por proceso
+                previous.ready.wait()
+                previous.thread.join(timeout=SSE_SAFETY_POLL_SECONDS)
+            run.last_seq = self.repo.latest_seq(primary=True)
+        except Exception as e:
+            # El hilo lo reintenta en su primera lectura
+            logger.warning("Error leyendo el registro de cambios: %s", e)
+        finally:
+            run.thread = threading.Thread(target=self._loop, args=(run,), name='sse-broker', daemon=True)
+            run.thread.start()
+            run.ready.set()
+
+    def stop(self):
+        """Detiene el hilo y cierra todas las suscripciones."""
+        with self._lock:
+            run, self._run = self._run, None
+            threaded = list(self._threaded)
+            by_loop = [(loop, tuple(subscriptions)) for loop, subscriptions in self._by_loop.items()]
+        for stopped in (run, self._stopped):
+            if stopped is not None:
+                stopped.stop.set()
+                stopped.ready.wait()
+                stopped.thread.join(timeout=SSE_SAFETY_POLL_SECONDS)
+        for subscription in threaded:
+            subscription.close()
+        for loop, subscriptions in by_loop:
+            for subscription in subscriptions:
+                loop.call_soon_threadsafe(subscription.close)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Broker del proceso (se crea al primer uso)."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = ChangeBroker()
+    return _broker
+
+
+def set_broker(broker):
+    """Sustituye el broker (tests)."""
+    global _broker
+    _broker = broker
+
+
+def replay(since):
+    """
+    Mensajes de los cambios posteriores a ``since`` para un cliente que reconecta.
+
+    Returns:
+        list[tuple]: Mensajes (seq, texto); sólo ``RESET`` si le faltan demasiados
+    """
+    changes = change_repo.get_since(since, SSE_REPLAY_LIMIT + 1, primary=True)
+    if len(changes) > SSE_REPLAY_LIMIT:
+        return [RESET]
+    return [format_event(change) for change in changes]
+
+
+def _fresh(message, state):
+    # Descarta cambios ya enviados en la recuperación inicial
+    seq = message[0]
+    if seq is None:
+        return True
+    if state['sent'] is not None and seq <= state['sent']:
+        return False
+    state['sent'] = seq
+    return True
+
+
+def stream(last_event_id=None, broker=None):
+    """
+    Generador del flujo SSE para un hilo (app.py).
+
+    Se suscribe antes de recuperar lo perdido para no dejar huecos; los
+    duplicados se descartan por seq.
+    """
+    broker = broker or get_broker()
+    subscription = Subscription()
+    broker.subscribe(subscription)
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        state = {'sent': parse_last_event_id(last_event_id)}
+        if state['sent'] is not None:
+            for message in replay(state['sent']):
+                if _fresh(message, state):
+                    yield message[1]
+        while True:
+            try:
+                message = subscription.get()
+            except SubscriptionClosed:
+                return
+            if _fresh(message, state):
+                yield message[1]
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def stream_async(last_event_id=None, broker=None):
+    """Generador asíncrono del flujo SSE (asgi.py); misma lógica que ``stream``."""
+    broker = broker or get_broker()
+    subscription = AsyncSubscription()
+    # Puede arrancar el hilo del broker y consultar la BD: fuera del bucle
+    await asyncio.to_thread(broker.subscribe, subscription)
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        state = {'sent': parse_last_event_id(last_event_id)}
+        if state['sent'] is not None:
+            for message in await asyncio.to_thread(replay, state['sent']):
+                if _fresh(message, state):
+                    yield message[1]
+        while True:
+            try:
+                message = await subscription.get()
+            except SubscriptionClosed:
+                return
+            if _fresh(message, state):
+                yield message[1]
+    finally:
+        broker.unsubscribe(subscription)
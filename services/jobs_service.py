@@ -0,0 +1,399 @@
+"""
+Trabajos en segundo plano.
+
+Las peticiones que desencadenan trabajo pesado lo encolan en la tabla ``jobs``
+(ver models/job_model.py) y responden ``202 Accepted`` con la URL de estado
+(``/api/jobs/<id>``), de modo que su latencia no depende del trabajo. Uno o
+varios procesos ``python worker.py`` consumen la cola:
+
+- Cada worker toma el siguiente trabajo por prioridad con ``FOR UPDATE SKIP
+  LOCKED``, así que pueden ejecutarse varios en paralelo sin pisarse.
+- Si el manejador falla, el trabajo vuelve a la cola con una espera
+  exponencial (JOB_RETRY_BASE_SECONDS × 2^(intento-1)) hasta agotar sus
+  intentos. ``PermanentJobError`` (datos inválidos) no se reintenta.
+- Mientras un trabajo se ejecuta, el worker renueva ``locked_at`` cada
+  JOB_HEARTBEAT_SECONDS; los trabajos de un worker caído (sin renovar en
+  JOB_STALE_SECONDS) vuelven a la cola.
+- Un trabajo puede ejecutarse más de una vez (worker caído tras escribir y
+  antes de cerrarlo), así que los manejadores deben ser idempotentes. Los que
+  escriben en el catálogo confirman el cierre del trabajo en la misma
+  transacción que su escritura (``JobRepository.completion``).
+
+Tipos de trabajo incluidos:
+
+- ``weapons.import``: alta masiva de armas (``POST /api/weapons/import``)
+- ``weapon.image``: decodificar, redimensionar y guardar la imagen de un arma
+  (``PUT /api/weapons/<id>/image``); la imagen subida espera en job_files
+- ``catalog.export``: exportación completa del catálogo en el resultado
+- ``stats.rebuild``: recalcular los contadores de catalog_counters
+
+Los manejadores se ejecutan en el proceso del worker: las cachés en memoria
+de los workers web se refrescan al expirar su TTL.
+"""
+
+import base64
+import io
+import logging
+import os
+import socket
+import threading
+import time
+from PIL import Image, UnidentifiedImageError
+from models.weapons_model import utcnow, format_timestamp
+from repositories.job_repository import JobRepository
+from services import metrics_service, stats_service, weapons_service
+from services.runtime import run_sync
+
+logger = logging.getLogger(__name__)
+
+# Intentos por trabajo y espera base entre reintentos (se duplica en cada uno)
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETRY_BASE_SECONDS = float(os.getenv('JOB_RETRY_BASE_SECONDS', '10'))
+# Espera del worker cuando la cola está vacía
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '1'))
+# Un trabajo 'running' más antiguo se da por abandonado y vuelve a la cola
+JOB_STALE_SECONDS = float(os.getenv('JOB_STALE_SECONDS', '600'))
+# Cada cuánto renueva el worker ``locked_at`` del trabajo en curso
+JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', str(JOB_STALE_SECONDS / 4)))
+# Los trabajos terminados se borran pasado este tiempo (7 días)
+JOB_RETENTION_SECONDS = float(os.getenv('JOB_RETENTION_SECONDS', str(7 * 24 * 3600)))
+
+# Límites de los endpoints que encolan
+IMPORT_MAX_WEAPONS = int(os.getenv('IMPORT_MAX_WEAPONS', '1000'))
+IMAGE_UPLOAD_MAX_BYTES = int(os.getenv('IMAGE_UPLOAD_MAX_BYTES', str(5 * 1024 * 1024)))
+# Lado máximo (px) de las imágenes de armas tras redimensionarlas
+IMAGE_MAX_SIZE = int(os.getenv('IMAGE_MAX_SIZE', '512'))
+
+job_repo = JobRepository()
+
+
+class PermanentJobError(Exception):
+    """El trabajo no puede completarse nunca (datos inválidos): no se reintenta."""
+
+
+class JobLostError(Exception):
+    """El trabajo volvió a la cola (o lo tomó otro worker) mientras se ejecutaba: se descarta el intento."""
+
+
+# kind -> (manejador, prioridad por defecto)
+_handlers = {}
+
+
+def job_handler(kind, priority=0):
+    """
+    Registra el manejador de un tipo de trabajo.
+
+    El manejador recibe el payload (dict) y el trabajo (Job, con ``id`` y el
+    intento en ``attempts``) y devuelve el resultado (JSON o None).
+
+    Args:
+        kind (str): Tipo de trabajo
+        priority (int): Prioridad por defecto de los trabajos de este tipo
+    """
+    def decorator(func):
+        _handlers[kind] = (func, priority)
+        return func
+    return decorator
+
+
+def job_kinds():
+    """Tipos de trabajo registrados."""
+    return sorted(_handlers)
+
+
+def status_url(job_id):
+    """URL de estado de un trabajo."""
+    return f"/api/jobs/{job_id}"
+
+
+def enqueue(kind, payload=None, priority=None, max_attempts=None, data=None):
+    """
+    Encola un trabajo.
+
+    Args:
+        kind (str): Tipo de trabajo registrado
+        payload (dict|None): Parámetros del trabajo
+        priority (int|None): Prioridad (por defecto la del tipo)
+        max_attempts (int|None): Intentos máximos (por defecto JOB_MAX_ATTEMPTS)
+        data (bytes|None): Fichero subido; el manejador lo lee con ``job_file``
+
+    Returns:
+        dict: Estado del trabajo encolado, con ``status_url``
+
+    Raises:
+        ValueError: Si el tipo no existe o los parámetros no son válidos
+    """
+    if not isinstance(kind, str) or kind not in _handlers:
+        raise ValueError(f"Tipo de trabajo desconocido: '{kind}'. Disponibles: {', '.join(job_kinds())}")
+    if payload is not None and not isinstance(payload, dict):
+        raise ValueError("El campo 'payload' debe ser un objeto JSON")
+    for name, value in (('priority', priority), ('max_attempts', max_attempts)):
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+            raise ValueError(f"El campo '{name}' debe ser un entero")
+    if max_attempts is not None and max_attempts < 1:
+        raise ValueError("El campo 'max_attempts' debe ser al menos 1")
+
+    job = job_repo.enqueue(
+        kind, payload or {},
+        priority=_handlers[kind][1] if priority is None else priority,
+        max_attempts=max_attempts or JOB_MAX_ATTEMPTS,
+        data=data,
+    )
+    return dict(job.to_json(), status_url=status_url(job.id))
+
+
+def get_job(job_id):
+    """Estado de un trabajo, o None si no existe."""
+    job = job_repo.get(job_id)
+    return dict(job.to_json(), status_url=status_url(job.id)) if job else None
+
+
+def job_file(job):
+    """Fichero subido de ``job`` (bytes), o None si no tiene."""
+    return job_repo.get_file(job.id)
+
+
+def queue_counts():
+    """Número de trabajos por estado."""
+    return job_repo.count_by_status()
+
+
+def retry_delay(attempts):
+    """Segundos de espera antes del siguiente intento tras ``attempts`` fallidos."""
+    return JOB_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+
+
+def run_one(worker_id, kinds=None):
+    """
+    Toma y ejecuta el siguiente trabajo pendiente.
+
+    Args:
+        worker_id (str): Identificador del worker
+        kinds (list[str]|None): Limitar a estos tipos de trabajo
+
+    Returns:
+        Job|None: Trabajo ejecutado (con el estado previo a terminarlo), o None
+                  si la cola estaba vacía
+    """
+    job = job_repo.claim(worker_id, kinds)
+    if job is None:
+        return None
+
+    started = time.perf_counter()
+    handler = _handlers.get(job.kind, (None,))[0]
+    heartbeat = _Heartbeat(job)
+    try:
+        if handler is None:
+            raise PermanentJobError(f"Tipo de trabajo desconocido: '{job.kind}'")
+        result = handler(job.payload or {}, job)
+    except JobLostError:
+        outcome = 'lost'
+        logger.warning("Trabajo %s (%s) devuelto a la cola durante el intento %d: se descarta",
+                       job.id, job.kind, job.attempts)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        if isinstance(e, PermanentJobError) or job.attempts >= job.max_attempts:
+            outcome = 'failed'
+            job_repo.fail(job.id, job.attempts, error)
+            logger.error("Trabajo %s (%s) fallido tras %d intento(s): %s", job.id, job.kind, job.attempts, error)
+        else:
+            outcome = 'retry'
+            job_repo.fail(job.id, job.attempts, error, retry_in=retry_delay(job.attempts))
+            logger.warning("Trabajo %s (%s) falló en el intento %d, se reintentará: %s",
+                           job.id, job.kind, job.attempts, error)
+    else:
+        outcome = 'succeeded'
+        job_repo.complete(job.id, job.attempts, result)
+    finally:
+        heartbeat.stop()
+    metrics_service.job_finished(job.kind, outcome, time.perf_counter() - started)
+    return job
+
+
+class _Heartbeat:
+    """Hilo que renueva ``locked_at`` del trabajo en curso hasta ``stop()``."""
+
+    def __init__(self, job):
+        self.job = job
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-heartbeat-{job.id}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                if not job_repo.heartbeat(self.job.id, self.job.attempts):
+                    return
+            except Exception as e:
+                logger.warning("Error renovando el trabajo %s: %s", self.job.id, e)
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+
+def default_worker_id():
+    """``<host>:<pid>``: identifica al worker en ``locked_by``."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Worker:
+    """
+    Bucle de un worker: ejecuta trabajos mientras haya y espera cuando la cola está vacía.
+
+    Cada ``JOB_STALE_SECONDS / 2`` devuelve a la cola los trabajos abandonados
+    y purga los terminados antiguos.
+
+    Args:
+        worker_id (str|None): Identificador (por defecto ``<host>:<pid>``)
+        kinds (list[str]|None): Limitar a estos tipos de trabajo
+        poll_seconds (float|None): Espera con la cola vacía (por defecto JOB_POLL_SECONDS)
+    """
+
+    def __init__(self, worker_id=None, kinds=None, poll_seconds=None):
+        self.worker_id = worker_id or default_worker_id()
+        self.kinds = kinds
+        self.poll_seconds = JOB_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self._stop = threading.Event()
+        self._next_maintenance = 0
+
+    def stop(self):
+        """Termina el bucle al acabar el trabajo en curso."""
+        self._stop.set()
+
+    def maintenance(self):
+        """Devuelve a la cola los trabajos abandonados y purga los terminados antiguos."""
+        requeued = job_repo.requeue_stale(JOB_STALE_SECONDS)
+        if requeued:
+            logger.warning("%d trabajo(s) abandonado(s) devuelto(s) a la cola", requeued)
+        job_repo.purge_finished(JOB_RETENTION_SECONDS)
+
+    def run(self, once=False):
+        """
+        Ejecuta trabajos hasta ``stop()``.
+
+        Args:
+            once (bool): Terminar en cuanto la cola esté vacía
+
+        Returns:
+            int: Trabajos ejecutados
+        """
+        processed = 0
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now >= self._next_maintenance:
+                self._next_maintenance = now + JOB_STALE_SECONDS / 2
+                try:
+                    self.maintenance()
+                except Exception as e:
+                    logger.warning("Error en el mantenimiento de la cola: %s", e)
+            try:
+                job = run_one(self.worker_id, self.kinds)
+            except Exception as e:
+                # Base de datos caída: esperar y volver a intentarlo
+                logger.warning("Error tomando trabajos de la cola: %s", e)
+                job = None
+            if job is not None:
+                processed += 1
+                continue
+            if once:
+                break
+            self._stop.wait(self.poll_seconds)
+        return processed
+
+
+# =============================================================================
+# MANEJADORES
+# =============================================================================
+
+def enqueue_weapon_import(items):
+    """
+    Encola una importación masiva de armas.
+
+    Raises:
+        ValueError: Si ``items`` no es una lista o supera IMPORT_MAX_WEAPONS
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError("El campo 'weapons' debe ser una lista no vacía")
+    if len(items) > IMPORT_MAX_WEAPONS:
+        raise ValueError(f"Como máximo se pueden importar {IMPORT_MAX_WEAPONS} armas a la vez")
+    return enqueue('weapons.import', {'weapons': items})
+
+
+@job_handler('weapons.import')
+def import_weapons(payload, job):
+    # Las armas y el cierre del trabajo se confirman juntos: si el worker cae
+    # después, el trabajo ya consta como terminado y no se vuelve a insertar
+    # el lote; si el trabajo dejó de ser nuestro, no se inserta nada
+    result = weapons_service.import_weapons(
+        payload.get('weapons') or [],
+        complete=lambda result: job_repo.completion(job.id, job.attempts, result)
+    )
+    if result is None:
+        raise JobLostError(job.id)
+    return result
+
+
+def enqueue_weapon_image(weapon_id, image_data):
+    """
+    Encola el procesado de la imagen subida de un arma.
+
+    Raises:
+        ValueError: Si la imagen está vacía o supera IMAGE_UPLOAD_MAX_BYTES
+    """
+    if not image_data:
+        raise ValueError("El cuerpo de la petición debe contener la imagen")
+    if len(image_data) > IMAGE_UPLOAD_MAX_BYTES:
+        raise ValueError(f"La imagen supera el máximo de {IMAGE_UPLOAD_MAX_BYTES} bytes")
+    # Las subidas de imágenes van por delante de exportaciones e importaciones
+    return enqueue('weapon.image', {'weapon_id': weapon_id}, data=image_data)
+
+
+def resize_image(image_data, max_size):
+    """
+    Decodifica una imagen, la reduce para que ningún lado supere ``max_size`` y la codifica en PNG.
+
+    Returns:
+        tuple: (bytes PNG, (ancho, alto))
+
+    Raises:
+        PermanentJobError: Si los datos no son una imagen válida
+    """
+    try:
+        with Image.open(io.BytesIO(image_data)) as image:
+            image.load()
+            if image.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+                image = image.convert('RGBA')
+            image.thumbnail((max_size, max_size))
+            output = io.BytesIO()
+            image.save(output, format='PNG', optimize=True)
+            return output.getvalue(), image.size
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise PermanentJobError(f"La imagen no es válida: {e}") from e
+
+
+@job_handler('weapon.image', priority=10)
+def process_weapon_image(payload, job):
+    # Los trabajos encolados antes de job_files llevan la imagen en base64
+    image_data = base64.b64decode(payload['data']) if 'data' in payload else job_file(job)
+    if image_data is None:
+        raise PermanentJobError(f"El trabajo {job.id} no tiene imagen")
+    png, (width, height) = resize_image(image_data, IMAGE_MAX_SIZE)
+    if not weapons_service.set_weapon_image(payload['weapon_id'], png, 'image/png'):
+        raise PermanentJobError(f"El arma con ID '{payload['weapon_id']}' no existe")
+    return {'weapon_id': payload['weapon_id'], 'width': width, 'height': height, 'bytes': len(png)}
+
+
+@job_handler('catalog.export', priority=-10)
+def export_catalog(payload, job):
+    return {
+        'exported_at': format_timestamp(utcnow()),
+        'categories': run_sync(weapons_service.get_all_categories()),
+        'weapons': run_sync(weapons_service.get_all_weapons()),
+    }
+
+
+@job_handler('stats.rebuild', priority=-10)
+def rebuild_stats(payload, job):
+    stats_service.rebuild_stats()
+    return stats_service.get_stats()
@@ -0,0 +1,184 @@
+"""
+Control de admisión (load shedding) para los endpoints caros.
+
+Cada grupo de endpoints caros (bcrypt en login/registro, envío de imágenes)
+tiene un número máximo de peticiones simultáneas por worker, por debajo de
+sus hilos. Una petición que no consigue plaza en LOAD_SHED_TARGET_MS, o que ya
+ha esperado más que eso en cola, se rechaza con 503 y ``Retry-After`` en lugar
+de encolarse: así los hilos siguen libres para las lecturas baratas (y
+cacheadas) aunque el nodo esté saturado.
+
+La espera en cola es la mayor entre la del proxy (cabecera
+``X-Request-Start``) y la del propio worker: ``serve.py`` anota cuánto esperó
+cada conexión a que un hilo la atendiera (``set_worker_queue_wait``).
+
+Configuración (variables de entorno):
+- LOAD_SHED_ENABLED: 0 desactiva el control de admisión
+- LOAD_SHED_TARGET_MS: Latencia de cola máxima antes de rechazar (por defecto 100)
+- LOAD_SHED_<GRUPO>_CONCURRENCY: Peticiones simultáneas por worker del grupo
+  (por defecto la mitad de SERVE_THREADS; bcrypt, además, no más que CPUs)
+- LOAD_SHED_RETRY_AFTER: Segundos sugeridos en Retry-After (por defecto 1)
+
+``shed_load`` decora las vistas compartidas por app.py y asgi.py (ver
+services/runtime.py), con los mismos grupos de admisión por proceso. En
+asgi.py no hay cola de hilos: sólo cuenta ``X-Request-Start``.
+"""
+
+import os
+import threading
+import time
+from functools import wraps
+from services import metrics_service
+from services.runtime import offload
+from services.web import jsonify, request
+
+LOAD_SHED_ENABLED = os.getenv('LOAD_SHED_ENABLED', '1').lower() not in ('0', 'false', 'no')
+LOAD_SHED_TARGET_MS = float(os.getenv('LOAD_SHED_TARGET_MS', '100'))
+LOAD_SHED_RETRY_AFTER = int(os.getenv('LOAD_SHED_RETRY_AFTER', '1'))
+
+# Por debajo de los hilos del worker: si un grupo pudiera ocuparlos todos, las
+# peticiones esperarían en la cola de Gunicorn y el límite no actuaría nunca
+_THREADS = int(os.getenv('SERVE_THREADS', '4'))
+DEFAULT_CONCURRENCY = {
+    # bcrypt es CPU puro: más hilos que núcleos sólo alargan la cola
+    'bcrypt': max(1, min(os.cpu_count() or 1, _THREADS // 2)),
+    'images': max(1, _THREADS // 2),
+}
+
+# Espera en la cola del worker de la petición que atiende cada hilo
+_worker_queue = threading.local()
+
+
+def set_worker_queue_wait(ms):
+    """Anota los ms que la petición del hilo actual esperó a que un hilo la atendiera (None = desconocido)."""
+    _worker_queue.ms = ms
+
+
+def worker_queue_delay_ms():
+    """Espera en la cola del worker de la petición actual, o None si el servidor no la anota."""
+    return getattr(_worker_queue, 'ms', None)
+
+
+def request_delay_ms(headers):
+    """Mayor espera conocida de la petición: en el proxy o en la cola del worker."""
+    delays = [d for d in (queue_delay_ms(headers), worker_queue_delay_ms()) if d is not None]
+    return max(delays) if delays else None
+
+
+def queue_delay_ms(headers, now=None):
+    """
+    Milisegundos que la petición lleva esperando desde que la recibió el proxy.
+
+    Acepta ``X-Request-Start`` en los formatos habituales: ``t=<segundos>``
+    (nginx ``$msec``), o un entero en milisegundos o microsegundos.
+
+    Returns:
+        float|None: Retraso en ms, o None si no hay cabecera válida
+    """
+    value = headers.get('X-Request-Start')
+    if not value:
+        return None
+    value = value.strip()
+    if value.startswith('t='):
+        value = value[2:]
+    try:
+        started = float(value)
+    except ValueError:
+        return None
+    now = time.time() if now is None else now
+    # Normalizar a segundos según la magnitud (s: ~1e9, ms: ~1e12, µs: ~1e15)
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    return max(0.0, (now - started) * 1000)
+
+
+class AdmissionPool:
+    """
+    Plazas de ejecución simultánea de un grupo de endpoints.
+
+    Args:
+        name (str): Nombre del grupo (etiqueta de las métricas)
+        concurrency (int): Plazas por worker
+        target_ms (float): Espera máxima por una plaza
+    """
+
+    def __init__(self, name, concurrency, target_ms=LOAD_SHED_TARGET_MS):
+        self.name = name
+        self.concurrency = concurrency
+        self.target_ms = target_ms
+        self._slots = threading.BoundedSemaphore(concurrency)
+
+    def acquire(self, upstream_delay_ms=None):
+        """
+        Intenta ocupar una plaza.
+
+        Returns:
+            str|None: None si se admite; si no, el motivo ('queue' o 'concurrency')
+        """
+        if upstream_delay_ms is not None and upstream_delay_ms > self.target_ms:
+            return 'queue'
+        budget = self.target_ms - (upstream_delay_ms or 0)
+        if not self._slots.acquire(timeout=max(budget, 0) / 1000):
+            return 'concurrency'
+        metrics_service.ADMISSION_IN_FLIGHT.labels(self.name).inc()
+        return None
+
+    def release(self):
+        metrics_service.ADMISSION_IN_FLIGHT.labels(self.name).dec()
+        self._slots.release()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(name):
+    """Grupo de admisión ``name`` (se crea al primer uso con la configuración de entorno)."""
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                concurrency = int(os.getenv(
+                    f"LOAD_SHED_{name.upper()}_CONCURRENCY", DEFAULT_CONCURRENCY.get(name, 4)
+                ))
+                pool = _pools[name] = AdmissionPool(name, concurrency)
+    return pool
+
+
+def shed_load(name):
+    """
+    Decorador de endpoint que limita las peticiones simultáneas del grupo ``name``.
+
+    La espera por una plaza bloquea (hasta LOAD_SHED_TARGET_MS): en el bucle
+    de eventos (asgi.py) se hace en un hilo.
+
+    Uso:
+        @auth_bp.route('/login', methods=['POST'])
+        @shed_load('bcrypt')
+        async def login(): ...
+    """
+    def decorator(f):
+        @wraps(f)
+        async def decorated(*args, **kwargs):
+            if not LOAD_SHED_ENABLED:
+                return await f(*args, **kwargs)
+            pool = get_pool(name)
+            reason = await offload(pool.acquire, request_delay_ms(request.headers))
+            if reason is not None:
+                return _overloaded(name, reason)
+            try:
+                return await f(*args, **kwargs)
+            finally:
+                pool.release()
+        return decorated
+    return decorator
+
+
+def _overloaded(name, reason):
+    metrics_service.load_shed(name, reason)
+    response = jsonify({'error': 'Servicio saturado. Inténtalo de nuevo en unos segundos'})
+    response.headers['Retry-After'] = str(LOAD_SHED_RETRY_AFTER)
+    return response, 503
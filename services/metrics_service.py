@@ -0,0 +1,225 @@
+"""
+Métricas de la aplicación en formato Prometheus (endpoint /metrics).
+
+Con varios workers (serve.py), cada proceso escribe sus valores en el
+directorio PROMETHEUS_MULTIPROC_DIR y /metrics los agrega todos, así que da
+igual qué worker atienda la petición del scraper. Sin esa variable las
+métricas son las del proceso actual.
+
+Métricas:
+- mhwiki_http_requests_total / mhwiki_http_request_duration_seconds: por endpoint
+- mhwiki_db_queries_per_request: consultas SQL por petición (config/query_stats.py)
+- mhwiki_db_pool_*: estado del pool de conexiones de cada motor
+- mhwiki_cache_requests_total: aciertos, fallos, valores caducados servidos
+  (stale) y esperas a un cálculo en curso (coalesced) de las cachés en memoria
+- mhwiki_bcrypt_in_flight / mhwiki_bcrypt_duration_seconds: cola de bcrypt
+- mhwiki_image_bytes_served_total: bytes de imágenes BYTEA servidos
+- mhwiki_jwt_decode_failures_total: tokens rechazados (caducados o inválidos)
+- mhwiki_rate_limited_total / mhwiki_load_shed_total: peticiones rechazadas con 429 / 503
+- mhwiki_admission_in_flight: peticiones en curso de cada grupo de endpoints caros
+"""
+
+import hmac
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from prometheus_client import multiprocess
+
+# Token opcional que debe enviar el scraper (Authorization: Bearer <token>)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+MULTIPROCESS = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUESTS = Counter(
+    'mhwiki_http_requests_total', 'Peticiones HTTP atendidas',
+    ['method', 'endpoint', 'status']
+)
+HTTP_LATENCY = Histogram(
+    'mhwiki_http_request_duration_seconds', 'Duración de las peticiones HTTP',
+    ['method', 'endpoint'], buckets=LATENCY_BUCKETS
+)
+DB_QUERIES = Histogram(
+    'mhwiki_db_queries_per_request', 'Sentencias SQL por petición',
+    ['endpoint'], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+)
+
+# Gauges del pool: con varios workers se suman los procesos vivos
+POOL_CHECKED_OUT = Gauge(
+    'mhwiki_db_pool_checked_out', 'Conexiones prestadas', ['pool'], multiprocess_mode='livesum'
+)
+POOL_IDLE = Gauge(
+    'mhwiki_db_pool_idle', 'Conexiones libres en el pool', ['pool'], multiprocess_mode='livesum'
+)
+POOL_OVERFLOW = Gauge(
+    'mhwiki_db_pool_overflow', 'Conexiones abiertas por encima de pool_size', ['pool'], multiprocess_mode='livesum'
+)
+# Contadores: se incrementan en cada checkout (config/pool.py) y, a diferencia
+# de los gauges, no pierden lo acumulado cuando un worker se recicla
+POOL_WAIT_SECONDS = Counter(
+    'mhwiki_db_pool_wait_seconds', 'Segundos acumulados esperando una conexión', ['pool']
+)
+POOL_CHECKOUT_ERRORS = Counter(
+    'mhwiki_db_pool_checkout_errors', 'Esperas por conexión que acabaron en error', ['pool']
+)
+
+CACHE_REQUESTS = Counter(
+    'mhwiki_cache_requests_total', 'Consultas a las cachés en memoria', ['cache', 'result']
+)
+
+BCRYPT_IN_FLIGHT = Gauge(
+    'mhwiki_bcrypt_in_flight', 'Operaciones bcrypt en curso', multiprocess_mode='livesum'
+)
+BCRYPT_DURATION = Histogram(
+    'mhwiki_bcrypt_duration_seconds', 'Duración de cada hash/verificación bcrypt', ['operation'],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0)
+)
+
+IMAGE_BYTES = Counter(
+    'mhwiki_image_bytes_served_total', 'Bytes de imágenes servidos desde la base de datos', ['kind']
+)
+
+JWT_FAILURES = Counter(
+    'mhwiki_jwt_decode_failures_total', 'Tokens JWT rechazados', ['reason']
+)
+
+RATE_LIMITED = Counter(
+    'mhwiki_rate_limited_total', 'Peticiones rechazadas por límite de peticiones (429)', ['rule', 'scope']
+)
+LOAD_SHED = Counter(
+    'mhwiki_load_shed_total', 'Peticiones rechazadas por saturación (503)', ['pool', 'reason']
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    'mhwiki_admission_in_flight', 'Peticiones en curso por grupo de endpoints caros', ['pool'],
+    multiprocess_mode='livesum'
+)
+
+SSE_SUBSCRIBERS = Gauge(
+    'mhwiki_sse_subscribers', 'Suscriptores conectados al flujo de cambios (SSE)', ['transport'],
+    multiprocess_mode='livesum'
+)
+SSE_DROPPED = Counter(
+    'mhwiki_sse_dropped_total', 'Suscriptores SSE desconectados por no consumir a tiempo'
+)
+
+JOBS_FINISHED = Counter(
+    'mhwiki_jobs_finished_total', 'Intentos de trabajos en segundo plano terminados', ['kind', 'outcome']
+)
+JOB_DURATION = Histogram(
+    'mhwiki_job_duration_seconds', 'Duración de cada intento de un trabajo en segundo plano', ['kind'],
+    buckets=LATENCY_BUCKETS + (30.0, 60.0, 300.0)
+)
+
+
+def observe_request(method, endpoint, status, seconds, queries=None):
+    """Registra una petición atendida."""
+    endpoint = endpoint or 'unmatched'
+    HTTP_REQUESTS.labels(method, endpoint, str(status)).inc()
+    HTTP_LATENCY.labels(method, endpoint).observe(seconds)
+    if queries is not None:
+        DB_QUERIES.labels(endpoint).observe(queries)
+
+
+def update_pool_gauges(stats):
+    """
+    Copia en los gauges el estado de los pools.
+
+    Args:
+        stats (dict): Resultado de ``config.database.pool_stats()``
+    """
+    pools = [('primary', stats['primary'])]
+    pools += [(f'replica_{i}', data) for i, data in enumerate(stats['replicas'])]
+    for name, data in pools:
+        POOL_CHECKED_OUT.labels(name).set(data.get('checked_out', 0))
+        POOL_IDLE.labels(name).set(data.get('idle', 0))
+        POOL_OVERFLOW.labels(name).set(data.get('overflow', 0))
+
+
+def pool_wait(pool, seconds, failed=False):
+    """Suma la espera de un checkout del pool (y el error si no consiguió conexión)."""
+    POOL_WAIT_SECONDS.labels(pool).inc(seconds)
+    if failed:
+        POOL_CHECKOUT_ERRORS.labels(pool).inc()
+
+
+def cache_lookup(cache, hit, result=None):
+    """Registra un acierto o fallo de caché (o un ``result`` concreto: 'stale', 'coalesced')."""
+    CACHE_REQUESTS.labels(cache, result or ('hit' if hit else 'miss')).inc()
+
+
+@contextmanager
+def track_bcrypt(operation):
+    """Cuenta una operación bcrypt en curso y mide su duración."""
+    BCRYPT_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        BCRYPT_IN_FLIGHT.dec()
+        BCRYPT_DURATION.labels(operation).observe(time.perf_counter() - start)
+
+
+def image_served(kind, size):
+    """Suma los bytes de una imagen enviada."""
+    IMAGE_BYTES.labels(kind).inc(size)
+
+
+def jwt_failure(reason):
+    """Registra un token rechazado ('expired' o 'invalid')."""
+    JWT_FAILURES.labels(reason).inc()
+
+
+def rate_limited(rule, scope):
+    """Registra una petición rechazada con 429 ('ip' o 'user')."""
+    RATE_LIMITED.labels(rule, scope).inc()
+
+
+def load_shed(pool, reason):
+    """Registra una petición rechazada con 503 ('queue' o 'concurrency')."""
+    LOAD_SHED.labels(pool, reason).inc()
+
+
+def job_finished(kind, outcome, seconds):
+    """Registra un intento de trabajo ('succeeded', 'retry', 'failed' o 'lost')."""
+    JOBS_FINISHED.labels(kind, outcome).inc()
+    JOB_DURATION.labels(kind).observe(seconds)
+
+
+def sse_dropped():
+    """Registra un suscriptor SSE expulsado por tener la cola llena."""
+    SSE_DROPPED.inc()
+
+
+def is_authorized(headers):
+    """Comprueba el token del scraper si METRICS_TOKEN está configurado."""
+    if not METRICS_TOKEN:
+        return True
+    # Comparación en tiempo constante: no revela cuántos caracteres coinciden
+    return hmac.compare_digest(
+        headers.get('Authorization', '').encode('utf-8'), f'Bearer {METRICS_TOKEN}'.encode('utf-8')
+    )
+
+
+def render_metrics():
+    """
+    Genera la exposición de texto de Prometheus.
+
+    Returns:
+        tuple: (cuerpo en bytes, content type)
+    """
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """Descarta los gauges de un worker que ha terminado (hook de Gunicorn)."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,308 @@
+"""
+Perfilador para administradores (endpoints /api/auth/profiler/...).
+
+Dos modos:
+- Por tiempo: un hilo muestrea cada pocos milisegundos las pilas de todos los
+  hilos del proceso durante N segundos y devuelve pilas colapsadas
+  (``marco;marco;marco cuenta``), listas para flamegraph.pl o speedscope.
+- Por peticiones: se arma una sesión que perfila las próximas N peticiones
+  cuya ruta empiece por un prefijo (o cuyo endpoint coincida). Genera pilas
+  colapsadas (muestreo de los hilos que atienden esas peticiones) o un
+  fichero ``.pstats`` (cProfile por petición, agregado).
+
+El perfilado es por proceso: con varios workers se perfila el que atiende la
+petición de arranque. Los resultados se guardan en PROFILER_DIR para que
+cualquier worker pueda devolverlos.
+"""
+
+import cProfile
+import os
+import pstats
+import re
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+PROFILER_DIR = os.getenv('PROFILER_DIR') or os.path.join(tempfile.gettempdir(), 'mhwiki-profiles')
+PROFILER_MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', '60'))
+PROFILER_MAX_REQUESTS = 1000
+DEFAULT_INTERVAL_MS = 5
+
+FORMATS = ('collapsed', 'pstats')
+_SESSION_ID = re.compile(r'^[0-9a-f]{16}$')
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(_PROJECT_ROOT):
+        filename = os.path.relpath(filename, _PROJECT_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _collapse(frame):
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class Sampler:
+    """
+    Hilo que muestrea periódicamente las pilas de otros hilos.
+
+    Args:
+        interval (float): Segundos entre muestras
+        threads (callable|None): Devuelve los idents de hilo a muestrear
+                                 (None = todos salvo el propio muestreador)
+    """
+
+    def __init__(self, interval, threads=None):
+        self.interval = interval
+        self.threads = threads
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            wanted = self.threads() if self.threads else None
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own or (wanted is not None and ident not in wanted):
+                    continue
+                self.stacks[_collapse(frame)] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+def render_collapsed(stacks):
+    """Pilas colapsadas en texto, de la más frecuente a la menos."""
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def _result_path(session_id, fmt):
+    return os.path.join(PROFILER_DIR, f"{session_id}.{fmt}")
+
+
+def _save_result(session_id, fmt, stacks=None, stats=None):
+    os.makedirs(PROFILER_DIR, exist_ok=True)
+    path = _result_path(session_id, fmt)
+    partial = f"{path}.tmp"
+    if fmt == 'pstats':
+        if stats is not None:
+            stats.dump_stats(partial)
+        else:
+            # Ninguna petición capturada: un perfil vacío sigue siendo válido
+            cProfile.Profile().dump_stats(partial)
+    else:
+        with open(partial, 'w', encoding='utf-8') as f:
+            f.write(render_collapsed(stacks or Counter()))
+    os.replace(partial, path)
+    return path
+
+
+def sample_for(seconds, interval_ms=DEFAULT_INTERVAL_MS):
+    """
+    Muestrea todos los hilos del proceso durante ``seconds`` (bloqueante).
+
+    Returns:
+        tuple: (pilas colapsadas en texto, número de muestras)
+    """
+    seconds = min(max(float(seconds), 0.1), PROFILER_MAX_SECONDS)
+    caller = threading.get_ident()
+    # El hilo que espera no aporta nada al perfil
+    others = lambda: {ident for ident in sys._current_frames() if ident != caller}
+    sampler = Sampler(max(interval_ms, 1) / 1000, others).start()
+    time.sleep(seconds)
+    stacks = sampler.stop()
+    return render_collapsed(stacks), sampler.samples
+
+
+class RequestSession:
+    """Sesión que perfila las próximas N peticiones que coinciden con ``route``."""
+
+    def __init__(self, route, requests, fmt, interval_ms, timeout):
+        self.id = secrets.token_hex(8)
+        self.route = route
+        self.requested = requests
+        self.format = fmt
+        self.captured = 0
+        self.active = 0
+        self.deadline = time.monotonic() + timeout
+        self.finished = False
+        self._lock = threading.Lock()
+        # Peticiones en curso por hilo: en asgi.py todas comparten el del bucle
+        self._watched = Counter()
+        self._stats = None
+        self._sampler = None
+        if fmt == 'collapsed':
+            self._sampler = Sampler(max(interval_ms, 1) / 1000, self.watched_threads).start()
+
+    def watched_threads(self):
+        with self._lock:
+            return set(self._watched)
+
+    def matches(self, path, endpoint):
+        return path.startswith(self.route) or endpoint == self.route
+
+    def begin(self):
+        """
+        Empieza a perfilar la petición actual.
+
+        Returns:
+            cProfile.Profile|None|bool: El perfil de la petición (None en modo
+            colapsado) o False si la sesión ya tiene suficientes peticiones
+        """
+        thread = threading.get_ident()
+        with self._lock:
+            if self.finished or self.captured + self.active >= self.requested:
+                return False
+            # cProfile perfila un hilo entero: con pstats, una petición por hilo a la vez
+            if self.format == 'pstats' and self._watched[thread]:
+                return False
+            self.active += 1
+            self._watched[thread] += 1
+        profile = None
+        if self.format == 'pstats':
+            profile = cProfile.Profile()
+            profile.enable()
+        return profile
+
+    def end(self, profile):
+        if profile is not None:
+            profile.disable()
+        thread = threading.get_ident()
+        with self._lock:
+            self._watched[thread] -= 1
+            if not self._watched[thread]:
+                del self._watched[thread]
+            self.active -= 1
+            self.captured += 1
+            if profile is not None:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+            done = self.captured >= self.requested
+        if done:
+            self.finish()
+
+    def expired(self):
+        return time.monotonic() > self.deadline
+
+    def finish(self):
+        """Cierra la sesión y guarda el resultado en PROFILER_DIR."""
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+        stacks = self._sampler.stop() if self._sampler else None
+        _save_result(self.id, self.format, stacks=stacks, stats=self._stats)
+
+    def to_json(self):
+        return {
+            'id': self.id,
+            'route': self.route,
+            'format': self.format,
+            'requests': self.requested,
+            'captured': self.captured,
+            'status': 'finished' if self.finished else 'running',
+        }
+
+
+_lock = threading.Lock()
+_session = None
+
+
+def start_request_session(route, requests, fmt='collapsed', interval_ms=DEFAULT_INTERVAL_MS,
+                          timeout=PROFILER_MAX_SECONDS * 5):
+    """
+    Arma una sesión de perfilado por peticiones en este proceso.
+
+    Raises:
+        ValueError: Si los parámetros no son válidos o ya hay una sesión activa
+    """
+    global _session
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato inválido. Use {' o '.join(FORMATS)}")
+    if not route:
+        raise ValueError("El campo 'route' es requerido")
+    requests = int(requests)
+    if not 1 <= requests <= PROFILER_MAX_REQUESTS:
+        raise ValueError(f"'requests' debe estar entre 1 y {PROFILER_MAX_REQUESTS}")
+    with _lock:
+        if _session is not None and not _session.finished:
+            if not _session.expired():
+                raise ValueError(f"Ya hay una sesión de perfilado activa ({_session.id})")
+            _session.finish()
+        _session = RequestSession(route, requests, fmt, interval_ms, timeout)
+        return _session
+
+
+def request_started(path, endpoint):
+    """
+    Hook de before_request. Casi gratis cuando no hay sesión armada.
+
+    Returns:
+        tuple|None: Handle para ``request_finished``
+    """
+    session = _session
+    if session is None or session.finished:
+        return None
+    if session.expired():
+        session.finish()
+        return None
+    if not session.matches(path, endpoint):
+        return None
+    profile = session.begin()
+    if profile is False:
+        return None
+    return session, profile
+
+
+def request_finished(handle):
+    """Hook de teardown_request."""
+    if handle is None:
+        return
+    session, profile = handle
+    session.end(profile)
+
+
+def get_session(session_id):
+    """Sesión en curso de este proceso (o None)."""
+    session = _session
+    return session if session is not None and session.id == session_id else None
+
+
+def find_result(session_id):
+    """
+    Busca el resultado guardado de una sesión.
+
+    Returns:
+        tuple: (ruta, formato) o (None, None) si no existe
+    """
+    if not _SESSION_ID.match(session_id or ''):
+        return None, None
+    for fmt in FORMATS:
+        path = _result_path(session_id, fmt)
+        if os.path.exists(path):
+            return path, fmt
+    return None, None
@@ -0,0 +1,312 @@
+"""
+Limitación de peticiones por token bucket, por IP y por usuario.
+
+Cada regla tiene un límite por IP y opcionalmente otro por usuario (el del
+token JWT o, en el login, el ``username`` enviado). Un límite "N/periodo"
+admite ráfagas de N peticiones y recarga N tokens por periodo. Las peticiones
+rechazadas reciben 429 con ``Retry-After``.
+
+Configuración (variables de entorno):
+- RATE_LIMIT_BACKEND: memory (por proceso) o database (tabla rate_limit_buckets,
+  compartida por todos los workers). serve.py usa database con varios workers.
+- RATE_LIMIT_LOCAL_RULES: reglas que siempre cuentan en memoria aunque el
+  backend sea database (por defecto images: cada GET de una imagen escribiría
+  en la primaria; el límite efectivo es el configurado × workers)
+- RATE_LIMIT_<REGLA>_IP / RATE_LIMIT_<REGLA>_USER: sustituyen el límite por
+  defecto de una regla ("20/minute", "5/hour"...; "off" lo desactiva)
+- RATE_LIMIT_TRUST_PROXY: 1 para tomar la IP del cliente de X-Forwarded-For
+- RATE_LIMIT_ENABLED: 0 desactiva toda la limitación
+
+Si el backend compartido falla, la petición se admite (se registra el error).
+
+``rate_limit`` decora las vistas compartidas por app.py y asgi.py (ver
+services/runtime.py), con las mismas reglas, backends y buckets.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import random
+import threading
+import time
+from functools import wraps
+from services import metrics_service
+from services.runtime import offload
+from services.web import get_json, jsonify, request
+
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', '1').lower() not in ('0', 'false', 'no')
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory').lower()
+RATE_LIMIT_TRUST_PROXY = os.getenv('RATE_LIMIT_TRUST_PROXY', '0').lower() in ('1', 'true', 'yes')
+RATE_LIMIT_LOCAL_RULES = {
+    rule.strip() for rule in os.getenv('RATE_LIMIT_LOCAL_RULES', 'images').split(',') if rule.strip()
+}
+
+# Límites por defecto de cada regla: (por IP, por usuario)
+DEFAULT_RULES = {
+    'login': ('20/minute', '5/minute'),
+    'register': ('10/hour', None),
+    'images': ('600/minute', None),
+}
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Los buckets inactivos más de un día ya estarían llenos: se pueden borrar
+IDLE_BUCKET_SECONDS = 86400
+PURGE_PROBABILITY = 0.001
+
+logger = logging.getLogger('mhwiki.rate_limit')
+
+
+class Limit:
+    """
+    Límite de un token bucket.
+
+    Args:
+        capacity (int): Tokens máximos (tamaño de ráfaga)
+        period (float): Segundos en los que se recargan ``capacity`` tokens
+    """
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+
+    def __repr__(self):
+        return f"<Limit {self.capacity}/{self.period}s>"
+
+
+def parse_limit(value):
+    """
+    Convierte "N/periodo" en un ``Limit``.
+
+    Returns:
+        Limit|None: None si el valor está vacío o es "off"
+
+    Raises:
+        ValueError: Si el formato no es válido
+    """
+    if value is None or value.strip().lower() in ('', 'off', 'none', '0'):
+        return None
+    count, _, period = value.strip().partition('/')
+    period = period.strip().lower().rstrip('s')
+    if not count.strip().isdigit() or period not in PERIODS or int(count) < 1:
+        raise ValueError(f"Límite inválido '{value}'. Use N/second, N/minute, N/hour o N/day")
+    return Limit(int(count), PERIODS[period])
+
+
+def get_rule(name):
+    """
+    Límites efectivos de una regla (los de entorno tienen prioridad).
+
+    Returns:
+        tuple: (Limit|None por IP, Limit|None por usuario)
+    """
+    default_ip, default_user = DEFAULT_RULES.get(name, (None, None))
+    prefix = f"RATE_LIMIT_{name.upper()}"
+    return (
+        parse_limit(os.getenv(f"{prefix}_IP", default_ip)),
+        parse_limit(os.getenv(f"{prefix}_USER", default_user)),
+    )
+
+
+class MemoryBackend:
+    """Buckets en memoria del proceso (cada worker cuenta por separado)."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, limit, now):
+        """
+        Returns:
+            tuple: (admitida, segundos hasta el siguiente token)
+        """
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - updated_at) * limit.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return False, (1 - tokens) / limit.rate
+            self._buckets[key] = (tokens - 1, now)
+            return True, 0.0
+
+    def purge_idle(self, older_than):
+        with self._lock:
+            for key in [k for k, (_, updated_at) in self._buckets.items() if updated_at < older_than]:
+                del self._buckets[key]
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class DatabaseBackend:
+    """Buckets en la tabla rate_limit_buckets, compartidos entre workers y nodos."""
+
+    def __init__(self):
+        from repositories.rate_limit_repository import RateLimitRepository
+        self.repo = RateLimitRepository()
+
+    def consume(self, key, limit, now):
+        if self.repo.consume(key, limit.capacity, limit.rate, now) is not None:
+            return True, 0.0
+        tokens = self.repo.available(key, limit.capacity, limit.rate, now)
+        return False, max(1 - tokens, 0) / limit.rate
+
+    def purge_idle(self, older_than):
+        self.repo.purge_idle(older_than)
+
+    def reset(self):
+        self.repo.purge_idle(float('inf'))
+
+
+BACKENDS = {'memory': MemoryBackend, 'database': DatabaseBackend}
+
+_backend = None
+_backend_lock = threading.Lock()
+# Backend de las reglas de RATE_LIMIT_LOCAL_RULES cuando el configurado es compartido
+_local_backend = MemoryBackend()
+
+
+def get_backend(rule=None):
+    """
+    Backend de ``rule``: el configurado en RATE_LIMIT_BACKEND (se crea al
+    primer uso) o, para las reglas de RATE_LIMIT_LOCAL_RULES, uno en memoria.
+    """
+    global _backend
+    if rule in RATE_LIMIT_LOCAL_RULES and RATE_LIMIT_BACKEND != 'memory':
+        return _local_backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if RATE_LIMIT_BACKEND not in BACKENDS:
+                    raise ValueError(
+                        f"RATE_LIMIT_BACKEND desconocido: '{RATE_LIMIT_BACKEND}'. Use {' o '.join(BACKENDS)}"
+                    )
+                _backend = BACKENDS[RATE_LIMIT_BACKEND]()
+    return _backend
+
+
+def set_backend(backend):
+    """Sustituye el backend (tests y configuración programática)."""
+    global _backend
+    _backend = backend
+
+
+def client_ip(req):
+    """IP del cliente; con RATE_LIMIT_TRUST_PROXY se usa el primer salto de X-Forwarded-For."""
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = req.headers.get('X-Forwarded-For', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return req.remote_addr or 'unknown'
+
+
+def user_identity(headers, data):
+    """
+    Identidad del usuario de la petición: el del token JWT si lo hay o, en
+    formularios de login, el ``username`` enviado.
+
+    Args:
+        headers: Cabeceras de la petición
+        data: Cuerpo JSON ya leído (o None)
+    """
+    from services import auth_service
+
+    token, error = auth_service.extract_token(headers)
+    if not error:
+        payload = auth_service.decode_token(token)
+        if payload:
+            return f"id:{payload['user_id']}"
+    if isinstance(data, dict) and isinstance(data.get('username'), str) and data['username'].strip():
+        return f"name:{data['username'].strip().lower()}"
+    return None
+
+
+def bucket_key(rule, scope, client):
+    """
+    Clave del bucket: la regla y el ámbito legibles y el cliente como hash.
+
+    El cliente puede venir del usuario (``username`` del login), así que se
+    resume con SHA-256: la clave tiene siempre la misma longitud y cabe en la
+    columna de rate_limit_buckets.
+    """
+    digest = hashlib.sha256(str(client).encode('utf-8')).hexdigest()
+    return f"{rule}:{scope}:{digest}"
+
+
+def check(rule, ip, user=None, now=None):
+    """
+    Consume un token de los buckets de ``rule`` para la IP y el usuario.
+
+    Returns:
+        tuple: (admitida, segundos de espera recomendados, ámbito que rechazó)
+    """
+    ip_limit, user_limit = get_rule(rule)
+    now = time.time() if now is None else now
+    backend = get_backend(rule)
+    scopes = [('ip', ip, ip_limit), ('user', user, user_limit)]
+
+    for scope, client, limit in scopes:
+        if limit is None or client is None:
+            continue
+        try:
+            allowed, retry_after = backend.consume(bucket_key(rule, scope, client), limit, now)
+        except Exception as e:
+            logger.error("Backend de rate limit no disponible (%s): se admite la petición", e)
+            return True, 0.0, None
+        if not allowed:
+            metrics_service.rate_limited(rule, scope)
+            return False, retry_after, scope
+
+    if random.random() < PURGE_PROBABILITY:
+        try:
+            backend.purge_idle(now - IDLE_BUCKET_SECONDS)
+        except Exception as e:
+            logger.warning("No se pudieron purgar los buckets inactivos: %s", e)
+    return True, 0.0, None
+
+
+def _rejection(rule, ip, user):
+    """Segundos de Retry-After si ``rule`` rechaza la petición, o None si se admite."""
+    allowed, retry_after, _ = check(rule, ip, user)
+    return None if allowed else max(1, math.ceil(retry_after))
+
+
+def _too_many_requests(seconds):
+    response = jsonify({'error': f'Demasiadas peticiones. Inténtalo de nuevo en {seconds} s'})
+    response.headers['Retry-After'] = str(seconds)
+    return response, 429
+
+
+def rate_limit(rule):
+    """
+    Decorador de endpoint que aplica la regla ``rule`` por IP y por usuario.
+
+    Con el backend database la comprobación escribe en la BD con el motor
+    síncrono: en el bucle de eventos (asgi.py) se hace en un hilo.
+
+    Uso:
+        @auth_bp.route('/login', methods=['POST'])
+        @rate_limit('login')
+        async def login(): ...
+    """
+    def decorator(f):
+        @wraps(f)
+        async def decorated(*args, **kwargs):
+            if RATE_LIMIT_ENABLED:
+                _, user_limit = get_rule(rule)
+                user = None
+                if user_limit is not None:
+                    user = user_identity(request.headers, await get_json(silent=True))
+                ip = client_ip(request)
+                if isinstance(get_backend(rule), MemoryBackend):
+                    seconds = _rejection(rule, ip, user)
+                else:
+                    seconds = await offload(_rejection, rule, ip, user)
+                if seconds is not None:
+                    return _too_many_requests(seconds)
+            return await f(*args, **kwargs)
+        return decorated
+    return decorator
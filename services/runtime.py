@@ -0,0 +1,103 @@
+"""
+Ejecución de los servicios compartidos por app.py (WSGI) y asgi.py (ASGI).
+
+Los servicios, los decoradores y las vistas se escriben una sola vez como
+corrutinas, y cada modo las ejecuta a su manera:
+
+- asgi.py (Quart): se esperan en el bucle de eventos, con los repositorios
+  asíncronos (AsyncEngine) y sin ocupar un hilo por petición.
+- app.py y worker.py: ``run_sync`` las ejecuta de principio a fin en el hilo
+  actual. Fuera del bucle de eventos los repositorios son los síncronos y
+  ``offload`` llama directamente, así que ningún ``await`` llega a
+  suspenderse.
+
+El modo se decide por llamada: hay bucle de eventos en marcha en este hilo o no.
+"""
+
+import asyncio
+import importlib
+
+
+def in_event_loop():
+    """True si el hilo actual está ejecutando un bucle de eventos (asgi.py)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def run_sync(awaitable):
+    """
+    Ejecuta hasta el final una corrutina de los servicios fuera del bucle de eventos.
+
+    Returns:
+        El valor que devuelve la corrutina
+
+    Raises:
+        RuntimeError: Si la corrutina se suspende (esperaba algo que sólo
+            existe dentro de un bucle de eventos)
+    """
+    coroutine = awaitable.__await__()
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    coroutine.close()
+    raise RuntimeError('La corrutina se suspendió fuera del bucle de eventos')
+
+
+async def offload(func, *args, **kwargs):
+    """
+    Ejecuta una función bloqueante (bcrypt, la cola de trabajos, ficheros...).
+
+    En el bucle de eventos va a un hilo para no bloquearlo; fuera de él se
+    llama directamente en el hilo de la petición.
+    """
+    if in_event_loop():
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return func(*args, **kwargs)
+
+
+class _AwaitableRepository:
+    """Repositorio síncrono con la interfaz del asíncrono: cada método devuelve una corrutina ya resuelta."""
+
+    def __init__(self, repository):
+        self._repository = repository
+
+    def __getattr__(self, name):
+        method = getattr(self._repository, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+
+class RepositoryPair:
+    """
+    Versión síncrona y asíncrona de un repositorio.
+
+    Llamar al par devuelve la que corresponde al modo actual: la asíncrona
+    dentro del bucle de eventos y la síncrona (con sus métodos esperables con
+    ``await``) fuera de él. La asíncrona se importa la primera vez que se
+    pide, así que sin asgi.py no hacen falta sus dependencias
+    (requirements-async.txt).
+
+    Args:
+        sync: Repositorio síncrono
+        async_path (str): Clase del asíncrono como ``'modulo:Clase'``
+    """
+
+    def __init__(self, sync, async_path):
+        self.sync = sync
+        self._awaitable = _AwaitableRepository(sync)
+        self._async_path = async_path
+        self._async = None
+
+    def __call__(self):
+        if not in_event_loop():
+            return self._awaitable
+        if self._async is None:
+            module, _, name = self._async_path.partition(':')
+            self._async = getattr(importlib.import_module(module), name)()
+        return self._async
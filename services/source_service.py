@@ -0,0 +1,65 @@
+"""
+Servicio de lectura del código fuente del proyecto (herramientas de admin).
+
+Compartido por los controladores síncrono (Flask) y asíncrono (ASGI).
+"""
+
+import os
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IGNORED_DIRS = ['.venv', '__pycache__', '.git', 'images']
+
+
+def read_source_file(file_path):
+    """
+    Lee un archivo del proyecto.
+    
+    Args:
+        file_path: Ruta relativa a la raíz del proyecto
+        
+    Returns:
+        tuple: (cuerpo_json, código_http)
+    """
+    full_path = os.path.join(PROJECT_ROOT, file_path)
+    
+    # Seguridad: evitar acceso fuera del proyecto
+    if not os.path.abspath(full_path).startswith(PROJECT_ROOT):
+        return {'error': 'Acceso denegado'}, 403
+    
+    if not os.path.exists(full_path):
+        return {'error': 'Archivo no encontrado'}, 404
+    
+    try:
+        with open(full_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        return {
+            'file_path': file_path,
+            'content': content,
+            'lines': len(content.split('\n')),
+            'size_bytes': len(content.encode('utf-8'))
+        }, 200
+        
+    except Exception as e:
+        return {'error': f'Error leyendo archivo: {str(e)}'}, 500
+
+
+def list_python_files():
+    """
+    Lista los archivos Python del proyecto.
+    
+    Returns:
+        list[str]: Rutas relativas ordenadas
+    """
+    python_files = []
+    
+    for root, dirs, files in os.walk(PROJECT_ROOT):
+        # Ignorar carpetas específicas
+        dirs[:] = [d for d in dirs if d not in IGNORED_DIRS]
+        
+        for file in files:
+            if file.endswith('.py'):
+                rel_path = os.path.relpath(os.path.join(root, file), PROJECT_ROOT)
+                python_files.append(rel_path)
+    
+    return sorted(python_files)
@@ -0,0 +1,56 @@
+"""
+Servicio de estadísticas de la wiki.
+
+Las estadísticas se leen de la tabla ``catalog_counters`` (mantenida en la
+transacción de cada alta/baja, ver models/stats_model.py) y se sirven desde una caché en memoria con un
+TTL corto, de modo que la página de inicio no provoca escaneos de tablas.
+"""
+
+import os
+from repositories.stats_repository import StatsRepository, CATEGORY_COUNTER_PREFIX
+from services.cache import TTLCache
+
+# Segundos que las estadísticas se sirven desde memoria
+STATS_CACHE_TTL = float(os.getenv('STATS_CACHE_TTL', '30'))
+
+stats_repo = StatsRepository()
+_cache = TTLCache(STATS_CACHE_TTL, name='stats')
+
+
+def _load_stats():
+    counters = stats_repo.get_all()
+    weapons_by_category = sorted(
+        (int(name[len(CATEGORY_COUNTER_PREFIX):]), value)
+        for name, value in counters.items()
+        if name.startswith(CATEGORY_COUNTER_PREFIX)
+    )
+    return {
+        'categories': counters.get('categories', 0),
+        'weapons': counters.get('weapons', 0),
+        'users': counters.get('users', 0),
+        'weapons_by_category': [
+            {'category_id': category_id, 'weapons': value}
+            for category_id, value in weapons_by_category
+        ]
+    }
+
+
+def get_stats():
+    """
+    Obtiene las estadísticas del catálogo (con caché).
+
+    Returns:
+        dict: Conteos de categorías, armas, usuarios y armas por categoría
+    """
+    return _cache.get_or_set('stats', _load_stats)
+
+
+def rebuild_stats():
+    """Recalcula los contadores desde las tablas e invalida la caché."""
+    stats_repo.rebuild()
+    _cache.invalidate()
+
+
+def invalidate_cache():
+    """Descarta las estadísticas en memoria; lo llaman las escrituras que cambian contadores."""
+    _cache.invalidate()
@@ -0,0 +1,312 @@
+"""
+Trazas distribuidas compatibles con OpenTelemetry.
+
+Cada petición abre un span SERVER que continúa la traza del cliente si llega
+una cabecera W3C ``traceparent``; dentro se anidan spans de cada capa:
+controlador (vista del blueprint), servicio, repositorio, sentencias SQL,
+bcrypt y envío de imágenes. El id de traza se devuelve en ``X-Trace-Id`` y se
+incluye en el log de la petición.
+
+Configuración (variables de entorno):
+- TRACING_EXPORTER: none (por defecto), console, file u otlp
+- TRACING_FILE: Fichero JSON Lines del exportador ``file`` (por defecto traces.jsonl)
+- TRACING_SAMPLE_RATIO: Fracción de trazas nuevas que se registran (por defecto 1)
+- OTEL_SERVICE_NAME: Nombre del servicio (por defecto mhwiki-api)
+- OTEL_EXPORTER_OTLP_ENDPOINT: Destino del exportador ``otlp`` (requiere
+  ``opentelemetry-exporter-otlp-proto-http``)
+
+Con TRACING_EXPORTER=none los decoradores solo comprueban una variable y
+llaman a la función original.
+"""
+
+import functools
+import inspect
+import json
+import os
+import threading
+
+from opentelemetry import context as otel_context
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor, SpanExporter, SpanExportResult
+)
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', 'none').lower()
+TRACING_FILE = os.getenv('TRACING_FILE', 'traces.jsonl')
+TRACING_SAMPLE_RATIO = float(os.getenv('TRACING_SAMPLE_RATIO', '1'))
+SERVICE_NAME = os.getenv('OTEL_SERVICE_NAME', 'mhwiki-api')
+
+# Longitud máxima de la sentencia SQL guardada en el span
+MAX_STATEMENT_LENGTH = 2000
+
+_propagator = TraceContextTextMapPropagator()
+_tracer = trace.NoOpTracer()
+_provider = None
+_enabled = False
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Exportador local: un span por línea en formato JSON (para uso sin conexión)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = [json.dumps(json.loads(span.to_json()), ensure_ascii=False) for span in spans]
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(f"{line}\n" for line in lines)
+        return SpanExportResult.SUCCESS
+
+
+def _otlp_exporter():
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError as e:
+        raise RuntimeError(
+            "TRACING_EXPORTER=otlp requiere 'pip install opentelemetry-exporter-otlp-proto-http'"
+        ) from e
+    return OTLPSpanExporter()
+
+
+# Exportadores disponibles: nombre -> (factoría, procesar en lote)
+EXPORTERS = {
+    'console': (ConsoleSpanExporter, False),
+    'file': (lambda: JsonLinesSpanExporter(TRACING_FILE), True),
+    'otlp': (_otlp_exporter, True),
+}
+
+
+def register_exporter(name, factory, batch=True):
+    """
+    Añade un exportador seleccionable con TRACING_EXPORTER.
+
+    Args:
+        name (str): Nombre del exportador
+        factory (callable): Devuelve una instancia de ``SpanExporter``
+        batch (bool): Exportar en segundo plano por lotes
+    """
+    EXPORTERS[name] = (factory, batch)
+
+
+def configure(exporter=None, batch=None, sample_ratio=TRACING_SAMPLE_RATIO):
+    """
+    Activa las trazas con el exportador indicado.
+
+    Args:
+        exporter (str|SpanExporter|None): Nombre registrado o instancia
+                                          (None = TRACING_EXPORTER)
+        batch (bool|None): Forzar procesado por lotes o síncrono
+        sample_ratio (float): Fracción de trazas nuevas registradas
+
+    Returns:
+        bool: True si las trazas quedan activas
+    """
+    global _tracer, _provider, _enabled
+    exporter = TRACING_EXPORTER if exporter is None else exporter
+    if exporter in ('', 'none'):
+        return False
+    if isinstance(exporter, str):
+        if exporter not in EXPORTERS:
+            raise ValueError(f"TRACING_EXPORTER desconocido: '{exporter}'. Use none, {', '.join(EXPORTERS)}")
+        factory, default_batch = EXPORTERS[exporter]
+        exporter = factory()
+    else:
+        default_batch = False
+
+    if _provider is not None:
+        _provider.shutdown()
+    _provider = TracerProvider(
+        resource=Resource.create({'service.name': SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(sample_ratio)),
+    )
+    use_batch = default_batch if batch is None else batch
+    _provider.add_span_processor(BatchSpanProcessor(exporter) if use_batch else SimpleSpanProcessor(exporter))
+    _tracer = _provider.get_tracer('mhwiki')
+    _enabled = True
+    return True
+
+
+def shutdown():
+    """Desactiva las trazas y vacía los spans pendientes."""
+    global _tracer, _provider, _enabled
+    _enabled = False
+    _tracer = trace.NoOpTracer()
+    if _provider is not None:
+        _provider.shutdown()
+        _provider = None
+
+
+def is_enabled():
+    return _enabled
+
+
+def span(name, layer=None, **attributes):
+    """
+    Context manager que abre un span hijo del actual.
+
+    Uso:
+        with tracing_service.span('bcrypt.hash', layer='crypto'):
+            ...
+    """
+    if layer is not None:
+        attributes['mhwiki.layer'] = layer
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+
+def traced(layer, name=None):
+    """
+    Decorador que envuelve una función (síncrona o async) en un span.
+
+    Args:
+        layer (str): Capa de la aplicación ('controller', 'service', 'repository'...)
+        name (str|None): Nombre del span (por defecto módulo.función)
+    """
+    def decorator(func):
+        span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+        attributes = {'mhwiki.layer': layer, 'code.function': func.__qualname__}
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await func(*args, **kwargs)
+                with _tracer.start_as_current_span(span_name, attributes=attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _tracer.start_as_current_span(span_name, attributes=attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def traced_methods(layer):
+    """Decorador de clase: envuelve en un span cada método público definido en ella."""
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if not attr.startswith('_') and inspect.isfunction(value):
+                setattr(cls, attr, traced(layer, f"{cls.__name__}.{attr}")(value))
+        return cls
+    return decorator
+
+
+def trace_views(app, blueprints):
+    """
+    Envuelve las vistas de los blueprints indicados en spans de la capa
+    'controller'. Llamar después de ``register_blueprint``.
+    """
+    prefixes = tuple(f"{bp}." for bp in blueprints)
+    for endpoint, view in list(app.view_functions.items()):
+        if endpoint.startswith(prefixes):
+            app.view_functions[endpoint] = traced('controller', endpoint)(view)
+
+
+def start_request(method, route, endpoint, path, headers):
+    """
+    Abre el span SERVER de una petición continuando la traza entrante.
+
+    Returns:
+        tuple|None: Handle para ``finish_request``
+    """
+    if not _enabled:
+        return None
+    parent = _propagator.extract(headers)
+    request_span = _tracer.start_span(
+        f"{method} {route or path}",
+        context=parent,
+        kind=SpanKind.SERVER,
+        attributes={
+            'http.request.method': method,
+            'url.path': path,
+            'http.route': route or '',
+            'code.function': endpoint or '',
+        },
+    )
+    token = otel_context.attach(trace.set_span_in_context(request_span, parent))
+    return request_span, token
+
+
+def finish_request(handle, status_code=None, exception=None):
+    """Cierra el span de la petición (hook de teardown)."""
+    if handle is None:
+        return
+    request_span, token = handle
+    if status_code is not None:
+        request_span.set_attribute('http.response.status_code', status_code)
+        if status_code >= 500:
+            request_span.set_status(Status(StatusCode.ERROR))
+    if exception is not None:
+        request_span.record_exception(exception)
+        request_span.set_status(Status(StatusCode.ERROR, str(exception)))
+    request_span.end()
+    otel_context.detach(token)
+
+
+def current_trace_id():
+    """Id de la traza actual en hexadecimal (o None si no se registra)."""
+    span_context = trace.get_current_span().get_span_context()
+    if not span_context.is_valid:
+        return None
+    return format(span_context.trace_id, '032x')
+
+
+def inject_headers(headers):
+    """Añade ``traceparent`` de la traza actual a un diccionario de cabeceras salientes."""
+    _propagator.inject(headers)
+    return headers
+
+
+def trace_queries(engine):
+    """Registra en ``engine`` un span CLIENT por cada sentencia SQL ejecutada."""
+    from sqlalchemy import event
+
+    system = engine.dialect.name
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _start_span(conn, cursor, statement, parameters, context, executemany):
+        if not _enabled or context is None:
+            return
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'SQL'
+        context._trace_span = _tracer.start_span(
+            f"{operation} {system}",
+            kind=SpanKind.CLIENT,
+            attributes={
+                'mhwiki.layer': 'sql',
+                'db.system': system,
+                'db.statement': statement[:MAX_STATEMENT_LENGTH],
+                'db.operation': operation,
+            },
+        )
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _end_span(conn, cursor, statement, parameters, context, executemany):
+        sql_span = getattr(context, '_trace_span', None)
+        if sql_span is not None:
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                sql_span.set_attribute('db.rowcount', cursor.rowcount)
+            sql_span.end()
+            context._trace_span = None
+
+    @event.listens_for(engine, 'handle_error')
+    def _fail_span(exception_context):
+        sql_span = getattr(exception_context.execution_context, '_trace_span', None)
+        if sql_span is not None:
+            error = exception_context.original_exception
+            sql_span.record_exception(error)
+            sql_span.set_status(Status(StatusCode.ERROR, str(error)))
+            sql_span.end()
+            exception_context.execution_context._trace_span = None
+
+
+# Activar el exportador configurado por entorno al importar
+configure()
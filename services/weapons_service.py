@@ -1,78 +1,448 @@
-﻿from repositories.weapon_category_repository import WeaponCategoryRepository
+﻿import os
+from repositories.weapon_category_repository import WeaponCategoryRepository
 from repositories.weapon_repository import WeaponRepository
+from sqlalchemy.exc import IntegrityError
+from config.database import is_primary_pinned, use_primary
+from sqlalchemy.orm.exc import StaleDataError
+from repositories.change_repository import ChangeRepository
+from repositories.lock_repository import LockRepository
+from services import stats_service
+from services.cache import AsyncPolledVersion, AsyncTTLCache, PolledVersion, TTLCache
+from services.runtime import RepositoryPair, in_event_loop, run_sync
+from services.tracing_service import traced
 
 category_repo = WeaponCategoryRepository()
 weapon_repo = WeaponRepository()
+category_repos = RepositoryPair(
+    category_repo, 'repositories.async_weapon_category_repository:AsyncWeaponCategoryRepository'
+)
+weapon_repos = RepositoryPair(weapon_repo, 'repositories.async_weapon_repository:AsyncWeaponRepository')
 
-def get_all_categories():
-    categories = category_repo.get_all()
-    return [cat.to_json() for cat in categories]
+# Máximo de ids en una búsqueda por lotes (?ids=...)
+BATCH_MAX_IDS = int(os.getenv('BATCH_MAX_IDS', '100'))
 
-def get_category_by_id(category_id):
-    category = category_repo.get_by_id(category_id)
-    return category.to_json() if category else None
+# Listados completos del catálogo en memoria (ver services/cache.py): las
+# peticiones simultáneas comparten una sola consulta y, al expirar, se sirve
+# el listado anterior mientras un hilo lo recalcula. Con
+# CATALOG_CACHE_ADVISORY_LOCK=1 sólo un worker a la vez lo recalcula.
+#
+# La entrada se compara con el último seq de catalog_changes, que se guarda
+# en memoria y se consulta como mucho cada CATALOG_CACHE_VERSION_CHECK_SECONDS
+# (o antes, si el broker SSE recibe un NOTIFY): las escrituras de otros
+# workers (o de worker.py) la descartan en ese plazo. Las peticiones fijadas a
+# la primaria tras escribir leen siempre ese seq de la primaria, así que nunca
+# reciben un listado anterior a su propia escritura.
+#
+# En el bucle de eventos (asgi.py) se usa una caché gemela con cargas,
+# versión y bloqueo asíncronos sobre el AsyncEngine (ver AsyncTTLCache); se
+# crea la primera vez que se pide un listado desde el bucle.
+CATALOG_CACHE_TTL = float(os.getenv('CATALOG_CACHE_TTL', '5'))
+CATALOG_CACHE_STALE_SECONDS = float(os.getenv('CATALOG_CACHE_STALE_SECONDS', '30'))
+CATALOG_CACHE_ADVISORY_LOCK = os.getenv('CATALOG_CACHE_ADVISORY_LOCK', '0').lower() in ('1', 'true', 'yes')
+CATALOG_CACHE_VERSION_CHECK_SECONDS = float(os.getenv('CATALOG_CACHE_VERSION_CHECK_SECONDS', '1'))
 
-def get_category_object(category_id):
-    """Obtiene el objeto de categoría completo (no JSON) - para imágenes BYTEA"""
-    return category_repo.get_by_id(category_id)
+_catalog_version = PolledVersion(
+    ChangeRepository().latest_seq, CATALOG_CACHE_VERSION_CHECK_SECONDS, bypass=is_primary_pinned
+)
+_catalog_cache = TTLCache(
+    CATALOG_CACHE_TTL, name='catalog', stale_ttl=CATALOG_CACHE_STALE_SECONDS,
+    lock=LockRepository().advisory_lock if CATALOG_CACHE_ADVISORY_LOCK else None,
+    version=_catalog_version
+)
+_async_catalog_version = None
+_async_catalog_cache = None
+
+def _catalog_cache_in_loop():
+    global _async_catalog_version, _async_catalog_cache
+    if _async_catalog_cache is None:
+        from repositories.async_change_repository import AsyncChangeRepository
+        from repositories.async_lock_repository import AsyncLockRepository
+        _async_catalog_version = AsyncPolledVersion(
+            AsyncChangeRepository().latest_seq, CATALOG_CACHE_VERSION_CHECK_SECONDS, bypass=is_primary_pinned
+        )
+        _async_catalog_cache = AsyncTTLCache(
+            CATALOG_CACHE_TTL, name='catalog', stale_ttl=CATALOG_CACHE_STALE_SECONDS,
+            lock=AsyncLockRepository().advisory_lock if CATALOG_CACHE_ADVISORY_LOCK else None,
+            version=_async_catalog_version
+        )
+    return _async_catalog_cache
+
+async def _cached(key, load):
+    """``load()`` (corrutina) a través de la caché del catálogo del modo actual."""
+    if in_event_loop():
+        return await _catalog_cache_in_loop().get_or_set(key, load)
+    return _catalog_cache.get_or_set(key, lambda: run_sync(load()))
+
+# Validaciones y serialización
 
-def create_category(data):
+def validate_category_data(data):
     if 'name' not in data or not data['name'].strip():
         raise ValueError("El campo 'name' es requerido")
-    if category_repo.exists_by_name(data['name']):
-        raise ValueError(f"Ya existe una categoría con el nombre '{data['name']}'")
-    category = category_repo.create(data)
-    return category.to_json()
 
-def update_category(category_id, data):
+def validate_weapon_data(data):
     if 'name' not in data or not data['name'].strip():
         raise ValueError("El campo 'name' es requerido")
-    category = category_repo.update(category_id, data)
+    if 'category_id' not in data:
+        raise ValueError("El campo 'category_id' es requerido")
+
+class CategoryNotFoundError(ValueError):
+    """La categoría referenciada no existe."""
+
+def category_not_found_error(category_id):
+    return CategoryNotFoundError(f"La categoría con ID '{category_id}' no existe")
+
+def duplicate_category_error(name):
+    return ValueError(f"Ya existe una categoría con el nombre '{name}'")
+
+def category_in_use_error(weapons_count):
+    return CategoryInUseError(f"No se puede eliminar la categoría porque tiene {weapons_count} arma(s) asociada(s)")
+
+class CategoryInUseError(ValueError):
+    """La clave foránea ON DELETE RESTRICT impide borrar una categoría con armas."""
+
+def _is_unique_violation(error):
+    orig = getattr(error, 'orig', None)
+    code = getattr(orig, 'pgcode', None) or getattr(orig, 'sqlstate', None)
+    return code == '23505' or 'UNIQUE constraint failed' in str(orig)
+
+def constraint_name(error):
+    """Restricción que rechazó la escritura (PostgreSQL), o el mensaje del driver."""
+    orig = getattr(error, 'orig', error)
+    return getattr(getattr(orig, 'diag', None), 'constraint_name', None) or str(orig).splitlines()[0]
+
+def category_write_error(error, changes):
+    """ValueError de un IntegrityError al escribir una categoría, según la restricción que falló."""
+    if _is_unique_violation(error) and changes.get('name') is not None:
+        return duplicate_category_error(changes['name'])
+    return ValueError(f"La categoría no cumple la restricción '{constraint_name(error)}'")
+
+class VersionConflictError(Exception):
+    """La fila cambió desde la versión que indicó el cliente (If-Match)."""
+
+# Columnas que acepta un PATCH
+CATEGORY_PATCH_FIELDS = ('name', 'description')
+WEAPON_PATCH_FIELDS = ('name', 'category_id', 'description')
+
+def validate_patch(data, fields):
+    """
+    Valida el cuerpo de un PATCH y devuelve sólo las columnas a cambiar.
+
+    Raises:
+        ValueError: Si está vacío, trae campos desconocidos o un nombre vacío
+    """
+    if not isinstance(data, dict) or not data:
+        raise ValueError(f"Indica al menos un campo a modificar: {', '.join(fields)}")
+    unknown = sorted(set(data) - set(fields))
+    if unknown:
+        raise ValueError(f"Campos no modificables: {', '.join(unknown)}")
+    if 'name' in data and (not isinstance(data['name'], str) or not data['name'].strip()):
+        raise ValueError("El campo 'name' no puede estar vacío")
+    if 'category_id' in data and (isinstance(data['category_id'], bool) or not isinstance(data['category_id'], int)):
+        raise ValueError("El campo 'category_id' debe ser un entero")
+    return {field: data[field] for field in fields if field in data}
+
+def validate_import_item(data):
+    """Valida un arma de una importación masiva (los datos no vienen de un formulario)."""
+    if not isinstance(data, dict):
+        raise ValueError("Cada arma debe ser un objeto JSON")
+    if not isinstance(data.get('name'), str) or not data['name'].strip():
+        raise ValueError("El campo 'name' es requerido")
+    if isinstance(data.get('category_id'), bool) or not isinstance(data.get('category_id'), int):
+        raise ValueError("El campo 'category_id' debe ser un entero")
+    if not isinstance(data.get('description', ''), str):
+        raise ValueError("El campo 'description' debe ser texto")
+
+def parse_ids(raw):
+    """
+    Valida el parámetro ``ids`` de las búsquedas por lotes ("3,1,7").
+
+    Returns:
+        list[int]: IDs en el orden pedido, sin duplicados
+
+    Raises:
+        ValueError: Si no son enteros, está vacío o supera BATCH_MAX_IDS
+    """
+    try:
+        ids = [int(part) for part in raw.split(',') if part.strip()]
+    except ValueError:
+        raise ValueError("El parámetro 'ids' debe ser una lista de enteros separados por comas")
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise ValueError("El parámetro 'ids' no puede estar vacío")
+    if len(ids) > BATCH_MAX_IDS:
+        raise ValueError(f"Como máximo se pueden pedir {BATCH_MAX_IDS} ids a la vez")
+    return ids
+
+def serialize_batch(ids, rows):
+    """
+    Resultado de una búsqueda por lotes en el orden pedido.
+
+    Returns:
+        dict: {'items': [to_json() de los que existen], 'missing': [ids que no existen]}
+    """
+    found = {row.id: row for row in rows}
+    return {
+        'items': [found[item_id].to_json() for item_id in ids if item_id in found],
+        'missing': [item_id for item_id in ids if item_id not in found],
+    }
+
+def serialize_categories(categories, counts=None):
+    if counts is None:
+        return [cat.to_json() for cat in categories]
+    return [dict(cat.to_json(), weapon_count=counts.get(cat.id, 0)) for cat in categories]
+
+async def _load_categories(with_counts):
+    categories = await category_repos().get_all()
+    counts = await weapon_repos().count_grouped_by_category() if with_counts else None
+    return serialize_categories(categories, counts)
+
+@traced('service')
+async def get_all_categories(with_counts=False):
+    """Listado de categorías desde la caché del catálogo (no modificar el resultado)."""
+    return await _cached(('categories', with_counts), lambda: _load_categories(with_counts))
+
+@traced('service')
+async def get_categories_by_ids(category_ids):
+    return serialize_batch(category_ids, await category_repos().get_by_ids(category_ids))
+
+@traced('service')
+async def get_category_by_id(category_id):
+    category = await category_repos().get_view(category_id)
     return category.to_json() if category else None
 
-def delete_category(category_id):
-    weapons_count = weapon_repo.count_by_category(category_id)
-    if weapons_count > 0:
-        raise ValueError(f"No se puede eliminar la categoría porque tiene {weapons_count} arma(s) asociada(s)")
-    return category_repo.delete(category_id)
+@traced('service')
+async def get_category_object(category_id):
+    """Obtiene el objeto de categoría completo (no JSON) - para imágenes BYTEA"""
+    return await category_repos().get_by_id(category_id)
 
-def get_all_weapons():
-    weapons = weapon_repo.get_all()
-    return [weapon.to_json() for weapon in weapons]
+@traced('service')
+async def create_category(data):
+    validate_category_data(data)
+    try:
+        category = await category_repos().create(data)
+    except IntegrityError as e:
+        # La restricción UNIQUE de weapon_categories.name detecta el duplicado
+        raise category_write_error(e, data) from e
+    invalidate_catalog_cache()
+    stats_service.invalidate_cache()
+    return category.to_json()
+
+@traced('service')
+async def update_category(category_id, data, expected_versions=None):
+    validate_category_data(data)
+    try:
+        row = await category_repos().update(category_id, data, expected_versions)
+    except StaleDataError as e:
+        raise VersionConflictError(str(e)) from e
+    except IntegrityError as e:
+        raise category_write_error(e, data) from e
+    if row is None:
+        return None
+    invalidate_catalog_cache()
+    return row.to_json()
+
+@traced('service')
+async def patch_category(category_id, data, expected_versions=None):
+    """Modifica sólo los campos enviados; la unicidad del nombre la garantiza la BD."""
+    changes = validate_patch(data, CATEGORY_PATCH_FIELDS)
+    try:
+        row = await category_repos().patch(category_id, changes, expected_versions)
+    except StaleDataError as e:
+        raise VersionConflictError(str(e)) from e
+    except IntegrityError as e:
+        raise category_write_error(e, changes) from e
+    if row is None:
+        return None
+    invalidate_catalog_cache()
+    return row.to_json()
+
+@traced('service')
+async def delete_category(category_id):
+    """Borra la categoría; la clave foránea ON DELETE RESTRICT impide borrarla si tiene armas."""
+    try:
+        deleted = await category_repos().delete(category_id)
+    except IntegrityError as e:
+        # Sólo en el caso de error se cuentan las armas para el mensaje
+        raise category_in_use_error(await weapon_repos().count_by_category(category_id)) from e
+    if deleted:
+        invalidate_catalog_cache()
+        stats_service.invalidate_cache()
+    return deleted
+
+@traced('service')
+async def get_categories_version(with_counts=False):
+    """Validadores de /categories sin cargar las filas: (cantidad, última modificación, extra)."""
+    count, newest = await category_repos().collection_version()
+    extra = await weapon_repos().count_grouped_by_category() if with_counts else None
+    return count, newest, extra
+
+@traced('service')
+async def get_category_version(category_id):
+    return await category_repos().get_version(category_id)
+
+@traced('service')
+async def get_weapons_version(category_id=None):
+    return await weapon_repos().collection_version(category_id)
+
+@traced('service')
+async def get_weapon_version(weapon_id):
+    return await weapon_repos().get_version(weapon_id)
+
+async def _load_weapons():
+    return [weapon.to_json() for weapon in await weapon_repos().get_all()]
 
-def get_weapon_by_id(weapon_id):
-    weapon = weapon_repo.get_by_id(weapon_id)
+@traced('service')
+async def get_all_weapons():
+    """Listado de armas desde la caché del catálogo (no modificar el resultado)."""
+    return await _cached('weapons', _load_weapons)
+
+def invalidate_catalog_cache():
+    """Descarta los listados en caché; lo llaman todas las escrituras del catálogo."""
+    _catalog_version.expire()
+    _catalog_cache.invalidate()
+    if _async_catalog_cache is not None:
+        _async_catalog_version.expire()
+        _async_catalog_cache.invalidate()
+
+def catalog_changed():
+    """Otro proceso escribió en el catálogo: la próxima consulta relee el último seq."""
+    _catalog_version.expire()
+    if _async_catalog_version is not None:
+        _async_catalog_version.expire()
+
+@traced('service')
+async def get_weapons_by_ids(weapon_ids):
+    return serialize_batch(weapon_ids, await weapon_repos().get_by_ids(weapon_ids))
+
+@traced('service')
+async def get_weapon_by_id(weapon_id):
+    weapon = await weapon_repos().get_view(weapon_id)
     return weapon.to_json() if weapon else None
 
-def get_weapon_object(weapon_id):
+@traced('service')
+async def get_weapon_object(weapon_id):
     """Obtiene el objeto de arma completo (no JSON) - para imágenes BYTEA"""
-    return weapon_repo.get_by_id(weapon_id)
+    return await weapon_repos().get_by_id(weapon_id)
 
-def get_weapons_by_category(category_id):
-    weapons = weapon_repo.get_by_category(category_id)
+@traced('service')
+async def get_weapons_by_category(category_id):
+    weapons = await weapon_repos().get_by_category(category_id)
     return [weapon.to_json() for weapon in weapons]
 
-def create_weapon(data):
-    if 'name' not in data or not data['name'].strip():
-        raise ValueError("El campo 'name' es requerido")
-    if 'category_id' not in data:
-        raise ValueError("El campo 'category_id' es requerido")
-    category = category_repo.get_by_id(data['category_id'])
-    if not category:
-        raise ValueError(f"La categoría con ID '{data['category_id']}' no existe")
-    weapon = weapon_repo.create(data)
+@traced('service')
+async def create_weapon(data):
+    """Crea un arma; la categoría la valida la clave foránea."""
+    validate_weapon_data(data)
+    try:
+        weapon = await weapon_repos().create(data)
+    except IntegrityError as e:
+        raise category_not_found_error(data['category_id']) from e
+    invalidate_catalog_cache()
+    stats_service.invalidate_cache()
     return weapon.to_json()
 
-def update_weapon(weapon_id, data):
-    if 'name' not in data or not data['name'].strip():
-        raise ValueError("El campo 'name' es requerido")
-    if 'category_id' not in data:
-        raise ValueError("El campo 'category_id' es requerido")
-    category = category_repo.get_by_id(data['category_id'])
-    if not category:
-        raise ValueError(f"La categoría con ID '{data['category_id']}' no existe")
-    weapon = weapon_repo.update(weapon_id, data)
-    return weapon.to_json() if weapon else None
+@traced('service')
+def import_weapons(items, complete=None):
+    """
+    Crea varias armas de una vez; las inválidas se omiten y se informan.
+
+    Síncrona: sólo la ejecuta worker.py (ver services/jobs_service.py).
+
+    Las válidas se insertan en una sola transacción: si falla la escritura no
+    queda ninguna a medias y la importación se puede repetir.
+
+    Args:
+        items (list[dict]): Datos de cada arma
+        complete (callable|None): Recibe el resultado y devuelve la sentencia
+            que cierra el trabajo de importación, que se confirma junto con
+            las armas (ver WeaponRepository.create_many)
+
+    Returns:
+        dict|None: {'created': [ids creados], 'errors': [{'index', 'error'}]};
+        None si ``complete`` no afectó a ninguna fila y no se creó nada
+    """
+    valid, errors = [], []
+    for index, data in enumerate(items):
+        try:
+            validate_import_item(data)
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+            continue
+        valid.append((index, data))
+
+    # De la primaria: una categoría recién creada puede no haber llegado aún a la réplica
+    with use_primary():
+        existing = {category.id for category in category_repo.get_by_ids({data['category_id'] for _, data in valid})}
+    rows = []
+    for index, data in valid:
+        if data['category_id'] in existing:
+            rows.append(data)
+        else:
+            errors.append({'index': index, 'error': str(category_not_found_error(data['category_id']))})
+    errors.sort(key=lambda e: e['index'])
+
+    def result(weapons):
+        return {'created': [weapon.id for weapon in weapons], 'errors': errors}
+
+    finish = (lambda weapons: complete(result(weapons))) if complete else None
+    weapons = weapon_repo.create_many(rows, finish) if rows else []
+    if weapons is None:
+        return None
+    if weapons:
+        invalidate_catalog_cache()
+        stats_service.invalidate_cache()
+    return result(weapons)
+
+
+@traced('service')
+def set_weapon_image(weapon_id, image_data, mime_type):
+    """Guarda la imagen (ya procesada) de un arma; False si el arma no existe."""
+    weapon = weapon_repo.set_image(weapon_id, image_data, mime_type)
+    if weapon is None:
+        return False
+    invalidate_catalog_cache()
+    return True
+
+@traced('service')
+async def update_weapon(weapon_id, data, expected_versions=None):
+    """Actualización completa; la categoría la valida la clave foránea."""
+    validate_weapon_data(data)
+    try:
+        result = await weapon_repos().update(weapon_id, data, expected_versions)
+    except StaleDataError as e:
+        raise VersionConflictError(str(e)) from e
+    except IntegrityError as e:
+        raise category_not_found_error(data['category_id']) from e
+    if result is None:
+        return None
+    row, previous_category_id = result
+    invalidate_catalog_cache()
+    if previous_category_id != row.category_id:
+        stats_service.invalidate_cache()
+    return row.to_json()
+
+@traced('service')
+async def patch_weapon(weapon_id, data, expected_versions=None):
+    """Modifica sólo los campos enviados; la categoría la valida la clave foránea."""
+    changes = validate_patch(data, WEAPON_PATCH_FIELDS)
+    try:
+        result = await weapon_repos().patch(weapon_id, changes, expected_versions)
+    except StaleDataError as e:
+        raise VersionConflictError(str(e)) from e
+    except IntegrityError as e:
+        raise category_not_found_error(changes.get('category_id')) from e
+    if result is None:
+        return None
+    row, previous_category_id = result
+    invalidate_catalog_cache()
+    if 'category_id' in changes and previous_category_id != row.category_id:
+        stats_service.invalidate_cache()
+    return row.to_json()
 
-def delete_weapon(weapon_id):
-    return weapon_repo.delete(weapon_id)
+@traced('service')
+async def delete_weapon(weapon_id):
+    weapon = await weapon_repos().delete(weapon_id)
+    if weapon:
+        invalidate_catalog_cache()
+        stats_service.invalidate_cache()
+    return weapon is not None
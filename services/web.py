@@ -0,0 +1,130 @@
+"""
+Piezas de Flask / Quart que usan las vistas compartidas por app.py y asgi.py.
+
+Los blueprints de controllers/ son de Flask, pero sus vistas y hooks son
+corrutinas y no importan ``flask`` directamente, sino ``request``, ``g``,
+``jsonify``... de aquí, que resuelven al framework de la petición en curso:
+
+- app.py usa ``SyncFlask``, que ejecuta las vistas ``async def`` en el hilo
+  de la petición con ``services.runtime.run_sync`` (sin bucle de eventos).
+- asgi.py registra los mismos blueprints en Quart, que las espera en su bucle.
+
+Quart sólo se importa si hay una petición de Quart en curso.
+"""
+
+import functools
+from io import BytesIO
+import flask
+from werkzeug.local import LocalProxy
+from services.runtime import run_sync
+
+
+class SyncFlask(flask.Flask):
+    """Flask que ejecuta las vistas y hooks asíncronos en el propio hilo de la petición."""
+
+    def async_to_sync(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return run_sync(func(*args, **kwargs))
+        return wrapper
+
+
+def _quart():
+    import quart
+    return quart
+
+
+def _framework():
+    return flask if flask.has_app_context() else _quart()
+
+
+request = LocalProxy(lambda: _framework().request)
+g = LocalProxy(lambda: _framework().g)
+current_app = LocalProxy(lambda: _framework().current_app)
+
+
+def is_flask():
+    """True si la petición en curso la atiende Flask (app.py)."""
+    return flask.has_app_context()
+
+
+def jsonify(*args, **kwargs):
+    return _framework().jsonify(*args, **kwargs)
+
+
+def response(*args, **kwargs):
+    """Respuesta de la clase del framework (``Response(body, status, headers, mimetype...)``)."""
+    return current_app.response_class(*args, **kwargs)
+
+
+async def get_json(silent=False):
+    """Cuerpo JSON de la petición (``request.get_json``)."""
+    if is_flask():
+        return flask.request.get_json(silent=silent)
+    return await _quart().request.get_json(silent=silent)
+
+
+async def read_body(limit):
+    """
+    Cuerpo en bruto de la petición, sin leer más de ``limit`` + 1 bytes.
+
+    Sirve también para las subidas sin Content-Length (chunked): en cuanto se
+    pasa del límite se deja de leer.
+
+    Returns:
+        bytes|None: El cuerpo, o None si supera ``limit``
+    """
+    chunks, size = [], 0
+    if is_flask():
+        while size <= limit:
+            chunk = flask.request.stream.read(min(64 * 1024, limit + 1 - size))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+    else:
+        async for chunk in _quart().request.body:
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > limit:
+                break
+    return None if size > limit else b''.join(chunks)
+
+
+async def send_file(path_or_data, mimetype, as_attachment=False, download_name=None):
+    """
+    Envía un fichero (ruta) o unos bytes.
+
+    Args:
+        path_or_data (str|bytes): Ruta del fichero o su contenido
+        mimetype (str): Tipo MIME
+        as_attachment (bool): Descargar en lugar de mostrar
+        download_name (str|None): Nombre del fichero para el navegador
+    """
+    source = BytesIO(path_or_data) if isinstance(path_or_data, bytes) else path_or_data
+    if is_flask():
+        return flask.send_file(source, mimetype=mimetype, as_attachment=as_attachment, download_name=download_name)
+    return await _quart().send_file(
+        source, mimetype=mimetype, as_attachment=as_attachment, attachment_filename=download_name
+    )
+
+
+async def render_template(name, **context):
+    if is_flask():
+        return flask.render_template(name, **context)
+    return await _quart().render_template(name, **context)
+
+
+def event_stream(body, headers=None):
+    """
+    Respuesta ``text/event-stream`` sin límite de duración.
+
+    Args:
+        body: Generador (Flask) o generador asíncrono (Quart) con los mensajes
+        headers (dict|None): Cabeceras adicionales
+    """
+    stream = response(body, mimetype='text/event-stream', headers=headers)
+    if not is_flask():
+        # Sin el límite de duración de respuesta de Quart: el flujo es indefinido
+        stream.timeout = None
+    return stream
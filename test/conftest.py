@@ -0,0 +1,181 @@
+"""
+Configuración común de pytest.
+
+Las pruebas usan una base de datos SQLite temporal en lugar de la primaria
+configurada en .env, para no tocar nunca datos reales.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_TEST_DIR = tempfile.mkdtemp(prefix='mhwiki-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}"
+os.environ.setdefault('DBREPLICA_HOSTS', '')
+
+
+@pytest.fixture(autouse=True)
+def fresh_catalog_cache():
+    """Los fixtures escriben directamente en la BD: cada test empieza sin listados en caché."""
+    from services import weapons_service
+    weapons_service.invalidate_catalog_cache()
+
+
+def clear_catalog():
+    """Vacía las tablas que escriben los tests de la API (las armas antes que sus categorías)."""
+    from sqlalchemy import delete
+    from config.database import engine
+    from models.change_model import CatalogChange
+    from models.job_model import Job
+    from models.stats_model import CatalogCounter
+    from models.user_model import User
+    from models.weapons_model import Weapon, WeaponCategory
+
+    with engine.begin() as conn:
+        for table in (Weapon, WeaponCategory, CatalogCounter, CatalogChange, Job, User):
+            conn.execute(delete(table))
+
+
+@pytest.fixture
+def catalog_db():
+    """
+    BD de pruebas con el esquema creado y las tablas vacías (también al terminar).
+
+    Devuelve una función para insertar las filas de partida:
+
+        def client(catalog_db):
+            catalog_db(categories=[{'id': 1, 'name': 'Lance'}])
+            from app import app
+            return app.test_client()
+    """
+    from sqlalchemy import insert
+    from config.database import engine, init_db
+    from models.user_model import User
+    from models.weapons_model import Weapon, WeaponCategory
+
+    init_db()
+    clear_catalog()
+
+    def seed(categories=(), weapons=(), users=()):
+        with engine.begin() as conn:
+            for model, rows in ((WeaponCategory, categories), (Weapon, weapons), (User, users)):
+                if rows:
+                    conn.execute(insert(model), list(rows))
+
+    yield seed
+    clear_catalog()
+
+
+# =============================================================================
+# MICRO-BENCHMARKS
+# =============================================================================
+#
+# El fixture ``microbench`` mide el coste por llamada de una función (mínimo
+# de varias rondas) y lo normaliza con un bucle de referencia en Python puro,
+# para que los umbrales valgan en máquinas de distinta velocidad. Cada
+# benchmark falla si su coste normalizado supera BENCHMARK_MAX_RATIO (2 por
+# defecto) veces la línea base de test/benchmark_baseline.json.
+#
+#   pytest test -m benchmark                      # sólo los benchmarks
+#   pytest test -m "not benchmark"                # todo menos los benchmarks
+#   pytest test -m benchmark --benchmark-update   # regenerar la línea base
+
+BENCHMARK_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+BENCHMARK_MAX_RATIO = float(os.getenv('BENCHMARK_MAX_RATIO', '2.0'))
+
+_measured = {}
+
+
+def pytest_addoption(parser):
+    parser.addoption('--benchmark-update', action='store_true',
+                     help='Guarda los costes medidos como nueva línea base de los benchmarks')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: micro-benchmark con umbral de regresión')
+
+
+def _load_baseline():
+    if not os.path.exists(BENCHMARK_BASELINE):
+        return {}
+    with open(BENCHMARK_BASELINE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _reference_workload():
+    data = {}
+    for i in range(20000):
+        data[i % 512] = data.get(i % 512, 0) + i * 3
+    return sorted(data.values())
+
+
+def _min_seconds_per_call(func, min_time, rounds):
+    # Ajustar las iteraciones para que cada ronda dure al menos min_time
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or iterations >= 1_000_000:
+            break
+        iterations *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    best = elapsed / iterations
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, (time.perf_counter() - start) / iterations)
+    return best
+
+
+@pytest.fixture(scope='session')
+def benchmark_reference():
+    """Coste (segundos) del bucle de referencia en esta máquina."""
+    return _min_seconds_per_call(_reference_workload, min_time=0.05, rounds=5)
+
+
+@pytest.fixture
+def microbench(request, benchmark_reference):
+    """
+    Mide ``func`` y lo compara con la línea base.
+
+    Usage:
+        def test_algo(microbench):
+            microbench('nombre', lambda: funcion(args))
+    """
+    update = request.config.getoption('--benchmark-update')
+    baseline = _load_baseline()
+
+    def run(name, func, min_time=0.05, rounds=5):
+        seconds = _min_seconds_per_call(func, min_time, rounds)
+        normalized = seconds / benchmark_reference
+        _measured[name] = float(f'{normalized:.4g}')
+        if update:
+            return normalized
+        if name not in baseline:
+            pytest.skip(f"Sin línea base para '{name}': ejecuta pytest con --benchmark-update")
+        limit = baseline[name] * BENCHMARK_MAX_RATIO
+        assert normalized <= limit, (
+            f"{name}: {seconds * 1e6:.1f} µs/llamada = {normalized:.4f} unidades de referencia, "
+            f"más de {BENCHMARK_MAX_RATIO:g}× la línea base ({baseline[name]:.4f})"
+        )
+        return normalized
+
+    return run
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not session.config.getoption('--benchmark-update') or not _measured:
+        return
+    baseline = _load_baseline()
+    baseline.update(_measured)
+    with open(BENCHMARK_BASELINE, 'w', encoding='utf-8') as f:
+        json.dump(dict(sorted(baseline.items())), f, indent=2)
+        f.write('\n')
@@ -0,0 +1,130 @@
+"""
+Tests del modo asíncrono (asgi.py) frente a las piezas que comparte con app.py.
+"""
+
+import asyncio
+import sys
+
+import pytest
+
+pytest.importorskip('quart')
+pytest.importorskip('aiosqlite')
+
+from services import rate_limit_service, weapons_service
+from services.rate_limit_service import MemoryBackend
+from services.runtime import run_sync
+
+
+def _import_asgi():
+    import config.database
+
+    def fail():
+        raise AssertionError('init_db al importar asgi.py')
+
+    # Importar el módulo no debe tocar la base de datos
+    sys.modules.pop('asgi', None)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(config.database, 'init_db', fail)
+        import asgi
+    # asgi.py importó el sustituto: el arranque usa el real
+    asgi.init_db = config.database.init_db
+    return asgi
+
+
+def _run(asgi, scenario):
+    async def serve():
+        async with asgi.app.test_app() as test_app:
+            return await scenario(test_app.test_client())
+    return asyncio.run(serve())
+
+
+def test_writes_share_cache_and_change_log(catalog_db, monkeypatch):
+    asgi = _import_asgi()
+    catalog_db(categories=[{'id': 1, 'name': 'Bow'}])
+    from models.change_model import CatalogChange
+    from config.database import SessionLocal
+
+    async def scenario(client):
+        before = await (await client.get('/api/weapons')).get_json()
+        created = await client.post('/api/weapons', json={'name': 'Hunter Bow', 'category_id': 1})
+        missing = await client.post('/api/weapons', json={'name': 'Lost Bow', 'category_id': 99})
+        after = await (await client.get('/api/weapons')).get_json()
+        return before, created.status_code, missing.status_code, after
+
+    before, created, missing, after = _run(asgi, scenario)
+    assert (before, created, missing) == ([], 201, 404)
+    # El listado sale de la caché de app.py y la escritura asíncrona la invalida
+    assert [weapon['name'] for weapon in after] == ['Hunter Bow']
+    assert run_sync(weapons_service.get_all_weapons()) == after
+    with SessionLocal() as db:
+        assert [(c.entity, c.op) for c in db.query(CatalogChange)] == [('weapon', 'insert')]
+
+
+def test_login_is_rate_limited(catalog_db, monkeypatch):
+    asgi = _import_asgi()
+    monkeypatch.setenv('RATE_LIMIT_LOGIN_IP', '2/minute')
+    monkeypatch.setattr(rate_limit_service, 'RATE_LIMIT_ENABLED', True)
+    rate_limit_service.set_backend(MemoryBackend())
+
+    async def scenario(client):
+        responses = [await client.post('/api/auth/login', json={'username': 'nadie', 'password': 'x'})
+                     for _ in range(3)]
+        return [(r.status_code, r.headers.get('Retry-After')) for r in responses]
+
+    try:
+        statuses = _run(asgi, scenario)
+    finally:
+        rate_limit_service.set_backend(None)
+    assert [status for status, _ in statuses] == [401, 401, 429]
+    assert statuses[2][1] == '30'
+
+
+def test_conditional_requests_patch_and_changes(catalog_db):
+    asgi = _import_asgi()
+    catalog_db(categories=[{'id': 1, 'name': 'Bow'}, {'id': 2, 'name': 'Lance'}],
+               weapons=[{'id': 1, 'name': 'Hunter Bow', 'category_id': 1}])
+    from services import stats_service
+    stats_service.rebuild_stats()
+
+    async def scenario(client):
+        first = await client.get('/api/weapons/1')
+        etag = first.headers['ETag']
+        cached = await client.get('/api/weapons/1', headers={'If-None-Match': etag})
+        stale = await client.patch('/api/weapons/1', headers={'If-Match': 'W/"99"'}, json={'name': 'Old'})
+        patched = await client.patch('/api/weapons/1', headers={'If-Match': etag}, json={'category_id': 2})
+        put = await client.put('/api/weapons/1', headers={'If-Match': etag},
+                               json={'name': 'Again', 'category_id': 1})
+        deleted = await client.delete('/api/weapons/1')
+        changes = await (await client.get('/api/changes?since=0')).get_json()
+        return first, cached, stale, patched, put, deleted, changes
+
+    first, cached, stale, patched, put, deleted, changes = _run(asgi, scenario)
+    assert first.status_code == 200 and 'queries=' in first.headers['Server-Timing']
+    assert cached.status_code == 304
+    assert (stale.status_code, put.status_code) == (412, 412)
+    assert patched.status_code == 200 and patched.headers['ETag'] == 'W/"2"'
+    assert deleted.status_code == 200
+    assert [(c['entity'], c['op'], c['version']) for c in changes['changes']] == [
+        ('weapon', 'update', 2), ('weapon', 'delete', 2)
+    ]
+    # Los contadores se actualizan en la misma transacción que el UPDATE / DELETE
+    stats_service.invalidate_cache()
+    assert stats_service.get_stats()['weapons'] == 0
+
+
+def test_jobs_and_pages(catalog_db):
+    asgi = _import_asgi()
+    from models.user_model import UserRole
+    from services import auth_service
+    catalog_db(users=[{'id': 1, 'username': 'admin', 'email': 'admin@example.com',
+                       'password_hash': 'x', 'role': UserRole.ADMIN}])
+    admin = {'Authorization': f"Bearer {auth_service.generate_token(1, 'admin', UserRole.ADMIN.value)}"}
+
+    async def scenario(client):
+        queued = await client.post('/api/jobs', headers=admin, json={'kind': 'stats.rebuild'})
+        status = await client.get(queued.headers['Location'], headers=admin)
+        page = await client.get('/weapons')
+        health = await (await client.get('/health')).get_json()
+        return queued.status_code, status.status_code, page.status_code, health['mode']
+
+    assert _run(asgi, scenario) == (202, 202, 200, 'asgi')
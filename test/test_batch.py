@@ -0,0 +1,52 @@
+"""
+Tests de las búsquedas por lotes (GET /api/weapons?ids=... y /api/categories?ids=...).
+"""
+
+import pytest
+
+from config.query_stats import track_queries
+from services import weapons_service
+
+
+@pytest.fixture
+def client(catalog_db):
+    catalog_db(
+        categories=[{'id': 1, 'name': 'Gunlance'}, {'id': 2, 'name': 'Hunting Horn'}],
+        weapons=[{'id': i, 'name': f'Gunlance {i}', 'category_id': 1} for i in range(1, 6)],
+    )
+    from app import app
+    return app.test_client()
+
+
+def test_weapons_batch_preserves_order_and_reports_missing(client):
+    with track_queries() as stats:
+        response = client.get('/api/weapons?ids=4,99,2,4,1')
+    assert response.status_code == 200
+    assert stats.count == 1
+
+    body = response.get_json()
+    assert [weapon['id'] for weapon in body['items']] == [4, 2, 1]
+    assert body['missing'] == [99]
+    assert body['items'][0] == client.get('/api/weapons/4').get_json()
+
+    etag = response.headers['ETag']
+    assert client.get('/api/weapons?ids=4,99,2,4,1', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/weapons?ids=1,2,4').headers['ETag'] != etag
+
+
+def test_categories_batch(client):
+    body = client.get('/api/categories?ids=2,1,3').get_json()
+    assert [category['name'] for category in body['items']] == ['Hunting Horn', 'Gunlance']
+    assert body['missing'] == [3]
+
+
+@pytest.mark.parametrize('ids', ['', 'a,b', '1,,x'])
+def test_invalid_ids(client, ids):
+    assert client.get(f'/api/weapons?ids={ids}').status_code == 400
+
+
+def test_too_many_ids(client, monkeypatch):
+    monkeypatch.setattr(weapons_service, 'BATCH_MAX_IDS', 3)
+    assert client.get('/api/weapons?ids=1,2,3').status_code == 200
+    response = client.get('/api/categories?ids=1,2,3,4')
+    assert response.status_code == 400 and '3' in response.get_json()['error']
@@ -0,0 +1,110 @@
+"""
+Micro-benchmarks de las rutas calientes (servicios, serialización, JWT,
+bcrypt e imágenes) sobre la base de datos SQLite de pruebas.
+
+Ver el fixture ``microbench`` en conftest.py para los umbrales y cómo
+regenerar la línea base.
+"""
+
+import pytest
+from sqlalchemy import delete, insert
+
+from config.database import engine, init_db
+from controllers.weapons_controller import weapons_bp
+from models.stats_model import CatalogCounter
+from models.user_model import User, UserRole
+from models.weapons_model import Weapon, WeaponCategory
+from repositories.user_repository import UserRepository
+from repositories.weapon_repository import WeaponRepository
+from services import auth_service, rate_limit_service, weapons_service
+from services.runtime import run_sync
+from services.web import SyncFlask
+
+pytestmark = pytest.mark.benchmark
+
+CATEGORIES = 14
+WEAPONS = 700
+IMAGE = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 32
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    """Catálogo fijo de 14 categorías y 700 armas con imagen."""
+    init_db()
+    with engine.begin() as conn:
+        for table in (Weapon, WeaponCategory, CatalogCounter, User):
+            conn.execute(delete(table))
+        conn.execute(insert(WeaponCategory), [
+            {'id': i + 1, 'name': f'Categoría {i}', 'description': 'Benchmark'} for i in range(CATEGORIES)
+        ])
+        conn.execute(insert(Weapon), [
+            {'id': i + 1, 'name': f'Arma {i}', 'category_id': i % CATEGORIES + 1,
+             'description': 'Benchmark', 'image_data': IMAGE, 'image_mime_type': 'image/png'}
+            for i in range(WEAPONS)
+        ])
+        conn.execute(insert(User), [{
+            'id': 1, 'username': 'hunter', 'email': 'hunter@example.com',
+            'password_hash': auth_service.hash_password('secret123'), 'role': UserRole.USER
+        }])
+    yield
+    with engine.begin() as conn:
+        for table in (Weapon, WeaponCategory, CatalogCounter, User):
+            conn.execute(delete(table))
+
+
+@pytest.fixture(scope='module')
+def client(catalog):
+    # Se mide el controlador, no el límite por IP (todas las llamadas vienen del mismo cliente)
+    rate_limit_service.RATE_LIMIT_ENABLED = False
+    app = SyncFlask(__name__)
+    app.register_blueprint(weapons_bp, url_prefix='/api')
+    yield app.test_client()
+    rate_limit_service.RATE_LIMIT_ENABLED = True
+
+
+def test_get_all_weapons(catalog, microbench):
+    assert len(run_sync(weapons_service.get_all_weapons())) == WEAPONS
+    # Se mide la consulta y la serialización, no la caché del catálogo
+    microbench('weapons_service.get_all_weapons',
+               lambda: (weapons_service.invalidate_catalog_cache(), run_sync(weapons_service.get_all_weapons())))
+
+
+def test_get_weapons_by_category(catalog, microbench):
+    assert len(run_sync(weapons_service.get_weapons_by_category(1))) == WEAPONS // CATEGORIES
+    microbench('weapons_service.get_weapons_by_category', lambda: run_sync(weapons_service.get_weapons_by_category(1)))
+
+
+def test_weapon_to_json(catalog, microbench):
+    weapon = WeaponRepository().get_by_id(1)
+    microbench('Weapon.to_json', weapon.to_json)
+
+
+def test_weapon_view_to_json(catalog, microbench):
+    view = WeaponRepository().get_view(1)
+    assert view.to_json() == WeaponRepository().get_by_id(1).to_json()
+    microbench('WeaponView.to_json', view.to_json)
+
+
+def test_user_to_json(catalog, microbench):
+    user = UserRepository().get_by_id(1)
+    microbench('User.to_json', lambda: user.to_json(include_sensitive=True))
+
+
+def test_generate_and_decode_token(microbench):
+    token = auth_service.generate_token(1, 'hunter', 'user')
+    assert auth_service.decode_token(token)['user_id'] == 1
+    microbench('auth_service.generate_token', lambda: auth_service.generate_token(1, 'hunter', 'user'))
+    microbench('auth_service.decode_token', lambda: auth_service.decode_token(token))
+
+
+def test_verify_password(microbench):
+    password_hash = auth_service.hash_password('secret123')
+    assert auth_service.verify_password(password_hash, 'secret123')
+    microbench('auth_service.verify_password',
+               lambda: auth_service.verify_password(password_hash, 'secret123'), rounds=3)
+
+
+def test_get_weapon_image(client, microbench):
+    response = client.get('/api/weapons/1/image')
+    assert response.status_code == 200 and response.data == IMAGE
+    microbench('weapons_controller.get_weapon_image', lambda: client.get('/api/weapons/1/image').data)
@@ -0,0 +1,202 @@
+"""
+Tests de la caché en memoria (services/cache.py): single-flight,
+stale-while-revalidate e invalidación, y su uso en los listados del catálogo.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import delete, insert
+
+from config.database import engine, init_db
+from config.query_stats import track_queries
+from models.change_model import CatalogChange
+from models.stats_model import CatalogCounter
+from models.weapons_model import Weapon, WeaponCategory
+from services.cache import TTLCache
+
+
+def _run_concurrently(func, threads=8):
+    results = [None] * threads
+    barrier = threading.Barrier(threads)
+
+    def worker(index):
+        barrier.wait()
+        try:
+            results[index] = func()
+        except Exception as e:
+            results[index] = e
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join(timeout=5)
+    return results
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache(60, name='test')
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return 'catalog'
+
+    assert _run_concurrently(lambda: cache.get_or_set('key', loader)) == ['catalog'] * 8
+    assert len(calls) == 1
+
+
+def test_load_errors_reach_every_waiter_and_are_not_cached():
+    cache = TTLCache(60, name='test')
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError('base de datos caída')
+
+    results = _run_concurrently(lambda: cache.get_or_set('key', failing), threads=4)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache.get_or_set('key', lambda: 'ok') == 'ok'
+
+
+def test_stale_value_is_served_while_one_thread_refreshes():
+    cache = TTLCache(0.05, name='test', stale_ttl=60)
+    cache.get_or_set('key', lambda: 'v1')
+    time.sleep(0.06)
+
+    release = threading.Event()
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        release.wait(5)
+        return 'v2'
+
+    # Todas las peticiones reciben el valor anterior sin esperar
+    assert [cache.get_or_set('key', slow_loader) for _ in range(5)] == ['v1'] * 5
+    release.set()
+    deadline = time.monotonic() + 5
+    while cache.get('key') != 'v2' and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get('key') == 'v2'
+    assert len(calls) == 1
+
+
+def test_invalidate_discards_in_flight_result():
+    cache = TTLCache(60, name='test')
+    started, release = threading.Event(), threading.Event()
+
+    def old_read():
+        started.set()
+        release.wait(5)
+        return 'antes de escribir'
+
+    reader = threading.Thread(target=lambda: cache.get_or_set('key', old_read))
+    reader.start()
+    started.wait(5)
+    cache.invalidate()  # Una escritura termina mientras la lectura sigue en curso
+    assert cache.get_or_set('key', lambda: 'después de escribir') == 'después de escribir'
+    release.set()
+    reader.join(5)
+    assert cache.get('key') == 'después de escribir'
+
+
+def test_loader_runs_under_the_cross_process_lock():
+    held = []
+
+    @contextmanager
+    def lock(name):
+        held.append(name)
+        yield
+
+    cache = TTLCache(60, name='catalog', lock=lock)
+    cache.get_or_set('weapons', lambda: [])
+    cache.get_or_set('weapons', lambda: [])
+    assert held == ["catalog:'weapons'"]
+
+
+@pytest.fixture
+def client():
+    init_db()
+    with engine.begin() as conn:
+        for table in (Weapon, WeaponCategory, CatalogCounter, CatalogChange):
+            conn.execute(delete(table))
+        conn.execute(insert(WeaponCategory), [{'id': 1, 'name': 'Dual Blades'}])
+    from app import app
+    yield app.test_client()
+    with engine.begin() as conn:
+        for table in (Weapon, WeaponCategory, CatalogCounter, CatalogChange):
+            conn.execute(delete(table))
+
+
+def test_catalog_lists_are_cached_and_invalidated_by_writes(client):
+    assert client.get('/api/weapons').get_json() == []
+    with track_queries(capture=True) as stats:
+        assert client.get('/api/weapons').get_json() == []
+        client.get('/api/categories')
+        client.get('/api/categories')
+    # El listado se carga una vez y el último seq sólo se consulta al cargarlo
+    loads = [s for s in stats.statements if 'FROM catalog_changes' not in s]
+    assert len(loads) == 1
+    assert len(stats.statements) <= 2
+
+    weapon = client.post('/api/weapons', json={'name': 'Twin Daggers', 'category_id': 1}).get_json()
+    assert [w['id'] for w in client.get('/api/weapons').get_json()] == [weapon['id']]
+    client.patch(f"/api/weapons/{weapon['id']}", json={'name': 'Twin Daggers+'})
+    assert client.get('/api/weapons').get_json()[0]['name'] == 'Twin Daggers+'
+    client.delete(f"/api/weapons/{weapon['id']}")
+    assert client.get('/api/weapons').get_json() == []
+
+
+def test_writes_from_other_processes_invalidate_catalog_lists(client, monkeypatch):
+    from repositories.weapon_repository import WeaponRepository
+    from services import weapons_service
+
+    monkeypatch.setattr(weapons_service._catalog_version, 'interval', 60)
+    assert client.get('/api/weapons').get_json() == []
+    # Escritura sin pasar por weapons_service (otro worker o worker.py): no
+    # invalida la caché local, pero deja su seq en catalog_changes
+    weapon = WeaponRepository().create({'name': 'Twin Daggers', 'category_id': 1})
+    # Hasta la próxima comprobación del seq se sirve el listado en caché...
+    assert client.get('/api/weapons').get_json() == []
+    # ...que se descarta al llegar el NOTIFY (o al pasar el intervalo)
+    weapons_service.catalog_changed()
+    assert [w['id'] for w in client.get('/api/weapons').get_json()] == [weapon.id]
+
+    WeaponRepository().delete(weapon.id)
+    monkeypatch.setattr(weapons_service._catalog_version, 'interval', 0)
+    assert client.get('/api/weapons').get_json() == []
+
+
+def test_polled_version_reads_at_most_once_per_interval():
+    from services.cache import PolledVersion
+
+    reads = []
+    bypass = [False]
+
+    def fetch():
+        reads.append(1)
+        return len(reads)
+
+    version = PolledVersion(fetch, interval=60, bypass=lambda: bypass[0])
+    assert [version(), version(), version()] == [1, 1, 1]
+    bypass[0] = True
+    assert version() == 2
+    bypass[0] = False
+    version.expire()
+    assert version() == 3 and len(reads) == 3
+
+
+def test_version_change_is_not_served_stale():
+    version = [1]
+    cache = TTLCache(0.05, name='test', stale_ttl=60, version=lambda: version[0])
+    cache.get_or_set('key', lambda: 'v1')
+    time.sleep(0.06)
+    # Sólo caducada: se sirve la anterior mientras se recalcula
+    assert cache.get_or_set('key', lambda: 'v1') == 'v1'
+    version[0] = 2
+    assert cache.get_or_set('key', lambda: 'v2') == 'v2'
+    assert cache.get('key') == 'v2'
@@ -0,0 +1,114 @@
+"""
+Tests del registro de cambios y de GET /api/changes.
+"""
+
+import pytest
+
+from config.database import SessionLocal
+from models.weapons_model import WeaponCategory
+
+
+@pytest.fixture
+def client(catalog_db):
+    catalog_db(categories=[{'id': 1, 'name': 'Lance'}])
+    from app import app
+    return app.test_client()
+
+
+def _feed(client, since=0, limit=100):
+    response = client.get(f'/api/changes?since={since}&limit={limit}')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_writes_are_logged_in_order(client):
+    weapon = client.post('/api/weapons', json={'name': 'Iron Lance', 'category_id': 1}).get_json()
+    client.put(f"/api/weapons/{weapon['id']}", json={'name': 'Iron Lance II', 'category_id': 1})
+    client.delete(f"/api/weapons/{weapon['id']}")
+
+    feed = _feed(client)
+    assert [(c['entity'], c['op'], c['version']) for c in feed['changes']] == [
+        ('weapon', 'insert', 1), ('weapon', 'update', 2), ('weapon', 'delete', 2)
+    ]
+    seqs = [c['seq'] for c in feed['changes']]
+    assert seqs == sorted(seqs) and feed['next_since'] == seqs[-1]
+    # La fila ya no existe: sólo el tombstone lleva la información
+    assert all(c['data'] is None for c in feed['changes'])
+    assert _feed(client, since=feed['next_since'])['changes'] == []
+
+
+def test_pagination_and_current_data(client):
+    for name in ('Lance A', 'Lance B', 'Lance C'):
+        client.post('/api/weapons', json={'name': name, 'category_id': 1})
+
+    first = _feed(client, limit=2)
+    assert first['has_more'] and len(first['changes']) == 2
+    rest = _feed(client, since=first['next_since'], limit=2)
+    assert not rest['has_more']
+    assert [c['data']['name'] for c in first['changes'] + rest['changes']] == ['Lance A', 'Lance B', 'Lance C']
+
+
+def test_image_changes_and_rollback(client):
+    db = SessionLocal()
+    try:
+        category = db.get(WeaponCategory, 1)
+        category.icon_data = b'\x89PNG'
+        db.commit()
+
+        category.name = 'Lanza'
+        db.flush()
+        db.rollback()
+    finally:
+        db.close()
+
+    changes = _feed(client)['changes']
+    # El cambio revertido no queda registrado
+    assert [(c['entity'], c['op']) for c in changes] == [('category_icon', 'update')]
+    assert changes[0]['data']['has_icon_data'] is True
+
+
+def test_invalid_parameters(client):
+    assert client.get('/api/changes?since=abc').status_code == 400
+    assert client.get('/api/changes?limit=0').status_code == 400
+
+
+def test_changes_and_rows_are_read_in_one_session(client, monkeypatch):
+    from repositories import change_repository
+
+    client.post('/api/weapons', json={'name': 'Iron Lance', 'category_id': 1})
+    client.patch('/api/categories/1', json={'description': 'Lanza'})
+    sessions = []
+    read_db = change_repository.get_read_db
+
+    def counting_read_db():
+        sessions.append(1)
+        return read_db()
+
+    # Cada sesión puede ir a una réplica distinta: registro y filas deben
+    # salir de la misma
+    monkeypatch.setattr(change_repository, 'get_read_db', counting_read_db)
+    feed = _feed(client)
+    assert len(sessions) == 1
+    assert [c['data']['name'] for c in feed['changes']] == ['Iron Lance', 'Lance']
+
+
+def test_changes_are_written_last_before_commit(client):
+    from config.query_stats import track_queries
+
+    db = SessionLocal()
+    try:
+        category = db.get(WeaponCategory, 1)
+        category.name = 'Lanza'
+        db.flush()
+        db.rollback()
+
+        category = db.get(WeaponCategory, 1)
+        category.description = 'Lanzas'
+        with track_queries(capture=True) as stats:
+            db.commit()
+    finally:
+        db.close()
+
+    # El registro (y en PostgreSQL su lock) es la última sentencia antes del COMMIT
+    assert stats.statements[-1].startswith('INSERT INTO catalog_changes')
+    assert [(c['entity'], c['op']) for c in _feed(client)['changes']] == [('category', 'update')]
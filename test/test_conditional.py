@@ -0,0 +1,84 @@
+"""
+Tests de las peticiones condicionales (ETag, Last-Modified, If-Match).
+"""
+
+import pytest
+from sqlalchemy import delete
+
+from config.database import engine
+from models.weapons_model import Weapon
+
+
+@pytest.fixture
+def client(catalog_db):
+    catalog_db(categories=[{'id': 1, 'name': 'Hammer'}, {'id': 2, 'name': 'Bow'}])
+    from app import app
+    return app.test_client()
+
+
+@pytest.fixture
+def weapon(client):
+    response = client.post('/api/weapons', json={'name': 'Iron Hammer', 'category_id': 1})
+    assert response.status_code == 201
+    yield response.get_json()
+    with engine.begin() as conn:
+        conn.execute(delete(Weapon))
+
+
+def test_item_revalidation(client, weapon):
+    response = client.get(f"/api/weapons/{weapon['id']}")
+    assert response.headers['ETag'] == f'W/"{weapon["version"]}"'
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+    cached = client.get(f"/api/weapons/{weapon['id']}", headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+    assert cached.headers['ETag'] == etag
+    assert client.get(f"/api/weapons/{weapon['id']}",
+                      headers={'If-Modified-Since': last_modified}).status_code == 304
+
+    # Una escritura incrementa la versión
+    client.put(f"/api/weapons/{weapon['id']}", json={'name': 'Iron Hammer II', 'category_id': 1})
+    fresh = client.get(f"/api/weapons/{weapon['id']}", headers={'If-None-Match': etag})
+    assert fresh.status_code == 200
+    assert fresh.get_json()['version'] == weapon['version'] + 1
+
+
+@pytest.mark.parametrize('path', ['/api/weapons', '/api/categories', '/api/categories?with_counts=1',
+                                  '/api/categories/1/weapons'])
+def test_collection_etag_matches_cheap_query(client, weapon, path):
+    etag = client.get(path).headers['ETag']
+    assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
+
+    # Mover el arma de categoría cambia las listas y los recuentos
+    client.put(f"/api/weapons/{weapon['id']}", json={'name': 'Iron Bow', 'category_id': 2})
+    response = client.get(path, headers={'If-None-Match': etag})
+    if path == '/api/categories':
+        assert response.status_code == 304
+    else:
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+
+def test_collection_etag_changes_on_delete(client, weapon):
+    client.post('/api/weapons', json={'name': 'Anvil Hammer', 'category_id': 1})
+    etag = client.get('/api/weapons').headers['ETag']
+    client.delete(f"/api/weapons/{weapon['id']}")
+    assert client.get('/api/weapons', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_if_match_rejects_stale_update(client, weapon):
+    path = f"/api/weapons/{weapon['id']}"
+    etag = client.get(path).headers['ETag']
+
+    updated = client.put(path, json={'name': 'Iron Hammer+', 'category_id': 1}, headers={'If-Match': etag})
+    assert updated.status_code == 200
+    assert updated.headers['ETag'] != etag
+
+    stale = client.put(path, json={'name': 'Iron Hammer++', 'category_id': 1}, headers={'If-Match': etag})
+    assert stale.status_code == 412
+    assert client.get(path).get_json()['name'] == 'Iron Hammer+'
+
+    category = client.put('/api/categories/1', json={'name': 'Hammer'}, headers={'If-Match': 'W/"99"'})
+    assert category.status_code == 412
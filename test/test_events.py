@@ -0,0 +1,166 @@
+"""
+Tests del flujo SSE de cambios del catálogo (services/events_service.py).
+"""
+
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from services import events_service
+from services.events_service import (
+    AsyncSubscription, ChangeBroker, Subscription, SubscriptionClosed, change_repo
+)
+
+
+@pytest.fixture
+def client(catalog_db):
+    catalog_db(categories=[{'id': 1, 'name': 'Charge Blade'}])
+    from app import app
+    return app.test_client()
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    monkeypatch.setattr(events_service, 'SSE_POLL_SECONDS', 0.02)
+    monkeypatch.setattr(events_service, 'SSE_HEARTBEAT_SECONDS', 60)
+    broker = ChangeBroker()
+    yield broker
+    broker.stop()
+
+
+def test_stream_pushes_committed_changes(client, broker):
+    stream = events_service.stream(broker=broker)
+    # El primer next() suscribe y fija el punto de partida antes de escribir
+    assert next(stream).startswith('retry:')
+
+    weapon = client.post('/api/weapons', json={'name': 'Charge Blade I', 'category_id': 1}).get_json()
+    message = next(stream)
+    assert message.startswith('id: ') and 'event: change' in message
+    assert f'"id":{weapon["id"]}' in message and '"op":"insert"' in message
+    stream.close()
+    assert broker.thread_subscribers() == 0
+
+
+def test_reconnect_replays_missed_changes(client, broker):
+    since = change_repo.latest_seq()
+    for name in ('Charge Blade II', 'Charge Blade III'):
+        client.post('/api/weapons', json={'name': name, 'category_id': 1})
+
+    stream = events_service.stream(last_event_id=str(since), broker=broker)
+    next(stream)
+    replayed = [next(stream), next(stream)]
+    assert [int(m.split('\n')[0][4:]) for m in replayed] == [since + 1, since + 2]
+    stream.close()
+
+
+def test_slow_subscriber_is_dropped():
+    subscription = Subscription(maxsize=2)
+    for seq in (1, 2, 3):
+        subscription.push((seq, f'id: {seq}\n\n'))
+    with pytest.raises(SubscriptionClosed):
+        subscription.get()
+
+
+def test_async_subscribers_receive_and_overflow(broker):
+    async def scenario():
+        subscriptions = [AsyncSubscription(maxsize=1) for _ in range(3)]
+        for subscription in subscriptions:
+            broker.subscribe(subscription)
+        # Se publica desde otro hilo, como hace el broker
+        await asyncio.to_thread(broker.publish, (7, 'id: 7\n\n'))
+        await asyncio.to_thread(broker.publish, (8, 'id: 8\n\n'))
+        await asyncio.sleep(0)
+
+        results = []
+        for subscription in subscriptions:
+            received = await subscription.get()
+            # El segundo mensaje no cabía en la cola: suscripción cerrada
+            with pytest.raises(SubscriptionClosed):
+                await subscription.get()
+            broker.unsubscribe(subscription)
+            results.append(received)
+        return results
+
+    assert asyncio.run(scenario()) == [(7, 'id: 7\n\n')] * 3
+
+
+def test_flask_endpoint_limits_thread_subscribers(client, monkeypatch):
+    monkeypatch.setattr(events_service, 'SSE_MAX_SYNC_SUBSCRIBERS', 0)
+    response = client.get('/api/events')
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
+
+
+class _ListRepo:
+    """Registro de cambios en memoria, para probar el broker sin la BD de los tests."""
+
+    def __init__(self):
+        self.changes = []
+
+    def add(self, seq):
+        self.changes.append(SimpleNamespace(seq=seq, entity='weapon', entity_id=seq, op='insert', version=1))
+
+    def latest_seq(self, primary=False):
+        return self.changes[-1].seq if self.changes else 0
+
+    def get_since(self, since, limit, primary=False):
+        return [change for change in self.changes if change.seq > since][:limit]
+
+
+def _wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_broker_thread_stops_without_subscribers(broker):
+    repo = broker.repo = _ListRepo()
+    first = Subscription()
+    broker.subscribe(first)
+    assert broker.is_running()
+    broker.unsubscribe(first)
+    _wait_until(lambda: not broker.is_running())
+
+    # Lo escrito mientras estaba parado no se reenvía: quien reconecta lo
+    # recupera del registro con Last-Event-ID
+    repo.add(1)
+    second = Subscription()
+    broker.subscribe(second)
+    assert broker.is_running()
+    repo.add(2)
+    assert second.get(timeout=5) == events_service.format_event(repo.changes[1])
+    broker.unsubscribe(second)
+
+
+@pytest.mark.skipif(not os.getenv('TEST_POSTGRES_URL'),
+                    reason='LISTEN/NOTIFY necesita PostgreSQL (TEST_POSTGRES_URL)')
+def test_broker_wakes_on_notify(monkeypatch):
+    from models.change_model import CHANGE_CHANNEL
+
+    # Sin NOTIFY, el siguiente sondeo tardaría un minuto
+    monkeypatch.setattr(events_service, 'SSE_SAFETY_POLL_SECONDS', 60)
+    monkeypatch.setattr(events_service, 'SSE_HEARTBEAT_SECONDS', 60)
+    pg = create_engine(os.environ['TEST_POSTGRES_URL'])
+    repo = _ListRepo()
+    broker = ChangeBroker(repo=repo, engine=pg)
+    subscription = Subscription()
+    try:
+        broker.subscribe(subscription)
+        _wait_until(lambda: broker._run.listener is not None)
+        repo.add(1)
+        with pg.begin() as conn:
+            conn.execute(text(f"NOTIFY {CHANGE_CHANNEL}"))
+        assert subscription.get(timeout=5)[0] == 1
+
+        run = broker._run
+        broker.unsubscribe(subscription)
+        _wait_until(lambda: not run.thread.is_alive())
+        assert run.listener is None
+    finally:
+        broker.stop()
+        pg.dispose()
@@ -0,0 +1,202 @@
+"""
+Tests de la cola de trabajos en segundo plano (services/jobs_service.py).
+"""
+
+import io
+
+import pytest
+from PIL import Image
+from sqlalchemy import func, select, update
+
+from config.database import engine
+from models.job_model import Job, JobFile
+from models.user_model import UserRole
+from services import auth_service, jobs_service, stats_service
+from services.jobs_service import job_handler
+
+
+@pytest.fixture
+def client(catalog_db):
+    catalog_db(
+        categories=[{'id': 1, 'name': 'Hammer'}],
+        weapons=[{'id': 1, 'name': 'Iron Hammer', 'category_id': 1}],
+        users=[{'id': 1, 'username': 'admin', 'email': 'admin@example.com',
+                'password_hash': 'x', 'role': UserRole.ADMIN}],
+    )
+    stats_service.rebuild_stats()
+    from app import app
+    return app.test_client()
+
+
+ADMIN = {'Authorization': f"Bearer {auth_service.generate_token(1, 'admin', UserRole.ADMIN.value)}"}
+
+
+def _drain():
+    return jobs_service.Worker('test-worker', poll_seconds=0).run(once=True)
+
+
+def _status(client, response):
+    assert response.status_code == 202
+    assert response.headers['Location'] == response.get_json()['status_url']
+    return client.get(response.headers['Location'], headers=ADMIN)
+
+
+def test_import_returns_202_and_runs_in_worker(client):
+    response = client.post('/api/weapons/import', headers=ADMIN, json={'weapons': [
+        {'name': 'Iron Hammer II', 'category_id': 1},
+        {'name': '', 'category_id': 1},
+        {'name': 'Lost Hammer', 'category_id': 99},
+        {'name': 'Iron Hammer III', 'category_id': 1, 'description': 'Pesado'},
+    ]})
+    pending = _status(client, response)
+    assert pending.status_code == 202 and pending.get_json()['status'] == 'queued'
+    # Encolar no escribe armas
+    assert len(client.get('/api/weapons').get_json()) == 1
+
+    assert _drain() == 1
+    job = client.get(response.headers['Location'], headers=ADMIN)
+    assert job.status_code == 200
+    body = job.get_json()
+    assert body['status'] == 'succeeded' and body['attempts'] == 1
+    assert len(body['result']['created']) == 2
+    assert [e['index'] for e in body['result']['errors']] == [1, 2]
+    assert stats_service.get_stats()['weapons'] == 3
+
+
+def test_image_upload_is_resized_by_worker(client, monkeypatch):
+    monkeypatch.setattr(jobs_service, 'IMAGE_MAX_SIZE', 64)
+    upload = io.BytesIO()
+    Image.new('RGB', (300, 150), 'red').save(upload, format='JPEG')
+
+    response = client.put('/api/weapons/1/image', headers=ADMIN, data=upload.getvalue(),
+                          content_type='image/jpeg')
+    assert _status(client, response).status_code == 202
+    assert client.put('/api/weapons/999/image', headers=ADMIN, data=upload.getvalue()).status_code == 404
+    assert client.put('/api/weapons/1/image', headers=ADMIN, data=b'').status_code == 400
+
+    # La imagen espera en bruto en job_files, no en el payload JSON
+    job_id = response.get_json()['id']
+    assert jobs_service.job_repo.get(job_id).payload == {'weapon_id': 1}
+    assert jobs_service.job_repo.get_file(job_id) == upload.getvalue()
+
+    _drain()
+    assert jobs_service.job_repo.get_file(job_id) is None
+    assert client.get(response.headers['Location'], headers=ADMIN).get_json()['result']['width'] == 64
+    image = client.get('/api/weapons/1/image')
+    assert image.mimetype == 'image/png'
+    assert Image.open(io.BytesIO(image.data)).size == (64, 32)
+
+
+def test_invalid_image_fails_without_retry(client):
+    response = client.put('/api/weapons/1/image', headers=ADMIN, data=b'no es una imagen')
+    _drain()
+    body = client.get(response.headers['Location'], headers=ADMIN).get_json()
+    assert body['status'] == 'failed' and body['attempts'] == 1
+    assert 'PermanentJobError' in body['last_error']
+    assert jobs_service.job_repo.get_file(body['id']) is None
+
+
+def test_chunked_upload_stops_reading_past_the_limit(client, monkeypatch):
+    monkeypatch.setattr(jobs_service, 'IMAGE_UPLOAD_MAX_BYTES', 1024)
+    body = io.BytesIO(b'x' * 1024 * 1024)
+    # Sin Content-Length: el límite se comprueba al leer el cuerpo
+    response = client.put('/api/weapons/1/image', headers=dict(ADMIN, **{'Transfer-Encoding': 'chunked'}),
+                          input_stream=body, environ_overrides={'wsgi.input_terminated': True})
+    assert response.status_code == 413
+    assert body.tell() <= 1025
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(JobFile)).scalar() == 0
+
+    response = client.put('/api/weapons/1/image', headers=dict(ADMIN, **{'Transfer-Encoding': 'chunked'}),
+                          input_stream=io.BytesIO(b'y' * 1024), environ_overrides={'wsgi.input_terminated': True})
+    assert response.status_code == 202
+    assert jobs_service.job_repo.get_file(response.get_json()['id']) == b'y' * 1024
+
+
+def test_failures_retry_with_backoff_until_exhausted(client, monkeypatch):
+    monkeypatch.setattr(jobs_service, 'JOB_RETRY_BASE_SECONDS', 0)
+    calls = []
+
+    @job_handler('test.flaky')
+    def flaky(payload, job):
+        calls.append(payload)
+        raise RuntimeError('fallo temporal')
+
+    try:
+        job = jobs_service.enqueue('test.flaky', {'n': 1}, max_attempts=2)
+        assert _drain() == 2
+    finally:
+        jobs_service._handlers.pop('test.flaky')
+    body = jobs_service.get_job(job['id'])
+    assert len(calls) == 2
+    assert body['status'] == 'failed' and body['attempts'] == 2
+    assert 'fallo temporal' in body['last_error']
+
+
+def test_claim_order_and_stale_requeue(client):
+    low = jobs_service.enqueue('stats.rebuild', priority=0)
+    high = jobs_service.enqueue('stats.rebuild', priority=5)
+    later = jobs_service.job_repo.enqueue('stats.rebuild', {}, priority=9)
+    with engine.begin() as conn:
+        conn.execute(update(Job).where(Job.id == later.id).values(run_at=later.run_at.replace(year=2999)))
+
+    repo = jobs_service.job_repo
+    claimed = [repo.claim('a'), repo.claim('b'), repo.claim('c')]
+    assert [job.id for job in claimed[:2]] == [high['id'], low['id']]
+    # El programado para el futuro aún no se toma
+    assert claimed[2] is None
+
+    # Un worker caído: su trabajo vuelve a la cola y su resultado tardío se descarta
+    assert repo.requeue_stale(timeout_seconds=-1) == 2
+    repo.complete(claimed[0].id, claimed[0].attempts, {'tarde': True})
+    assert jobs_service.get_job(high['id'])['status'] == 'queued'
+
+
+def test_job_endpoints_require_admin_and_validate(client):
+    assert client.post('/api/weapons/import', json={'weapons': [{}]}).status_code == 401
+    assert client.post('/api/weapons/import', headers=ADMIN, json={'weapons': []}).status_code == 400
+    assert client.post('/api/jobs', headers=ADMIN, json={'kind': 'nope'}).status_code == 400
+    assert client.get('/api/jobs/999', headers=ADMIN).status_code == 404
+
+    response = client.post('/api/jobs', headers=ADMIN, json={'kind': 'catalog.export'})
+    _drain()
+    result = _status(client, response).get_json()['result']
+    assert [w['name'] for w in result['weapons']] == ['Iron Hammer']
+    assert client.get('/api/jobs', headers=ADMIN).get_json()['counts'] == {'succeeded': 1}
+
+
+def test_import_commits_with_job_completion(client, monkeypatch):
+    job = jobs_service.enqueue_weapon_import([{'name': 'Iron Hammer II', 'category_id': 1}])
+
+    # El cierre del trabajo ya se confirmó con las armas: aunque falle el
+    # complete() posterior, el trabajo no vuelve a la cola ni se duplica el lote
+    def broken(*args, **kwargs):
+        raise RuntimeError('conexión perdida')
+    monkeypatch.setattr(jobs_service.job_repo, 'complete', broken)
+    with pytest.raises(RuntimeError):
+        jobs_service.run_one('a')
+    assert jobs_service.get_job(job['id'])['status'] == 'succeeded'
+    assert jobs_service.job_repo.requeue_stale(timeout_seconds=-1) == 0
+    assert len(client.get('/api/weapons').get_json()) == 2
+
+
+def test_import_of_lost_job_writes_nothing(client):
+    job = jobs_service.enqueue_weapon_import([{'name': 'Iron Hammer II', 'category_id': 1}])
+    claimed = jobs_service.job_repo.claim('a')
+    # Otro worker lo dio por abandonado mientras se ejecutaba
+    assert jobs_service.job_repo.requeue_stale(timeout_seconds=-1) == 1
+    with pytest.raises(jobs_service.JobLostError):
+        jobs_service.import_weapons(claimed.payload, claimed)
+    assert len(client.get('/api/weapons').get_json()) == 1
+    assert jobs_service.get_job(job['id'])['status'] == 'queued'
+
+
+def test_heartbeat_keeps_running_job_claimed(client):
+    jobs_service.enqueue('stats.rebuild')
+    repo = jobs_service.job_repo
+    job = repo.claim('a')
+    with engine.begin() as conn:
+        conn.execute(update(Job).where(Job.id == job.id).values(locked_at=job.locked_at.replace(year=2000)))
+    assert repo.heartbeat(job.id, job.attempts)
+    assert repo.requeue_stale(timeout_seconds=60) == 0
+    assert not repo.heartbeat(job.id, job.attempts + 1)
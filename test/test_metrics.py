@@ -0,0 +1,83 @@
+"""
+Tests del endpoint /metrics (modo de un solo proceso).
+"""
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import delete, insert
+
+from config.database import engine, init_db
+from models.weapons_model import Weapon, WeaponCategory
+from services import metrics_service
+
+IMAGE = b'\x89PNG\r\n\x1a\n' + b'\x00' * 120
+
+
+@pytest.fixture(scope='module')
+def client():
+    init_db()
+    with engine.begin() as conn:
+        conn.execute(delete(Weapon))
+        conn.execute(delete(WeaponCategory))
+        conn.execute(insert(WeaponCategory), [{'id': 1, 'name': 'Hammer'}])
+        conn.execute(insert(Weapon), [{'id': 1, 'name': 'Iron Hammer', 'category_id': 1,
+                                       'image_data': IMAGE, 'image_mime_type': 'image/png'}])
+    from app import app
+    yield app.test_client()
+    with engine.begin() as conn:
+        conn.execute(delete(Weapon))
+        conn.execute(delete(WeaponCategory))
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_requests_and_image_bytes_are_counted(client):
+    requests_before = _sample('mhwiki_http_requests_total',
+                              method='GET', endpoint='weapons.get_weapon_image', status='200')
+    bytes_before = _sample('mhwiki_image_bytes_served_total', kind='weapon')
+
+    assert client.get('/api/weapons/1/image').status_code == 200
+
+    assert _sample('mhwiki_http_requests_total',
+                   method='GET', endpoint='weapons.get_weapon_image', status='200') == requests_before + 1
+    assert _sample('mhwiki_image_bytes_served_total', kind='weapon') == bytes_before + len(IMAGE)
+
+
+def test_jwt_failures_are_counted(client):
+    before = _sample('mhwiki_jwt_decode_failures_total', reason='invalid')
+    assert client.get('/api/auth/me', headers={'Authorization': 'Bearer no-es-un-jwt'}).status_code == 401
+    assert _sample('mhwiki_jwt_decode_failures_total', reason='invalid') == before + 1
+
+
+def test_metrics_endpoint_exposes_text_format(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    body = response.get_data(as_text=True)
+    assert 'mhwiki_http_request_duration_seconds_bucket' in body
+    assert 'mhwiki_db_pool_checked_out{pool="primary"}' in body
+
+
+def test_metrics_token(client, monkeypatch):
+    monkeypatch.setattr(metrics_service, 'METRICS_TOKEN', 'secreto')
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secreto'}).status_code == 200
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 401
+
+
+def test_pool_waits_are_counted_at_checkout():
+    import sqlite3
+    from config.pool import InstrumentedQueuePool, PoolStats
+
+    pool = InstrumentedQueuePool(lambda: sqlite3.connect(':memory:'), pool_size=1, max_overflow=0, timeout=0.01)
+    pool.stats, pool.metrics_name = PoolStats(), 'test'
+    held = pool.connect()
+    with pytest.raises(Exception):
+        pool.connect()
+    held.close()
+    pool.connect().close()
+    # Contadores, no gauges: no dependen de que el proceso siga vivo
+    assert _sample('mhwiki_db_pool_checkout_errors_total', pool='test') == 1
+    assert _sample('mhwiki_db_pool_wait_seconds_total', pool='test') >= 0.01
@@ -0,0 +1,67 @@
+"""
+Tests del sistema de migraciones (migrations/) sobre una base SQLite vacía.
+"""
+
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from migrations import current_revision, find_missing_columns, find_missing_indexes, head_revision, upgrade
+from migrations.runner import load_revisions
+
+
+@pytest.fixture
+def empty_engine():
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='mhwiki-migrations-'), 'm.db')}")
+    yield engine
+    engine.dispose()
+
+
+def _columns(engine, table):
+    return {column['name'] for column in inspect(engine).get_columns(table)}
+
+
+def test_baseline_is_frozen_and_upgrade_reaches_head(empty_engine):
+    upgrade(empty_engine, target='0001', echo=lambda message: None)
+    # La base no crea lo que añaden las revisiones posteriores
+    assert 'version' not in _columns(empty_engine, 'weapons')
+    assert not inspect(empty_engine).has_table('catalog_changes')
+    # El índice de category_id lo añade sólo 0002
+    assert 'ix_weapons_category_id' not in {index['name'] for index in inspect(empty_engine).get_indexes('weapons')}
+
+    upgrade(empty_engine, echo=lambda message: None)
+    assert current_revision(empty_engine) == head_revision()
+    assert find_missing_indexes(empty_engine) == []
+    assert find_missing_columns(empty_engine) == []
+
+
+def test_failed_revision_is_neither_applied_nor_stamped(empty_engine, monkeypatch):
+    upgrade(empty_engine, target='0003', echo=lambda message: None)
+    row_versions = next(module for module in load_revisions() if module.revision == '0004')
+    original = row_versions.upgrade
+
+    def failing(op):
+        original(op)
+        raise RuntimeError('fallo a mitad de la revisión')
+
+    monkeypatch.setattr(row_versions, 'upgrade', failing)
+    with pytest.raises(RuntimeError):
+        upgrade(empty_engine, echo=lambda message: None)
+    assert current_revision(empty_engine) == '0003'
+    assert 'version' not in _columns(empty_engine, 'weapons')
+
+
+def test_counters_are_seeded_from_existing_rows(empty_engine):
+    upgrade(empty_engine, target='0007', echo=lambda message: None)
+    with empty_engine.begin() as conn:
+        conn.execute(text("INSERT INTO weapon_categories (id, name, version) VALUES (1, 'Bow', 1), (2, 'Lance', 1)"))
+        conn.execute(text("INSERT INTO weapons (name, category_id, version) VALUES ('A', 1, 1), ('B', 1, 1)"))
+        conn.execute(text("INSERT INTO catalog_counters (name, value) VALUES ('admins', 3)"))
+
+    upgrade(empty_engine, echo=lambda message: None)
+    with empty_engine.connect() as conn:
+        counters = dict(conn.execute(text('SELECT name, value FROM catalog_counters')).all())
+    assert counters == {'categories': 2, 'weapons': 2, 'users': 0,
+                        'weapons.category.1': 2, 'weapons.category.2': 0}
@@ -0,0 +1,92 @@
+"""
+Tests de las modificaciones parciales (PATCH) de armas y categorías.
+"""
+
+import pytest
+from repositories.stats_repository import StatsRepository
+from services import stats_service
+
+
+@pytest.fixture
+def client(catalog_db):
+    catalog_db(
+        categories=[{'id': 1, 'name': 'Switch Axe'}, {'id': 2, 'name': 'Insect Glaive'}],
+        weapons=[{'id': 1, 'name': 'Proto Switch Axe', 'category_id': 1, 'description': 'Tpyo'}],
+    )
+    StatsRepository().rebuild()
+    from app import app
+    return app.test_client()
+
+
+def test_patch_changes_only_sent_fields(client):
+    before = client.get('/api/weapons/1').get_json()
+    response = client.patch('/api/weapons/1', json={'description': 'Typo'}, headers={'If-Match': f'W/"{before["version"]}"'})
+    assert response.status_code == 200
+
+    weapon = response.get_json()
+    assert weapon == client.get('/api/weapons/1').get_json()
+    assert (weapon['name'], weapon['description']) == ('Proto Switch Axe', 'Typo')
+    assert weapon['version'] == before['version'] + 1
+    assert response.headers['ETag'] == f'W/"{weapon["version"]}"'
+
+    feed = client.get('/api/changes').get_json()['changes']
+    assert [(c['entity'], c['op'], c['version']) for c in feed] == [('weapon', 'update', weapon['version'])]
+
+    stale = client.patch('/api/weapons/1', json={'name': 'X'}, headers={'If-Match': f'W/"{before["version"]}"'})
+    assert stale.status_code == 412
+
+
+def test_patch_category_id_relies_on_foreign_key(client):
+    assert client.patch('/api/weapons/1', json={'category_id': 99}).status_code == 404
+    assert client.get('/api/weapons/1').get_json()['category_id'] == 1
+
+    assert client.patch('/api/weapons/1', json={'category_id': 2}).status_code == 200
+    counts = {row['category_id']: row['weapons'] for row in stats_service._load_stats()['weapons_by_category']}
+    assert counts == {1: 0, 2: 1}
+
+
+def test_patch_validation_and_missing_rows(client):
+    assert client.patch('/api/weapons/1', json={}).status_code == 400
+    assert client.patch('/api/weapons/1', json={'image_data': 'x'}).status_code == 400
+    assert client.patch('/api/weapons/1', json={'name': '  '}).status_code == 400
+    assert client.patch('/api/weapons/404', json={'name': 'Nada'}).status_code == 404
+    assert client.patch('/api/categories/404', json={'name': 'Nada'}).status_code == 404
+
+
+def test_patch_category_name_is_unique(client):
+    assert client.patch('/api/categories/1', json={'name': 'Insect Glaive'}).status_code == 400
+    response = client.patch('/api/categories/1', json={'description': 'Hacha transformable'})
+    assert response.status_code == 200
+    assert response.get_json()['description'] == 'Hacha transformable'
+
+
+def test_put_and_delete_map_constraint_errors(client):
+    # PUT comparte con PATCH la traducción de los errores de integridad
+    bad_category = client.put('/api/weapons/1', json={'name': 'Proto Switch Axe', 'category_id': 99})
+    assert bad_category.status_code == 404
+    duplicate = client.put('/api/categories/1', json={'name': 'Insect Glaive'})
+    assert duplicate.status_code == 400 and "'Insect Glaive'" in duplicate.get_json()['error']
+
+    in_use = client.delete('/api/categories/1')
+    assert in_use.status_code == 409 and '1 arma(s)' in in_use.get_json()['error']
+    assert client.get('/api/categories/1').status_code == 200
+
+
+def test_counters_follow_writes_in_same_transaction(client):
+    def counters():
+        stats_service.invalidate_cache()
+        return {row['category_id']: row['weapons'] for row in stats_service._load_stats()['weapons_by_category']}
+
+    created = client.post('/api/weapons', json={'name': 'Proto Insect Glaive', 'category_id': 2})
+    assert created.status_code == 201
+    # Una escritura rechazada por la FK no deja incrementos huérfanos
+    assert client.post('/api/weapons', json={'name': 'Huérfana', 'category_id': 99}).status_code == 404
+    assert counters() == {1: 1, 2: 1}
+
+    assert client.delete(f"/api/weapons/{created.get_json()['id']}").status_code in (200, 204)
+    assert counters() == {1: 1, 2: 0}
+
+    # Reconstruir sobre contadores existentes es un upsert, no un DELETE + INSERT
+    StatsRepository().rebuild()
+    StatsRepository().rebuild()
+    assert counters() == {1: 1, 2: 0}
@@ -0,0 +1,88 @@
+"""
+Tests del perfilador para administradores (/api/auth/profiler).
+"""
+
+import pstats
+
+import pytest
+from sqlalchemy import delete, insert
+
+from config.database import engine, init_db
+from models.user_model import User, UserRole
+from models.weapons_model import Weapon, WeaponCategory
+from services import auth_service, profiler_service
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    init_db()
+    with engine.begin() as conn:
+        for table in (Weapon, WeaponCategory, User):
+            conn.execute(delete(table))
+        conn.execute(insert(WeaponCategory), [{'id': 1, 'name': 'Lance'}])
+        conn.execute(insert(Weapon), [{'id': 1, 'name': 'Iron Lance', 'category_id': 1}])
+        conn.execute(insert(User), [
+            {'id': 1, 'username': 'admin', 'email': 'admin@example.com',
+             'password_hash': 'x', 'role': UserRole.ADMIN},
+            {'id': 2, 'username': 'hunter', 'email': 'hunter@example.com',
+             'password_hash': 'x', 'role': UserRole.USER},
+        ])
+    original_dir = profiler_service.PROFILER_DIR
+    profiler_service.PROFILER_DIR = str(tmp_path_factory.mktemp('profiles'))
+
+    from app import app
+    yield app.test_client()
+
+    profiler_service.PROFILER_DIR = original_dir
+    with engine.begin() as conn:
+        for table in (Weapon, WeaponCategory, User):
+            conn.execute(delete(table))
+
+
+def _auth(user_id, username, role):
+    return {'Authorization': f'Bearer {auth_service.generate_token(user_id, username, role)}'}
+
+
+ADMIN = _auth(1, 'admin', UserRole.ADMIN.value)
+
+
+def test_profiler_requires_admin(client):
+    user = _auth(2, 'hunter', UserRole.USER.value)
+    assert client.post('/api/auth/profiler/sample', json={'seconds': 0.1}).status_code == 401
+    assert client.post('/api/auth/profiler/sample', json={'seconds': 0.1}, headers=user).status_code == 403
+
+
+def test_sample_returns_collapsed_stacks(client):
+    response = client.post('/api/auth/profiler/sample', json={'seconds': 0.2, 'interval_ms': 5}, headers=ADMIN)
+    assert response.status_code == 200
+    assert int(response.headers['X-Profiler-Samples']) > 0
+    for line in response.get_data(as_text=True).splitlines():
+        stack, count = line.rsplit(' ', 1)
+        assert stack and int(count) > 0
+
+
+@pytest.mark.parametrize('fmt', ['collapsed', 'pstats'])
+def test_request_session_profiles_matching_requests(client, fmt):
+    response = client.post('/api/auth/profiler/requests',
+                           json={'route': '/api/weapons/', 'requests': 2, 'format': fmt}, headers=ADMIN)
+    assert response.status_code == 202
+    result_url = response.get_json()['result_url']
+
+    client.get('/api/categories')  # no coincide con la ruta
+    client.get('/api/weapons/1')
+    running = client.get(result_url, headers=ADMIN)
+    assert running.status_code == 202
+    assert running.get_json()['captured'] == 1
+
+    client.get('/api/weapons/1')
+    result = client.get(result_url, headers=ADMIN)
+    assert result.status_code == 200
+    if fmt == 'pstats':
+        path, _ = profiler_service.find_result(result_url.rsplit('/', 1)[1])
+        functions = {name for _, _, name in pstats.Stats(path).stats}
+        assert 'get_weapon' in functions
+
+
+def test_unknown_session_is_not_found(client):
+    assert client.get('/api/auth/profiler/0123456789abcdef', headers=ADMIN).status_code == 404
+    assert client.get('/api/auth/profiler/..%2Fetc', headers=ADMIN).status_code == 404
@@ -0,0 +1,140 @@
+"""
+Número máximo de consultas SQL por endpoint (ver config/query_stats.py).
+
+Si un cambio introduce un N+1 o una búsqueda repetida, estos tests fallan
+con la lista de sentencias ejecutadas.
+"""
+
+import pytest
+from sqlalchemy import delete, event, insert
+from sqlalchemy.engine.default import CacheStats
+
+from config.database import engine, init_db
+from config.query_stats import assert_max_queries, track_queries
+from models.stats_model import CatalogCounter
+from models.weapons_model import Weapon, WeaponCategory
+from repositories.stats_repository import StatsRepository
+
+
+@pytest.fixture(scope='module')
+def client():
+    init_db()
+    with engine.begin() as conn:
+        for table in (Weapon, WeaponCategory, CatalogCounter):
+            conn.execute(delete(table))
+        conn.execute(insert(WeaponCategory), [{'id': 1, 'name': 'Great Sword'}, {'id': 2, 'name': 'Bow'}])
+        conn.execute(insert(Weapon), [
+            {'id': i, 'name': f'Arma {i}', 'category_id': 1 + i % 2} for i in range(1, 21)
+        ])
+    StatsRepository().rebuild()
+
+    from app import app
+    yield app.test_client()
+
+    with engine.begin() as conn:
+        for table in (Weapon, WeaponCategory, CatalogCounter):
+            conn.execute(delete(table))
+
+
+@pytest.mark.parametrize('path, limit', [
+    ('/api/weapons/1', 1),
+    ('/api/categories/1/weapons', 2),
+    # Con la caché vacía: último seq de catalog_changes, categorías y recuentos
+    ('/api/categories?with_counts=1', 3),
+])
+def test_read_endpoints_query_budget(client, path, limit):
+    with assert_max_queries(limit):
+        assert client.get(path).status_code == 200
+
+
+
+def test_read_endpoints_do_not_load_images(client):
+    # Los GET construyen vistas desde filas Core: la imagen sólo se consulta
+    # con length() para has_image_data, nunca se transfiere
+    with track_queries(capture=True) as stats:
+        for path in ('/api/weapons', '/api/weapons/1', '/api/categories', '/api/categories/1/weapons'):
+            assert client.get(path).status_code == 200
+    assert stats.statements
+    for statement in stats.statements:
+        for column in ('weapons.image_data', 'weapon_categories.icon_data'):
+            assert column not in statement.replace(f'length({column})', '')
+
+def test_create_weapon_query_budget(client):
+    # INSERT ... RETURNING y registro de cambios, más los upserts de los
+    # contadores; sin comprobar antes la categoría ni refrescar la fila después
+    with track_queries(capture=True) as stats:
+        response = client.post('/api/weapons', json={'name': 'Nueva', 'category_id': 1})
+    assert response.status_code == 201
+    assert [statement.split()[0] for statement in stats.statements] == ['INSERT'] * 4
+
+    assert client.post('/api/weapons', json={'name': 'Huérfana', 'category_id': 99}).status_code == 404
+
+
+def test_patch_weapon_query_budget(client):
+    # UPDATE ... RETURNING más el INSERT en catalog_changes; sin SELECT previos
+    with track_queries(capture=True) as stats:
+        response = client.patch('/api/weapons/2', json={'description': 'Corregida'})
+    assert response.status_code == 200
+    assert [statement.split()[0] for statement in stats.statements] == ['UPDATE', 'INSERT']
+
+
+
+def test_category_writes_rely_on_constraints(client):
+    from services import weapons_service
+    from services.runtime import run_sync
+
+    # Sin SELECT previo de nombre duplicado ni COUNT de armas: cada escritura
+    # es una sola sentencia y la BD rechaza los casos inválidos
+    with track_queries(capture=True) as stats:
+        category = run_sync(weapons_service.create_category({'name': 'Hammer'}))
+        assert run_sync(weapons_service.delete_category(category['id']))
+    catalog_reads = [
+        s for s in stats.statements
+        if s.startswith('SELECT') and ('FROM weapons' in s or 'FROM weapon_categories' in s)
+    ]
+    assert catalog_reads == []
+
+    with pytest.raises(ValueError, match="Ya existe una categoría con el nombre 'Bow'"):
+        run_sync(weapons_service.create_category({'name': 'Bow'}))
+    with pytest.raises(ValueError, match=r'tiene \d+ arma\(s\) asociada'):
+        run_sync(weapons_service.delete_category(1))
+    assert run_sync(weapons_service.delete_category(999)) is False
+
+
+def test_hot_lookups_reuse_compiled_statements(client):
+    from repositories.weapon_repository import WeaponRepository
+
+    repo = WeaponRepository()
+    repo.get_view(1)  # Primera compilación (si no la hizo ya otro test)
+    hits = []
+
+    def collect(conn, cursor, statement, parameters, context, executemany):
+        hits.append(context.cache_hit == CacheStats.CACHE_HIT)
+
+    event.listen(engine, 'after_cursor_execute', collect)
+    try:
+        views = [repo.get_view(weapon_id) for weapon_id in (2, 3)]
+        assert repo.count_by_category(1) == repo.count_by_category(1)
+    finally:
+        event.remove(engine, 'after_cursor_execute', collect)
+    # Cada llamada usa su propio parámetro sobre la misma sentencia compilada
+    assert [view.id for view in views] == [2, 3]
+    assert hits[:2] == [True, True] and hits[-1] is True
+
+def test_assert_max_queries_lists_statements(client):
+    with pytest.raises(AssertionError, match='weapon_categories'):
+        with assert_max_queries(1):
+            client.get('/api/categories/1/weapons')
+
+
+def test_server_timing_header(client):
+    response = client.get('/api/weapons/1')
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+    assert 'desc="queries=1"' in response.headers['Server-Timing']
+
+
+def test_queries_outside_tracking_are_not_counted(client):
+    with track_queries() as stats:
+        pass
+    client.get('/api/weapons/1')
+    assert stats.count == 0
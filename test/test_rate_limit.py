@@ -0,0 +1,125 @@
+"""
+Tests de la limitación de peticiones (token buckets) y del control de admisión.
+"""
+
+import os
+import time
+
+import pytest
+from sqlalchemy import delete
+
+from config.database import engine, init_db
+from models.rate_limit_model import RateLimitBucket
+from services import load_shed_service, rate_limit_service
+from services.load_shed_service import AdmissionPool, queue_delay_ms
+from services.rate_limit_service import DatabaseBackend, MemoryBackend, parse_limit
+
+
+@pytest.fixture(scope='module')
+def client():
+    init_db()
+    from app import app
+    yield app.test_client()
+    rate_limit_service.set_backend(None)
+
+
+@pytest.fixture(params=[MemoryBackend, DatabaseBackend])
+def backend(request):
+    init_db()
+    with engine.begin() as conn:
+        conn.execute(delete(RateLimitBucket))
+    backend = request.param()
+    rate_limit_service.set_backend(backend)
+    yield backend
+    rate_limit_service.set_backend(None)
+
+
+def test_parse_limit():
+    limit = parse_limit('30/minute')
+    assert (limit.capacity, limit.period) == (30, 60)
+    assert parse_limit('off') is None
+    with pytest.raises(ValueError):
+        parse_limit('30 por minuto')
+
+
+def test_bucket_refills_over_time(backend, monkeypatch):
+    monkeypatch.setenv('RATE_LIMIT_LOGIN_IP', '3/minute')
+    now = 1_700_000_000.0
+    results = [rate_limit_service.check('login', '198.51.100.1', now=now)[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+
+    allowed, retry_after, scope = rate_limit_service.check('login', '198.51.100.1', now=now)
+    assert (allowed, scope) == (False, 'ip')
+    assert retry_after == pytest.approx(20)
+
+    # Un token se recarga cada 20 s; otra IP tiene su propio bucket
+    assert rate_limit_service.check('login', '198.51.100.1', now=now + 20)[0]
+    assert rate_limit_service.check('login', '198.51.100.2', now=now)[0]
+
+
+def test_login_is_limited_per_user(client, backend, monkeypatch):
+    monkeypatch.setenv('RATE_LIMIT_LOGIN_USER', '2/minute')
+    attempt = {'username': 'Rathalos', 'password': 'incorrecta'}
+    assert client.post('/api/auth/login', json=attempt).status_code == 401
+    assert client.post('/api/auth/login', json=attempt).status_code == 401
+
+    response = client.post('/api/auth/login', json={'username': 'rathalos', 'password': 'otra'})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    # Otro usuario desde la misma IP no se ve afectado
+    assert client.post('/api/auth/login', json={'username': 'nargacuga', 'password': 'x'}).status_code == 401
+
+
+def test_image_rule_stays_in_memory_and_keys_are_hashed(monkeypatch):
+    monkeypatch.setattr(rate_limit_service, 'RATE_LIMIT_BACKEND', 'database')
+    assert isinstance(rate_limit_service.get_backend('images'), MemoryBackend)
+
+    key = rate_limit_service.bucket_key('login', 'user', 'name:' + 'x' * 500)
+    assert key.startswith('login:user:') and len(key) == len('login:user:') + 64
+
+
+def test_queue_delay_header_formats():
+    now = 1_700_000_000.5
+    assert queue_delay_ms({'X-Request-Start': 't=1700000000.250'}, now) == pytest.approx(250)
+    assert queue_delay_ms({'X-Request-Start': '1700000000400'}, now) == pytest.approx(100)
+    assert queue_delay_ms({'X-Request-Start': '1700000000000000'}, now) == pytest.approx(500)
+    assert queue_delay_ms({}, now) is None
+
+
+def test_worker_queue_wait_counts_as_queue_delay():
+    load_shed_service.set_worker_queue_wait(250)
+    try:
+        assert load_shed_service.request_delay_ms({}) == 250
+        assert load_shed_service.request_delay_ms({'X-Request-Start': f't={time.time() - 0.5}'}) >= 500
+    finally:
+        load_shed_service.set_worker_queue_wait(None)
+    assert load_shed_service.request_delay_ms({}) is None
+    # Ningún grupo puede ocupar todos los hilos del worker
+    assert all(c < int(os.getenv('SERVE_THREADS', '4')) or c == 1
+               for c in load_shed_service.DEFAULT_CONCURRENCY.values())
+
+
+def test_admission_pool_sheds_when_full():
+    pool = AdmissionPool('test', concurrency=1, target_ms=20)
+    assert pool.acquire() is None
+    started = time.perf_counter()
+    assert pool.acquire() == 'concurrency'
+    assert time.perf_counter() - started < 0.5
+    pool.release()
+    assert pool.acquire(upstream_delay_ms=50) == 'queue'
+    assert pool.acquire(upstream_delay_ms=5) is None
+    pool.release()
+
+
+def test_overloaded_login_returns_503(client, backend, monkeypatch):
+    pool = AdmissionPool('bcrypt', concurrency=1, target_ms=10)
+    monkeypatch.setitem(load_shed_service._pools, 'bcrypt', pool)
+    pool.acquire()
+    try:
+        response = client.post('/api/auth/login', json={'username': 'diablos', 'password': 'x'})
+    finally:
+        pool.release()
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(load_shed_service.LOAD_SHED_RETRY_AFTER)
+    # Las lecturas baratas no pasan por el control de admisión
+    assert client.get('/api/categories').status_code == 200
@@ -0,0 +1,60 @@
+import os
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+import config.database as database
+from config.database import ReplicaSet, get_read_db, use_primary
+
+
+def _sqlite_engine(tmp_path, name):
+    return create_engine(f"sqlite:///{os.path.join(tmp_path, name)}")
+
+
+def test_round_robin_between_healthy_replicas(tmp_path):
+    a, b = _sqlite_engine(tmp_path, 'a.db'), _sqlite_engine(tmp_path, 'b.db')
+    replicas = ReplicaSet([a, b], eject_seconds=60)
+
+    assert [replicas.choose() for _ in range(4)] == [a, b, a, b]
+
+    replicas.eject(a)
+    assert {replicas.choose() for _ in range(4)} == {b}
+
+    replicas.eject(b)
+    assert replicas.choose() is None
+
+
+def test_replica_with_connection_errors_is_ejected(tmp_path):
+    broken = _sqlite_engine(tmp_path, os.path.join('missing', 'replica.db'))
+    replicas = ReplicaSet([broken], eject_seconds=60)
+
+    with pytest.raises(OperationalError):
+        with broken.connect() as conn:
+            conn.execute(text('SELECT 1'))
+
+    assert replicas.healthy() == []
+
+
+def test_reads_go_to_replica_unless_pinned(tmp_path, monkeypatch):
+    replica = _sqlite_engine(tmp_path, 'replica.db')
+    monkeypatch.setattr(database, 'replicas', ReplicaSet([replica]))
+
+    db = next(get_read_db())
+    assert db.get_bind() is replica
+    db.close()
+
+    with use_primary():
+        db = next(get_read_db())
+        assert db.get_bind() is database.engine
+        db.close()
+
+
+def test_postgres_urls_default_to_psycopg3():
+    from config.async_database import async_database_url
+
+    assert database.with_default_driver('postgres://u:p@db/wiki') == 'postgresql+psycopg://u:p@db/wiki'
+    assert database.with_default_driver('postgresql://u:p@db/wiki') == 'postgresql+psycopg://u:p@db/wiki'
+    # Un driver explícito (o SQLite) se respeta
+    assert database.with_default_driver('postgresql+psycopg2://u:p@db/wiki') == 'postgresql+psycopg2://u:p@db/wiki'
+    assert database.with_default_driver('sqlite:///wiki.db') == 'sqlite:///wiki.db'
+    assert async_database_url('postgresql+psycopg://u:p@db/wiki') == 'postgresql+asyncpg://u:p@db/wiki'
@@ -0,0 +1,40 @@
+"""
+Tests del dimensionado del pool por worker en serve.py
+"""
+
+import pytest
+from serve import DEDICATED_CONNECTIONS, plan_pool
+
+
+def test_pool_follows_threads_when_budget_allows():
+    # 4 hilos + barrido de vida, broker SSE y recálculo de la caché
+    assert plan_pool(workers=3, threads=4, max_connections=100, reserved=5) == (4, 3)
+
+
+def test_pool_never_exceeds_connection_limit():
+    pool_size, max_overflow = plan_pool(workers=9, threads=8, max_connections=50, reserved=5)
+    # La conexión LISTEN de cada worker también cuenta
+    assert 9 * (pool_size + max_overflow + DEDICATED_CONNECTIONS) <= 45
+    assert pool_size >= 1
+
+
+def test_explicit_pool_is_validated():
+    assert plan_pool(2, 4, 100, 5, pool_size=10, max_overflow=5) == (10, 5)
+    with pytest.raises(ValueError):
+        plan_pool(8, 4, 100, 5, pool_size=10, max_overflow=5)
+    # 5 × (15 + 4) = 95 cabe justo; con la conexión LISTEN ya no
+    with pytest.raises(ValueError):
+        plan_pool(5, 4, 100, 5, pool_size=15, max_overflow=4)
+
+
+def test_too_many_workers_is_rejected():
+    with pytest.raises(ValueError):
+        plan_pool(workers=8, threads=4, max_connections=10, reserved=5)
+
+
+@pytest.mark.parametrize('value, expected', [('5', 5), ('0', 0), ('none', None), ('', None)])
+def test_prepare_threshold_keeps_zero(monkeypatch, value, expected):
+    from config import pool
+
+    monkeypatch.setenv('DB_PREPARE_THRESHOLD', value)
+    assert pool._env_optional_int('DB_PREPARE_THRESHOLD', '5') == expected
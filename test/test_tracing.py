@@ -0,0 +1,86 @@
+"""
+Tests de las trazas por capas (services/tracing_service.py).
+"""
+
+import pytest
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from sqlalchemy import delete, insert
+
+from config.database import engine, init_db
+from models.stats_model import CatalogCounter
+from models.weapons_model import Weapon, WeaponCategory
+from services import tracing_service
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_SPAN_ID = '00f067aa0ba902b7'
+
+
+@pytest.fixture(scope='module')
+def client():
+    init_db()
+    with engine.begin() as conn:
+        for table in (Weapon, WeaponCategory, CatalogCounter):
+            conn.execute(delete(table))
+        conn.execute(insert(WeaponCategory), [{'id': 1, 'name': 'Gunlance'}])
+    from app import app
+    yield app.test_client()
+    with engine.begin() as conn:
+        for table in (Weapon, WeaponCategory, CatalogCounter):
+            conn.execute(delete(table))
+
+
+@pytest.fixture
+def spans():
+    exporter = InMemorySpanExporter()
+    tracing_service.configure(exporter)
+    yield exporter
+    tracing_service.shutdown()
+
+
+def _by_name(finished):
+    return {span.name: span for span in finished}
+
+
+def test_write_is_traced_through_every_layer(client, spans):
+    response = client.post('/api/weapons', json={'name': 'Gunlance I', 'category_id': 1},
+                           headers={'traceparent': f'00-{TRACE_ID}-{PARENT_SPAN_ID}-01'})
+    assert response.status_code == 201
+    assert response.headers['X-Trace-Id'] == TRACE_ID
+
+    finished = spans.get_finished_spans()
+    named = _by_name(finished)
+    server = named['POST /api/weapons']
+    controller = named['weapons.create_new_weapon']
+    service = named['weapons_service.create_weapon']
+    repository = named['WeaponRepository.create']
+
+    # La traza continúa la del cliente
+    assert format(server.parent.span_id, '016x') == PARENT_SPAN_ID
+    assert all(format(span.context.trace_id, '032x') == TRACE_ID for span in finished)
+    assert controller.parent.span_id == server.context.span_id
+    assert service.parent.span_id == controller.context.span_id
+    assert repository.parent.span_id == service.context.span_id
+    assert server.attributes['http.response.status_code'] == 201
+
+    inserts = [span for span in finished
+               if span.attributes.get('db.operation') == 'INSERT' and 'weapons' in span.attributes['db.statement']]
+    assert inserts and inserts[0].parent.span_id == repository.context.span_id
+
+
+def test_disabled_tracing_records_nothing(client):
+    exporter = InMemorySpanExporter()
+    response = client.get('/api/weapons')
+    assert response.status_code == 200
+    assert 'X-Trace-Id' not in response.headers
+    assert exporter.get_finished_spans() == ()
+
+
+def test_file_exporter_writes_json_lines(tmp_path):
+    path = tmp_path / 'traces.jsonl'
+    tracing_service.configure(tracing_service.JsonLinesSpanExporter(str(path)))
+    try:
+        with tracing_service.span('bcrypt.hash', layer='crypto'):
+            pass
+    finally:
+        tracing_service.shutdown()
+    assert '"name": "bcrypt.hash"' in path.read_text(encoding='utf-8')
@@ -0,0 +1,108 @@
+"""
+Monster Hunter Weapons API - Worker de trabajos en segundo plano
+
+Consume la cola de la tabla ``jobs`` (ver services/jobs_service.py): las
+importaciones masivas, el procesado de imágenes, las exportaciones y el
+recálculo de estadísticas que encolan los endpoints con ``202 Accepted``.
+
+Uso:
+    python worker.py                         # procesar trabajos hasta SIGTERM/Ctrl+C
+    python worker.py --concurrency 4         # 4 hilos tomando trabajos en paralelo
+    python worker.py --kinds weapon.image    # sólo ciertos tipos de trabajo
+    python worker.py --once                  # vaciar la cola y terminar (cron)
+    python worker.py --status                # trabajos por estado
+
+Se pueden arrancar tantos procesos como se quiera (en una o varias máquinas):
+cada trabajo lo toma un único worker gracias a ``FOR UPDATE SKIP LOCKED``.
+
+Variables de entorno:
+- JOB_POLL_SECONDS: Espera con la cola vacía (por defecto 1)
+- JOB_MAX_ATTEMPTS: Intentos por trabajo (por defecto 3)
+- JOB_RETRY_BASE_SECONDS: Espera base entre reintentos, se duplica (por defecto 10)
+- JOB_STALE_SECONDS: Un trabajo en curso sin renovar en este tiempo vuelve a la cola (por defecto 600)
+- JOB_HEARTBEAT_SECONDS: Cada cuánto se renueva el trabajo en curso (por defecto JOB_STALE_SECONDS / 4)
+- JOB_RETENTION_SECONDS: Antigüedad a la que se borran los terminados (por defecto 7 días)
+- IMAGE_MAX_SIZE: Lado máximo en píxeles de las imágenes procesadas (por defecto 512)
+
+SIGTERM o Ctrl+C terminan el worker al acabar los trabajos en curso.
+"""
+
+import argparse
+import logging
+import signal
+import sys
+import threading
+from dotenv import load_dotenv
+
+
+def main(argv=None):
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='Worker de trabajos en segundo plano')
+    parser.add_argument('--concurrency', type=int, default=1, help='Hilos tomando trabajos (por defecto 1)')
+    parser.add_argument('--kinds', help='Tipos de trabajo separados por comas (por defecto todos)')
+    parser.add_argument('--poll', type=float, default=None, help='Segundos de espera con la cola vacía')
+    parser.add_argument('--once', action='store_true', help='Terminar en cuanto la cola esté vacía')
+    parser.add_argument('--status', action='store_true', help='Mostrar los trabajos por estado y salir')
+    args = parser.parse_args(argv)
+
+    if args.concurrency < 1:
+        parser.error('--concurrency debe ser al menos 1')
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    # Importar después de cargar .env (la configuración se lee al importar)
+    from config.database import init_db
+    from services import jobs_service
+
+    init_db()
+
+    if args.status:
+        for status, count in sorted(jobs_service.queue_counts().items()):
+            print(f"{status:10} {count}")
+        return 0
+
+    kinds = [kind.strip() for kind in args.kinds.split(',') if kind.strip()] if args.kinds else None
+    unknown = sorted(set(kinds or ()) - set(jobs_service.job_kinds()))
+    if unknown:
+        parser.error(f"Tipos de trabajo desconocidos: {', '.join(unknown)}")
+
+    base_id = jobs_service.default_worker_id()
+    workers = [
+        jobs_service.Worker(f"{base_id}:{index}", kinds=kinds, poll_seconds=args.poll)
+        for index in range(args.concurrency)
+    ]
+
+    def shutdown(signum, frame):
+        print("⏹️  Deteniendo el worker (se terminan los trabajos en curso)...")
+        for worker in workers:
+            worker.stop()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    print(f"⚙️  Worker {base_id}: {args.concurrency} hilo(s), "
+          f"trabajos: {', '.join(kinds or jobs_service.job_kinds())}")
+
+    processed = [0] * len(workers)
+
+    def run(index):
+        processed[index] = workers[index].run(once=args.once)
+
+    threads = [
+        threading.Thread(target=run, args=(index,), name=f'job-worker-{index}', daemon=True)
+        for index in range(len(workers))
+    ]
+    for thread in threads:
+        thread.start()
+    # join con timeout para que la señal se atienda en el hilo principal
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=0.5)
+
+    print(f"✅ Worker detenido: {sum(processed)} trabajo(s) procesado(s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())